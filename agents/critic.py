@@ -1,31 +1,39 @@
 """
 Critic agent for code review and quality assurance.
 """
+from typing import Callable
 from crewai import Agent
-from langchain_ollama import ChatOllama
-from config import get_model_for_task, OLLAMA_HOST, OLLAMA_KEEP_ALIVE
+from agents.llm import build_agent_llm, build_caller
+
+ROLE = "Code Reviewer"
+GOAL = (
+    "Review code and output a valid JSON ReviewResult object:\n"
+    "- status: 'PASS' for clean code, 'ISSUES' if changes needed\n"
+    "- diffs: [] for PASS, or list of suggested changes for ISSUES\n"
+    "\nOutput ONLY the JSON object, no other text."
+)
+BACKSTORY = (
+    "You are a thorough code reviewer focused on correctness, imports, "
+    "I/O handling, and edge cases. You provide specific, actionable feedback."
+)
 
 def critic_agent() -> Agent:
     """Create a critic agent that outputs structured ReviewResult JSON."""
-    llm = ChatOllama(
-        model=f"ollama/{get_model_for_task('critic')}",
-        base_url=OLLAMA_HOST,
-        keep_alive=OLLAMA_KEEP_ALIVE,
-        temperature=0.2
-    )
-    
+    llm = build_agent_llm('critic', 0.2)
+
     return Agent(
-        role="Code Reviewer",
-        goal=(
-            "Review code and output a valid JSON ReviewResult object:\n"
-            "- status: 'PASS' for clean code, 'ISSUES' if changes needed\n"
-            "- diffs: [] for PASS, or list of suggested changes for ISSUES\n"
-            "\nOutput ONLY the JSON object, no other text."
-        ),
-        backstory=(
-            "You are a thorough code reviewer focused on correctness, imports, "
-            "I/O handling, and edge cases. You provide specific, actionable feedback."
-        ),
+        role=ROLE,
+        goal=GOAL,
+        backstory=BACKSTORY,
         llm=llm,
         verbose=True
-    )
\ No newline at end of file
+    )
+
+def critic_reviewer() -> Callable[[str], str]:
+    """
+    Create a thread-safe reviewer for map-reduce review (see utils.review).
+
+    Each call sends one chunk prompt straight to the critic model with the
+    agent's role as system prompt, so chunks can be reviewed concurrently.
+    """
+    return build_caller('critic', 0.2, f"You are a {ROLE}. {BACKSTORY}\n\nYour goal: {GOAL}")
@@ -1,45 +1,107 @@
 """
 Engineer agent for code generation.
 """
+from contextlib import contextmanager
+from typing import Any, Callable, Iterator, Optional
 from crewai import Agent
-from langchain_ollama import ChatOllama
-from config import get_model_for_task, OLLAMA_HOST, OLLAMA_KEEP_ALIVE
-
-def engineer_agent() -> Agent:
-    """Create an engineer agent that outputs clean Python code."""
-    llm = ChatOllama(
-        model=f"ollama/{get_model_for_task('engineer')}",
-        base_url=OLLAMA_HOST,
-        keep_alive=OLLAMA_KEEP_ALIVE,
-        temperature=0.4  # Increased for more creative outputs
+from crewai.events import crewai_event_bus
+from crewai.events.types.llm_events import LLMStreamChunkEvent
+from agents.llm import build_agent_llm, build_caller
+from utils.engineer_output import StreamingFileWriter
+
+class EngineerStreamHandler:
+    """
+    Pipe one agent's streamed LLM response into a StreamingFileWriter.
+
+    crewai reports streamed tokens as LLMStreamChunkEvents on its event bus
+    (synchronously, in order); chunks of other agents and tool-call arguments
+    are ignored. A chunk from a new call (the agent retrying after a bad
+    answer) starts the writer over.
+    """
+
+    def __init__(self, writer: StreamingFileWriter, agent_id: str):
+        self.writer = writer
+        self.agent_id = agent_id
+        self._call: Optional[str] = None
+
+    def on_chunk(self, source: Any, event: LLMStreamChunkEvent) -> None:
+        if event.agent_id != self.agent_id or event.tool_call is not None:
+            return
+        if event.call_id != self._call:
+            self._call = event.call_id
+            self.writer.reset()
+        self.writer.feed(event.chunk)
+
+@contextmanager
+def stream_files(agent: Agent, writer: Optional[StreamingFileWriter]) -> Iterator[None]:
+    """
+    Feed `writer` with the response `agent` streams while the block runs.
+
+    The agent must have been created with `engineer_agent(stream=True)`;
+    with no writer this does nothing.
+    """
+    if writer is None:
+        yield
+        return
+    handler = EngineerStreamHandler(writer, str(agent.id))
+    crewai_event_bus.register_handler(LLMStreamChunkEvent, handler.on_chunk)
+    try:
+        yield
+    finally:
+        crewai_event_bus.off(LLMStreamChunkEvent, handler.on_chunk)
+
+ROLE = "Senior Full-Stack Engineer and UI/UX Expert"
+GOAL = (
+    "Generate a comprehensive, production-ready Next.js application that showcases modern web development best practices.\n"
+    "Create a complete file structure with clean, maintainable code and intuitive user interfaces.\n"
+    "Implement TypeScript throughout for type safety and developer experience.\n"
+    "Design responsive components using Tailwind CSS for beautiful, accessible UI.\n"
+    "Structure the application with proper separation of concerns and reusable components.\n"
+    "Include proper error handling, loading states, and user feedback mechanisms.\n\n"
+    "Output Format: A single JSON object where keys are file paths and values are file content strings.\n"
+    "Example (truncated):\n"
+    '{\n'
+    '  "package.json": "{\\"name\\": \\"weather-app\\",\\"version\\": \\"1.0.0\\" }",\n'
+    '  "pages/index.tsx": "import React from \'react\'\\n\\nconst HomePage = () => {\\n  return <div>Weather Dashboard</div>\\n}\\n\\nexport default HomePage",\n'
+    '  "components/WeatherCard.tsx": "import React from \'react\'\\n\\ninterface WeatherCardProps {\\n  temperature: number;\\n}\\n\\nconst WeatherCard: React.FC<WeatherCardProps> = ({ temperature }) => {\\n  return <div>{temperature}°C</div>\\n}\\n\\nexport default WeatherCard"\n'
+    '}'
+)
+BACKSTORY = (
+    "You are a seasoned Full-Stack Engineer and UI/UX Expert with over 10 years of experience building modern web applications. "
+    "You've specialized in React and Next.js ecosystems, creating intuitive, accessible, and performant applications. "
+    "You are known for your attention to detail, clean code architecture, and thoughtful component design. "
+    "Your expertise in TypeScript, API integration, and state management has made you a sought-after developer for complex web projects. "
+    "You prioritize user experience and accessibility while maintaining excellent developer experience through well-structured code."
+)
+
+def engineer_agent(stream: bool = False) -> Agent:
+    """
+    Create an engineer agent that outputs a Next.js app as a JSON file map.
+
+    Args:
+        stream: Stream the response, so `stream_files` can write files as they arrive
+    """
+    llm = build_agent_llm(
+        'engineer',
+        0.4,  # Increased for more creative outputs
+        stream=stream
     )
     
     return Agent(
-        role="Senior Full-Stack Engineer and UI/UX Expert",
-        goal=(
-            "Generate a comprehensive, production-ready Next.js application that showcases modern web development best practices.\n"
-            "Create a complete file structure with clean, maintainable code and intuitive user interfaces.\n"
-            "Implement TypeScript throughout for type safety and developer experience.\n"
-            "Design responsive components using Tailwind CSS for beautiful, accessible UI.\n"
-            "Structure the application with proper separation of concerns and reusable components.\n"
-            "Include proper error handling, loading states, and user feedback mechanisms.\n\n"
-            "Output Format: A single JSON object where keys are file paths and values are file content strings.\n"
-            "Example (truncated):\n"
-            '{\n'
-            '  "package.json": "{\\"name\\": \\"weather-app\\",\\"version\\": \\"1.0.0\\" }",\n'
-            '  "pages/index.tsx": "import React from \'react\'\\n\\nconst HomePage = () => {\\n  return <div>Weather Dashboard</div>\\n}\\n\\nexport default HomePage",\n'
-            '  "components/WeatherCard.tsx": "import React from \'react\'\\n\\ninterface WeatherCardProps {\\n  temperature: number;\\n}\\n\\nconst WeatherCard: React.FC<WeatherCardProps> = ({ temperature }) => {\\n  return <div>{temperature}°C</div>\\n}\\n\\nexport default WeatherCard"\n'
-            '}'
-        ),
-        backstory=(
-            "You are a seasoned Full-Stack Engineer and UI/UX Expert with over 10 years of experience building modern web applications. "
-            "You've specialized in React and Next.js ecosystems, creating intuitive, accessible, and performant applications. "
-            "You are known for your attention to detail, clean code architecture, and thoughtful component design. "
-            "Your expertise in TypeScript, API integration, and state management has made you a sought-after developer for complex web projects. "
-            "You prioritize user experience and accessibility while maintaining excellent developer experience through well-structured code."
-        ),
+        role=ROLE,
+        goal=GOAL,
+        backstory=BACKSTORY,
         llm=llm,
         tools=[],
         allow_delegation=False,
         verbose=True
-    )
\ No newline at end of file
+    )
+
+def engineer_generator() -> Callable[[str], str]:
+    """
+    Create a thread-safe generator for two-stage generation (see utils.staged_generation).
+
+    Each call sends one manifest or file prompt straight to the engineer model
+    with the agent's role as system prompt; the prompt itself sets the output format.
+    """
+    return build_caller('engineer', 0.4, f"You are a {ROLE}. {BACKSTORY}")
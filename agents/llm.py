@@ -0,0 +1,248 @@
+"""
+Shared LLM construction for all agents.
+Every call goes through `build_llm`'s ChatOllama so it shares the on-disk
+response cache and the model pool's HTTP transport (and host routing), and
+reports each call (tokens, throughput, model load time, cache status) to the
+trace. crewai agents get an `AgentLLM`, which makes their calls the same way.
+"""
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple, Union
+from langchain_core.caches import BaseCache
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.load import dumps, loads
+from langchain_ollama import ChatOllama
+from crewai.events.types.llm_events import LLMCallType
+from crewai.llms.base_llm import BaseLLM, llm_call_context
+from pydantic import PrivateAttr
+from config import get_model_for_task, OLLAMA_KEEP_ALIVE
+from utils.llm_cache import ResponseCache, get_response_cache, make_key
+from utils.model_pool import get_model_pool
+from utils.tracing import Span, current_span, record_llm_call
+
+class PersistentLLMCache(BaseCache):
+    """LangChain cache adapter over the content-addressed ResponseCache."""
+
+    def __init__(self, store: ResponseCache, model: str):
+        self.store = store
+        self.model = model
+        self._local = threading.local()
+
+    @property
+    def last_status(self) -> Optional[str]:
+        """'hit' or 'miss' for the most recent lookup on this thread."""
+        return getattr(self._local, "status", None)
+
+    def lookup(self, prompt: str, llm_string: str) -> Optional[Sequence[Any]]:
+        value = self.store.get(make_key(self.model, prompt, llm_string))
+        self._local.status = "miss" if value is None else "hit"
+        return loads(value) if value is not None else None
+
+    def update(self, prompt: str, llm_string: str, return_val: Sequence[Any]) -> None:
+        self.store.put(make_key(self.model, prompt, llm_string), dumps(list(return_val)))
+
+    def clear(self, **kwargs: Any) -> None:
+        self.store.clear()
+
+class TracingHandler(BaseCallbackHandler):
+    """Report every LLM call of one agent as an 'llm' span in the trace."""
+
+    def __init__(self, task: str, model: str, cache: Optional[PersistentLLMCache]):
+        self.task = task
+        self.model = model
+        self.cache = cache
+        self._calls: Dict[Any, Tuple[float, Optional[Span]]] = {}
+        self._first_token: Dict[Any, float] = {}
+
+    def on_chat_model_start(self, serialized: Any, messages: Any, *, run_id: Any = None, **kwargs: Any) -> None:
+        self._calls[run_id] = (time.perf_counter(), current_span())
+
+    def on_llm_start(self, serialized: Any, prompts: Any, *, run_id: Any = None, **kwargs: Any) -> None:
+        self._calls[run_id] = (time.perf_counter(), current_span())
+
+    def on_llm_new_token(self, token: str, *, run_id: Any = None, **kwargs: Any) -> None:
+        self._first_token.setdefault(run_id, time.perf_counter())
+
+    def on_llm_end(self, response: Any, *, run_id: Any = None, **kwargs: Any) -> None:
+        start, parent = self._calls.pop(run_id, (time.perf_counter(), current_span()))
+        first_token = self._first_token.pop(run_id, None)
+        wall = time.perf_counter() - start
+        cache = self.cache.last_status if self.cache is not None else None
+        prompt_tokens, completion_tokens, eval_seconds, load_seconds = _usage(response)
+        prefill_seconds = _prefill_seconds(response)
+        if cache == "hit":
+            # Served from disk: no inference happened
+            prompt_tokens = completion_tokens = 0
+            eval_seconds = load_seconds = prefill_seconds = 0.0
+        else:
+            get_model_pool().note_loaded(self.model, load_seconds)
+        # Streamed calls have a measured first token; otherwise everything before generation counts
+        ttft = first_token - start if first_token is not None else max(0.0, wall - eval_seconds)
+        record_llm_call(self.model, wall, prompt_tokens, completion_tokens, eval_seconds, cache, parent=parent,
+                        load_seconds=load_seconds, phase=self.task, ttft_ms=round(ttft * 1000, 2),
+                        prefill_ms=round(prefill_seconds * 1000, 2))
+
+    def on_llm_error(self, error: BaseException, *, run_id: Any = None, **kwargs: Any) -> None:
+        start, parent = self._calls.pop(run_id, (time.perf_counter(), current_span()))
+        self._first_token.pop(run_id, None)
+        record_llm_call(self.model, time.perf_counter() - start, 0, 0, 0.0, None, parent=parent,
+                        status="error", phase=self.task, error=f"{type(error).__name__}: {error}")
+
+def _usage(response: Any) -> Tuple[int, int, float, float]:
+    """Extract (prompt tokens, completion tokens, generation seconds, load seconds) from an LLMResult."""
+    try:
+        generation = response.generations[0][0]
+    except (AttributeError, IndexError):
+        return 0, 0, 0.0, 0.0
+    message = getattr(generation, "message", None)
+    usage = getattr(message, "usage_metadata", None) or {}
+    meta = getattr(message, "response_metadata", None) or generation.generation_info or {}
+    prompt_tokens = usage.get("input_tokens") or meta.get("prompt_eval_count") or 0
+    completion_tokens = usage.get("output_tokens") or meta.get("eval_count") or 0
+    # Ollama reports durations in nanoseconds
+    return (int(prompt_tokens), int(completion_tokens), (meta.get("eval_duration") or 0) / 1e9,
+            (meta.get("load_duration") or 0) / 1e9)
+
+def _prefill_seconds(response: Any) -> float:
+    """Server-reported prompt evaluation (prefill) time of an LLMResult, 0 if unknown."""
+    try:
+        generation = response.generations[0][0]
+    except (AttributeError, IndexError):
+        return 0.0
+    message = getattr(generation, "message", None)
+    meta = getattr(message, "response_metadata", None) or generation.generation_info or {}
+    return (meta.get("prompt_eval_duration") or 0) / 1e9
+
+def build_llm(task: str, temperature: float, callbacks: Optional[List[Any]] = None) -> ChatOllama:
+    """
+    Create the chat model for a pipeline task.
+
+    Args:
+        task: Task identifier ('research', 'engineer', 'critic', 'marketing')
+        temperature: Sampling temperature
+        callbacks: Optional LangChain callback handlers
+
+    Returns:
+        ChatOllama instance backed by the shared response cache and model pool
+    """
+    model = get_model_for_task(task)
+    store = get_response_cache()
+    cache = PersistentLLMCache(store, model) if store.enabled else None
+    pool = get_model_pool()
+    return ChatOllama(
+        # Ollama's own API takes the plain model name; the "ollama/" prefix is crewai's
+        model=model,
+        base_url=pool.host,
+        keep_alive=OLLAMA_KEEP_ALIVE,
+        temperature=temperature,
+        callbacks=[TracingHandler(task, model, cache), *(callbacks or [])],
+        # cache=False opts out of any global LangChain cache as well
+        cache=cache if cache is not None else False,
+        # Reuse the pool's open connections (and host routing) instead of a pool per agent;
+        # async calls, which the pipeline doesn't make, get ChatOllama's own client
+        sync_client_kwargs={"transport": pool.transport()},
+    )
+
+class _ChunkEvents(BaseCallbackHandler):
+    """Re-emit ChatOllama's streamed tokens as crewai LLMStreamChunkEvents."""
+
+    def __init__(self, llm: "AgentLLM", from_task: Any, from_agent: Any):
+        self.llm = llm
+        self.from_task = from_task
+        self.from_agent = from_agent
+        self.streamed = False
+
+    def on_llm_new_token(self, token: str, **kwargs: Any) -> None:
+        if token:
+            self.streamed = True
+            self.llm._emit_stream_chunk_event(token, self.from_task, self.from_agent, call_type=LLMCallType.LLM_CALL)
+
+class AgentLLM(BaseLLM):
+    """
+    crewai LLM that makes an agent's calls through `build_llm`'s ChatOllama.
+
+    crewai's own Ollama LLM posts to OLLAMA_HOST with its own HTTP client, so
+    agent calls would skip the response cache, the trace, the model pool and
+    host routing. Tools are described in the prompt (ReAct), not passed as
+    native function calls. With `stream=True` each token is reported as an
+    LLMStreamChunkEvent (a cached response as a single chunk).
+    """
+    task: str = ""
+    _chat: ChatOllama = PrivateAttr()
+
+    def __init__(self, **data: Any):
+        super().__init__(**data)
+        self._chat = build_llm(self.task, self.temperature if self.temperature is not None else 0.7)
+
+    def supports_function_calling(self) -> bool:
+        return False
+
+    def call(
+        self,
+        messages: Union[str, List[Dict[str, Any]]],
+        tools: Optional[List[dict]] = None,
+        callbacks: Optional[List[Any]] = None,
+        available_functions: Optional[Dict[str, Any]] = None,
+        from_task: Any = None,
+        from_agent: Any = None,
+        response_model: Any = None,
+    ) -> str:
+        with llm_call_context():
+            self._emit_call_started_event(messages=messages, tools=tools, callbacks=callbacks,
+                                          available_functions=available_functions, from_task=from_task,
+                                          from_agent=from_agent)
+            try:
+                formatted = self._format_messages(messages)
+                self._invoke_before_llm_call_hooks(formatted, from_agent)
+                chunks = _ChunkEvents(self, from_task, from_agent)
+                reply = self._chat.invoke(formatted, stop=self.stop_sequences or None,
+                                          config={"callbacks": [chunks]} if self._effective_stream() else None)
+                text = self._apply_stop_words(reply.content)
+                if self._effective_stream() and not chunks.streamed and text:
+                    chunks.on_llm_new_token(text)
+                text = self._invoke_after_llm_call_hooks(formatted, text, from_agent)
+            except Exception as e:
+                self._emit_call_failed_event(error=f"{type(e).__name__}: {e}", from_task=from_task,
+                                             from_agent=from_agent)
+                raise
+            usage = reply.usage_metadata or {}
+            tokens = {"prompt_tokens": usage.get("input_tokens", 0),
+                      "completion_tokens": usage.get("output_tokens", 0),
+                      "total_tokens": usage.get("total_tokens", 0)}
+            self._track_token_usage_internal(tokens)
+            self._emit_call_completed_event(response=text, call_type=LLMCallType.LLM_CALL, from_task=from_task,
+                                            from_agent=from_agent, messages=formatted, usage=tokens)
+            return text
+
+def build_agent_llm(task: str, temperature: float, stream: bool = False) -> AgentLLM:
+    """
+    Create the model for a crewai agent.
+
+    Args:
+        task: Task identifier ('research', 'engineer', 'critic', 'marketing')
+        temperature: Sampling temperature
+        stream: Report each streamed token as an LLMStreamChunkEvent on crewai's event bus
+
+    Returns:
+        AgentLLM for the task's model, cached, traced and routed like direct calls
+    """
+    return AgentLLM(model=get_model_for_task(task), provider="ollama", task=task, temperature=temperature,
+                    stream=stream)
+
+def build_caller(task: str, temperature: float, system: str) -> Callable[[str], str]:
+    """
+    Plain prompt -> text function on the task's model, outside crewai.
+
+    Used where a phase fans out into many independent requests (or needs a
+    one-off repair call); ChatOllama is safe to call from several threads.
+
+    Args:
+        task: Task identifier used for model routing and tracing
+        temperature: Sampling temperature
+        system: System prompt sent with every call
+    """
+    llm = build_llm(task, temperature)
+
+    def call(prompt: str) -> str:
+        return llm.invoke([("system", system), ("human", prompt)]).content
+    return call
@@ -2,17 +2,11 @@
 Marketing agent for launch copy generation.
 """
 from crewai import Agent
-from langchain_ollama import ChatOllama
-from config import get_model_for_task, OLLAMA_HOST, OLLAMA_KEEP_ALIVE
+from agents.llm import build_agent_llm
 
 def marketing_agent() -> Agent:
     """Create a marketing agent that writes launch copy."""
-    llm = ChatOllama(
-        model=f"ollama/{get_model_for_task('marketing')}",
-        base_url=OLLAMA_HOST,
-        keep_alive=OLLAMA_KEEP_ALIVE,
-        temperature=0.5
-    )
+    llm = build_agent_llm('marketing', 0.5)
     
     return Agent(
         role="Product Marketing",
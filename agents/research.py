@@ -1,19 +1,14 @@
 """
 Research agent for market analysis and requirements gathering.
 """
+from typing import Callable
 from crewai import Agent
-from langchain_ollama import ChatOllama
-from tools.search import web_search
-from config import get_model_for_task, OLLAMA_HOST, OLLAMA_KEEP_ALIVE
+from tools.search import web_search, web_search_many
+from agents.llm import build_agent_llm, build_caller
 
 def research_agent() -> Agent:
     """Create a research agent that outputs structured ResearchSpec JSON."""
-    llm = ChatOllama(
-        model=f"ollama/{get_model_for_task('research')}",
-        base_url=OLLAMA_HOST,
-        keep_alive=OLLAMA_KEEP_ALIVE,
-        temperature=0.3
-    )
+    llm = build_agent_llm('research', 0.3)
     
     return Agent(
         role="Market Research & Spec",
@@ -29,7 +24,11 @@ def research_agent() -> Agent:
             "in a clear JSON format. You validate competitors through web search."
         ),
         llm=llm,
-        tools=[web_search],
+        tools=[web_search_many, web_search],
         allow_delegation=False,
         verbose=True
-    )
\ No newline at end of file
+    )
+
+def research_repairer() -> Callable[[str], str]:
+    """Create a one-shot caller that re-asks the research model for a valid ResearchSpec."""
+    return build_caller('research', 0.0, "You convert product research notes into strict JSON. Output ONLY JSON.")
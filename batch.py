@@ -0,0 +1,151 @@
+"""
+Batch mode: run many product ideas through the pipeline with bounded concurrency.
+
+Ideas are read one per line (plain text) or as JSONL `JobRequest`s; invalid
+lines are skipped and listed in the summary. Each idea gets its own artifacts
+subdirectory and the batch ends with a throughput summary.
+"""
+import hashlib
+import re
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from pydantic import ValidationError
+
+from schemas import JobRequest
+from utils.stats import percentile
+
+@dataclass
+class BatchResult:
+    """Outcome of one idea in a batch."""
+    index: int
+    idea: str
+    out_dir: Path
+    elapsed: float = 0.0
+    timings: Dict[str, float] = field(default_factory=dict)
+    error: Optional[str] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+def load_jobs(lines: Iterable[str]) -> Tuple[List[JobRequest], List[str]]:
+    """
+    Parse batch input into job requests.
+
+    One bad line (an idea shorter than JobRequest allows, broken JSON, ...)
+    doesn't abort the batch: it is skipped and reported.
+
+    Args:
+        lines: Plain-text ideas (one per line) and/or JSON `JobRequest` objects;
+            blank lines and lines starting with '#' are ignored
+
+    Returns:
+        (validated JobRequest objects, one "line N: reason" message per skipped line)
+    """
+    jobs: List[JobRequest] = []
+    errors: List[str] = []
+    for lineno, line in enumerate(lines, 1):
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        try:
+            if line.startswith("{"):
+                jobs.append(JobRequest.model_validate_json(line))
+            else:
+                jobs.append(JobRequest(idea=line))
+        except ValidationError as e:
+            reasons = "; ".join(f"{'.'.join(map(str, err['loc'])) or 'input'}: {err['msg']}" for err in e.errors())
+            errors.append(f"line {lineno}: {reasons}")
+    return jobs, errors
+
+def idea_dir_name(index: int, idea: str) -> str:
+    """Stable, filesystem-safe artifacts subdirectory name for an idea."""
+    slug = re.sub(r"[^a-z0-9]+", "-", idea.lower()).strip("-")[:40].rstrip("-") or "idea"
+    digest = hashlib.sha1(idea.encode("utf-8")).hexdigest()[:8]
+    return f"{index:04d}-{slug}-{digest}"
+
+def run_batch(
+    jobs: List[JobRequest],
+    runner: Callable[..., dict],
+    out_root: Path,
+    parallel: int = 2,
+    **run_kwargs,
+) -> List[BatchResult]:
+    """
+    Run every job through `runner` with at most `parallel` ideas in flight.
+
+    Args:
+        jobs: Jobs to run
+        runner: Pipeline entry point (main.run); called as
+            runner(idea, out_dir=..., **run_kwargs) and returning a dict with "timings"
+        out_root: Directory that receives one subdirectory per idea
+        parallel: Maximum number of ideas processed concurrently
+        **run_kwargs: Extra keyword arguments passed to the runner
+
+    Returns:
+        One BatchResult per job, in input order
+    """
+    results = [
+        BatchResult(index=i, idea=job.idea, out_dir=Path(out_root) / idea_dir_name(i, job.idea))
+        for i, job in enumerate(jobs)
+    ]
+
+    def execute(result: BatchResult) -> BatchResult:
+        start = time.perf_counter()
+        try:
+            outcome = runner(result.idea, out_dir=result.out_dir, **run_kwargs) or {}
+            result.timings = dict(outcome.get("timings", {}))
+        except Exception as e:
+            result.error = f"{type(e).__name__}: {e}"
+            result.out_dir.mkdir(parents=True, exist_ok=True)
+            (result.out_dir / "error_log.txt").write_text(traceback.format_exc(), encoding="utf-8")
+        result.elapsed = time.perf_counter() - start
+        return result
+
+    with ThreadPoolExecutor(max_workers=max(1, parallel)) as pool:
+        futures = [pool.submit(execute, r) for r in results]
+        for done, future in enumerate(as_completed(futures), 1):
+            r = future.result()
+            status = "ok" if r.ok else f"FAILED ({r.error})"
+            print(f"[batch {done}/{len(results)}] {r.out_dir.name}: {status} in {r.elapsed:.1f}s")
+    return results
+
+def summarize(results: List[BatchResult], wall: float, skipped: Sequence[str] = ()) -> str:
+    """
+    Throughput summary: ideas/hour, p50/p95 latency per phase, failures and skipped input lines.
+
+    Args:
+        results: Results returned by run_batch
+        wall: Wall-clock seconds the whole batch took
+        skipped: Errors for input lines load_jobs skipped
+    """
+    succeeded = [r for r in results if r.ok]
+    failed = [r for r in results if not r.ok]
+    rate = len(succeeded) / (wall / 3600.0) if wall > 0 else 0.0
+
+    lines = [
+        f"Batch: {len(results)} ideas, {len(succeeded)} succeeded, {len(failed)} failed in {wall:.1f}s",
+        f"Throughput: {rate:.1f} ideas/hour",
+    ]
+
+    phases: Dict[str, List[float]] = {}
+    for r in succeeded:
+        for phase, seconds in r.timings.items():
+            phases.setdefault(phase, []).append(seconds)
+        phases.setdefault("total", []).append(r.elapsed)
+    if phases:
+        lines.append(f"  {'phase':<12} {'p50':>8} {'p95':>8}")
+        for phase, values in phases.items():
+            lines.append(f"  {phase:<12} {percentile(values, 50):7.1f}s {percentile(values, 95):7.1f}s")
+
+    for r in failed:
+        lines.append(f"  FAILED {r.out_dir.name}: {r.error}")
+    if skipped:
+        lines.append(f"Skipped {len(skipped)} invalid input lines:")
+        lines.extend(f"  {error}" for error in skipped)
+    return "\n".join(lines)
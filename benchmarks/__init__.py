@@ -0,0 +1,4 @@
+"""
+Benchmarks for the AI Startup Simulator's hot paths.
+Run individual scripts with `python -m benchmarks.<name>` from the repo root.
+"""
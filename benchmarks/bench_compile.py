@@ -0,0 +1,66 @@
+"""
+Compare the batch compile gate (tools.runner.check_files) with the
+per-snippet subprocess approach (tools.runner.py_compile_string).
+
+Usage:
+    python -m benchmarks.bench_compile --files 200
+"""
+import argparse
+import json
+import time
+
+from tools.runner import check_files, py_compile_string, shutdown_pool
+
+def synthetic_project(n_files: int, broken_every: int = 25) -> dict:
+    """Generated-looking project: mostly Python modules plus some JSON, a few broken."""
+    files = {}
+    for i in range(n_files):
+        if i % 5 == 4:
+            files[f"config/settings_{i}.json"] = json.dumps({"name": f"svc{i}", "port": 8000 + i, "debug": False})
+            continue
+        body = "\n".join(
+            f"def handler_{i}_{j}(request):\n    data = {{'id': {j}, 'ok': True}}\n    return data\n"
+            for j in range(40)
+        )
+        if broken_every and i % broken_every == 1:
+            body += "\ndef broken(:\n    pass\n"
+        files[f"app/module_{i}.py"] = body
+    return files
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    ap.add_argument("--files", type=int, default=200)
+    ap.add_argument("--subprocess-sample", type=int, default=50,
+                    help="Python files checked with the subprocess approach (extrapolated to all)")
+    args = ap.parse_args()
+
+    files = synthetic_project(args.files)
+    py_files = [(p, c) for p, c in files.items() if p.endswith(".py")]
+
+    sample = py_files[:args.subprocess_sample]
+    start = time.perf_counter()
+    for _, content in sample:
+        py_compile_string(content)
+    per_file = (time.perf_counter() - start) / max(1, len(sample))
+    subprocess_total = per_file * len(py_files)
+
+    start = time.perf_counter()
+    serial = check_files(files, parallel=False)
+    in_process = time.perf_counter() - start
+
+    check_files(files, parallel=True)  # warm the persistent pool
+    start = time.perf_counter()
+    pooled = check_files(files, parallel=True)
+    pooled_time = time.perf_counter() - start
+    shutdown_pool()
+
+    assert serial == pooled
+    failures = sum(1 for ok, _ in pooled.values() if not ok)
+    print(f"{len(files)} files ({len(py_files)} Python), {failures} with syntax errors")
+    print(f"  subprocess per snippet : {subprocess_total * 1000:9.1f} ms  ({per_file * 1000:.1f} ms/file, Python only)")
+    print(f"  check_files in-process : {in_process * 1000:9.1f} ms")
+    print(f"  check_files pooled     : {pooled_time * 1000:9.1f} ms")
+    print(f"  speedup vs subprocess  : {subprocess_total / min(in_process, pooled_time):9.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+JSON extraction benchmark on 1-20 MB engineer outputs.
+
+Times utils.engineer_output.scan_json_object on complete, fenced, truncated
+and malformed objects against the previous regex + json.loads extractor, and
+reports how many files each recovers (the regex extractor recovers none once
+the object is cut off).
+
+Usage:
+    python -m benchmarks.bench_extract [--sizes 1 5 10 20] [--repeat 3]
+"""
+import argparse
+import json
+import re
+from typing import Callable, Dict, List, Optional
+
+from benchmarks.bench_pipeline import timeit
+from benchmarks.fake_ollama import synthetic_project
+
+def legacy_extract(raw: str) -> dict:
+    """The extractor before the linear scanner: fenced regex, then greedy brace regex."""
+    match = re.search(r'```(?:json)?\s*([\s\S]*?)\s*```', raw)
+    if match:
+        return json.loads(match.group(1))
+    match = re.search(r'(\{[\s\S]*\})', raw)
+    if match:
+        return json.loads(match.group(1))
+    raise ValueError("No JSON object found in the engineer output")
+
+def variants(files: Dict[str, str]) -> Dict[str, str]:
+    """Engineer outputs of the same project in the shapes models actually produce."""
+    raw = json.dumps(files, indent=1)
+    third = len(raw) // 3
+    # An unescaped quote inside one file's content, a third of the way in
+    quote = raw.index('": "', third) + 4
+    return {
+        "complete": raw,
+        "fenced": "Here is the app:\n```json\n" + raw + "\n```\nLet me know if you need changes.",
+        "truncated": raw[:len(raw) * 2 // 3],
+        "stray_quote": raw[:quote] + 'say "hi" ' + raw[quote:],
+    }
+
+def recovered(extract: Callable[[str], dict], raw: str) -> int:
+    try:
+        return len(extract(raw))
+    except ValueError:
+        return 0
+
+def run(sizes: List[float], repeat: int) -> List[dict]:
+    from utils.engineer_output import extract_json_object
+
+    rows = []
+    for mb in sizes:
+        files = synthetic_project(int(mb * 1024 * 1024))
+        for shape, raw in variants(files).items():
+            row = {"mb": mb, "shape": shape, "files": len(files)}
+            for name, extract in (("scan", extract_json_object), ("legacy", legacy_extract)):
+                def once(extract=extract) -> None:
+                    try:
+                        extract(raw)
+                    except ValueError:
+                        pass
+                row[name] = dict(timeit(once, repeat), recovered=recovered(extract, raw))
+            rows.append(row)
+    return rows
+
+def main(argv: Optional[List[str]] = None) -> None:
+    ap = argparse.ArgumentParser(description="Benchmark JSON extraction on large engineer outputs")
+    ap.add_argument("--sizes", type=float, nargs="+", default=[1, 5, 10, 20], help="Output sizes in MB")
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--json", action="store_true", help="Print raw results as JSON")
+    args = ap.parse_args(argv)
+
+    rows = run(args.sizes, args.repeat)
+    if args.json:
+        print(json.dumps(rows, indent=2))
+        return
+    print(f"{'MB':>5} {'shape':<12} {'files':>6} {'scan ms':>9} {'recovered':>9} {'legacy ms':>10} {'recovered':>9}")
+    for row in rows:
+        scan, legacy = row["scan"], row["legacy"]
+        print(f"{row['mb']:>5g} {row['shape']:<12} {row['files']:>6} {scan['median_ms']:>9.1f} "
+              f"{scan['recovered']:>9} {legacy['median_ms']:>10.1f} {legacy['recovered']:>9}")
+
+if __name__ == "__main__":
+    main()
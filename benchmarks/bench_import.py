@@ -0,0 +1,90 @@
+"""
+Import-time budget for the CLI entry points, measured with `python -X importtime`.
+
+Heavy dependencies (crewai, LangChain, the search backends) must only load
+when a pipeline phase actually runs, so `main.py --help` and importing the
+service module stay cheap. Exits non-zero when a command exceeds its budget
+or pulls in a forbidden module.
+
+Usage:
+    python -m benchmarks.bench_import [--budget-ms 400] [--top 10]
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+from typing import Dict, List, Optional, Sequence, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Must not be imported just to parse arguments or load the service module
+HEAVY_MODULES = ("crewai", "langchain_core", "langchain_ollama", "litellm", "ddgs",
+                 "duckduckgo_search", "json5", "dotenv")
+
+COMMANDS: Dict[str, List[str]] = {
+    "main --help": [os.path.join(ROOT, "main.py"), "--help"],
+    "import service.server": ["-c", "import service.server"],
+}
+
+def parse_importtime(stderr: str) -> List[Tuple[str, int, int]]:
+    """(module, self us, cumulative us) for every top-level import in -X importtime output."""
+    entries = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        # Nested imports are indented two spaces per level after the separator's space
+        name = name.rstrip()[1:]
+        if name and not name.startswith(" "):
+            entries.append((name, int(self_us), int(cumulative_us)))
+    return entries
+
+def measure(args: Sequence[str], cwd: Optional[str] = None) -> Tuple[List[Tuple[str, int, int]], str]:
+    """Run `python -X importtime <args>`; returns top-level imports and stderr."""
+    env = dict(os.environ, PYTHONPATH=ROOT + os.pathsep + os.environ.get("PYTHONPATH", ""))
+    proc = subprocess.run([sys.executable, "-X", "importtime", *args], cwd=cwd or ROOT, env=env,
+                          capture_output=True, text=True, timeout=120)
+    return parse_importtime(proc.stderr), proc.stderr
+
+def import_cost(args: Sequence[str], cwd: Optional[str] = None) -> Dict[str, object]:
+    """
+    Import cost of a command beyond interpreter startup.
+
+    Returns:
+        Dict with total milliseconds, the heavy modules it loaded and the
+        most expensive top-level imports
+    """
+    baseline = {name for name, _, _ in measure(["-c", "pass"], cwd)[0]}
+    entries, stderr = measure(args, cwd)
+    own = [(name, cumulative) for name, _, cumulative in entries if name not in baseline]
+    loaded = {line.rsplit("|", 1)[-1].strip() for line in stderr.splitlines() if line.startswith("import time:")}
+    return {
+        "total_ms": round(sum(c for _, c in own) / 1000, 1),
+        "heavy": sorted(m for m in HEAVY_MODULES if m in loaded),
+        "top": sorted(own, key=lambda e: -e[1]),
+    }
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Check CLI import time against a budget")
+    ap.add_argument("--budget-ms", type=float, default=400.0, help="Per-command import budget")
+    ap.add_argument("--top", type=int, default=8, help="Most expensive imports to list")
+    args = ap.parse_args()
+
+    failed = False
+    with tempfile.TemporaryDirectory() as tmp:
+        for label, command in COMMANDS.items():
+            cost = import_cost(command, cwd=tmp)
+            over = cost["total_ms"] > args.budget_ms or cost["heavy"]
+            failed = failed or bool(over)
+            print(f"{label:<24} {cost['total_ms']:8.1f} ms  {'FAIL' if over else 'ok'}"
+                  + (f"  heavy: {', '.join(cost['heavy'])}" if cost["heavy"] else ""))
+            for name, cumulative in cost["top"][:args.top]:
+                print(f"    {name:<36} {cumulative / 1000:8.1f} ms")
+            if os.listdir(tmp):
+                print(f"    created at import: {', '.join(sorted(os.listdir(tmp)))}")
+                failed = True
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,196 @@
+"""
+Offline benchmark suite for the pipeline, driven by the fake Ollama server.
+
+Times the full `main.run` end to end plus the hot post-processing steps
+(JSON extraction, normalization, file writing, streaming, compile gates) and
+the client side of streaming a large engineer response. Nothing here needs a
+GPU, a real Ollama or network access, so numbers are comparable across commits.
+
+Results are saved to benchmarks/results/<git sha>.json; compare two runs with:
+    python -m benchmarks.bench_pipeline --engineer-mb 2
+    python -m benchmarks.bench_pipeline --compare benchmarks/results/<old sha>.json
+"""
+import argparse
+import json
+import os
+import pathlib
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, List, Optional
+
+from benchmarks.fake_ollama import RESEARCH, FakeOllama, FakeOllamaConfig, pipeline_responses, synthetic_project
+
+RESULTS_DIR = pathlib.Path(__file__).parent / "results"
+
+def git_sha() -> str:
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                             cwd=pathlib.Path(__file__).parent, timeout=10)
+        return out.stdout.strip() or "unknown"
+    except (OSError, subprocess.SubprocessError):
+        return "unknown"
+
+def timeit(fn: Callable[[], object], repeat: int) -> Dict[str, float]:
+    """Run `fn` `repeat` times; returns min/median milliseconds."""
+    samples: List[float] = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return {"min_ms": round(min(samples), 3), "median_ms": round(statistics.median(samples), 3), "n": repeat}
+
+def bench_post_processing(files: Dict[str, str], workdir: pathlib.Path, repeat: int) -> Dict[str, dict]:
+    """Benchmarks for everything that happens to the engineer output after generation."""
+    from benchmarks.bench_compile import synthetic_project as python_project
+    from tools.runner import check_files, py_compile_string, shutdown_pool
+    from utils.engineer_output import StreamingFileWriter, extract_json_object, normalize_file_content, write_files
+
+    raw = json.dumps(files)
+    fenced = "Here is the app:\n```json\n" + json.dumps(files, indent=2) + "\n```\n"
+    results = {
+        "extract_json": timeit(lambda: extract_json_object(raw), repeat),
+        "extract_json_fenced": timeit(lambda: extract_json_object(fenced), repeat),
+        "normalize": timeit(lambda: [normalize_file_content(p, c) for p, c in files.items()], repeat),
+    }
+
+    counter = iter(range(10 ** 6))
+    results["write_files_fresh"] = timeit(lambda: write_files(workdir / f"fresh{next(counter)}", files), repeat)
+    rerun_dir = workdir / "rerun"
+    write_files(rerun_dir, files)
+    results["write_files_unchanged"] = timeit(lambda: write_files(rerun_dir, files), repeat)
+
+    def stream() -> None:
+        writer = StreamingFileWriter(workdir / f"stream{next(counter)}")
+        for i in range(0, len(raw), 4096):
+            writer.feed(raw[i:i + 4096])
+        writer.finish()
+    results["stream_writer_4k_chunks"] = timeit(stream, repeat)
+
+    results["check_files"] = timeit(lambda: check_files(files, parallel=False), repeat)
+    from utils.static_gate import check_project
+    results["static_gate"] = timeit(lambda: check_project(files), repeat)
+    shutdown_pool()
+    for entry in results.values():
+        entry["bytes"] = len(raw)
+
+    # The per-snippet subprocess compile the batch gate replaced, on one generated module
+    module = next(c for p, c in python_project(1, broken_every=0).items() if p.endswith(".py"))
+    results["py_compile_string"] = dict(timeit(lambda: py_compile_string(module), repeat), bytes=len(module))
+    return results
+
+def bench_llm_stream(server: FakeOllama, repeat: int) -> Dict[str, float]:
+    """Client-side cost of streaming the engineer response through ChatOllama."""
+    from langchain_ollama import ChatOllama
+
+    llm = ChatOllama(model="fake-coder", base_url=server.url, temperature=0)
+    prompt = "Generate a complete Next.js app (TypeScript) as a single JSON object."
+    size = 0
+
+    def consume() -> None:
+        nonlocal size
+        size = sum(len(chunk.content) for chunk in llm.stream(prompt))
+    result = timeit(consume, repeat)
+    result["bytes"] = size
+    result["mb_per_sec"] = round(size / 1e6 / (result["median_ms"] / 1000), 2) if result["median_ms"] else None
+    return result
+
+def bench_end_to_end(workdir: pathlib.Path, repeat: int) -> Dict[str, object]:
+    """Full main.run (crewai agents, DAG scheduler, gates, writing files) against the fake server."""
+    import main
+
+    runs: List[dict] = []
+
+    def once() -> None:
+        runs.append(main.run("A pickup basketball game finder", out_dir=workdir / f"run{len(runs)}"))
+    result: Dict[str, object] = dict(timeit(once, repeat))
+    # Timings only count if the runs took the normal path: research.md is the agent's final answer and
+    # the hand-off parsed it (otherwise downstream prompts get the raw text instead of the compact spec)
+    from utils.handoff import parse_research
+    for i in range(len(runs)):
+        research = (workdir / f"run{i}" / "research.md").read_text(encoding="utf-8")
+        assert research == RESEARCH, f"run{i}/research.md isn't the research agent's final answer"
+        parse_research(research)
+    last = runs[-1]
+    result["files"] = last["files"]
+    result["phases_ms"] = {name: round(secs * 1000, 2) for name, secs in last["timings"].items()}
+    return result
+
+def run_suite(engineer_mb: float, tps: float, latency: float, repeat: int, malformed: bool = False) -> dict:
+    """Start the fake server, point the pipeline at it and run every benchmark."""
+    files = synthetic_project(int(engineer_mb * 1024 * 1024))
+    config = FakeOllamaConfig(responses=pipeline_responses(int(engineer_mb * 1024 * 1024), malformed),
+                              tps=tps, latency=latency)
+    cwd = os.getcwd()
+    with FakeOllama(config) as server, tempfile.TemporaryDirectory() as tmp:
+        # Must be set before config is first imported; artifacts/state/logs land in tmp
+        os.environ.update({"OLLAMA_HOST": server.url, "LLM_CACHE": "off", "TRACING": "off",
+                           "CREWAI_TELEMETRY_OPT_OUT": "true", "OTEL_SDK_DISABLED": "true"})
+        os.chdir(tmp)
+        try:
+            workdir = pathlib.Path(tmp)
+            results = {
+                "post_processing": bench_post_processing(files, workdir, repeat),
+                "llm_stream": bench_llm_stream(server, repeat),
+                "end_to_end": bench_end_to_end(workdir, repeat),
+            }
+            results["server_requests"] = len(server.requests)
+        finally:
+            os.chdir(cwd)
+    return results
+
+def _flatten(results: dict, prefix: str = "") -> Dict[str, float]:
+    flat = {}
+    for key, value in results.items():
+        if isinstance(value, dict) and "median_ms" in value:
+            flat[prefix + key] = value["median_ms"]
+        elif isinstance(value, dict):
+            flat.update(_flatten(value, f"{prefix}{key}."))
+    return flat
+
+def compare(old: dict, new: dict) -> str:
+    """Side-by-side medians of two result files."""
+    before, after = _flatten(old["results"]), _flatten(new["results"])
+    lines = [f"{'benchmark':<44} {old['sha']:>12} {new['sha']:>12} {'change':>9}"]
+    for name in sorted(set(before) | set(after)):
+        a, b = before.get(name), after.get(name)
+        if a is None or b is None:
+            lines.append(f"{name:<44} {a if a is not None else '-':>12} {b if b is not None else '-':>12}")
+            continue
+        change = f"{100.0 * (b - a) / a:+.1f}%" if a else "-"
+        lines.append(f"{name:<44} {a:>12.2f} {b:>12.2f} {change:>9}")
+    return "\n".join(lines)
+
+def main(argv: Optional[List[str]] = None) -> None:
+    ap = argparse.ArgumentParser(description="Offline pipeline benchmarks against a fake Ollama server")
+    ap.add_argument("--engineer-mb", type=float, default=1.0, help="Size of the engineer's JSON output")
+    ap.add_argument("--tps", type=float, default=0.0, help="Simulated tokens/sec (0 = unlimited)")
+    ap.add_argument("--latency", type=float, default=0.0, help="Simulated seconds to first token")
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--malformed", action="store_true", help="Serve truncated engineer JSON")
+    ap.add_argument("--compare", metavar="FILE", help="Earlier results file to compare against")
+    ap.add_argument("--no-save", action="store_true", help="Don't write benchmarks/results/<sha>.json")
+    args = ap.parse_args(argv)
+
+    sha = git_sha()
+    record = {
+        "sha": sha,
+        "python": sys.version.split()[0],
+        "params": {"engineer_mb": args.engineer_mb, "tps": args.tps, "latency": args.latency,
+                   "repeat": args.repeat, "malformed": args.malformed},
+        "results": run_suite(args.engineer_mb, args.tps, args.latency, args.repeat, args.malformed),
+    }
+    print(json.dumps(record, indent=2))
+    if not args.no_save:
+        RESULTS_DIR.mkdir(exist_ok=True)
+        path = RESULTS_DIR / f"{sha}.json"
+        path.write_text(json.dumps(record, indent=2), encoding="utf-8")
+        print(f"Saved {path}")
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as fh:
+            print("\n" + compare(json.load(fh), record))
+
+if __name__ == "__main__":
+    main()
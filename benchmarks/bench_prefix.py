@@ -0,0 +1,101 @@
+"""
+Prefill benchmark for the prompt layouts on a batch of ideas.
+
+Sends the research and engineer prompts of a batch to the fake Ollama server
+with its prefix (KV) cache enabled and a finite prefill speed, once per
+PROMPT_LAYOUT, and reports the prompt tokens the server had to evaluate and
+the time to first token per phase. With the idea at the end ("prefix"), the
+system prompt and the instructions are prefilled once per batch instead of
+once per idea.
+
+Usage:
+    python -m benchmarks.bench_prefix [--ideas 20] [--prefill-tps 1500] [--cache-slots 4]
+"""
+import argparse
+import json
+import time
+import urllib.request
+from typing import Dict, List, Optional, Tuple
+
+from benchmarks.fake_ollama import FakeOllama, FakeOllamaConfig
+from utils.stats import percentile
+
+LAYOUTS = ["legacy", "prefix"]
+# Static system prompts as crewai renders them (role, backstory, goal)
+SYSTEMS = {
+    "research": ("You are Market Research & Spec. You are a pragmatic product researcher who delivers structured "
+                 "insights in a clear JSON format. You validate competitors through web search.\n"
+                 "Your personal goal is: Research the market and output a valid JSON ResearchSpec object."),
+}
+TOPICS = ["pickup basketball games", "community gardens", "board game nights", "dog walking swaps",
+          "language exchange meetups", "tool lending libraries", "carpooling to concerts", "study groups",
+          "volunteer shifts", "farmers market preorders"]
+
+def ideas(n: int) -> List[str]:
+    return [f"A web app that helps people organize {TOPICS[i % len(TOPICS)]} in neighbourhood #{i}"
+            for i in range(n)]
+
+def _systems() -> Dict[str, str]:
+    from agents.engineer import BACKSTORY, GOAL, ROLE
+    return dict(SYSTEMS, engineer=f"You are {ROLE}. {BACKSTORY}\nYour personal goal is: {GOAL}")
+
+def chat(url: str, model: str, system: str, user: str) -> Tuple[float, int]:
+    """Stream one chat; returns (seconds to first chunk, prompt tokens the server evaluated)."""
+    body = {"model": model, "messages": [{"role": "system", "content": system}, {"role": "user", "content": user}]}
+    req = urllib.request.Request(url + "/api/chat", data=json.dumps(body).encode(), method="POST",
+                                 headers={"Content-Type": "application/json"})
+    start = time.perf_counter()
+    ttft = None
+    last = {}
+    with urllib.request.urlopen(req, timeout=60) as resp:
+        for line in resp:
+            if ttft is None:
+                ttft = time.perf_counter() - start
+            if line.strip():
+                last = json.loads(line)
+    return ttft or 0.0, int(last.get("prompt_eval_count") or 0)
+
+def run(layout: str, batch: List[str], prefill_tps: float, cache_slots: int) -> Dict[str, dict]:
+    from main import task_prompts
+
+    systems = _systems()
+    # Both models stay resident, as with OLLAMA_MAX_LOADED_MODELS=2; an evicted model loses its cache
+    config = FakeOllamaConfig(responses=[], default="OK", prefill_tps=prefill_tps, cache_slots=cache_slots,
+                              max_loaded=2)
+    samples: Dict[str, List[Tuple[float, int]]] = {phase: [] for phase in systems}
+    with FakeOllama(config) as server:
+        for idea in batch:
+            prompts = task_prompts(idea, layout)
+            research = f"- Pain point for {idea}\n- Competitor - https://example.com/{len(idea)}\n"
+            samples["research"].append(chat(server.url, "writer", systems["research"], prompts["research"]))
+            engineer = f"{prompts['engineer']}\n\nThis is the context you're working with:\n{research}"
+            samples["engineer"].append(chat(server.url, "coder", systems["engineer"], engineer))
+    return {phase: {"calls": len(rows), "prefill_tokens": sum(t for _, t in rows),
+                    "p50_ttft_ms": round(percentile([s * 1000 for s, _ in rows], 50), 1),
+                    "p95_ttft_ms": round(percentile([s * 1000 for s, _ in rows], 95), 1)}
+            for phase, rows in samples.items()}
+
+def main(argv: Optional[List[str]] = None) -> None:
+    ap = argparse.ArgumentParser(description="Prefill tokens and TTFT per phase for each prompt layout")
+    ap.add_argument("--ideas", type=int, default=20)
+    ap.add_argument("--prefill-tps", type=float, default=1500.0, help="Simulated prompt tokens per second")
+    ap.add_argument("--cache-slots", type=int, default=4, help="Cached prompt prefixes per model")
+    ap.add_argument("--json", action="store_true", help="Print raw results as JSON")
+    args = ap.parse_args(argv)
+
+    batch = ideas(args.ideas)
+    results = {layout: run(layout, batch, args.prefill_tps, args.cache_slots) for layout in LAYOUTS}
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"{'layout':<8} {'phase':<9} {'calls':>5} {'prefill tok':>12} {'p50 ttft ms':>12} {'p95 ttft ms':>12}")
+    for layout, phases in results.items():
+        for phase, row in phases.items():
+            print(f"{layout:<8} {phase:<9} {row['calls']:>5} {row['prefill_tokens']:>12} "
+                  f"{row['p50_ttft_ms']:>12.1f} {row['p95_ttft_ms']:>12.1f}")
+    for phase in results[LAYOUTS[0]]:
+        old, new = results["legacy"][phase]["prefill_tokens"], results["prefix"][phase]["prefill_tokens"]
+        print(f"{phase}: {1 - new / old:.0%} fewer prefill tokens with the prefix layout")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""
+Scaling benchmark for distributed workers on the Redis work queue.
+
+Each worker simulates a node: the pipeline sleeps through the four phases and
+pays a model-load delay whenever a phase needs a model the node doesn't have
+resident (one model per node, like a GPU that fits a single model). Jobs are
+submitted up front and the wall time to drain the queue is measured for
+each worker count. Runs in-process on the in-memory Redis stand-in unless
+--redis points at a real server.
+
+Usage:
+    python -m benchmarks.bench_workers [--workers 1 2 4 8] [--jobs-per-worker 8]
+    python -m benchmarks.bench_workers --redis redis://localhost:6379/15
+"""
+import argparse
+import json
+import threading
+import time
+import uuid
+from typing import Callable, List, Optional
+
+from schemas import JobRequest
+from service.fake_redis import FakeRedis
+from service.work_queue import QueueWorker, RedisJobQueue, connect
+
+PHASES = ["research", "engineer", "critic", "marketing"]
+
+class SimulatedNode:
+    """A node with one resident model; switching models costs `load_seconds`."""
+
+    def __init__(self, model_for: Callable[[str], str], phase_seconds: float, load_seconds: float):
+        self.model_for = model_for
+        self.phase_seconds = phase_seconds
+        self.load_seconds = load_seconds
+        self.resident: List[str] = []
+        self.loads = 0
+
+    def pipeline(self, job_id: str, request: JobRequest, report: Callable[[str, float], None]) -> List[str]:
+        for i, phase in enumerate(PHASES):
+            report(phase, 100.0 * i / len(PHASES))
+            model = self.model_for(phase)
+            if model not in self.resident:
+                self.loads += 1
+                time.sleep(self.load_seconds)
+                self.resident = [model]
+            time.sleep(self.phase_seconds)
+        report(PHASES[-1], 100.0)
+        return []
+
+def run(workers: int, jobs: int, phase_seconds: float, load_seconds: float,
+        redis_url: Optional[str] = None) -> dict:
+    from config import get_model_for_task
+
+    redis = connect(redis_url) if redis_url else FakeRedis()
+    queue = RedisJobQueue(redis, prefix=f"bench-{uuid.uuid4().hex[:8]}", lease_seconds=10,
+                          steal_after=phase_seconds, model_for=get_model_for_task)
+    ids = [queue.submit(JobRequest(idea=f"Benchmark idea number {i} for the worker pool")) for i in range(jobs)]
+    nodes = [SimulatedNode(get_model_for_task, phase_seconds, load_seconds) for _ in range(workers)]
+    pool = [QueueWorker(queue, node.pipeline, lambda node=node: node.resident, f"node{i}", poll_interval=0.005)
+            for i, node in enumerate(nodes)]
+
+    stop = threading.Event()
+    start = time.perf_counter()
+    threads = [threading.Thread(target=w.run, args=(stop,)) for w in pool]
+    for thread in threads:
+        thread.start()
+    while sum(w.done for w in pool) < jobs:
+        time.sleep(0.005)
+    wall = time.perf_counter() - start
+    stop.set()
+    for thread in threads:
+        thread.join()
+
+    succeeded = sum(queue.get(j).status == "succeeded" for j in ids)
+    return {
+        "workers": workers, "jobs": jobs, "succeeded": succeeded, "wall_s": round(wall, 3),
+        "jobs_per_s": round(jobs / wall, 2),
+        "warm_claims": sum(w.warm_claims for w in pool), "model_loads": sum(n.loads for n in nodes),
+    }
+
+def main(argv: Optional[List[str]] = None) -> None:
+    ap = argparse.ArgumentParser(description="Throughput of the distributed work queue as workers are added")
+    ap.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    ap.add_argument("--jobs-per-worker", type=int, default=8)
+    ap.add_argument("--phase-seconds", type=float, default=0.02, help="Simulated time per phase")
+    ap.add_argument("--load-seconds", type=float, default=0.05, help="Simulated model load time")
+    ap.add_argument("--redis", help="Use a real Redis server instead of the in-memory stand-in")
+    ap.add_argument("--json", action="store_true", help="Print raw results as JSON")
+    args = ap.parse_args(argv)
+
+    rows = [run(n, n * args.jobs_per_worker, args.phase_seconds, args.load_seconds, args.redis)
+            for n in args.workers]
+    if args.json:
+        print(json.dumps(rows, indent=2))
+        return
+    base = rows[0]["jobs_per_s"] / rows[0]["workers"]
+    print(f"{'workers':>7} {'jobs':>5} {'wall s':>7} {'jobs/s':>7} {'efficiency':>10} {'warm':>5} {'loads':>6}")
+    for row in rows:
+        efficiency = row["jobs_per_s"] / (base * row["workers"])
+        print(f"{row['workers']:>7} {row['jobs']:>5} {row['wall_s']:>7.2f} {row['jobs_per_s']:>7.1f} "
+              f"{efficiency:>10.0%} {row['warm_claims']:>5} {row['model_loads']:>6}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,408 @@
+"""
+Local stand-in for an Ollama server, for offline benchmarks and tests.
+
+Speaks the subset of the Ollama HTTP API the pipeline uses (/api/chat,
+/api/generate, /api/tags, /api/ps, /api/show, /api/version, and the
+OpenAI-compatible /v1/chat/completions) and replays
+canned or synthetic responses with configurable latency, tokens/sec and
+model-load time, including multi-MB engineer outputs and malformed JSON.
+With `cache_slots`, prompt prefixes are cached per model like the server's
+KV cache: only the tokens after the longest prefix shared with a cached
+prompt are prefilled (and counted in prompt_eval_count).
+
+Usage:
+    python -m benchmarks.fake_ollama --port 11434 --tps 200 --engineer-mb 2
+"""
+import argparse
+import json
+import os
+import re
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional, Tuple, Union
+
+# Rough characters per token used for pacing and usage counts
+CHARS_PER_TOKEN = 4
+
+Response = Union[str, Callable[[str], str]]
+
+def synthetic_project(target_bytes: int, seed: str = "app") -> Dict[str, str]:
+    """Next.js-looking {path: content} map of roughly `target_bytes` of source."""
+    files: Dict[str, str] = {
+        "package.json": json.dumps({
+            "name": f"{seed}-app", "version": "1.0.0", "private": True,
+            "scripts": {"dev": "next dev", "build": "next build", "start": "next start"},
+            "dependencies": {"next": "14.2.0", "react": "18.3.0", "react-dom": "18.3.0"},
+        }),
+        "tsconfig.json": json.dumps({"compilerOptions": {"strict": True, "jsx": "preserve",
+                                                         "paths": {"@/*": ["./*"]}}}),
+        "pages/index.tsx": "import React from 'react'\nimport Card0 from '../components/Card0'\n\n"
+                           "export default function Home() {\n  return <main><Card0 title=\"Home\" /></main>\n}\n",
+    }
+    i = 0
+    size = sum(len(v) for v in files.values())
+    while size < target_bytes:
+        body = "\n".join(
+            f"  const item{j}: Item = {{ id: {j}, label: 'Item {j} of card {i}', done: {str(j % 2 == 0).lower()} }};"
+            for j in range(60)
+        )
+        content = (
+            "import React from 'react'\n\n"
+            f"interface Card{i}Props {{\n  title: string;\n}}\n\n"
+            "interface Item {\n  id: number;\n  label: string;\n  done: boolean;\n}\n\n"
+            f"const Card{i}: React.FC<Card{i}Props> = ({{ title }}) => {{\n{body}\n"
+            "  return <div className=\"rounded p-4 shadow\">{title}</div>\n}\n\n"
+            f"export default Card{i}\n"
+        )
+        files[f"components/Card{i}.tsx"] = content
+        size += len(content)
+        i += 1
+    return files
+
+# What crewai keeps as the research and marketing agents' output (the text after "Final Answer:")
+RESEARCH = (
+    "## Pain points\n- Hard to find games\n- No-shows\n- Skill mismatch\n\n"
+    "## Competitors\n- Pickup Finder - https://example.com/a\n- CourtBuddy - https://example.com/b\n"
+    "- HoopsNow - https://example.com/c\n\n"
+    "## Spec\n1. Map of nearby games\n2. RSVP with reminders\n3. Skill tags per game"
+)
+LAUNCH = ("Finding a pickup game shouldn't be hard. Our app shows nearby games on a map, lets you RSVP "
+          "and reminds you before tip-off. Key features: live map, RSVPs, skill tags. Join today!")
+
+def react_answer(text: str) -> str:
+    """Wrap text in the ReAct final-answer format a model answers crewai agents in."""
+    return f"Thought: I now know the final answer\nFinal Answer: {text}"
+
+def pipeline_responses(engineer_bytes: int = 200_000, malformed: bool = False) -> List[Tuple[str, Response]]:
+    """
+    Canned model replies for the four pipeline agents, matched on prompt content.
+
+    Replies are in the ReAct format a real model answers a crewai agent in;
+    crewai saves only the final answer (e.g. RESEARCH as research.md).
+
+    Args:
+        engineer_bytes: Approximate size of the engineer's JSON output
+        malformed: Truncate the engineer JSON mid-string, as when the model
+            hits its token limit
+    """
+    project = json.dumps(synthetic_project(engineer_bytes))
+    if malformed:
+        project = project[: int(len(project) * 0.9)]
+    return [
+        ("Review the following code", react_answer("PASS")),
+        ("Code Reviewer", react_answer("PASS")),
+        ("Next.js", react_answer(project)),
+        ("launch post", react_answer(LAUNCH)),
+        ("Research", react_answer(RESEARCH)),
+    ]
+
+@dataclass
+class FakeOllamaConfig:
+    """Behaviour knobs for the fake server."""
+    responses: List[Tuple[str, Response]] = field(default_factory=pipeline_responses)
+    default: str = react_answer("OK")
+    latency: float = 0.0          # seconds before the first token
+    prefill_tps: float = 0.0      # prompt tokens evaluated per second; 0 = instant
+    cache_slots: int = 0          # cached prompts per model whose prefix is reused; 0 = no KV cache
+    tps: float = 0.0              # generated tokens per second; 0 = unlimited
+    load_seconds: float = 0.0     # cost of loading a model that is not resident
+    max_loaded: int = 1           # models resident at once (single-GPU box = 1)
+    chunk_tokens: int = 16        # tokens per streamed chunk
+    fail_status: int = 0          # if set, every generation request returns this HTTP status
+    models: Optional[List[str]] = None  # if set, the only models served (others get a 404)
+
+class FakeOllama:
+    """
+    In-process fake Ollama server.
+
+    Example:
+        with FakeOllama(FakeOllamaConfig(tps=500)) as server:
+            os.environ["OLLAMA_HOST"] = server.url
+    """
+
+    def __init__(self, config: Optional[FakeOllamaConfig] = None, host: str = "127.0.0.1", port: int = 0):
+        self.config = config or FakeOllamaConfig()
+        self.requests: List[dict] = []
+        self.loaded: List[str] = []    # most recently used last
+        self.loads = 0
+        self.in_flight = 0
+        self.cached_tokens = 0
+        self.slots: Dict[str, List[str]] = {}  # model -> cached prompts, most recently used last
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), _make_handler(self))
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "FakeOllama":
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "FakeOllama":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+    # -- simulation ---------------------------------------------------------
+
+    def respond(self, prompt: str) -> str:
+        for pattern, response in self.config.responses:
+            if pattern in prompt:
+                return response(prompt) if callable(response) else response
+        return self.config.default
+
+    def ensure_loaded(self, model: str, keep_alive=None) -> float:
+        """Make `model` resident, evicting others; returns simulated load seconds."""
+        with self._lock:
+            if model in self.loaded:
+                self.loaded.remove(model)
+                self.loaded.append(model)
+                cost = 0.0
+            else:
+                self.loaded.append(model)
+                self.loads += 1
+                cost = self.config.load_seconds
+            while len(self.loaded) > max(1, self.config.max_loaded):
+                self.slots.pop(self.loaded.pop(0), None)
+            if keep_alive in (0, "0", "0s", "0m"):
+                self.loaded.remove(model)
+                self.slots.pop(model, None)
+        if cost:
+            time.sleep(cost)
+        return cost
+
+    def reuse_prefix(self, model: str, prompt: str) -> int:
+        """Tokens of `prompt` already in `model`'s KV cache; the prompt takes over the best-matching slot."""
+        if not self.config.cache_slots:
+            return 0
+        with self._lock:
+            slots = self.slots.setdefault(model, [])
+            shared = [len(os.path.commonprefix([cached, prompt])) for cached in slots]
+            best = max(range(len(slots)), key=shared.__getitem__, default=None)
+            if best is not None and (shared[best] or len(slots) >= self.config.cache_slots):
+                reused = shared[best]
+                slots.pop(best)
+            else:
+                reused = 0
+            while len(slots) >= self.config.cache_slots:
+                slots.pop(0)
+            slots.append(prompt)
+            tokens = reused // CHARS_PER_TOKEN
+            self.cached_tokens += tokens
+            return tokens
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+def _make_handler(server: FakeOllama):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args) -> None:  # keep benchmark output clean
+            pass
+
+        def _send_json(self, payload: dict, status: int = 200) -> None:
+            body = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _read_json(self) -> dict:
+            length = int(self.headers.get("Content-Length") or 0)
+            return json.loads(self.rfile.read(length) or b"{}")
+
+        def do_GET(self) -> None:
+            if self.path == "/api/tags":
+                # Without a fixed list any model name is accepted; list the ones requested so far
+                names = server.config.models or sorted({r.get("model", "") for r in server.requests} - {""})
+                self._send_json({"models": [{"name": m, "model": m} for m in names]})
+            elif self.path == "/api/ps":
+                self._send_json({"models": [{"name": m, "model": m} for m in server.loaded]})
+            elif self.path == "/api/version":
+                self._send_json({"version": "0.0.0-fake"})
+            elif self.path == "/":
+                self.send_response(200)
+                self.send_header("Content-Length", "17")
+                self.end_headers()
+                self.wfile.write(b"Ollama is running")
+            else:
+                self._send_json({"error": "not found"}, 404)
+
+        def do_POST(self) -> None:
+            try:
+                request = self._read_json()
+            except ValueError:
+                self._send_json({"error": "invalid JSON"}, 400)
+                return
+            if self.path == "/api/show":
+                self._send_json({"modelfile": "", "parameters": "", "template": "{{ .Prompt }}",
+                                 "details": {"family": "fake"}, "model_info": {}})
+                return
+            if self.path not in ("/api/chat", "/api/generate", "/v1/chat/completions"):
+                self._send_json({"error": "not found"}, 404)
+                return
+            server.requests.append({"path": self.path, **request})
+            if server.config.fail_status:
+                self._send_json({"error": "injected failure"}, server.config.fail_status)
+                return
+            if server.config.models is not None and request.get("model") not in server.config.models:
+                self._send_json({"error": f"model '{request.get('model')}' not found"}, 404)
+                return
+            with server._lock:
+                server.in_flight += 1
+            try:
+                self._generate(request, chat=self.path != "/api/generate", openai=self.path.startswith("/v1/"))
+            finally:
+                with server._lock:
+                    server.in_flight -= 1
+
+        def _generate(self, request: dict, chat: bool, openai: bool = False) -> None:
+            cfg = server.config
+            model = request.get("model", "")
+            t0 = time.perf_counter()
+            load = server.ensure_loaded(model, request.get("keep_alive"))
+
+            if chat:
+                messages = request.get("messages", [])
+                prompt = "\n".join(str(m.get("content", "")) for m in messages)
+                rendered = "".join(f"<|{m.get('role')}|>{m.get('content', '')}" for m in messages)
+            else:
+                prompt = request.get("prompt", "")
+                rendered = f"<|system|>{request.get('system') or ''}<|user|>{prompt}"
+            # An empty generate request only loads the model (used for warm-up)
+            text = server.respond(prompt) if (prompt or chat) else ""
+            prompt_tokens = max(1, len(prompt) // CHARS_PER_TOKEN) if prompt else 0
+            if prompt_tokens:
+                # Like Ollama, only the tokens actually evaluated are reported
+                prompt_tokens = max(1, prompt_tokens - server.reuse_prefix(model, rendered))
+            completion_tokens = len(text) // CHARS_PER_TOKEN
+            prefill = prompt_tokens / cfg.prefill_tps if cfg.prefill_tps else 0.0
+
+            if cfg.latency or prefill:
+                time.sleep(cfg.latency + prefill)
+            # OpenAI-style requests stream only when asked to, Ollama's by default
+            stream = request.get("stream", not openai)
+            chunk = max(1, cfg.chunk_tokens) * CHARS_PER_TOKEN
+            eval_start = time.perf_counter()
+
+            def piece(content: str, done: bool) -> dict:
+                base = {"model": model, "created_at": _now(), "done": done}
+                if chat:
+                    base["message"] = {"role": "assistant", "content": content}
+                else:
+                    base["response"] = content
+                return base
+
+            def final() -> dict:
+                eval_ns = int((time.perf_counter() - eval_start) * 1e9)
+                return {**piece("" if stream else text, True), "done_reason": "stop",
+                        "total_duration": int((time.perf_counter() - t0) * 1e9),
+                        "load_duration": int(load * 1e9),
+                        "prompt_eval_count": prompt_tokens, "prompt_eval_duration": int((cfg.latency + prefill) * 1e9),
+                        "eval_count": completion_tokens, "eval_duration": eval_ns}
+
+            if openai:
+                self._openai(model, text, stream, chunk, prompt_tokens, completion_tokens)
+                return
+            if not stream:
+                if cfg.tps:
+                    time.sleep(completion_tokens / cfg.tps)
+                self._send_json(final())
+                return
+
+            self.send_response(200)
+            self.send_header("Content-Type", "application/x-ndjson")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            delay = (chunk / CHARS_PER_TOKEN) / cfg.tps if cfg.tps else 0.0
+            for i in range(0, len(text), chunk):
+                self._chunk(piece(text[i:i + chunk], False))
+                if delay:
+                    time.sleep(delay)
+            self._chunk(final())
+            self.wfile.write(b"0\r\n\r\n")
+
+        def _openai(self, model: str, text: str, stream: bool, chunk: int, prompt_tokens: int,
+                    completion_tokens: int) -> None:
+            """Reply in the OpenAI chat-completions format (server-sent events when streaming)."""
+            cfg = server.config
+            base = {"id": "chatcmpl-fake", "created": int(time.time()), "model": model}
+            usage = {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                     "total_tokens": prompt_tokens + completion_tokens}
+            if not stream:
+                if cfg.tps:
+                    time.sleep(completion_tokens / cfg.tps)
+                self._send_json({**base, "object": "chat.completion", "usage": usage, "choices": [
+                    {"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}]})
+                return
+
+            def event(delta: dict, finish: Optional[str] = None, **extra) -> dict:
+                return {**base, "object": "chat.completion.chunk", **extra,
+                        "choices": [{"index": 0, "delta": delta, "finish_reason": finish}]}
+
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            delay = (chunk / CHARS_PER_TOKEN) / cfg.tps if cfg.tps else 0.0
+            for i in range(0, len(text), chunk):
+                self._event(event({"role": "assistant", "content": text[i:i + chunk]}))
+                if delay:
+                    time.sleep(delay)
+            self._event(event({}, "stop", usage=usage))
+            self._write_chunk(b"data: [DONE]\n\n")
+            self.wfile.write(b"0\r\n\r\n")
+
+        def _event(self, payload: dict) -> None:
+            self._write_chunk(b"data: " + json.dumps(payload).encode("utf-8") + b"\n\n")
+
+        def _write_chunk(self, data: bytes) -> None:
+            self.wfile.write(f"{len(data):X}\r\n".encode("ascii") + data + b"\r\n")
+
+        def _chunk(self, payload: dict) -> None:
+            self._write_chunk(json.dumps(payload).encode("utf-8") + b"\n")
+
+    return Handler
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Fake Ollama server for offline benchmarks")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=11434)
+    ap.add_argument("--latency", type=float, default=0.0, help="Seconds before the first token")
+    ap.add_argument("--tps", type=float, default=0.0, help="Tokens per second (0 = unlimited)")
+    ap.add_argument("--load-seconds", type=float, default=0.0, help="Simulated model load time")
+    ap.add_argument("--prefill-tps", type=float, default=0.0, help="Prompt tokens per second (0 = instant)")
+    ap.add_argument("--cache-slots", type=int, default=0, help="Cached prompt prefixes per model (0 = none)")
+    ap.add_argument("--engineer-mb", type=float, default=0.2, help="Size of the engineer's JSON output")
+    ap.add_argument("--malformed", action="store_true", help="Truncate the engineer JSON")
+    args = ap.parse_args()
+
+    config = FakeOllamaConfig(
+        responses=pipeline_responses(int(args.engineer_mb * 1024 * 1024), args.malformed),
+        latency=args.latency, tps=args.tps, load_seconds=args.load_seconds,
+        prefill_tps=args.prefill_tps, cache_slots=args.cache_slots,
+    )
+    server = FakeOllama(config, args.host, args.port)
+    print(f"Fake Ollama listening on {server.url}")
+    try:
+        server._server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
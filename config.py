@@ -4,14 +4,35 @@ Handles environment variables and model routing logic.
 """
 import os
 from typing import List, Optional
-from dotenv import load_dotenv
+
+def _load_dotenv() -> None:
+    """Load .env from the project root or working directory; python-dotenv is only imported if one exists."""
+    for directory in (os.path.dirname(os.path.abspath(__file__)), os.getcwd()):
+        path = os.path.join(directory, ".env")
+        if os.path.isfile(path):
+            from dotenv import load_dotenv
+            load_dotenv(path)
+            return
 
 # Load environment variables
-load_dotenv()
+_load_dotenv()
 
 # Ollama Configuration
 OLLAMA_HOST = os.getenv("OLLAMA_HOST", "http://localhost:11434")
 OLLAMA_KEEP_ALIVE = os.getenv("OLLAMA_KEEP_ALIVE", "10m")
+# Several Ollama hosts: "url[=model,model];url..." (calls go to the fastest healthy host serving the model)
+OLLAMA_HOSTS = os.getenv("OLLAMA_HOSTS", "")
+# Seconds a failing host is avoided, doubling per consecutive failure up to the max
+ROUTER_BACKOFF = float(os.getenv("ROUTER_BACKOFF", "1"))
+ROUTER_MAX_BACKOFF = float(os.getenv("ROUTER_MAX_BACKOFF", "60"))
+# Models the Ollama host keeps loaded at once; 0 (the default) = no limit, so phases on
+# different models run side by side. Set it (1 on a single-GPU box) to stop the phase
+# scheduler from interleaving models that would evict each other, at the cost of
+# running those phases one after another.
+OLLAMA_MAX_LOADED_MODELS = int(os.getenv("OLLAMA_MAX_LOADED_MODELS", "0"))
+# Preload the models the first phases need before a run starts: as many distinct models
+# as OLLAMA_MAX_LOADED_MODELS allows, or just the first one when there is no limit
+OLLAMA_WARMUP = os.getenv("OLLAMA_WARMUP", "off").lower() == "on"
 
 # Default Models
 DEFAULT_RESEARCH_MODEL = "llama3.1:8b-instruct-q4_K_M"
@@ -23,18 +44,91 @@ MODEL_CODER = os.getenv("MODEL_CODER", DEFAULT_CODER_MODEL)
 HEAVY_REASONER = os.getenv("HEAVY_REASONER", "")
 USE_HEAVY_FOR = os.getenv("USE_HEAVY_FOR", "").lower().split(",")
 
+# Pipeline Concurrency (independent phases run in parallel up to this limit)
+PIPELINE_WORKERS = int(os.getenv("PIPELINE_WORKERS", "2"))
+
+# Engineer generation: "single" JSON completion, or "staged" (manifest, then files in parallel)
+ENGINEER_MODE = os.getenv("ENGINEER_MODE", "single").lower()
+ENGINEER_WORKERS = int(os.getenv("ENGINEER_WORKERS", "4"))
+ENGINEER_RETRIES = int(os.getenv("ENGINEER_RETRIES", "1"))
+
+# Structured hand-off: token budgets for the compact objects passed downstream
+HANDOFF_RESEARCH_TOKENS = int(os.getenv("HANDOFF_RESEARCH_TOKENS", "600"))
+HANDOFF_REVIEW_TOKENS = int(os.getenv("HANDOFF_REVIEW_TOKENS", "4000"))
+
+# Static gate between the engineer and the critic: off | on; rounds of sending
+# mechanical failures (bad JSON, missing imports, ...) back to the engineer
+STATIC_GATE = os.getenv("STATIC_GATE", "on").lower() != "off"
+GATE_FIX_ROUNDS = int(os.getenv("GATE_FIX_ROUNDS", "2"))
+
+# Prompt layout: prefix (static instructions first, the idea last, so the
+# server's KV cache can reuse the shared prefix across ideas) | legacy
+PROMPT_LAYOUT = os.getenv("PROMPT_LAYOUT", "prefix").lower()
+
+# Critic (map-reduce review): code tokens per chunk and chunks reviewed at once
+CRITIC_CONTEXT_TOKENS = int(os.getenv("CRITIC_CONTEXT_TOKENS", "6000"))
+CRITIC_WORKERS = int(os.getenv("CRITIC_WORKERS", "4"))
+
+# Repair loop after the critic: rounds of applying its diffs as patches and
+# re-reviewing the touched files (0 = off)
+REPAIR_ROUNDS = int(os.getenv("REPAIR_ROUNDS", "2"))
+
+# Job Service
+SERVICE_HOST = os.getenv("SERVICE_HOST", "127.0.0.1")
+SERVICE_PORT = int(os.getenv("SERVICE_PORT", "8000"))
+JOB_CONCURRENCY = int(os.getenv("JOB_CONCURRENCY", "2"))
+
 # Redis Configuration
 REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+REDIS_PREFIX = os.getenv("REDIS_PREFIX", "startup-sim")
+
+# Distributed workers (python -m service.worker): a worker's jobs are requeued
+# when it misses heartbeats for WORKER_LEASE_SECONDS; a job waits up to
+# WORKER_STEAL_AFTER seconds for a worker that has its model loaded
+WORKER_LEASE_SECONDS = float(os.getenv("WORKER_LEASE_SECONDS", "30"))
+WORKER_STEAL_AFTER = float(os.getenv("WORKER_STEAL_AFTER", "5"))
+WORKER_MAX_ATTEMPTS = int(os.getenv("WORKER_MAX_ATTEMPTS", "3"))
 
 # GitHub Configuration
 GITHUB_TOKEN = os.getenv("GITHUB_TOKEN", "")
 
-# File System Paths
-ARTIFACTS_DIR = os.path.join("artifacts")
+# File System Paths (distributed workers need ARTIFACTS_DIR and STATE_DIR on shared
+# storage for a requeued job to resume on another node and for its artifact links to resolve)
+ARTIFACTS_DIR = os.getenv("ARTIFACTS_DIR", "artifacts")
 LOGS_DIR = os.path.join("logs")
-STATE_DIR = os.path.join("state")
+STATE_DIR = os.getenv("STATE_DIR", "state")
 DB_PATH = os.path.join(STATE_DIR, "app.db")
 
+# Generated-project tests: parallel pytest shards, timeouts (seconds) and result cache
+TEST_SHARDS = int(os.getenv("TEST_SHARDS", "4"))
+TEST_SHARD_TIMEOUT = float(os.getenv("TEST_SHARD_TIMEOUT", "120"))
+TEST_TIMEOUT = float(os.getenv("TEST_TIMEOUT", "600"))
+TEST_CACHE_DIR = os.path.join(STATE_DIR, "test_results")
+
+# Content-addressed history of every run's files (python -m utils.artifact_store)
+ARTIFACT_STORE = os.getenv("ARTIFACT_STORE", "on").lower() != "off"
+ARTIFACT_STORE_DIR = os.path.join(ARTIFACTS_DIR, "store")
+
+# Phase checkpoints for --resume; bump CHECKPOINT_VERSION to invalidate all of them
+CHECKPOINT_DIR = os.path.join(STATE_DIR, "checkpoints")
+CHECKPOINT_VERSION = os.getenv("CHECKPOINT_VERSION", "1")
+
+# Tracing (JSONL spans per pipeline stage)
+TRACING = os.getenv("TRACING", "on").lower() != "off"
+TRACE_PATH = os.path.join(LOGS_DIR, "trace.jsonl")
+
+# LLM Response Cache
+LLM_CACHE_MODE = os.getenv("LLM_CACHE", "on").lower()  # on | off | refresh
+LLM_CACHE_MAX_MB = int(os.getenv("LLM_CACHE_MAX_MB", "512"))
+LLM_CACHE_PATH = os.path.join(STATE_DIR, "llm_cache.db")
+
+# Web Search Cache (stored in DB_PATH)
+SEARCH_CACHE_TTL = float(os.getenv("SEARCH_CACHE_TTL", str(24 * 3600)))  # seconds
+SEARCH_CACHE_MAX_ENTRIES = int(os.getenv("SEARCH_CACHE_MAX_ENTRIES", "5000"))
+# web_search_many: queries run at once and seconds allowed per query
+SEARCH_WORKERS = int(os.getenv("SEARCH_WORKERS", "4"))
+SEARCH_TIMEOUT = float(os.getenv("SEARCH_TIMEOUT", "10"))
+
 def get_model_for_task(task: str) -> str:
     """
     Route tasks to appropriate models based on configuration.
@@ -54,9 +148,11 @@ def get_model_for_task(task: str) -> str:
     return MODEL_RESEARCH  # Default for research and marketing
 
 def ensure_directories():
-    """Create necessary directories if they don't exist."""
+    """
+    Create necessary directories if they don't exist.
+
+    Not called on import: the caches, trace writer and pipeline create the
+    directories they need on first use.
+    """
     for directory in [ARTIFACTS_DIR, LOGS_DIR, STATE_DIR]:
         os.makedirs(directory, exist_ok=True)
-
-# Create directories on module import
-ensure_directories()
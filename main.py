@@ -1,44 +1,95 @@
-import argparse, pathlib
-from crewai import Crew, Task, Process
-from agents.research import research_agent
-from agents.engineer import engineer_agent
-from agents.critic import critic_agent
-from agents.marketing import marketing_agent
-from utils.engineer_output import extract_json_object, write_files
+import argparse, json, pathlib, time, uuid
+from types import SimpleNamespace
+from typing import TYPE_CHECKING
+from utils.engineer_output import StreamingFileWriter, extract_json_object, scan_json_object, write_files
+from utils.llm_cache import get_response_cache
+from utils.checkpoint import PhaseCheckpoints, fingerprint
+from utils.dag import run_dag, topological_order
+from utils.model_pool import get_model_pool
+from utils.static_gate import check_project, gate_and_fix
+from utils.tracing import span, trace_run
+from config import (ARTIFACT_STORE, ARTIFACTS_DIR, CHECKPOINT_DIR, CHECKPOINT_VERSION, CRITIC_CONTEXT_TOKENS, CRITIC_WORKERS, ENGINEER_MODE, ENGINEER_RETRIES, ENGINEER_WORKERS,
+                    GATE_FIX_ROUNDS, HANDOFF_RESEARCH_TOKENS, HANDOFF_REVIEW_TOKENS, OLLAMA_WARMUP, PIPELINE_WORKERS,
+                    PROMPT_LAYOUT, REPAIR_ROUNDS, STATIC_GATE, get_model_for_task)
 
-ART = pathlib.Path("artifacts"); ART.mkdir(exist_ok=True)
+if TYPE_CHECKING:
+    from crewai import Crew, Task
 
-def save(name: str, text: str):
-    (ART / name).write_text(text, encoding="utf-8")
+# Phase names for t1..t4, in task order
+PHASES = ["research", "engineer", "critic", "marketing"]
 
-def build_crew(idea: str):
-    r = research_agent(); e = engineer_agent(); c = critic_agent(); m = marketing_agent()
+# Created by run() on first use, not at import
+ART = pathlib.Path(ARTIFACTS_DIR)
 
+# What a run leaves in its output directory, kept in the artifact store
+RUN_OUTPUTS = ["research.md", "engineer_raw.json", "nextjs_app", "review.md", "launch.md"]
+
+def save(name: str, text: str, out_dir: pathlib.Path = ART):
+    (out_dir / name).write_text(text, encoding="utf-8")
+
+RESEARCH_STEPS = ("- List 3–5 user pain points\n- 3 competing solutions with URLs\n"
+                  "- A short actionable spec with 3–5 requirements\n\n"
+                  "Use web_search_many(queries) to run all your searches in one call "
+                  "(competitors, pain points, pricing); web_search(query) for a single follow-up.\n"
+                  "Output in markdown.")
+ENGINEER_RULES = (
+    "Use the research from the previous task to guide your implementation.\n\n"
+    "Rules:\n"
+    "1. Do not return nested objects for files. All values must be strings.\n"
+    "2. For JSON files (e.g., package.json), return a serialized JSON string (minified or pretty).\n"
+    "3. For .js/.ts config files, return valid code (ESM) as a string (no JS objects).\n"
+    "4. Include ALL necessary files for a functional Next.js app (pages, components, styles, API services, etc.)\n"
+    "5. No Markdown fences or prose. Output ONLY the JSON object.\n"
+    "6. Include TypeScript types and interfaces for all components and data structures.\n"
+    "7. Ensure proper error handling and loading states throughout the application.\n"
+)
+ENGINEER_FORMAT = ("Generate a complete Next.js app (TypeScript) as a single JSON object.\n"
+                   "Keys = file paths, Values = entire file content as a string.\n")
+
+def task_prompts(idea: str, layout: str = PROMPT_LAYOUT) -> dict:
+    """
+    Task descriptions of the research and engineer phases.
+
+    With layout "prefix" everything but the idea is a byte-stable prefix and
+    the idea comes last, so across ideas the server can reuse the cached
+    prefill of the system prompt and the instructions. "legacy" keeps the
+    original wording with the idea near the top.
+    """
+    if layout == "legacy":
+        return {
+            "research": f"Research the idea: {idea}\n" + RESEARCH_STEPS,
+            "engineer": (ENGINEER_FORMAT
+                         + f"This should be a fully functional Next.js application based on this idea: {idea}\n\n"
+                         + ENGINEER_RULES),
+        }
+    return {
+        "research": f"Research the product idea given at the end.\n{RESEARCH_STEPS}\n\nIdea: {idea}",
+        "engineer": (ENGINEER_FORMAT
+                     + "This should be a fully functional Next.js application based on the idea given at the end.\n\n"
+                     + f"{ENGINEER_RULES}\nIdea: {idea}"),
+    }
+
+def build_crew(idea: str, stream: bool = False):
+    # crewai, LangChain and the search backends take seconds to import; only load them for a real run
+    from crewai import Crew, Task, Process
+    from agents.research import research_agent
+    from agents.engineer import engineer_agent
+    from agents.critic import critic_agent
+    from agents.marketing import marketing_agent
+
+    r = research_agent(); e = engineer_agent(stream); c = critic_agent(); m = marketing_agent()
+
+    prompts = task_prompts(idea)
     t1 = Task(
-        description=(f"Research the idea: {idea}\n"
-                     "- List 3–5 user pain points\n- 3 competing solutions with URLs\n"
-                     "- A short actionable spec with 3–5 requirements\n\n"
-                     "Use web_search(query) where helpful.\nOutput in markdown."),
+        description=prompts["research"],
         agent=r,
         expected_output="Markdown with bullets + links + a short spec"
     )
 
     t2 = Task(
-        description=(
-            "Generate a complete Next.js app (TypeScript) as a single JSON object.\n"
-            "Keys = file paths, Values = entire file content as a string.\n"
-            f"This should be a fully functional Next.js application based on this idea: {idea}\n\n"
-            "Use the research from the previous task to guide your implementation.\n\n"
-            "Rules:\n"
-            "1. Do not return nested objects for files. All values must be strings.\n"
-            "2. For JSON files (e.g., package.json), return a serialized JSON string (minified or pretty).\n"
-            "3. For .js/.ts config files, return valid code (ESM) as a string (no JS objects).\n"
-            "4. Include ALL necessary files for a functional Next.js app (pages, components, styles, API services, etc.)\n"
-            "5. No Markdown fences or prose. Output ONLY the JSON object.\n"
-            "6. Include TypeScript types and interfaces for all components and data structures.\n"
-            "7. Ensure proper error handling and loading states throughout the application.\n"
-        ),
+        description=prompts["engineer"],
         agent=e,
+        context=[t1],
         expected_output="A JSON object representing the complete file structure of a Next.js application based on the idea."
     )
 
@@ -46,12 +97,14 @@ def build_crew(idea: str):
         description=("Review the following code. If issues: start with 'ISSUES FOUND', "
                      "list fixes and diffs. If clean: 'PASS'.\n\n<CODE>{{output_of_previous_task}}</CODE>"),
         agent=c,
+        context=[t2],
         expected_output="PASS or issues with diffs"
     )
 
     t4 = Task(
         description=("Write a launch post (150–250 words) using the spec and final feature list."),
         agent=m,
+        context=[t1],  # needs the spec and feature list, not the review
         expected_output="Launch copy"
     )
 
@@ -64,67 +117,370 @@ def build_crew(idea: str):
     )
     return crew
 
-import json5 as json
-import re
+def _context(inputs: dict) -> str:
+    # Same format crewai uses when aggregating previous task outputs; a phase
+    # with a structured hand-off passes its compact JSON instead of the raw text
+    return "\n\n----------\n\n".join(getattr(out, "handoff", None) or out.raw or str(out)
+                                     for out in inputs.values())
 
-def extract_json_from_string(s: str) -> str:
-    """Extracts the first JSON object from a string. DEPRECATED: Use utils.engineer_output.extract_json_object instead."""
-    # Try to find JSON between triple backticks
-    code_block_pattern = r'```(?:json)?\s*(\{.*?\})```'
-    match = re.search(code_block_pattern, s, re.DOTALL)
-    if match:
-        return match.group(1)
-    
-    # Fall back to just looking for curly braces
-    match = re.search(r'\{.*\}', s, re.DOTALL)
-    if match:
-        return match.group(0)
-    
-    # If nothing found, return empty JSON
-    return "{}"
+def _execute_task(name: str, task: "Task", inputs: dict, runner=None, checkpoints: PhaseCheckpoints = None):
+    saved = checkpoints.load(name) if checkpoints is not None else None
+    with span(name) as s:
+        if saved is not None:
+            s.set(checkpoint="reused")
+            return saved
+        if runner is not None:
+            out = runner(task, inputs)
+        else:
+            out = task.execute_sync(agent=task.agent, context=_context(inputs))
+    if checkpoints is not None:
+        checkpoints.save(name, out)
+    return out
+
+def research_phase():
+    """
+    Research phase runner for kickoff_dag: run the task, then hand off a ResearchSpec.
+
+    The output is validated against schemas.ResearchSpec (repaired, or the
+    model re-asked once) and trimmed to HANDOFF_RESEARCH_TOKENS; downstream
+    prompts get that compact JSON while research.md keeps the full text.
+    """
+    def runner(task: "Task", inputs: dict):
+        from agents.research import research_repairer
+        from utils.handoff import research_handoff
+        out = task.execute_sync(agent=task.agent, context=_context(inputs))
+        raw = out.raw or str(out)
+        try:
+            handoff = research_handoff(raw, HANDOFF_RESEARCH_TOKENS, lambda prompt: research_repairer()(prompt))
+        except ValueError as e:
+            print(f"\nResearch hand-off failed ({e}); passing the full output downstream")
+            return out
+        print(f"\n{handoff.summary()}")
+        return SimpleNamespace(raw=raw, handoff=handoff.text)
+    return runner
+
+def staged_engineer_phase():
+    """
+    Engineer phase runner for kickoff_dag: manifest first, then files in parallel.
+
+    Produces the same {path: content} JSON as the single-completion engineer,
+    so extraction, review and write_files work unchanged.
+    """
+    def runner(task: "Task", inputs: dict):
+        from agents.engineer import engineer_generator
+        from utils.staged_generation import generate_staged
+        generation = generate_staged(task.description, engineer_generator(), _context(inputs),
+                                     max_workers=ENGINEER_WORKERS, retries=ENGINEER_RETRIES)
+        print(f"\nEngineer (staged): {generation.summary()}")
+        return SimpleNamespace(raw=json.dumps(generation.files, indent=2))
+    return runner
+
+def gated_engineer_phase(inner=None):
+    """
+    Engineer phase runner for kickoff_dag: generate, then run the static gate.
+
+    Mechanical failures (unparseable JSON files, imports of files that weren't
+    generated, missing packages, ...) go back to the engineer for up to
+    GATE_FIX_ROUNDS rounds of "send only the files to add or replace" before
+    the critic sees the app. `inner` is the engineer runner to wrap (None for
+    the single-completion task).
+    """
+    def runner(task: "Task", inputs: dict):
+        if inner is not None:
+            out = inner(task, inputs)
+        else:
+            out = task.execute_sync(agent=task.agent, context=_context(inputs))
+        try:
+            files = extract_json_object(out.raw or "")
+        except ValueError:
+            return out
+        if not isinstance(files, dict):
+            return out
+        from agents.engineer import engineer_generator
+        gate = gate_and_fix(files, engineer_generator(), task.description, GATE_FIX_ROUNDS)
+        print(f"\n{gate.summary()}")
+        if not gate.replaced:
+            return out
+        return SimpleNamespace(raw=json.dumps(gate.files, indent=2), gate_fixed=True)
+    return runner
+
+def review_phase(app_dir: pathlib.Path):
+    """
+    Critic phase runner for kickoff_dag: map-reduce review of the engineer's files.
+
+    The files are reviewed in context-sized chunks concurrently and merged into
+    one ReviewResult; per-file results are kept next to `app_dir` so a re-run
+    only reviews files that changed. Falls back to the single-prompt task if
+    the engineer output isn't a JSON object. If the static gate still fails,
+    its issues are the review and no critic inference is made. With
+    REPAIR_ROUNDS, the critic's diffs are applied as patches and the touched
+    files re-reviewed; the patched file map is returned as `files`.
+    """
+    def runner(task: "Task", inputs: dict):
+        raw = inputs["engineer"].raw or ""
+        try:
+            files = extract_json_object(raw)
+        except ValueError:
+            files = None
+        if not isinstance(files, dict):
+            from utils.handoff import review_handoff
+            out = task.execute_sync(agent=task.agent, context=raw)
+            handoff = review_handoff(out.raw or str(out), HANDOFF_REVIEW_TOKENS)
+            print(f"\n{handoff.summary()}")
+            return SimpleNamespace(raw=handoff.value.model_dump_json(indent=2), handoff=handoff.text)
+        if STATIC_GATE:
+            gate = check_project(files)
+            if not gate.ok:
+                # The engineer couldn't fix these; a critic inference would only restate them
+                from schemas import ReviewResult
+                print(f"\nCritic skipped: {gate.summary()}")
+                return SimpleNamespace(raw=ReviewResult(status="ISSUES", diffs=[str(i) for i in gate.issues])
+                                       .model_dump_json(indent=2))
+        from agents.critic import critic_reviewer
+        from utils.review import review_files, review_state_path
+        reviewer = critic_reviewer()
+        review = review_files(files, reviewer, CRITIC_CONTEXT_TOKENS, CRITIC_WORKERS, review_state_path(app_dir))
+        print(f"\nCritic: {review.summary()}")
+        if REPAIR_ROUNDS and review.result.status == "ISSUES":
+            from utils.repair import repair_files
+            repair = repair_files(files, review, reviewer, REPAIR_ROUNDS, CRITIC_CONTEXT_TOKENS, CRITIC_WORKERS,
+                                  gate=STATIC_GATE)
+            print(f"\n{repair.summary()}")
+            if repair.changed:
+                return SimpleNamespace(raw=repair.review.model_dump_json(indent=2),
+                                       files=json.dumps(repair.files, indent=2))
+        return SimpleNamespace(raw=review.result.model_dump_json(indent=2))
+    return runner
+
+def _phase_parts(name: str, task: "Task") -> dict:
+    """What shapes a phase's output, for its checkpoint fingerprint."""
+    agent = task.agent
+    prompt = {"description": task.description, "expected_output": task.expected_output,
+              "role": getattr(agent, "role", ""), "goal": getattr(agent, "goal", ""),
+              "backstory": getattr(agent, "backstory", "")}
+    return {"prompt": fingerprint(prompt), "model": get_model_for_task(name)}
 
-def run(idea: str):
-    crew = build_crew(idea)
-    result = crew.kickoff()
+def kickoff_dag(crew: "Crew", max_workers: int = PIPELINE_WORKERS, on_phase=None, runners=None,
+                checkpoints: PhaseCheckpoints = None):
+    """
+    Run the crew's tasks as a dependency graph instead of a fixed sequence.
+
+    Dependencies come from each Task's `context`; a task without one depends
+    on the task before it, as in Process.sequential. Returns an object whose
+    `tasks_output` is in task order, like CrewOutput. `on_phase(name, event)`
+    is called when a phase starts, finishes or fails. `runners` maps a phase
+    name to a function(task, inputs) that replaces the task's normal execution.
+    With `checkpoints`, each phase's output is saved as soon as it completes,
+    and a still-valid saved output is used instead of rerunning the phase.
+
+    Phases whose model is already loaded are preferred, and a phase only runs
+    next to others if the Ollama host can hold all their models at once, so
+    concurrent phases don't keep evicting each other's model.
+    """
+    names = [PHASES[i] if i < len(PHASES) else f"t{i + 1}" for i in range(len(crew.tasks))]
+    index = {id(task): name for task, name in zip(crew.tasks, names)}
+    nodes = {}
+    for i, (task, name) in enumerate(zip(crew.tasks, names)):
+        if isinstance(task.context, list):
+            deps = [index[id(dep)] for dep in task.context]
+        else:
+            deps = [names[i - 1]] if i else []
+        runner = (runners or {}).get(name)
+        nodes[name] = (lambda inputs, name=name, task=task, runner=runner: _execute_task(
+            name, task, inputs, runner, checkpoints), deps)
+    if checkpoints is not None:
+        for name in topological_order(nodes):
+            checkpoints.register(name, _phase_parts(name, crew.tasks[names.index(name)]), nodes[name][1])
+
+    pool = get_model_pool()
+    models = {name: get_model_for_task(name) for name in names}
+
+    def listener(name, event):
+        if event == "start":
+            pool.note_loaded(models[name])
+        if on_phase is not None:
+            on_phase(name, event)
+
+    run = run_dag(nodes, max_workers=max_workers, priority=pool.priority(models, names),
+                  listener=listener, admit=pool.admit(models))
+    print("\nPhase timings:\n" + run.summary())
+    if checkpoints is not None and checkpoints.reused:
+        print(f"Resumed from checkpoints: {', '.join(checkpoints.reused)}")
+    return SimpleNamespace(tasks_output=[run.results[name] for name in names], timings=run.timings)
+
+def run(idea: str, stream: bool = False, sequential: bool = False, workers: int = PIPELINE_WORKERS,
+        out_dir: pathlib.Path = ART, on_phase=None, warm: bool = OLLAMA_WARMUP,
+        engineer: str = ENGINEER_MODE, resume: bool = False, checkpoint_scope: str = "") -> dict:
+    """
+    Run the full pipeline for one idea and save its artifacts.
+
+    `on_phase(name, event)` receives "start"/"done"/"failed" events per phase
+    (dependency-graph mode only). With `warm`, the models the first phases
+    need are preloaded before the crew starts. `engineer="staged"` generates
+    the app as a manifest plus concurrent per-file requests (dependency-graph
+    mode only). Each phase's output is checkpointed under CHECKPOINT_DIR;
+    with `resume`, phases whose prompts, model, mode and inputs are unchanged
+    reuse their saved output (dependency-graph mode only); checkpoints are
+    per idea, or per idea and `checkpoint_scope` if one is given. Unless
+    ARTIFACT_STORE=off, the run's files are also kept in the content-addressed
+    artifact store under the run's trace id.
+
+    Returns:
+        Dict with the run id, output directory, file count and per-phase durations (seconds)
+    """
+    run_id = uuid.uuid4().hex[:12]
+    with trace_run(run_id, idea=idea[:120], out_dir=str(out_dir)):
+        result = _run(idea, stream, sequential, workers, out_dir, on_phase, warm, engineer, resume,
+                      checkpoint_scope)
+        if ARTIFACT_STORE:
+            from utils.artifact_store import get_artifact_store
+            with span("store_artifacts") as s:
+                report = get_artifact_store().add_run(run_id, pathlib.Path(out_dir), RUN_OUTPUTS,
+                                                      {"idea": idea, "out_dir": str(out_dir)})
+                s.set(files=report.files, new_blobs=report.new_blobs, new_bytes=report.new_bytes)
+            print(f"Stored {report}")
+    return dict(result, run_id=run_id)
+
+def _run(idea: str, stream: bool, sequential: bool, workers: int, out_dir: pathlib.Path, on_phase,
+         warm: bool, engineer: str, resume: bool, checkpoint_scope: str = "") -> dict:
+    if warm:
+        get_model_pool().warm([get_model_for_task(name) for name in PHASES])
+    out_dir = pathlib.Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    app_dir = out_dir / "nextjs_app"
+    # In streaming mode the engineer's files land on disk while it is still generating
+    staged = engineer == "staged" and not sequential
+    writer = StreamingFileWriter(app_dir) if stream and not staged else None
+    crew = build_crew(idea, stream=writer is not None)
+    from agents.engineer import stream_files
+    with stream_files(crew.tasks[1].agent, writer):
+        if sequential:
+            result = crew.kickoff()
+        else:
+            runners = {"research": research_phase(), "critic": review_phase(app_dir)}
+            if staged:
+                runners["engineer"] = staged_engineer_phase()
+            if STATIC_GATE:
+                runners["engineer"] = gated_engineer_phase(runners.get("engineer"))
+            modes = {"research": f"handoff:{HANDOFF_RESEARCH_TOKENS}",
+                     "engineer": f"{engineer}+gate:{GATE_FIX_ROUNDS}" if STATIC_GATE else engineer,
+                     "critic": f"map-reduce:{CRITIC_CONTEXT_TOKENS}:{HANDOFF_REVIEW_TOKENS}+repair:{REPAIR_ROUNDS}"}
+            checkpoints = PhaseCheckpoints(pathlib.Path(CHECKPOINT_DIR), idea, CHECKPOINT_VERSION, resume, modes,
+                                           checkpoint_scope)
+            result = kickoff_dag(crew, workers, on_phase, runners=runners, checkpoints=checkpoints)
+    timings = {name: end - start for name, (start, end) in getattr(result, "timings", {}).items()}
+    file_count = 0
 
     # Grab per-task outputs from the CrewOutput returned by kickoff(); fall back to string if raw missing
     outs = result.tasks_output
-    save("research.md", outs[0].raw or str(outs[0]))
+    save("research.md", outs[0].raw or str(outs[0]), out_dir)
 
     # The engineer agent now outputs a JSON string. We need to parse it.
     raw_output = outs[1].raw or "{}"
     
     # Save the raw engineer output to a file
-    save("engineer_raw.json", raw_output)
-    print("\nSaved raw engineer output to artifacts/engineer_raw.json")
+    save("engineer_raw.json", raw_output, out_dir)
+    print(f"\nSaved raw engineer output to {out_dir / 'engineer_raw.json'}")
     
-    print("Parsing engineer output...")
-    
-    try:
-        # Extract the JSON object from the raw output
-        file_structure = extract_json_object(raw_output)
-        
-        # Create the directory for the Next.js app
-        app_dir = ART / "nextjs_app"
-        app_dir.mkdir(exist_ok=True)
-        
-        # Write the files using our utility function
-        file_count = write_files(app_dir, file_structure)
-        print(f"Created {file_count} files in {app_dir}")
-        
-    except Exception as e:
-        print(f"Error processing engineer output: {e}")
-        save("error_log.txt", f"Error: {e}\n\nRaw Output:\n{raw_output}")
-        print("Error saved to artifacts/error_log.txt")
-        # Continue with the rest of the process
-
-    save("review.md", outs[2].raw or str(outs[2]))
-    save("launch.md", outs[3].raw or str(outs[3]))
-
-    print("\n✅ Done. See artifacts/: research.md, engineer_raw.json, nextjs_app/, review.md, launch.md")
+    post_start = time.perf_counter()
+    # Files fixed after the static gate or patched by the repair loop replace what was streamed
+    repaired = getattr(outs[2], "files", None)
+    if writer is not None and writer.complete and not repaired and not getattr(outs[1], "gate_fixed", False):
+        with span("write_files", streamed=True) as s:
+            report = writer.finish()
+            s.set(written=report.written, skipped=report.skipped, removed=report.removed,
+                  rejected=len(report.rejected))
+        file_count = report.total
+        print(f"Streamed {file_count} files into {app_dir} ({report})")
+    else:
+        if writer is not None:
+            reason = f" ({writer.error})" if writer.error else ""
+            print(f"Streaming stopped after {writer.count} files{reason}; re-parsing full output...")
+        print("Parsing engineer output...")
+
+        try:
+            # Extract the JSON object from the raw output
+            with span("extract_json", raw_bytes=len(raw_output)) as s:
+                extraction = scan_json_object(repaired or raw_output)
+                s.set(repaired=extraction.repaired, dropped=len(extraction.dropped))
+            file_structure = extraction.value
+            if extraction.repaired:
+                print(f"Engineer output was {extraction.summary()}")
+
+            # Create the directory for the Next.js app
+            app_dir.mkdir(exist_ok=True)
+
+            # Write the files using our utility function (unchanged files are skipped)
+            with span("write_files") as s:
+                report = write_files(app_dir, file_structure)
+                s.set(written=report.written, skipped=report.skipped, removed=report.removed,
+                      rejected=len(report.rejected))
+            file_count = report.total
+            print(f"Wrote {file_count} files in {app_dir} ({report})")
+
+        except Exception as e:
+            print(f"Error processing engineer output: {e}")
+            save("error_log.txt", f"Error: {e}\n\nRaw Output:\n{raw_output}", out_dir)
+            print(f"Error saved to {out_dir / 'error_log.txt'}")
+            # Continue with the rest of the process
+    timings["write_files"] = time.perf_counter() - post_start
+
+    save("review.md", outs[2].raw or str(outs[2]), out_dir)
+    save("launch.md", outs[3].raw or str(outs[3]), out_dir)
+
+    print(get_response_cache().stats())
+    print(get_model_pool().stats())
+    print(f"\n✅ Done. See {out_dir}/: research.md, engineer_raw.json, nextjs_app/, review.md, launch.md")
+    return {"out_dir": str(out_dir), "files": file_count, "timings": timings}
 
 if __name__ == "__main__":
     ap = argparse.ArgumentParser()
-    ap.add_argument("idea", help="Product idea to simulate")
+    ap.add_argument("idea", nargs="?", help="Product idea to simulate")
+    ap.add_argument("--batch", metavar="FILE",
+                    help="Run many ideas from FILE ('-' for stdin): one per line or JSONL JobRequests")
+    ap.add_argument("--parallel", type=int, default=2,
+                    help="Ideas processed concurrently in batch mode (default: %(default)s)")
+    ap.add_argument("--stream", action="store_true",
+                    help="Write engineer files to disk while the response is still streaming")
+    ap.add_argument("--sequential", action="store_true",
+                    help="Run phases one after another via Process.sequential instead of the dependency graph")
+    ap.add_argument("--workers", type=int, default=PIPELINE_WORKERS,
+                    help="Maximum number of phases running at once (default: %(default)s)")
+    ap.add_argument("--warm", action="store_true", default=OLLAMA_WARMUP,
+                    help="Preload the first phases' models before starting (also OLLAMA_WARMUP=on)")
+    ap.add_argument("--engineer", choices=["single", "staged"], default=ENGINEER_MODE,
+                    help="Engineer generation: one JSON completion, or a manifest then files in parallel "
+                         "(default: %(default)s)")
+    ap.add_argument("--resume", action="store_true",
+                    help="Reuse phase outputs checkpointed by an earlier run of the same idea "
+                         "whose prompts, model and inputs are unchanged")
+    cache_mode = ap.add_mutually_exclusive_group()
+    cache_mode.add_argument("--no-cache", dest="cache", action="store_const", const="off",
+                            help="Bypass the on-disk LLM response cache")
+    cache_mode.add_argument("--refresh-cache", dest="cache", action="store_const", const="refresh",
+                            help="Ignore cached LLM responses but store the fresh ones")
     args = ap.parse_args()
-    run(args.idea)
\ No newline at end of file
+    if bool(args.idea) == bool(args.batch):
+        ap.error("provide either an idea or --batch FILE")
+    if args.cache:
+        get_response_cache().mode = args.cache
+    run_kwargs = dict(stream=args.stream, sequential=args.sequential, workers=args.workers, warm=args.warm,
+                      engineer=args.engineer, resume=args.resume)
+
+    if args.batch:
+        import sys
+        from batch import load_jobs, run_batch, summarize
+        if args.batch == "-":
+            jobs, skipped = load_jobs(sys.stdin)
+        else:
+            with open(args.batch, encoding="utf-8") as fh:
+                jobs, skipped = load_jobs(fh)
+        for error in skipped:
+            print(f"Skipping {error}")
+        started = time.perf_counter()
+        results = run_batch(jobs, run, ART / "batch", parallel=args.parallel, **run_kwargs)
+        print("\n" + summarize(results, time.perf_counter() - started, skipped))
+        print(get_response_cache().stats())
+        sys.exit(1 if skipped or any(not r.ok for r in results) else 0)
+    else:
+        run(args.idea, **run_kwargs)
\ No newline at end of file
@@ -0,0 +1,3 @@
+"""
+Async job service: HTTP API, worker pool and SQLite-backed job store.
+"""
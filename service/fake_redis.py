@@ -0,0 +1,255 @@
+"""
+In-memory stand-in for the subset of Redis the work queue uses.
+
+Implements the redis-py calls RedisJobQueue makes (strings with expiry,
+lists, hashes, sets) with the same semantics and return types as a client
+created with decode_responses=True. Every command is atomic under one lock,
+like a single Redis server, and the clock is injectable so lease expiry can
+be tested without sleeping. Instances are process-local: workers on other
+nodes need a real server.
+"""
+import threading
+import time
+from typing import Any, Callable, Dict, List, Mapping, Optional, Set
+
+class FakeRedis:
+    """
+    Thread-safe in-memory Redis.
+
+    Args:
+        clock: Wall-clock source in seconds (injectable for tests)
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.time):
+        self.clock = clock
+        self._data: Dict[str, Any] = {}
+        self._expires: Dict[str, float] = {}
+        self._lock = threading.RLock()
+
+    # -- keys -----------------------------------------------------------------
+
+    def _live(self, key: str) -> Any:
+        deadline = self._expires.get(key)
+        if deadline is not None and deadline <= self.clock():
+            self._data.pop(key, None)
+            self._expires.pop(key, None)
+        return self._data.get(key)
+
+    def _typed(self, key: str, kind: type, create: bool = False) -> Any:
+        value = self._live(key)
+        if value is None:
+            if not create:
+                return None
+            value = self._data[key] = kind()
+        elif not isinstance(value, kind):
+            raise TypeError(f"WRONGTYPE Operation against a key holding the wrong kind of value: {key}")
+        return value
+
+    def _prune(self, key: str) -> None:
+        if not self._data.get(key):
+            self._data.pop(key, None)
+            self._expires.pop(key, None)
+
+    def exists(self, *keys: str) -> int:
+        with self._lock:
+            return sum(self._live(k) is not None for k in keys)
+
+    def delete(self, *keys: str) -> int:
+        with self._lock:
+            removed = 0
+            for key in keys:
+                if self._live(key) is not None:
+                    del self._data[key]
+                    removed += 1
+                self._expires.pop(key, None)
+            return removed
+
+    def pttl(self, key: str) -> int:
+        with self._lock:
+            if self._live(key) is None:
+                return -2
+            deadline = self._expires.get(key)
+            return -1 if deadline is None else int((deadline - self.clock()) * 1000)
+
+    def keys(self, pattern: str = "*") -> List[str]:
+        from fnmatch import fnmatchcase
+        with self._lock:
+            return [k for k in list(self._data) if self._live(k) is not None and fnmatchcase(k, pattern)]
+
+    def flushdb(self) -> bool:
+        with self._lock:
+            self._data.clear()
+            self._expires.clear()
+            return True
+
+    def ping(self) -> bool:
+        return True
+
+    # -- strings --------------------------------------------------------------
+
+    def set(self, key: str, value: Any, ex: Optional[float] = None, px: Optional[int] = None,
+            nx: bool = False) -> Optional[bool]:
+        with self._lock:
+            if nx and self._live(key) is not None:
+                return None
+            self._data[key] = str(value)
+            self._expires.pop(key, None)
+            if px is not None:
+                self._expires[key] = self.clock() + px / 1000
+            elif ex is not None:
+                self._expires[key] = self.clock() + ex
+            return True
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            return self._typed(key, str)
+
+    # -- lists (index 0 is the head: LPUSH adds there, RPOP takes the tail) ---
+
+    def lpush(self, key: str, *values: Any) -> int:
+        with self._lock:
+            items = self._typed(key, list, create=True)
+            for value in values:
+                items.insert(0, str(value))
+            return len(items)
+
+    def rpush(self, key: str, *values: Any) -> int:
+        with self._lock:
+            items = self._typed(key, list, create=True)
+            items.extend(str(v) for v in values)
+            return len(items)
+
+    def rpop(self, key: str) -> Optional[str]:
+        with self._lock:
+            items = self._typed(key, list)
+            if not items:
+                return None
+            value = items.pop()
+            self._prune(key)
+            return value
+
+    def rpoplpush(self, src: str, dst: str) -> Optional[str]:
+        with self._lock:
+            items = self._typed(src, list)
+            if not items:
+                return None
+            self._typed(dst, list, create=True)  # type check before mutating the source
+            value = items.pop()
+            self._prune(src)
+            self._typed(dst, list, create=True).insert(0, value)
+            return value
+
+    def lmove(self, first_list: str, second_list: str, src: str = "LEFT", dest: str = "RIGHT") -> Optional[str]:
+        with self._lock:
+            items = self._typed(first_list, list)
+            if not items:
+                return None
+            self._typed(second_list, list, create=True)
+            value = items.pop(0 if src.upper() == "LEFT" else -1)
+            self._prune(first_list)
+            target = self._typed(second_list, list, create=True)
+            target.insert(0 if dest.upper() == "LEFT" else len(target), value)
+            return value
+
+    def lrem(self, key: str, count: int, value: Any) -> int:
+        with self._lock:
+            items = self._typed(key, list)
+            if not items:
+                return 0
+            value = str(value)
+            indices = [i for i, v in enumerate(items) if v == value]
+            if count < 0:
+                indices = indices[::-1]
+            if count:
+                indices = indices[:abs(count)]
+            for i in sorted(indices, reverse=True):
+                del items[i]
+            self._prune(key)
+            return len(indices)
+
+    def lindex(self, key: str, index: int) -> Optional[str]:
+        with self._lock:
+            items = self._typed(key, list) or []
+            try:
+                return items[index]
+            except IndexError:
+                return None
+
+    def lrange(self, key: str, start: int, end: int) -> List[str]:
+        with self._lock:
+            items = self._typed(key, list) or []
+            return items[start:None if end == -1 else end + 1]
+
+    def llen(self, key: str) -> int:
+        with self._lock:
+            return len(self._typed(key, list) or [])
+
+    # -- hashes ---------------------------------------------------------------
+
+    def hset(self, name: str, key: Optional[str] = None, value: Any = None,
+             mapping: Optional[Mapping[str, Any]] = None) -> int:
+        with self._lock:
+            fields = dict(mapping or {})
+            if key is not None:
+                fields[key] = value
+            table = self._typed(name, dict, create=True)
+            added = sum(k not in table for k in fields)
+            table.update((k, str(v)) for k, v in fields.items())
+            return added
+
+    def hget(self, name: str, key: str) -> Optional[str]:
+        with self._lock:
+            return (self._typed(name, dict) or {}).get(key)
+
+    def hmget(self, name: str, keys: List[str]) -> List[Optional[str]]:
+        with self._lock:
+            table = self._typed(name, dict) or {}
+            return [table.get(k) for k in keys]
+
+    def hgetall(self, name: str) -> Dict[str, str]:
+        with self._lock:
+            return dict(self._typed(name, dict) or {})
+
+    def hdel(self, name: str, *keys: str) -> int:
+        with self._lock:
+            table = self._typed(name, dict) or {}
+            removed = sum(table.pop(k, None) is not None for k in keys)
+            self._prune(name)
+            return removed
+
+    def hincrby(self, name: str, key: str, amount: int = 1) -> int:
+        with self._lock:
+            table = self._typed(name, dict, create=True)
+            table[key] = str(int(table.get(key, 0)) + amount)
+            return int(table[key])
+
+    # -- sets -----------------------------------------------------------------
+
+    def sadd(self, key: str, *members: Any) -> int:
+        with self._lock:
+            items: Set[str] = self._typed(key, set, create=True)
+            before = len(items)
+            items.update(str(m) for m in members)
+            return len(items) - before
+
+    def smembers(self, key: str) -> Set[str]:
+        with self._lock:
+            return set(self._typed(key, set) or ())
+
+    def srem(self, key: str, *members: Any) -> int:
+        with self._lock:
+            items = self._typed(key, set) or set()
+            removed = sum(str(m) in items for m in members)
+            items.difference_update(str(m) for m in members)
+            self._prune(key)
+            return removed
+
+_instances: Dict[str, FakeRedis] = {}
+_instances_lock = threading.Lock()
+
+def shared(name: str = "") -> FakeRedis:
+    """The process-wide instance for a memory:// URL, so a server and its workers share one queue."""
+    with _instances_lock:
+        if name not in _instances:
+            _instances[name] = FakeRedis()
+        return _instances[name]
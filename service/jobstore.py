@@ -0,0 +1,229 @@
+"""
+SQLite-backed job store for the async job service.
+
+Status reads are served from an in-memory snapshot of pre-serialized
+`JobStatus` JSON, so polling never touches the database. Updates land in that
+snapshot immediately and are written to a WAL-mode SQLite database in batches
+by a single background writer thread.
+"""
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from schemas import JobPhase, JobRequest, JobStatus
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    job_id TEXT PRIMARY KEY,
+    request TEXT NOT NULL,
+    status TEXT NOT NULL,
+    snapshot TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+)
+"""
+
+class JobStore:
+    """
+    Job state with in-memory reads and batched, write-behind persistence.
+
+    Args:
+        db_path: SQLite database file (normally config.DB_PATH)
+        flush_interval: Maximum seconds an update waits before being persisted
+    """
+
+    def __init__(self, db_path: str, flush_interval: float = 0.25):
+        self.db_path = db_path
+        self.flush_interval = flush_interval
+        self.flushes = 0
+        self._lock = threading.Lock()
+        # Serializes flushes so an older snapshot can never overwrite a newer one
+        self._write_lock = threading.Lock()
+        self._requests: Dict[str, JobRequest] = {}
+        self._status: Dict[str, JobStatus] = {}
+        self._json: Dict[str, bytes] = {}
+        self._created: Dict[str, float] = {}
+        self._dirty: Set[str] = set()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._read_conn: Optional[sqlite3.Connection] = None
+
+        parent = os.path.dirname(db_path)
+        if parent:
+            os.makedirs(parent, exist_ok=True)
+        conn = self._connect()
+        conn.execute(_SCHEMA)
+        conn.commit()
+        conn.close()
+
+        self._writer = threading.Thread(target=self._write_loop, name="jobstore-writer", daemon=True)
+        self._writer.start()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=30, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    # -- writes -------------------------------------------------------------
+
+    def create(self, request: JobRequest) -> str:
+        """Register a new queued job and return its id."""
+        job_id = uuid.uuid4().hex
+        status = JobStatus(job_id=job_id, status="queued")
+        with self._lock:
+            self._requests[job_id] = request
+            self._created[job_id] = time.time()
+            self._set(job_id, status)
+        self._wake.set()
+        return job_id
+
+    def update(self, job_id: str, **fields: Any) -> JobStatus:
+        """
+        Apply field changes to a job (e.g. status="running", phase=JobPhase(...)).
+
+        The new state is visible to readers immediately and persisted on the
+        next batch flush; repeated updates between flushes cost one row write.
+        """
+        with self._lock:
+            current = self._status.get(job_id)
+            if current is None:
+                current = self._load(job_id)
+                if current is None:
+                    raise KeyError(job_id)
+            status = current.model_copy(update=fields)
+            self._set(job_id, status)
+        return status
+
+    def set_phase(self, job_id: str, name: str, progress: float) -> JobStatus:
+        """Record the current phase and its progress percentage."""
+        return self.update(job_id, status="running", phase=JobPhase(name=name, progress=progress))
+
+    def _set(self, job_id: str, status: JobStatus) -> None:
+        # Caller holds the lock
+        self._status[job_id] = status
+        self._json[job_id] = status.model_dump_json().encode("utf-8")
+        self._dirty.add(job_id)
+
+    # -- reads --------------------------------------------------------------
+
+    def get(self, job_id: str) -> Optional[JobStatus]:
+        """Current status of a job, or None if unknown."""
+        status = self._status.get(job_id)
+        if status is None:
+            with self._lock:
+                status = self._load(job_id)
+        return status
+
+    def get_json(self, job_id: str) -> Optional[bytes]:
+        """Pre-serialized JobStatus JSON; the hot path for status polling."""
+        data = self._json.get(job_id)
+        if data is None and self.get(job_id) is not None:
+            data = self._json.get(job_id)
+        return data
+
+    def request(self, job_id: str) -> Optional[JobRequest]:
+        return self._requests.get(job_id)
+
+    def unfinished(self) -> List[Tuple[str, JobRequest]]:
+        """Jobs persisted as queued/running, e.g. left over from a previous process."""
+        self.flush()
+        conn = self._connect()
+        try:
+            rows = conn.execute(
+                "SELECT job_id, request FROM jobs WHERE status IN ('queued', 'running') ORDER BY created_at"
+            ).fetchall()
+        finally:
+            conn.close()
+        jobs = []
+        for job_id, request in rows:
+            jobs.append((job_id, JobRequest.model_validate_json(request)))
+            self.get(job_id)  # warm the in-memory snapshot
+        return jobs
+
+    def _load(self, job_id: str) -> Optional[JobStatus]:
+        # Caller holds the lock; only used for jobs not yet in memory
+        if self._read_conn is None:
+            self._read_conn = self._connect()
+        row = self._read_conn.execute(
+            "SELECT request, snapshot, created_at FROM jobs WHERE job_id = ?", (job_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        status = JobStatus.model_validate_json(row[1])
+        self._requests[job_id] = JobRequest.model_validate_json(row[0])
+        self._created[job_id] = row[2]
+        self._status[job_id] = status
+        self._json[job_id] = row[1].encode("utf-8")
+        return status
+
+    # -- persistence --------------------------------------------------------
+
+    def _write_loop(self) -> None:
+        conn = self._connect()
+        try:
+            while not self._stop.is_set():
+                self._wake.wait(self.flush_interval)
+                self._wake.clear()
+                # Let a burst of updates accumulate into one transaction
+                time.sleep(self.flush_interval / 5)
+                self._flush_with(conn)
+            self._flush_with(conn)
+        finally:
+            conn.close()
+
+    def _flush_with(self, conn: sqlite3.Connection) -> int:
+        with self._write_lock:
+            with self._lock:
+                if not self._dirty:
+                    return 0
+                now = time.time()
+                rows = [
+                    (job_id, self._requests[job_id].model_dump_json(), self._status[job_id].status,
+                     self._json[job_id].decode("utf-8"), self._created[job_id], now)
+                    for job_id in self._dirty
+                ]
+                self._dirty.clear()
+            conn.executemany(
+                "INSERT INTO jobs (job_id, request, status, snapshot, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(job_id) DO UPDATE SET status = excluded.status, "
+                "snapshot = excluded.snapshot, updated_at = excluded.updated_at",
+                rows,
+            )
+            conn.commit()
+            self.flushes += 1
+            return len(rows)
+
+    def flush(self) -> int:
+        """Persist pending updates now; returns the number of rows written."""
+        conn = self._connect()
+        try:
+            return self._flush_with(conn)
+        finally:
+            conn.close()
+
+    def close(self) -> None:
+        """Stop the writer thread after a final flush."""
+        self._stop.set()
+        self._wake.set()
+        self._writer.join()
+        if self._read_conn is not None:
+            self._read_conn.close()
+            self._read_conn = None
+
+    def counts(self) -> Dict[str, int]:
+        """Number of in-memory jobs per status."""
+        out: Dict[str, int] = {}
+        for status in list(self._status.values()):
+            out[status.status] = out.get(status.status, 0) + 1
+        return out
+
+    def __enter__(self) -> "JobStore":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
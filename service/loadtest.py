@@ -0,0 +1,168 @@
+"""
+Load test for the job service against a stubbed LLM pipeline.
+
+Starts the service in a background thread with a pipeline that only sleeps
+through the four phases (no Ollama needed), submits jobs, and hammers
+GET /jobs/<id> from many keep-alive connections while the workers run.
+
+Usage:
+    python -m service.loadtest --jobs 200 --pollers 64 --duration 10
+    python -m service.loadtest --url http://127.0.0.1:8000   # drive a running service
+"""
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import threading
+import time
+from typing import Callable, List, Optional, Tuple
+from urllib.parse import urlparse
+
+from schemas import JobRequest
+from service.jobstore import JobStore
+from service.server import JobService
+from utils.stats import percentile
+
+PHASES = ["research", "engineer", "critic", "marketing"]
+
+def stub_pipeline(phase_seconds: float) -> Callable:
+    """Pipeline stand-in that reports each phase and sleeps instead of calling an LLM."""
+    def pipeline(job_id: str, request: JobRequest, report: Callable[[str, float], None]) -> List[str]:
+        for i, phase in enumerate(PHASES):
+            report(phase, 100.0 * i / len(PHASES))
+            time.sleep(phase_seconds)
+        report(PHASES[-1], 100.0)
+        return [f"artifacts/jobs/{job_id}/launch.md"]
+    return pipeline
+
+class _Client:
+    """Minimal keep-alive HTTP/1.1 client on asyncio streams."""
+
+    def __init__(self, host: str, port: int):
+        self.host, self.port = host, port
+        self.reader: Optional[asyncio.StreamReader] = None
+        self.writer: Optional[asyncio.StreamWriter] = None
+
+    async def request(self, method: str, path: str, body: bytes = b"") -> Tuple[int, bytes]:
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+        head = (f"{method} {path} HTTP/1.1\r\nHost: {self.host}\r\n"
+                f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n\r\n")
+        self.writer.write(head.encode("latin-1") + body)
+        await self.writer.drain()
+        status = int((await self.reader.readline()).split()[1])
+        length = 0
+        while True:
+            line = await self.reader.readline()
+            if line in (b"\r\n", b""):
+                break
+            key, _, value = line.decode("latin-1").partition(":")
+            if key.strip().lower() == "content-length":
+                length = int(value)
+        return status, await self.reader.readexactly(length)
+
+    def close(self) -> None:
+        if self.writer is not None:
+            self.writer.close()
+
+async def drive(host: str, port: int, jobs: int, pollers: int, duration: float) -> dict:
+    """Submit jobs, then poll their status from many connections; returns metrics."""
+    submit = _Client(host, port)
+    job_ids = []
+    t0 = time.perf_counter()
+    for i in range(jobs):
+        body = json.dumps({"idea": f"Load test idea number {i} for the job service"}).encode()
+        status, payload = await submit.request("POST", "/run", body)
+        if status == 202:
+            job_ids.append(json.loads(payload)["job_id"])
+    submit_rate = len(job_ids) / max(time.perf_counter() - t0, 1e-9)
+
+    latencies: List[float] = []
+    errors = 0
+    deadline = time.perf_counter() + duration
+
+    async def poller(offset: int) -> None:
+        nonlocal errors
+        client = _Client(host, port)
+        i = offset
+        try:
+            while time.perf_counter() < deadline:
+                start = time.perf_counter()
+                status, _ = await client.request("GET", f"/jobs/{job_ids[i % len(job_ids)]}")
+                latencies.append(time.perf_counter() - start)
+                errors += status != 200
+                i += 1
+        finally:
+            client.close()
+
+    poll_start = time.perf_counter()
+    await asyncio.gather(*(poller(i) for i in range(pollers)))
+    poll_wall = time.perf_counter() - poll_start
+
+    _, health = await submit.request("GET", "/healthz")
+    submit.close()
+    return {
+        "jobs_submitted": len(job_ids),
+        "submit_per_sec": round(submit_rate, 1),
+        "polls": len(latencies),
+        "polls_per_sec": round(len(latencies) / poll_wall, 1),
+        "poll_p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "poll_p99_ms": round(percentile(latencies, 99) * 1000, 2),
+        "poll_errors": errors,
+        "health": json.loads(health),
+    }
+
+def _serve_in_thread(db_path: str, concurrency: int, phase_seconds: float) -> Tuple[Tuple[str, int], Callable]:
+    started = threading.Event()
+    state = {}
+
+    def target() -> None:
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        store = JobStore(db_path)
+        service = JobService(store, stub_pipeline(phase_seconds), concurrency)
+        state["addr"] = loop.run_until_complete(service.start("127.0.0.1", 0))
+        state["loop"], state["stop"] = loop, asyncio.Event()
+        started.set()
+        loop.run_until_complete(state["stop"].wait())
+        loop.run_until_complete(service.stop())
+        store.close()
+        state["flushes"] = store.flushes
+        loop.close()
+
+    thread = threading.Thread(target=target, daemon=True)
+    thread.start()
+    started.wait()
+
+    def shutdown() -> int:
+        state["loop"].call_soon_threadsafe(state["stop"].set)
+        thread.join()
+        return state["flushes"]
+
+    return state["addr"], shutdown
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Load-test the job service with a stubbed LLM")
+    ap.add_argument("--url", help="Drive an already running service instead of an in-process one")
+    ap.add_argument("--jobs", type=int, default=200)
+    ap.add_argument("--pollers", type=int, default=64, help="Concurrent keep-alive polling connections")
+    ap.add_argument("--duration", type=float, default=10.0, help="Seconds of status polling")
+    ap.add_argument("--concurrency", type=int, default=8, help="Worker pool size (in-process mode)")
+    ap.add_argument("--phase-seconds", type=float, default=0.05, help="Stub time per phase")
+    args = ap.parse_args()
+
+    if args.url:
+        parsed = urlparse(args.url)
+        print(json.dumps(asyncio.run(drive(parsed.hostname, parsed.port or 80,
+                                           args.jobs, args.pollers, args.duration)), indent=2))
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        (host, port), shutdown = _serve_in_thread(os.path.join(tmp, "app.db"), args.concurrency, args.phase_seconds)
+        metrics = asyncio.run(drive(host, port, args.jobs, args.pollers, args.duration))
+        metrics["db_flushes"] = shutdown()
+    print(json.dumps(metrics, indent=2))
+
+if __name__ == "__main__":
+    main()
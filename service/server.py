@@ -0,0 +1,296 @@
+"""
+Asyncio HTTP job service for the AI Startup Simulator.
+
+Endpoints:
+    POST /run          Submit a JobRequest; returns 202 with the job id
+    GET  /jobs/<id>    Current JobStatus
+    GET  /healthz      Queue depth and job counts
+
+Jobs are queued in memory and executed by a fixed pool of in-process workers.
+Status is served from the JobStore's in-memory snapshot, so polling does not
+contend with the workers or the database writer. With --distributed, jobs and
+their status live in Redis instead and run on `python -m service.worker`
+nodes (see service.work_queue).
+
+Usage:
+    python -m service.server --port 8000 --concurrency 2
+    python -m service.server --distributed --redis redis://localhost:6379/0
+"""
+import argparse
+import asyncio
+import json
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from pydantic import ValidationError
+
+from schemas import JobRequest
+from service.jobstore import JobStore
+
+# A pipeline gets (job_id, request, report(phase, progress)) and returns artifact links
+Pipeline = Callable[[str, JobRequest, Callable[[str, float], None]], List[str]]
+
+MAX_BODY = 64 * 1024
+_REASONS = {200: "OK", 202: "Accepted", 400: "Bad Request", 404: "Not Found",
+            405: "Method Not Allowed", 413: "Payload Too Large", 422: "Unprocessable Entity",
+            503: "Service Unavailable"}
+
+def run_pipeline(job_id: str, request: JobRequest, report: Callable[[str, float], None]) -> List[str]:
+    """
+    Default pipeline: main.run into ARTIFACTS_DIR/jobs/<job_id>/ with phase reporting.
+
+    The reported phase is the first one not done yet, which is where a
+    requeued job resumes (and what the work queue routes it by). Returns
+    local paths: with distributed workers they are only meaningful if
+    ARTIFACTS_DIR is shared storage.
+    """
+    # Imported on first job so the service starts without loading crewai
+    from main import ART, PHASES, run
+
+    out_dir = ART / "jobs" / job_id
+    done = set()
+
+    def on_phase(name: str, event: str) -> None:
+        if name not in PHASES:
+            return
+        if event == "done":
+            done.add(name)
+        pending = [phase for phase in PHASES if phase not in done]
+        report(pending[0] if pending else name, 100.0 * len(done) / len(PHASES))
+
+    # A job retried after a crash picks up from its last completed phase; checkpoints are
+    # keyed by job id, so another job with the same idea starts fresh
+    run(request.idea, out_dir=out_dir, on_phase=on_phase, resume=True, checkpoint_scope=job_id)
+    return sorted(str(p) for p in Path(out_dir).iterdir())
+
+def _json(payload: Any) -> bytes:
+    return json.dumps(payload).encode("utf-8")
+
+class JobService:
+    """
+    HTTP front-end plus worker pool around a JobStore.
+
+    Args:
+        store: Job state store
+        pipeline: Callable executing one job in a worker thread
+        concurrency: Maximum number of jobs running at once
+        queue_size: Maximum number of queued jobs before POST /run returns 503
+    """
+
+    def __init__(self, store: JobStore, pipeline: Pipeline = run_pipeline,
+                 concurrency: int = 2, queue_size: int = 10000):
+        self.store = store
+        self.pipeline = pipeline
+        self.concurrency = max(1, concurrency)
+        self.queue: "asyncio.Queue[str]" = asyncio.Queue(maxsize=queue_size)
+        self._executor = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="job")
+        self._workers: List[asyncio.Task] = []
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    async def start(self, host: str = "127.0.0.1", port: int = 8000) -> Tuple[str, int]:
+        """Start workers and the HTTP listener; returns the bound (host, port)."""
+        for job_id, _ in self.store.unfinished():
+            self.store.update(job_id, status="queued", phase=None)
+            self.queue.put_nowait(job_id)
+        self._workers = [asyncio.create_task(self._worker()) for _ in range(self.concurrency)]
+        self._server = await asyncio.start_server(self._handle, host, port)
+        return self._server.sockets[0].getsockname()[:2]
+
+    async def stop(self) -> None:
+        """Stop accepting requests, cancel idle workers and flush the store."""
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._executor.shutdown(wait=True)
+        self.store.flush()
+
+    # -- workers ------------------------------------------------------------
+
+    async def _worker(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            job_id = await self.queue.get()
+            try:
+                await loop.run_in_executor(self._executor, self._execute, job_id)
+            finally:
+                self.queue.task_done()
+
+    def _execute(self, job_id: str) -> None:
+        request = self.store.request(job_id)
+        self.store.update(job_id, status="running")
+
+        def report(phase: str, progress: float) -> None:
+            self.store.set_phase(job_id, phase, min(100.0, max(0.0, progress)))
+
+        try:
+            links = self.pipeline(job_id, request, report)
+        except Exception as e:
+            status = self.store.get(job_id)
+            self.store.update(job_id, status="failed", errors=[*status.errors, f"{type(e).__name__}: {e}"])
+            return
+        self.store.update(job_id, status="succeeded", artifact_links=list(links or []))
+
+    # -- HTTP ---------------------------------------------------------------
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    method, target, version = line.decode("latin-1").split()
+                except ValueError:
+                    self._write(writer, 400, _json({"error": "malformed request line"}), False)
+                    break
+
+                headers = {}
+                while True:
+                    raw = await reader.readline()
+                    if raw in (b"\r\n", b"\n", b""):
+                        break
+                    key, _, value = raw.decode("latin-1").partition(":")
+                    headers[key.strip().lower()] = value.strip()
+
+                keep_alive = (version == "HTTP/1.1" and headers.get("connection", "").lower() != "close")
+                length = int(headers.get("content-length") or 0)
+                if length > MAX_BODY:
+                    self._write(writer, 413, _json({"error": "request body too large"}), False)
+                    break
+                body = await reader.readexactly(length) if length else b""
+
+                code, payload = self.dispatch(method, target, body)
+                self._write(writer, code, payload, keep_alive)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    @staticmethod
+    def _write(writer: asyncio.StreamWriter, code: int, payload: bytes, keep_alive: bool) -> None:
+        head = (f"HTTP/1.1 {code} {_REASONS.get(code, 'OK')}\r\n"
+                f"Content-Type: application/json\r\n"
+                f"Content-Length: {len(payload)}\r\n"
+                f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+        writer.write(head.encode("latin-1") + payload)
+
+    def dispatch(self, method: str, target: str, body: bytes) -> Tuple[int, bytes]:
+        """Route one request; returns (status code, JSON body)."""
+        path = target.split("?", 1)[0].rstrip("/")
+
+        if path.startswith("/jobs/"):
+            if method != "GET":
+                return 405, _json({"error": "use GET"})
+            data = self.status_json(path[len("/jobs/"):])
+            return (200, data) if data is not None else (404, _json({"error": "unknown job"}))
+
+        if path == "/run":
+            if method != "POST":
+                return 405, _json({"error": "use POST"})
+            try:
+                request = JobRequest.model_validate_json(body or b"{}")
+            except ValidationError as e:
+                return 422, _json({"error": "invalid JobRequest", "detail": json.loads(e.json())})
+            job_id = self.submit(request)
+            if job_id is None:
+                return 503, _json({"error": "job queue is full"})
+            return 202, _json({"job_id": job_id, "status": "queued"})
+
+        if path == "/healthz":
+            return 200, _json(dict(self.health(), status="ok"))
+
+        return 404, _json({"error": "not found"})
+
+    def submit(self, request: JobRequest) -> Optional[str]:
+        """Queue a job; returns its id, or None if the queue is full."""
+        if self.queue.full():
+            return None
+        job_id = self.store.create(request)
+        self.queue.put_nowait(job_id)
+        return job_id
+
+    def status_json(self, job_id: str) -> Optional[bytes]:
+        return self.store.get_json(job_id)
+
+    def health(self) -> Dict[str, Any]:
+        return {"queued": self.queue.qsize(), "jobs": self.store.counts()}
+
+class DistributedJobService(JobService):
+    """
+    HTTP front-end over a Redis work queue; jobs run on `python -m service.worker` nodes.
+
+    Args:
+        work_queue: service.work_queue.RedisJobQueue shared with the workers
+    """
+
+    def __init__(self, work_queue: Any):
+        self.work_queue = work_queue
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    async def start(self, host: str = "127.0.0.1", port: int = 8000) -> Tuple[str, int]:
+        self._server = await asyncio.start_server(self._handle, host, port)
+        return self._server.sockets[0].getsockname()[:2]
+
+    async def stop(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+
+    def submit(self, request: JobRequest) -> Optional[str]:
+        return self.work_queue.submit(request)
+
+    def status_json(self, job_id: str) -> Optional[bytes]:
+        return self.work_queue.get_json(job_id)
+
+    def health(self) -> Dict[str, Any]:
+        return self.work_queue.counts()
+
+async def serve(host: str, port: int, concurrency: int, db_path: str,
+                pipeline: Pipeline = run_pipeline, redis_url: Optional[str] = None) -> None:
+    """Run the service until cancelled; with `redis_url`, jobs go to the distributed queue instead."""
+    if redis_url:
+        from service.work_queue import configured_queue
+        service = DistributedJobService(configured_queue(redis_url))
+        bound = await service.start(host, port)
+        print(f"Job service listening on http://{bound[0]}:{bound[1]} (jobs queued in {redis_url})")
+        try:
+            await asyncio.Event().wait()
+        finally:
+            await service.stop()
+        return
+    store = JobStore(db_path)
+    service = JobService(store, pipeline, concurrency)
+    bound = await service.start(host, port)
+    print(f"Job service listening on http://{bound[0]}:{bound[1]} ({concurrency} workers, db {db_path})")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await service.stop()
+        store.close()
+
+if __name__ == "__main__":
+    from config import DB_PATH, JOB_CONCURRENCY, REDIS_URL, SERVICE_HOST, SERVICE_PORT
+
+    ap = argparse.ArgumentParser(description="Async job service for the AI Startup Simulator")
+    ap.add_argument("--host", default=SERVICE_HOST)
+    ap.add_argument("--port", type=int, default=SERVICE_PORT)
+    ap.add_argument("--concurrency", type=int, default=JOB_CONCURRENCY,
+                    help="Maximum number of pipeline runs at once (default: %(default)s)")
+    ap.add_argument("--db", default=DB_PATH, help="SQLite job database (default: %(default)s)")
+    ap.add_argument("--distributed", action="store_true",
+                    help="Queue jobs in Redis (REDIS_URL) for `python -m service.worker` nodes instead of "
+                         "running them in this process")
+    ap.add_argument("--redis", default=REDIS_URL, help="Redis URL for --distributed (default: %(default)s)")
+    args = ap.parse_args()
+    try:
+        asyncio.run(serve(args.host, args.port, args.concurrency, args.db,
+                          redis_url=args.redis if args.distributed else None))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,374 @@
+"""
+Redis-backed job queue for running pipeline workers on many nodes.
+
+Layout (all keys under a common prefix):
+    <p>:job:<id>          hash: request, status (JobStatus JSON), attempts, worker, enqueued
+    <p>:queue:<model>     list of queued job ids, one per model (LPUSH in, claimed from the tail)
+    <p>:models            set of models that have a queue
+    <p>:claimed:<worker>  list of job ids a worker holds
+    <p>:lease:<worker>    expiring key; the worker's heartbeat keeps it alive
+    <p>:workers           hash worker id -> JSON (host, warm models, current job)
+
+A job is always in exactly one queue or one worker's claimed list: claiming
+is a single RPOPLPUSH, so a worker that dies mid-claim can't lose it. Leases
+are per worker: while a worker heartbeats, its claimed jobs are its own.
+When its lease key expires, any worker's sweep moves its claimed jobs back
+to their queues for the next worker. Checkpoints and artifacts are files
+under STATE_DIR and ARTIFACTS_DIR, so a requeued job resumes from its
+completed phases, and its artifact links resolve, only if every worker
+mounts those directories from shared storage; otherwise it reruns from the
+start. A job whose lease expires `max_attempts` times is failed.
+
+Each job is queued under the model its next phase runs on
+(config.get_model_for_task). Workers advertise the models they have warm and
+claim from those queues first. They take other work only after it has waited
+`steal_after` seconds, or at once if no live worker has that model warm. A
+job therefore waits briefly for a node that can skip the model load, but
+never waits long.
+
+Usage:
+    python -m service.worker --redis redis://host:6379/0 --workers 2
+"""
+import json
+import os
+import socket
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from schemas import JobPhase, JobRequest, JobStatus
+from service.server import Pipeline
+from utils.tracing import span
+
+def connect(url: str) -> Any:
+    """
+    Client for a redis:// URL, or the process-wide in-memory stand-in for memory://<name>.
+
+    Raises:
+        RuntimeError: If the redis package isn't installed
+    """
+    if url.startswith("memory://"):
+        from service.fake_redis import shared
+        return shared(url[len("memory://"):].strip("/"))
+    try:
+        import redis
+    except ImportError:
+        raise RuntimeError("Distributed workers need the redis package: pip install redis") from None
+    return redis.Redis.from_url(url, decode_responses=True)
+
+def configured_queue(url: Optional[str] = None) -> "RedisJobQueue":
+    """Queue on `url` (default config.REDIS_URL) with the WORKER_* settings from config."""
+    from config import REDIS_PREFIX, REDIS_URL, WORKER_LEASE_SECONDS, WORKER_MAX_ATTEMPTS, WORKER_STEAL_AFTER
+    return RedisJobQueue(connect(url or REDIS_URL), REDIS_PREFIX, WORKER_LEASE_SECONDS,
+                         WORKER_STEAL_AFTER, WORKER_MAX_ATTEMPTS)
+
+@dataclass
+class Claim:
+    """A job a worker has taken off the queue."""
+    job_id: str
+    request: JobRequest
+    model: str
+    warm: bool
+    waited: float
+
+class RedisJobQueue:
+    """
+    Job queue, job status and worker leases in Redis.
+
+    Args:
+        redis: redis-py client with decode_responses=True, or a FakeRedis
+        prefix: Key prefix, so several deployments can share a server
+        lease_seconds: How long a worker's claims survive without a heartbeat
+        steal_after: Seconds a job waits for a worker with its model warm
+        max_attempts: Lease expiries after which a job is failed instead of requeued
+        model_for: Model a phase runs on; defaults to config.get_model_for_task
+        clock: Wall-clock source shared by all nodes (injectable for tests)
+    """
+
+    def __init__(self, redis: Any, prefix: str = "startup-sim", lease_seconds: float = 30.0,
+                 steal_after: float = 5.0, max_attempts: int = 3,
+                 model_for: Optional[Callable[[str], str]] = None,
+                 clock: Callable[[], float] = time.time):
+        if model_for is None:
+            from config import get_model_for_task
+            model_for = get_model_for_task
+        self.redis = redis
+        self.prefix = prefix
+        self.lease_seconds = lease_seconds
+        self.steal_after = steal_after
+        self.max_attempts = max_attempts
+        self.model_for = model_for
+        self.clock = clock
+
+    def _key(self, *parts: str) -> str:
+        return ":".join((self.prefix, *parts))
+
+    # -- jobs -----------------------------------------------------------------
+
+    def submit(self, request: JobRequest) -> str:
+        """Queue a job under the model of its first phase; returns the job id."""
+        job_id = uuid.uuid4().hex
+        status = JobStatus(job_id=job_id, status="queued")
+        self.redis.hset(self._key("job", job_id), mapping={
+            "request": request.model_dump_json(), "status": status.model_dump_json(),
+            "attempts": 0, "enqueued": self.clock(),
+        })
+        self._enqueue(job_id, self.model_for("research"))
+        return job_id
+
+    def _enqueue(self, job_id: str, model: str) -> None:
+        self.redis.sadd(self._key("models"), model)
+        self.redis.lpush(self._key("queue", model), job_id)
+
+    def get(self, job_id: str) -> Optional[JobStatus]:
+        data = self.get_json(job_id)
+        return JobStatus.model_validate_json(data) if data is not None else None
+
+    def get_json(self, job_id: str) -> Optional[bytes]:
+        """Serialized JobStatus, or None for an unknown job."""
+        data = self.redis.hget(self._key("job", job_id), "status")
+        return data.encode("utf-8") if data is not None else None
+
+    def _status(self, job_id: str) -> JobStatus:
+        return JobStatus.model_validate_json(self.redis.hget(self._key("job", job_id), "status"))
+
+    def _set_status(self, job_id: str, status: JobStatus) -> None:
+        self.redis.hset(self._key("job", job_id), "status", status.model_dump_json())
+
+    def report(self, job_id: str, phase: str, progress: float) -> None:
+        """Record a running job's phase and progress."""
+        status = self._status(job_id)
+        status.phase = JobPhase(name=phase, progress=min(100.0, max(0.0, progress)))
+        self._set_status(job_id, status)
+
+    def affinity(self, job_id: str) -> str:
+        """Model the job's next phase runs on: the first pending phase it last reported."""
+        phase = self._status(job_id).phase
+        return self.model_for(phase.name if phase else "research")
+
+    # -- workers --------------------------------------------------------------
+
+    def heartbeat(self, worker_id: str, models: Sequence[str], job_id: Optional[str] = None) -> None:
+        """Renew a worker's lease and advertise its warm models."""
+        self.redis.set(self._key("lease", worker_id), self.clock(), px=int(self.lease_seconds * 1000))
+        self.redis.hset(self._key("workers"), worker_id, json.dumps({
+            "host": socket.gethostname(), "pid": os.getpid(), "models": list(models),
+            "job": job_id, "seen": self.clock(),
+        }))
+
+    def workers(self) -> Dict[str, Dict[str, Any]]:
+        """Registered workers and whether their lease is live."""
+        found = {}
+        for worker_id, info in self.redis.hgetall(self._key("workers")).items():
+            entry = json.loads(info)
+            entry["alive"] = bool(self.redis.exists(self._key("lease", worker_id)))
+            found[worker_id] = entry
+        return found
+
+    def leave(self, worker_id: str) -> None:
+        """Deregister a worker that holds no jobs."""
+        self.redis.hdel(self._key("workers"), worker_id)
+        self.redis.delete(self._key("lease", worker_id))
+
+    def depth(self) -> Dict[str, int]:
+        """Queued jobs per model."""
+        return {m: self.redis.llen(self._key("queue", m)) for m in sorted(self.redis.smembers(self._key("models")))}
+
+    def _waited(self, model: str, now: float) -> Optional[float]:
+        """How long the oldest job in a model's queue has waited (None if the queue is empty)."""
+        job_id = self.redis.lindex(self._key("queue", model), -1)
+        if job_id is None:
+            return None
+        enqueued = self.redis.hget(self._key("job", job_id), "enqueued")
+        return now - float(enqueued or now)
+
+    def claim(self, worker_id: str, warm: Sequence[str]) -> Optional[Claim]:
+        """
+        Take the next job for a worker with `warm` models loaded.
+
+        Queues for warm models come first, oldest job first. Other queues are
+        served once their oldest job has waited `steal_after` seconds, or
+        immediately if no live worker has that model warm.
+        """
+        now = self.clock()
+        warm = set(warm)
+        waits = {m: w for m in self.redis.smembers(self._key("models"))
+                 if (w := self._waited(m, now)) is not None}
+        if not waits:
+            return None
+        covered = set()
+        if any(m not in warm for m in waits):
+            for info in self.workers().values():
+                if info["alive"]:
+                    covered.update(info["models"])
+        order = sorted((m for m in waits if m in warm), key=waits.get, reverse=True)
+        order += sorted((m for m in waits if m not in warm and (waits[m] >= self.steal_after or m not in covered)),
+                        key=waits.get, reverse=True)
+        for model in order:
+            job_id = self.redis.rpoplpush(self._key("queue", model), self._key("claimed", worker_id))
+            if job_id is None:
+                continue  # another worker emptied it
+            key = self._key("job", job_id)
+            self.redis.hset(key, mapping={"worker": worker_id, "claimed": now})
+            status = self._status(job_id)
+            status.status = "running"
+            self._set_status(job_id, status)
+            request = JobRequest.model_validate_json(self.redis.hget(key, "request"))
+            return Claim(job_id, request, model, model in warm, now - float(self.redis.hget(key, "enqueued") or now))
+        return None
+
+    def complete(self, worker_id: str, job_id: str, links: Sequence[str] = (),
+                 error: Optional[str] = None) -> bool:
+        """
+        Record a finished job and release the worker's claim.
+
+        Returns:
+            False if the worker had lost the job (its lease expired and the job
+            was requeued); the result is then discarded
+        """
+        if not self.redis.lrem(self._key("claimed", worker_id), 1, job_id):
+            return False
+        status = self._status(job_id)
+        if error is None:
+            status.status = "succeeded"
+            status.artifact_links = list(links)
+        else:
+            status.status = "failed"
+            status.errors = [*status.errors, error]
+        self._set_status(job_id, status)
+        self.redis.hdel(self._key("job", job_id), "worker")
+        return True
+
+    def requeue_expired(self) -> List[str]:
+        """
+        Return the jobs of workers whose lease has expired to their queues.
+
+        Safe to run from every worker at once: each job moves with one
+        LMOVE, so it is requeued exactly once.
+
+        Returns:
+            Ids of the requeued jobs
+        """
+        requeued = []
+        for worker_id in list(self.redis.hgetall(self._key("workers"))):
+            if self.redis.exists(self._key("lease", worker_id)):
+                continue
+            claimed = self._key("claimed", worker_id)
+            while True:
+                peek = self.redis.lindex(claimed, -1)
+                if peek is None:
+                    break
+                model = self.affinity(peek)
+                # Back to the front of the queue: the job has waited its turn already
+                job_id = self.redis.lmove(claimed, self._key("queue", model), "RIGHT", "RIGHT")
+                if job_id is None:
+                    break
+                self.redis.sadd(self._key("models"), model)
+                key = self._key("job", job_id)
+                attempts = self.redis.hincrby(key, "attempts", 1)
+                self.redis.hdel(key, "worker")
+                status = self._status(job_id)
+                message = f"lease of worker {worker_id} expired (attempt {attempts})"
+                if attempts >= self.max_attempts:
+                    if self.redis.lrem(self._key("queue", model), 1, job_id):
+                        status.status = "failed"
+                        status.errors = [*status.errors, message]
+                        self._set_status(job_id, status)
+                    continue
+                status.status = "queued"
+                status.errors = [*status.errors, message]
+                self._set_status(job_id, status)
+                requeued.append(job_id)
+            # Only forget the worker if it didn't come back while we were draining it
+            if not self.redis.exists(self._key("lease", worker_id)):
+                self.redis.hdel(self._key("workers"), worker_id)
+        return requeued
+
+    def counts(self) -> Dict[str, Any]:
+        workers = self.workers()
+        return {"queued": self.depth(), "workers": sum(w["alive"] for w in workers.values()),
+                "busy": sum(bool(w["alive"] and w["job"]) for w in workers.values())}
+
+class QueueWorker:
+    """
+    One worker: claims a job at a time and runs the pipeline on it.
+
+    A background thread renews the lease every third of `lease_seconds`
+    while the worker is alive, including during long pipeline runs.
+
+    Args:
+        queue: The shared queue
+        pipeline: Callable executing one job
+        warm_models: Models this node has loaded; defaults to the model pool's resident set
+        worker_id: Unique id; defaults to <hostname>-<random>
+        poll_interval: Seconds to sleep when there is nothing to claim
+    """
+
+    def __init__(self, queue: RedisJobQueue, pipeline: Pipeline,
+                 warm_models: Optional[Callable[[], Sequence[str]]] = None,
+                 worker_id: Optional[str] = None, poll_interval: float = 0.5):
+        if warm_models is None:
+            from utils.model_pool import get_model_pool
+            warm_models = lambda: get_model_pool().resident()
+        self.queue = queue
+        self.pipeline = pipeline
+        self.warm_models = warm_models
+        self.worker_id = worker_id or f"{socket.gethostname()}-{uuid.uuid4().hex[:8]}"
+        self.poll_interval = poll_interval
+        self.current: Optional[str] = None
+        self.done = 0
+        self.warm_claims = 0
+        self._stop = threading.Event()
+        self._beat: Optional[threading.Thread] = None
+
+    def heartbeat(self) -> None:
+        self.queue.heartbeat(self.worker_id, list(self.warm_models()), self.current)
+
+    def _beat_loop(self) -> None:
+        while not self._stop.wait(self.queue.lease_seconds / 3):
+            try:
+                self.heartbeat()
+            except Exception as e:
+                print(f"Worker {self.worker_id}: heartbeat failed: {e}")
+
+    def run_once(self) -> bool:
+        """Sweep expired leases, then claim and run one job; False if there was none."""
+        self.queue.requeue_expired()
+        claim = self.queue.claim(self.worker_id, list(self.warm_models()))
+        if claim is None:
+            return False
+        self.current = claim.job_id
+        self.heartbeat()
+        with span("worker_job", job=claim.job_id, worker=self.worker_id, model=claim.model,
+                  warm=claim.warm, waited_ms=round(claim.waited * 1000, 1)) as s:
+            try:
+                links = self.pipeline(claim.job_id, claim.request,
+                                      lambda phase, progress: self.queue.report(claim.job_id, phase, progress))
+                kept = self.queue.complete(self.worker_id, claim.job_id, links)
+            except Exception as e:
+                kept = self.queue.complete(self.worker_id, claim.job_id, error=f"{type(e).__name__}: {e}")
+            s.set(kept=kept)
+        if not kept:
+            print(f"Worker {self.worker_id}: lost the lease on job {claim.job_id}; result discarded")
+        self.current = None
+        self.done += 1
+        self.warm_claims += claim.warm
+        return True
+
+    def run(self, stop: Optional[threading.Event] = None) -> None:
+        """Work until `stop` is set; the lease is released on the way out."""
+        stop = stop or threading.Event()
+        self.heartbeat()
+        self._stop.clear()
+        self._beat = threading.Thread(target=self._beat_loop, name=f"heartbeat-{self.worker_id}", daemon=True)
+        self._beat.start()
+        try:
+            while not stop.is_set():
+                if not self.run_once():
+                    stop.wait(self.poll_interval)
+        finally:
+            self._stop.set()
+            self._beat.join()
+            self.queue.leave(self.worker_id)
@@ -0,0 +1,49 @@
+"""
+Distributed pipeline worker.
+
+Runs one or more QueueWorkers that claim jobs from the Redis queue
+(service.work_queue), so pipeline throughput scales by starting this on more
+nodes. Each worker advertises the models this node's Ollama has loaded, and
+prefers jobs whose next phase runs on one of them.
+
+Usage:
+    python -m service.worker --redis redis://queue-host:6379/0 --workers 2
+    python -m service.server --distributed   # front-end that queues the jobs
+"""
+import argparse
+import threading
+from typing import List, Optional
+
+from service.server import run_pipeline
+from service.work_queue import QueueWorker, configured_queue
+
+def main(argv: Optional[List[str]] = None) -> None:
+    from config import REDIS_URL
+
+    ap = argparse.ArgumentParser(description="Claim and run queued jobs from Redis")
+    ap.add_argument("--redis", default=REDIS_URL, help="Redis URL (default: %(default)s)")
+    ap.add_argument("--workers", type=int, default=1,
+                    help="Jobs this node runs at once (default: %(default)s)")
+    ap.add_argument("--poll", type=float, default=0.5, help="Seconds between claims when idle")
+    args = ap.parse_args(argv)
+
+    queue = configured_queue(args.redis)
+    stop = threading.Event()
+    workers = [QueueWorker(queue, run_pipeline, poll_interval=args.poll) for _ in range(max(1, args.workers))]
+    threads = [threading.Thread(target=w.run, args=(stop,), name=w.worker_id) for w in workers]
+    for thread in threads:
+        thread.start()
+    print(f"{len(workers)} worker(s) claiming jobs from {args.redis}: {', '.join(w.worker_id for w in workers)}")
+    try:
+        for thread in threads:
+            while thread.is_alive():
+                thread.join(1.0)
+    except KeyboardInterrupt:
+        print("Stopping after the current jobs...")
+        stop.set()
+        for thread in threads:
+            thread.join()
+    print(f"Ran {sum(w.done for w in workers)} jobs ({sum(w.warm_claims for w in workers)} on a warm model)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Tests for the content-addressed artifact store.
+"""
+import io
+import tarfile
+import zipfile
+
+import pytest
+
+from utils.artifact_store import ArtifactStore
+
+BOILERPLATE = {"nextjs_app/package.json": '{"name": "app"}', "nextjs_app/tsconfig.json": "{}"}
+
+class Unseekable(io.RawIOBase):
+    """Write-only stream like a pipe or socket."""
+
+    def __init__(self):
+        self.data = bytearray()
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, b) -> int:
+        self.data += b
+        return len(b)
+
+def make_run(base, files):
+    for rel, text in files.items():
+        path = base / rel
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(text, encoding="utf-8")
+    return base
+
+def test_identical_files_are_stored_once(tmp_path):
+    store = ArtifactStore(tmp_path / "store")
+    one = make_run(tmp_path / "one", dict(BOILERPLATE, **{"research.md": "A", "nextjs_app/pages/index.tsx": "1"}))
+    two = make_run(tmp_path / "two", dict(BOILERPLATE, **{"research.md": "B", "nextjs_app/pages/index.tsx": "1"}))
+    first = store.add_run("r1", one, ["research.md", "nextjs_app", "launch.md"])
+    second = store.add_run("r2", two, ["research.md", "nextjs_app"])
+    assert (first.files, first.new_blobs) == (4, 4)
+    assert (second.files, second.new_blobs) == (4, 1)
+    assert store.manifest("r2").files["nextjs_app/package.json"] == store.manifest("r1").files["nextjs_app/package.json"]
+    assert [run.run_id for run in store.runs()] == ["r1", "r2"]
+    with pytest.raises(ValueError):
+        store.add_run("r1", one, ["research.md"])
+
+    assert store.checkout("r2", tmp_path / "out") == 4
+    assert (tmp_path / "out" / "research.md").read_text(encoding="utf-8") == "B"
+
+def test_export_streams_to_unseekable_output(tmp_path):
+    store = ArtifactStore(tmp_path / "store")
+    store.add_run("r1", make_run(tmp_path / "one", BOILERPLATE), ["nextjs_app"])
+
+    out = Unseekable()
+    assert store.export("r1", out, "tar.gz") == 2
+    with tarfile.open(fileobj=io.BytesIO(bytes(out.data)), mode="r:gz") as tar:
+        assert tar.extractfile("r1/nextjs_app/package.json").read() == b'{"name": "app"}'
+
+    out = Unseekable()
+    store.export("r1", out, "zip")
+    with zipfile.ZipFile(io.BytesIO(bytes(out.data))) as archive:
+        assert sorted(archive.namelist()) == ["r1/nextjs_app/package.json", "r1/nextjs_app/tsconfig.json"]
+        assert archive.read("r1/nextjs_app/tsconfig.json") == b"{}"
+
+    with pytest.raises(KeyError):
+        store.export("missing", io.BytesIO())
+
+def test_gc_keeps_shared_and_recent_blobs(tmp_path):
+    store = ArtifactStore(tmp_path / "store")
+    store.add_run("r1", make_run(tmp_path / "one", dict(BOILERPLATE, **{"review.md": "old"})), ["nextjs_app", "review.md"])
+    store.add_run("r2", make_run(tmp_path / "two", BOILERPLATE), ["nextjs_app"])
+    store.delete_run("r1")
+
+    # Within the grace period nothing is touched
+    assert store.gc().removed == 0
+    assert store.gc(dry_run=True, grace_seconds=0).removed == 1
+    report = store.gc(grace_seconds=0)
+    assert (report.removed, report.kept) == (1, 2)
+    assert store.checkout("r2", tmp_path / "out") == 2
@@ -0,0 +1,56 @@
+"""
+Tests for batch mode: input parsing, output directories and the summary.
+"""
+import json
+
+from batch import idea_dir_name, load_jobs, run_batch, summarize
+
+IDEA = "A web app that helps people find local pickup basketball games"
+
+def test_loads_text_and_jsonl_and_skips_bad_lines():
+    lines = [
+        "# ideas for the weekend\n",
+        f"{IDEA}\n",
+        "\n",
+        json.dumps({"idea": "A board game night planner for friends", "visibility": "private"}) + "\n",
+        "too short\n",
+        '{"idea": "broken json\n',
+        json.dumps({"idea": "A tool lending library app", "visibility": "secret"}) + "\n",
+    ]
+    jobs, errors = load_jobs(lines)
+    assert [job.idea for job in jobs] == [IDEA, "A board game night planner for friends"]
+    assert jobs[1].visibility == "private"
+    assert [error.split(":")[0] for error in errors] == ["line 5", "line 6", "line 7"]
+    assert "idea" in errors[0] and "visibility" in errors[2]
+
+def test_idea_dir_names_are_stable_and_distinct():
+    assert idea_dir_name(3, IDEA) == idea_dir_name(3, IDEA)
+    assert idea_dir_name(3, IDEA).startswith("0003-a-web-app-that-helps-people-find-local")
+    # Ideas sharing their first 40 characters (or repeated in a batch) still get their own directory
+    names = {idea_dir_name(0, IDEA + " in Berlin"), idea_dir_name(0, IDEA + " in Paris"),
+             idea_dir_name(1, IDEA + " in Paris")}
+    assert len(names) == 3
+    assert idea_dir_name(0, "!!!").startswith("0000-idea-")
+
+def test_run_batch_isolates_failures_and_summarizes(tmp_path, capsys):
+    ideas = ["A recipe sharing app for families", "An app that always crashes on launch", IDEA]
+    jobs, _ = load_jobs(ideas)
+    calls = []
+
+    def run(idea, out_dir, engineer):
+        calls.append((idea, out_dir.name, engineer))
+        if "crashes" in idea:
+            raise RuntimeError("model went away")
+        return {"timings": {"research": 1.0, "engineer": 2.0}}
+
+    results = run_batch(jobs, run, tmp_path, parallel=2, engineer="staged")
+    assert [r.idea for r in results] == ideas and sorted(c[0] for c in calls) == sorted(ideas)
+    assert all(c[2] == "staged" for c in calls)
+    failed = results[1]
+    assert not failed.ok and failed.error == "RuntimeError: model went away"
+    assert "model went away" in (tmp_path / failed.out_dir.name / "error_log.txt").read_text()
+
+    summary = summarize(results, wall=3600.0, skipped=["line 4: idea: too short"])
+    assert "3 ideas, 2 succeeded, 1 failed" in summary and "Throughput: 2.0 ideas/hour" in summary
+    assert f"FAILED {failed.out_dir.name}: RuntimeError" in summary
+    assert "Skipped 1 invalid input lines:\n  line 4: idea: too short" in summary
@@ -0,0 +1,55 @@
+"""
+Tests for per-phase checkpoints and resume.
+"""
+from types import SimpleNamespace
+
+from utils.checkpoint import PhaseCheckpoints, idea_key
+
+IDEA = "A pickup basketball finder"
+
+def register(checkpoints, prompt="p1", model="llama3"):
+    checkpoints.register("research", {"prompt": prompt, "model": model})
+    checkpoints.register("engineer", {"prompt": "e1", "model": model}, ["research"])
+    return checkpoints
+
+def test_roundtrip_and_resume_flag(tmp_path):
+    first = register(PhaseCheckpoints(tmp_path, IDEA))
+    first.save("research", SimpleNamespace(raw="# Research", handoff='{"pain_points": []}'))
+    assert (tmp_path / idea_key(IDEA) / "research.json").exists()
+    # Without --resume saved outputs are written but never read
+    assert first.load("research") is None
+
+    resumed = register(PhaseCheckpoints(tmp_path, IDEA, resume=True))
+    out = resumed.load("research")
+    assert out.raw == "# Research" and out.handoff == '{"pain_points": []}'
+    assert resumed.load("engineer") is None
+    assert resumed.reused == ["research"]
+
+def test_stale_checkpoints_report_reason_and_cascade(tmp_path, capsys):
+    saved = register(PhaseCheckpoints(tmp_path, IDEA))
+    saved.save("research", "research text")
+    saved.save("engineer", "{}")
+
+    changed = register(PhaseCheckpoints(tmp_path, IDEA, resume=True), prompt="p2")
+    assert changed.load("research") is None
+    assert "prompt changed" in capsys.readouterr().out
+    # The engineer's own prompt is unchanged, but it consumed the stale research
+    assert changed.load("engineer") is None
+    assert "upstream changed" in capsys.readouterr().out
+
+    bumped = register(PhaseCheckpoints(tmp_path, IDEA, version="2", resume=True))
+    assert bumped.load("research") is None
+    assert "version" in capsys.readouterr().out
+
+def test_ideas_and_modes_are_separate(tmp_path):
+    register(PhaseCheckpoints(tmp_path, IDEA)).save("research", "research text")
+    assert register(PhaseCheckpoints(tmp_path, "Another idea", resume=True)).load("research") is None
+    staged = register(PhaseCheckpoints(tmp_path, IDEA, resume=True, modes={"research": "handoff:300"}))
+    assert staged.load("research") is None
+
+def test_scoped_checkpoints_only_resume_the_same_scope(tmp_path):
+    register(PhaseCheckpoints(tmp_path, IDEA, scope="job-1")).save("research", "research text")
+    assert register(PhaseCheckpoints(tmp_path, IDEA, resume=True, scope="job-2")).load("research") is None
+    assert register(PhaseCheckpoints(tmp_path, IDEA, resume=True)).load("research") is None
+    assert register(PhaseCheckpoints(tmp_path, IDEA, resume=True, scope="job-1")).load("research").raw == "research text"
+    assert idea_key(IDEA) != idea_key(IDEA, "job-1") != idea_key(IDEA, "job-2")
@@ -0,0 +1,57 @@
+"""
+Tests for the dependency-graph phase executor.
+"""
+import time
+
+import pytest
+
+from utils.dag import run_dag, topological_order
+
+def _sleep_then(value, seconds):
+    def fn(inputs):
+        time.sleep(seconds)
+        return (value, sorted(inputs))
+    return fn
+
+def test_independent_branches_overlap():
+    nodes = {
+        "research": (_sleep_then("r", 0.05), []),
+        "engineer": (_sleep_then("e", 0.2), ["research"]),
+        "critic": (_sleep_then("c", 0.2), ["engineer"]),
+        "marketing": (_sleep_then("m", 0.2), ["research"]),
+    }
+    run = run_dag(nodes, max_workers=2)
+    assert run.results["critic"] == ("c", ["engineer"])
+    assert run.results["marketing"] == ("m", ["research"])
+    # marketing starts together with engineer, well before critic
+    assert run.timings["marketing"][0] < run.timings["critic"][0]
+    assert run.wall < run.serial - 0.15
+    assert "saved" in run.summary()
+
+def test_worker_bound_is_respected():
+    nodes = {name: (_sleep_then(name, 0.1), []) for name in "abcd"}
+    run = run_dag(nodes, max_workers=1)
+    assert run.wall >= 0.4
+
+def test_zero_workers_runs_one_node_at_a_time():
+    nodes = {"a": (lambda inputs: 1, []), "b": (lambda inputs: inputs["a"] + 1, ["a"])}
+    assert run_dag(nodes, max_workers=0).results == {"a": 1, "b": 2}
+
+def test_failure_stops_dependents():
+    calls = []
+    def boom(inputs):
+        raise RuntimeError("boom")
+    nodes = {
+        "a": (boom, []),
+        "b": (lambda inputs: calls.append("b"), ["a"]),
+    }
+    with pytest.raises(RuntimeError):
+        run_dag(nodes)
+    assert calls == []
+
+def test_rejects_cycles_and_unknown_nodes():
+    noop = lambda inputs: None
+    with pytest.raises(ValueError, match="cycle"):
+        topological_order({"a": (noop, ["b"]), "b": (noop, ["a"])})
+    with pytest.raises(ValueError, match="unknown"):
+        topological_order({"a": (noop, ["zzz"])})
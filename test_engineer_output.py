@@ -0,0 +1,70 @@
+"""
+Tests for incremental, atomic write_files.
+"""
+import json
+import os
+
+from utils.engineer_output import StreamingFileWriter, load_manifest, manifest_path, write_files
+
+FILES = {
+    "package.json": {"name": "demo"},
+    "pages/index.tsx": "export default () => null\n",
+    "components/ui/Button.tsx": "export const Button = () => null\n",
+}
+
+def test_first_write_creates_files_and_manifest(tmp_path):
+    app = tmp_path / "nextjs_app"
+    report = write_files(app, FILES)
+    assert (report.written, report.skipped, report.removed) == (3, 0, 0)
+    assert (app / "components" / "ui" / "Button.tsx").exists()
+    assert manifest_path(app) == tmp_path / "nextjs_app.manifest.json"
+    assert set(load_manifest(app)) == set(FILES)
+    assert not list(app.rglob("*.tmp"))
+
+def test_rerun_skips_unchanged_and_keeps_mtime(tmp_path):
+    app = tmp_path / "nextjs_app"
+    write_files(app, FILES)
+    index = app / "pages" / "index.tsx"
+    os.utime(index, (1, 1))
+
+    changed = dict(FILES, **{"package.json": {"name": "demo2"}})
+    report = write_files(app, changed)
+    assert (report.written, report.skipped, report.removed) == (1, 2, 0)
+    assert index.stat().st_mtime == 1
+    assert "demo2" in (app / "package.json").read_text(encoding="utf-8")
+
+def test_dropped_files_are_removed_with_empty_dirs(tmp_path):
+    app = tmp_path / "nextjs_app"
+    write_files(app, FILES)
+    report = write_files(app, {"package.json": FILES["package.json"]})
+    assert (report.written, report.skipped, report.removed) == (0, 1, 2)
+    assert not (app / "components").exists()
+
+def test_missing_or_edited_file_is_rewritten(tmp_path):
+    app = tmp_path / "nextjs_app"
+    write_files(app, FILES)
+    (app / "pages" / "index.tsx").unlink()
+    (app / "package.json").write_text("{}", encoding="utf-8")
+    assert write_files(app, FILES).written == 2
+
+def test_paths_outside_the_output_directory_are_rejected(tmp_path):
+    app = tmp_path / "apps" / "nextjs_app"
+    victim = tmp_path / "victim.txt"
+    files = dict(FILES, **{"../../victim.txt": "pwned", "/tmp/abs.txt": "x", "./pages/about.tsx": "about"})
+    report = write_files(app, files)
+    assert not victim.exists() and report.written == 4
+    assert sorted(report.rejected) == ["../../victim.txt", "/tmp/abs.txt"]
+    assert (app / "pages" / "about.tsx").exists() and "pages/about.tsx" in load_manifest(app)
+
+    # A tampered manifest can't make the next run delete files outside the app either
+    victim.write_text("keep")
+    manifest = load_manifest(app)
+    manifest["../../victim.txt"] = "0" * 64
+    manifest_path(app).write_text(json.dumps(manifest))
+    assert write_files(app, FILES).removed == 1 and victim.read_text() == "keep"
+
+def test_streaming_writer_rejects_escaping_paths(tmp_path):
+    writer = StreamingFileWriter(tmp_path / "app")
+    writer.feed(json.dumps({"../escape.txt": "x", "pages/index.tsx": "y"}))
+    assert writer.paths == ["pages/index.tsx"] and writer.report.rejected == ["../escape.txt"]
+    assert not (tmp_path / "escape.txt").exists()
@@ -0,0 +1,51 @@
+"""
+Tests for JSON extraction and truncation repair.
+"""
+import json
+
+import pytest
+
+from utils.engineer_output import extract_json_object, scan_json_object
+
+FILES = {
+    "package.json": '{"name": "demo"}',
+    "pages/index.tsx": "export default function Home() {\n  return <main>{'hi'}</main>\n}\n",
+    "styles/globals.css": "body { margin: 0 }\n",
+}
+
+def test_complete_object_with_prose_and_fences():
+    raw = json.dumps(FILES)
+    assert extract_json_object(raw) == FILES
+    assert extract_json_object(f"Sure! Use {{braces}} wisely.\n{raw}\nDone }}") == FILES
+    fenced = scan_json_object(f"```bash\nnpm i\n```\nHere:\n```json\n{json.dumps(FILES, indent=2)}\n```")
+    assert fenced.value == FILES and not fenced.repaired
+    assert extract_json_object('```json\n[{"path": "a.ts"}]\n```') == [{"path": "a.ts"}]
+
+def test_truncated_object_keeps_complete_entries():
+    raw = json.dumps(FILES)
+    cut = raw[:raw.index("body {")]
+    result = scan_json_object(cut)
+    assert result.truncated and result.dropped == ["styles/globals.css"]
+    assert result.value == {k: FILES[k] for k in ("package.json", "pages/index.tsx")}
+    assert "recovered 2 entries; dropped: styles/globals.css" in result.summary()
+
+def test_malformed_entry_is_dropped_and_parsing_resumes():
+    # Unescaped quotes inside one value, and a missing comma after another
+    raw = ('{"a.ts": "x", "b.ts": "say "hi" now", "c.ts": "y",\n'
+           ' "d.ts": "z" "e.ts": "w", "f.ts": "v"}')
+    result = scan_json_object(raw)
+    assert result.errors == 2 and not result.truncated
+    # e.ts is skipped while resuming after d.ts's missing comma
+    assert result.dropped == ["b.ts", "d.ts", "e.ts"]
+    assert result.value == {"a.ts": "x", "c.ts": "y", "f.ts": "v"}
+
+def test_every_entry_skipped_while_resuming_is_reported():
+    result = scan_json_object('{"a": "x" "b": "y", "c": "z"}')
+    assert result.value == {"c": "z"}
+    assert result.dropped == ["a", "b"]
+
+def test_no_object_raises():
+    with pytest.raises(ValueError, match="No JSON object"):
+        extract_json_object("I could not generate the app.")
+    with pytest.raises(ValueError):
+        extract_json_object("Use {placeholders} like {this}.")
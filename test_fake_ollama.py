@@ -0,0 +1,54 @@
+"""
+Tests for the fake Ollama server used by the offline benchmarks.
+"""
+import json
+import urllib.request
+
+from benchmarks.fake_ollama import FakeOllama, FakeOllamaConfig, pipeline_responses
+
+def _post(url, payload):
+    req = urllib.request.Request(url, data=json.dumps(payload).encode(), method="POST",
+                                 headers={"Content-Type": "application/json"})
+    with urllib.request.urlopen(req, timeout=10) as resp:
+        return [json.loads(line) for line in resp.read().splitlines() if line.strip()]
+
+def test_chat_streams_canned_response_with_usage():
+    config = FakeOllamaConfig(responses=[("hello", "world " * 50)], chunk_tokens=4)
+    with FakeOllama(config) as server:
+        chunks = _post(server.url + "/api/chat",
+                       {"model": "m", "messages": [{"role": "user", "content": "hello there"}]})
+    assert len(chunks) > 2 and chunks[-1]["done"]
+    assert "".join(c["message"]["content"] for c in chunks) == "world " * 50
+    assert chunks[-1]["eval_count"] == len("world " * 50) // 4
+    assert chunks[-1]["prompt_eval_count"] > 0
+
+def test_model_swaps_are_counted():
+    with FakeOllama(FakeOllamaConfig(max_loaded=1)) as server:
+        for model in ["a", "a", "b", "a"]:
+            _post(server.url + "/api/generate", {"model": model, "prompt": "", "stream": False})
+        assert server.loads == 3 and server.loaded == ["a"]
+
+def test_malformed_engineer_output_is_truncated():
+    good = dict(pipeline_responses(5000))["Next.js"]
+    bad = dict(pipeline_responses(5000, malformed=True))["Next.js"]
+    assert good.startswith(bad) and len(bad) < len(good)
+
+def test_prefix_cache_reuses_shared_prompt_prefix():
+    from main import task_prompts
+
+    config = FakeOllamaConfig(responses=[], cache_slots=2, max_loaded=1)
+    with FakeOllama(config) as server:
+        def prefilled(model, layout, idea):
+            messages = [{"role": "system", "content": "You are an engineer. " * 50},
+                        {"role": "user", "content": task_prompts(idea, layout)["engineer"]}]
+            return _post(server.url + "/api/chat", {"model": model, "messages": messages})[-1]["prompt_eval_count"]
+
+        first = prefilled("m", "prefix", "A recipe sharing app")
+        # Only the idea at the end is new
+        assert prefilled("m", "prefix", "A chess club scheduler") < 20 < first
+        # With the idea near the top, the instructions after it are prefilled again
+        prefilled("m", "legacy", "A recipe sharing app")
+        assert prefilled("m", "legacy", "A chess club scheduler") > 150
+        # Loading another model evicts this one and its cache
+        prefilled("other", "prefix", "A recipe sharing app")
+        assert prefilled("m", "prefix", "A recipe sharing app") == first
@@ -0,0 +1,87 @@
+"""
+Tests for the structured hand-off between phases.
+"""
+import json
+
+import pytest
+
+from utils import tracing
+from utils.handoff import parse_research, research_handoff, review_handoff
+
+SPEC = {
+    "pain_points": ["Hard to find games", "No-shows", "Skill mismatch"],
+    "competitors": ["A - https://a.example", "B - https://b.example", "C - https://c.example"],
+    "requirements": ["Map of nearby games", "RSVP with reminders", "Skill tags"],
+}
+
+MARKDOWN = """Here is what I found.
+
+## Pain Points
+- Hard to find games
+- No-shows
+- Skill mismatch
+
+**Competitors:**
+1. A - https://a.example
+2. B - https://b.example
+3. C - https://c.example
+4. D - https://d.example
+
+### Actionable spec
+- Map of nearby games
+- RSVP with reminders
+- Skill tags
+
+Long discussion follows. """ + "Lorem ipsum dolor sit amet. " * 200
+
+@pytest.fixture(autouse=True)
+def no_trace():
+    tracing.set_trace_path(None)
+
+def test_valid_json_passes_through_unrepaired():
+    spec, repaired = parse_research("```json\n" + json.dumps(SPEC) + "\n```")
+    assert spec.model_dump() == SPEC and not repaired
+
+def test_markdown_and_overlong_lists_are_repaired():
+    spec, repaired = parse_research(MARKDOWN)
+    assert repaired and spec.model_dump() == SPEC  # fourth competitor dropped
+    too_many = dict(SPEC, pain_points=SPEC["pain_points"] * 3)
+    assert len(parse_research(json.dumps(too_many))[0].pain_points) == 5
+
+def test_react_prefix_is_ignored():
+    from benchmarks.fake_ollama import pipeline_responses
+
+    (research,) = [reply for pattern, reply in pipeline_responses(1000) if pattern == "Research"]
+    assert research.startswith("Thought:")
+    spec, _ = parse_research(research)
+    assert spec.pain_points == ["Hard to find games", "No-shows", "Skill mismatch"]
+    assert len(spec.competitors) == 3 and spec.requirements[0] == "Map of nearby games"
+
+def test_handoff_compacts_and_reports_tokens():
+    handoff = research_handoff(MARKDOWN, max_tokens=600)
+    assert json.loads(handoff.text) == SPEC
+    assert handoff.tokens_after < handoff.tokens_before / 10
+    assert "->" in handoff.summary()
+
+def test_budget_trims_long_items():
+    long_spec = dict(SPEC, requirements=["requirement " * 100] * 5)
+    handoff = research_handoff(json.dumps(long_spec), max_tokens=150)
+    assert handoff.tokens_after <= 150
+    assert len(handoff.value.requirements) >= 3
+
+def test_reasks_once_then_gives_up():
+    calls = []
+
+    def reask(prompt):
+        calls.append(prompt)
+        return json.dumps(SPEC)
+    handoff = research_handoff("I could not find anything useful.", 600, reask)
+    assert handoff.reasked and len(calls) == 1 and "pain_points" in calls[0]
+
+    with pytest.raises(ValueError):
+        research_handoff("nothing", 600, lambda prompt: "still nothing")
+
+def test_review_handoff_accepts_plain_text():
+    assert json.loads(review_handoff("PASS", 100).text) == {"status": "PASS", "diffs": []}
+    handoff = review_handoff('{"status": "ISSUES", "diffs": ["a.ts: fix"]}', 100)
+    assert handoff.value.diffs == ["a.ts: fix"] and not handoff.repaired
@@ -0,0 +1,117 @@
+"""
+Tests for latency-aware routing across several (fake) Ollama hosts.
+"""
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from ollama import ResponseError
+
+from benchmarks.fake_ollama import FakeOllama, FakeOllamaConfig
+from utils import tracing
+from utils.host_router import HostRouter, HostSpec, parse_hosts
+
+MESSAGES = [{"role": "user", "content": "hello"}]
+
+@pytest.fixture(autouse=True)
+def no_trace():
+    tracing.set_trace_path(None)
+
+def chat(router, model="m", stream=False):
+    client = router.client(model)
+    if stream:
+        return list(client.chat(model=model, messages=MESSAGES, stream=True))[-1]
+    return client.chat(model=model, messages=MESSAGES)
+
+def test_parse_hosts():
+    hosts = parse_hosts("http://a:11434=llama3.1:8b,qwen2.5-coder:7b; http://b:11434/")
+    assert hosts == [HostSpec("http://a:11434", {"llama3.1:8b", "qwen2.5-coder:7b"}), HostSpec("http://b:11434")]
+
+def test_prefers_faster_host_and_spreads_load():
+    with FakeOllama(FakeOllamaConfig(latency=0.01)) as fast, FakeOllama(FakeOllamaConfig(latency=0.15)) as slow:
+        router = HostRouter([HostSpec(slow.url), HostSpec(fast.url)])
+        for i in range(8):
+            chat(router, stream=i % 2 == 0)
+        assert [d.host for d in router.decisions][-4:] == [fast.url] * 4
+        assert router.snapshot()[1]["models"]["m"]["tps"]
+
+        # With the fast host busy, queued work goes to the slow one too
+        with ThreadPoolExecutor(8) as pool:
+            list(pool.map(lambda _: chat(router), range(16)))
+        assert len(slow.requests) > 1
+        assert all(h["in_flight"] == 0 for h in router.snapshot())
+
+def test_failing_host_backs_off_and_is_probed_again():
+    now = [0.0]
+    with FakeOllama(FakeOllamaConfig(fail_status=500)) as bad, FakeOllama() as good:
+        router = HostRouter([HostSpec(bad.url), HostSpec(good.url)], backoff=5, clock=lambda: now[0])
+        # The first call fails over to the good host; later ones skip the bad host
+        for _ in range(3):
+            assert chat(router).message.content
+        assert len(bad.requests) == 1 and router.snapshot()[0]["backoff_s"] == 5
+
+        now[0] = 6.0
+        chat(router)
+        assert len(bad.requests) == 2
+        assert router.snapshot()[0]["backoff_s"] == 10  # doubled after the failed probe
+        assert "backing off" in router.stats()
+
+        bad.config.fail_status = 0
+        now[0] = 20.0
+        chat(router)
+        assert len(bad.requests) == 3 and router.snapshot()[0]["backoff_s"] == 0
+
+def test_routes_by_advertised_models():
+    with FakeOllama(FakeOllamaConfig(models=["coder"])) as a, FakeOllama(FakeOllamaConfig(models=["writer"])) as b:
+        router = HostRouter([HostSpec(a.url, {"coder"}), HostSpec(b.url)])
+        chat(router, "coder")
+        chat(router, "writer")
+        assert {r["model"] for r in a.requests} == {"coder"} and {r["model"] for r in b.requests} == {"writer"}
+        with pytest.raises(LookupError):
+            HostRouter([HostSpec(a.url, {"coder"})]).client("writer").chat(model="writer", messages=MESSAGES)
+        # A host that lacks the model answers 404, which rules it out without counting as a failure
+        now = [0.0]
+        solo = HostRouter([HostSpec(a.url)], recheck=60, clock=lambda: now[0])
+        with pytest.raises(ResponseError):
+            solo.client("writer").chat(model="writer", messages=MESSAGES)
+        assert not solo.hosts[0].serves("writer", now[0]) and solo.hosts[0].failures == 0
+        with pytest.raises(LookupError):
+            chat(solo, "writer")
+        # The 404 is about the model in the request, not the one the client was made for
+        assert chat(solo, "coder").message.content and solo.hosts[0].serves("coder", now[0])
+        # Models get pulled: after `recheck` seconds the host is asked again
+        a.config.models.append("writer")
+        now[0] = 61.0
+        assert chat(solo, "writer").message.content and a.requests[-1]["model"] == "writer"
+
+def test_calls_stick_to_the_host_holding_their_prompt_prefix():
+    router = HostRouter([HostSpec("http://a"), HostSpec("http://b")])
+
+    def done(host, seconds):
+        router.release(host, "m", seconds, {"eval_count": 100, "eval_duration": 5e8,
+                                            "prompt_eval_duration": 4e8})
+
+    done(router.acquire("m", prefix="A"), 1.0)
+    done(router.acquire("m"), 0.9)
+    # b is faster, but a still holds prefix A, which saves about its prefill time
+    assert router.acquire("m", prefix="A").url == "http://a"
+    assert router.acquire("m", prefix="B").url == "http://b"
+    assert router.snapshot()[0]["models"]["m"]["prefill"] == 0.4
+
+def test_agent_calls_are_routed(monkeypatch, tmp_path):
+    from agents import llm
+    from config import get_model_for_task
+    from utils import llm_cache, model_pool
+    from utils.llm_cache import ResponseCache
+    from utils.model_pool import ModelPool
+
+    coder, writer = get_model_for_task("engineer"), get_model_for_task("research")
+    with FakeOllama(FakeOllamaConfig(models=[coder], default="OK")) as a, \
+            FakeOllama(FakeOllamaConfig(models=[writer], default="OK")) as b:
+        router = HostRouter([HostSpec(a.url, {coder}), HostSpec(b.url)])
+        monkeypatch.setattr(model_pool, "_shared", ModelPool(a.url, router=router))
+        monkeypatch.setattr(llm_cache, "_shared", ResponseCache(str(tmp_path / "cache.db"), 1 << 20, "off"))
+        for task in ("research", "engineer", "marketing"):
+            assert llm.build_agent_llm(task, 0.2).call("Write the spec") == "OK"
+    assert [r["model"] for r in a.requests] == [coder]
+    assert [r["model"] for r in b.requests] == [writer, writer]
+    assert sum(host["requests"] for host in router.snapshot()) == 3
@@ -0,0 +1,11 @@
+"""
+Guards against heavy imports and filesystem side effects at CLI startup.
+"""
+from benchmarks.bench_import import COMMANDS, import_cost
+
+def test_help_does_not_import_heavy_dependencies_or_create_directories(tmp_path):
+    cost = import_cost(COMMANDS["main --help"], cwd=str(tmp_path))
+    assert cost["heavy"] == []
+    # Generous bound: the full crewai import chain alone takes several seconds
+    assert cost["total_ms"] < 1500
+    assert list(tmp_path.iterdir()) == []
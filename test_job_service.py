@@ -0,0 +1,77 @@
+"""
+Tests for the job service and its SQLite-backed job store (stubbed pipeline).
+"""
+import asyncio
+import json
+
+from schemas import JobRequest
+from service.jobstore import JobStore
+from service.loadtest import _Client, stub_pipeline
+from service.server import JobService, run_pipeline
+
+IDEA = "A web app that helps people find local pickup basketball games"
+
+def test_store_batches_updates_and_reloads(tmp_path):
+    db = str(tmp_path / "app.db")
+    store = JobStore(db, flush_interval=10)
+    job_id = store.create(JobRequest(idea=IDEA))
+    for progress in range(0, 101, 10):
+        store.set_phase(job_id, "engineer", float(progress))
+    assert json.loads(store.get_json(job_id))["phase"] == {"name": "engineer", "progress": 100.0}
+    assert store.flush() == 1  # eleven updates, one row write
+    store.close()
+
+    reopened = JobStore(db)
+    status = reopened.get(job_id)
+    assert status.status == "running" and status.phase.progress == 100.0
+    assert [j for j, _ in reopened.unfinished()] == [job_id]
+    reopened.close()
+
+def test_submit_poll_and_complete(tmp_path):
+    async def scenario():
+        store = JobStore(str(tmp_path / "app.db"))
+        service = JobService(store, stub_pipeline(0.01), concurrency=2)
+        host, port = await service.start("127.0.0.1", 0)
+        client = _Client(host, port)
+        try:
+            code, body = await client.request("POST", "/run", json.dumps({"idea": IDEA}).encode())
+            assert code == 202
+            job_id = json.loads(body)["job_id"]
+
+            code, _ = await client.request("POST", "/run", b'{"idea": "short"}')
+            assert code == 422
+            code, _ = await client.request("GET", "/jobs/nope")
+            assert code == 404
+
+            await asyncio.wait_for(service.queue.join(), 5)
+            code, body = await client.request("GET", f"/jobs/{job_id}")
+            status = json.loads(body)
+            assert code == 200 and status["status"] == "succeeded"
+            assert status["artifact_links"]
+        finally:
+            client.close()
+            await service.stop()
+            store.close()
+
+    asyncio.run(scenario())
+
+def test_pipeline_scopes_checkpoints_and_reports_the_next_pending_phase(tmp_path, monkeypatch):
+    import main
+
+    calls, reports = [], []
+    events = [("research", "start"), ("research", "done"), ("engineer", "start"), ("marketing", "start"),
+              ("marketing", "done"), ("engineer", "done"), ("critic", "start"), ("critic", "done")]
+
+    def fake_run(idea, out_dir, on_phase, resume, checkpoint_scope):
+        calls.append((resume, checkpoint_scope))
+        for name, event in events:
+            on_phase(name, event)
+        out_dir.mkdir(parents=True)
+        (out_dir / "research.md").write_text("# Research")
+
+    monkeypatch.setattr(main, "ART", tmp_path)
+    monkeypatch.setattr(main, "run", fake_run)
+    links = run_pipeline("job-1", JobRequest(idea=IDEA), lambda phase, progress: reports.append(phase))
+    assert calls == [(True, "job-1")] and links == [str(tmp_path / "jobs" / "job-1" / "research.md")]
+    # A finished phase is never reported as the one to resume at
+    assert reports == ["research", "engineer", "engineer", "engineer", "engineer", "critic", "critic", "critic"]
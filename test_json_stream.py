@@ -0,0 +1,73 @@
+"""
+Tests for the incremental engineer-output parser and streaming file writer.
+"""
+import json
+
+import pytest
+
+from utils.engineer_output import StreamingFileWriter
+from utils.json_stream import JsonObjectStream
+
+FILES = {
+    "package.json": {"name": "demo", "scripts": {"dev": "next dev"}},
+    "pages/index.tsx": "import React from 'react'\n\nexport default () => <div>\"hi\" \\o/</div>\n",
+    "tsconfig.json": "{\"compilerOptions\": {\"strict\": true}}",
+    "notes.txt": "unicode \u00e9 \u2603 and braces { [ } ]",
+    "count": 3,
+}
+
+def _chunks(text, size):
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+@pytest.mark.parametrize("size", [1, 2, 7, 64, 100000])
+def test_stream_emits_every_entry_for_any_chunking(size):
+    raw = "Here you go:\n```json\n" + json.dumps(FILES, indent=2) + "\n```\nDone."
+    stream = JsonObjectStream()
+    got = []
+    for chunk in _chunks(raw, size):
+        got.extend(stream.feed(chunk))
+    assert stream.done
+    assert dict(got) == FILES
+
+def test_stream_emits_entries_before_object_closes():
+    stream = JsonObjectStream()
+    assert stream.feed('{"a.txt": "one", "b.txt": "tw') == [("a.txt", "one")]
+    assert stream.pending_key == "b.txt"
+    assert stream.feed('o"}') == [("b.txt", "two")]
+
+def test_stream_accepts_raw_newlines_in_strings():
+    stream = JsonObjectStream()
+    assert stream.feed('{"a.py": "x = 1\ny = 2"}') == [("a.py", "x = 1\ny = 2")]
+
+def test_stream_rejects_garbage_after_open_brace():
+    with pytest.raises(ValueError):
+        JsonObjectStream().feed('{"a" 1}')
+
+def test_writer_writes_files_as_they_close(tmp_path):
+    writer = StreamingFileWriter(tmp_path)
+    raw = json.dumps(FILES)
+    half = raw.index('"tsconfig.json"')
+    writer.feed(raw[:half])
+    assert (tmp_path / "pages" / "index.tsx").read_text(encoding="utf-8") == FILES["pages/index.tsx"]
+    assert not (tmp_path / "tsconfig.json").exists()
+    writer.feed(raw[half:])
+    assert writer.complete and writer.count == len(FILES)
+    assert json.loads((tmp_path / "package.json").read_text(encoding="utf-8")) == FILES["package.json"]
+
+def test_writer_records_error_and_stops(tmp_path):
+    writer = StreamingFileWriter(tmp_path)
+    writer.feed('{"a.txt": "ok", oops')
+    assert writer.error and writer.count == 1
+    assert writer.feed('"b.txt": "x"}') == 0
+    writer.reset()
+    assert writer.error is None
+
+def test_writer_skips_unchanged_files_on_rerun(tmp_path):
+    raw = json.dumps(FILES)
+    first = StreamingFileWriter(tmp_path)
+    first.feed(raw)
+    assert first.finish().written == len(FILES)
+
+    second = StreamingFileWriter(tmp_path)
+    second.feed(raw)
+    assert (second.finish().written, second.report.skipped) == (0, len(FILES))
@@ -0,0 +1,147 @@
+"""
+Tests for agent LLM construction against the fake Ollama server.
+"""
+import json
+import re
+from contextlib import contextmanager
+from types import SimpleNamespace
+
+import pytest
+
+from agents import llm
+from benchmarks.fake_ollama import RESEARCH, FakeOllama, FakeOllamaConfig, pipeline_responses
+from config import get_model_for_task
+from utils import llm_cache, model_pool, tracing
+from utils.llm_cache import ResponseCache
+from utils.model_pool import ModelPool
+
+MODELS = sorted({get_model_for_task(task) for task in ("research", "engineer", "critic", "marketing")})
+
+@contextmanager
+def serve(monkeypatch, tmp_path, config, cache="off"):
+    """Run the fake server and point the model pool and response cache (in `cache` mode) at it."""
+    tracing.set_trace_path(None)
+    with FakeOllama(config) as server:
+        monkeypatch.setattr(model_pool, "_shared", ModelPool(server.url))
+        monkeypatch.setattr(llm_cache, "_shared", ResponseCache(str(tmp_path / "cache.db"), 1 << 20, cache))
+        yield server
+
+@pytest.fixture
+def ollama(monkeypatch, tmp_path):
+    """Fake server that, like a real one, only knows the configured model names."""
+    config = FakeOllamaConfig(responses=[], default='{"status": "PASS", "diffs": []}', models=MODELS)
+    with serve(monkeypatch, tmp_path, config) as server:
+        yield server
+
+def test_direct_calls_use_the_plain_model_name(ollama):
+    from agents.critic import critic_reviewer
+
+    assert critic_reviewer()("Review this chunk") == '{"status": "PASS", "diffs": []}'
+    assert [r["model"] for r in ollama.requests] == [get_model_for_task("critic")]
+    # Direct calls go through the pool's shared transport
+    assert llm.build_llm("critic", 0.2).sync_client_kwargs["transport"] is model_pool.get_model_pool().transport()
+
+def test_agents_get_a_crewai_llm_for_ollama():
+    from agents.critic import critic_agent
+
+    agent = critic_agent()
+    assert agent.llm.model.removeprefix("ollama/") == get_model_for_task("critic")
+
+def test_staged_engineer_runs_on_a_server_with_only_the_engineer_model(monkeypatch, tmp_path):
+    from main import staged_engineer_phase
+
+    manifest = {"files": [{"path": "package.json", "purpose": "deps"},
+                          {"path": "pages/index.tsx", "purpose": "home"}]}
+
+    def files(prompt):
+        keys = json.loads("[" + re.search(r"exactly these keys: (.*)\. Values", prompt).group(1) + "]")
+        return json.dumps({key: f"// {key}" for key in keys})
+
+    config = FakeOllamaConfig(responses=[("compact manifest", json.dumps(manifest)), ("exactly these keys", files)],
+                              models=[get_model_for_task("engineer")])
+    with serve(monkeypatch, tmp_path, config) as server:
+        output = staged_engineer_phase()(SimpleNamespace(description="Build a pickup games app"), {})
+    assert json.loads(output.raw) == {"package.json": "// package.json", "pages/index.tsx": "// pages/index.tsx"}
+    assert {r["model"] for r in server.requests} == {get_model_for_task("engineer")}
+
+def test_streaming_engineer_agent_writes_files_as_they_arrive(monkeypatch, tmp_path):
+    from crewai import Task
+    from crewai.events import crewai_event_bus
+    from crewai.events.types.llm_events import LLMStreamChunkEvent
+
+    from agents.engineer import engineer_agent, stream_files
+    from benchmarks.fake_ollama import react_answer
+    from utils.engineer_output import StreamingFileWriter
+
+    files = {"package.json": "{}", "pages/index.tsx": "export default () => null\n"}
+    config = FakeOllamaConfig(responses=[], default=react_answer(json.dumps(files)), chunk_tokens=2)
+    writer = StreamingFileWriter(tmp_path / "app")
+    with serve(monkeypatch, tmp_path, config) as server:
+        agent = engineer_agent(stream=True)
+        with stream_files(agent, writer):
+            agent.execute_task(Task(description="Build a pickup games app", expected_output="JSON", agent=agent))
+    assert writer.complete and writer.count == 2
+    assert (tmp_path / "app" / "pages" / "index.tsx").read_text() == files["pages/index.tsx"]
+    assert [(r["path"], r["stream"]) for r in server.requests] == [("/api/chat", True)]
+    # Once the block exits, chunks no longer reach the writer
+    crewai_event_bus.emit(agent, LLMStreamChunkEvent(chunk="{", call_id="later", from_agent=agent))
+    assert writer.count == 2
+
+def test_a_repeated_idea_makes_no_llm_calls(monkeypatch, tmp_path):
+    import main
+
+    monkeypatch.chdir(tmp_path)
+    idea = "A web app that helps people find local pickup basketball games"
+    with serve(monkeypatch, tmp_path, FakeOllamaConfig(responses=pipeline_responses(20_000)), cache="on") as server:
+        first = main.run(idea, out_dir=tmp_path / "first", warm=False)
+        sent = len(server.requests)
+        second = main.run(idea, out_dir=tmp_path / "second", warm=False)
+    # Every agent and direct call of the second run is answered from the response cache
+    assert sent and len(server.requests) == sent
+    assert second["files"] == first["files"] > 0
+    # crewai keeps only the final answer of the canned ReAct reply
+    assert (tmp_path / "first" / "research.md").read_text(encoding="utf-8") == RESEARCH
+
+def run_traced(monkeypatch, tmp_path, config, router=None):
+    """Run the pipeline once against a fake server; returns its trace spans."""
+    import main
+
+    monkeypatch.chdir(tmp_path)
+    path = tmp_path / "trace.jsonl"
+    with serve(monkeypatch, tmp_path, config) as server:
+        if router is not None:
+            monkeypatch.setattr(model_pool, "_shared", ModelPool(server.url, router=router(server.url)))
+        tracing.set_trace_path(str(path))
+        try:
+            main.run("A web app that helps people find local pickup basketball games", out_dir=tmp_path / "out",
+                     warm=False)
+        finally:
+            tracing.set_trace_path(None)
+    return tracing.load_spans(str(path))
+
+def test_agent_phases_report_model_and_tokens_to_the_trace(monkeypatch, tmp_path):
+    trace = run_traced(monkeypatch, tmp_path, FakeOllamaConfig(responses=pipeline_responses(20_000)))
+    spans = {s["span"]: s for s in trace if s["span"] != "llm"}
+    calls = {s["phase"]: s for s in trace if s["span"] == "llm"}
+    for phase in ("research", "engineer", "marketing"):
+        assert spans[phase]["model"] == calls[phase]["model"] == get_model_for_task(phase)
+        assert spans[phase]["prompt_tokens"] > 0 and spans[phase]["completion_tokens"] > 0
+
+def test_agent_calls_measure_ttft_and_prefill(monkeypatch, tmp_path):
+    from utils.host_router import HostRouter, HostSpec
+
+    routers = []
+
+    def router(url):
+        routers.append(HostRouter([HostSpec(url)]))
+        return routers[-1]
+
+    config = FakeOllamaConfig(responses=pipeline_responses(20_000), prefill_tps=20_000)
+    trace = run_traced(monkeypatch, tmp_path, config, router)
+    calls = {s["phase"]: s for s in trace if s["span"] == "llm"}
+    # The phases whose prompts are laid out for prefix reuse report their prefill and first token
+    for phase in ("research", "engineer"):
+        assert calls[phase]["prefill_ms"] > 0 and calls[phase]["ttft_ms"] >= calls[phase]["prefill_ms"]
+    models = routers[0].snapshot()[0]["models"]
+    assert {get_model_for_task("research"), get_model_for_task("engineer")} <= set(models)
+    assert all(stats["prefill"] > 0 and stats["ttft"] > 0 for stats in models.values())
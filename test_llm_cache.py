@@ -0,0 +1,43 @@
+"""
+Tests for the persistent LLM response cache.
+"""
+from utils.llm_cache import ResponseCache, make_key
+
+def test_key_depends_on_model_prompt_and_params():
+    base = make_key("m", "prompt", "t=0.2")
+    assert base == make_key("m", "prompt", "t=0.2")
+    assert base != make_key("m2", "prompt", "t=0.2")
+    assert base != make_key("m", "prompt!", "t=0.2")
+    assert base != make_key("m", "prompt", "t=0.3")
+    assert make_key("ab", "c") != make_key("a", "bc")
+
+def test_round_trip_persists_across_instances(tmp_path):
+    path = str(tmp_path / "state" / "llm_cache.db")
+    cache = ResponseCache(path)
+    assert cache.get("k") is None
+    cache.put("k", "value")
+    assert cache.get("k") == "value"
+    assert (cache.hits, cache.misses) == (1, 1)
+    assert ResponseCache(path).get("k") == "value"
+
+def test_lru_eviction_keeps_recently_used(tmp_path):
+    cache = ResponseCache(str(tmp_path / "c.db"), max_bytes=25)
+    cache.put("a", "x" * 10)
+    cache.put("b", "y" * 10)
+    assert cache.get("a")  # touch a so b becomes least recently used
+    cache.put("c", "z" * 10)
+    assert cache.get("b") is None
+    assert cache.get("a") and cache.get("c")
+
+def test_off_and_refresh_modes(tmp_path):
+    path = str(tmp_path / "c.db")
+    ResponseCache(path).put("k", "old")
+
+    off = ResponseCache(path, mode="off")
+    assert off.get("k") is None
+    off.put("k", "ignored")
+
+    refresh = ResponseCache(path, mode="refresh")
+    assert refresh.get("k") is None
+    refresh.put("k", "new")
+    assert ResponseCache(path).get("k") == "new"
@@ -0,0 +1,73 @@
+"""
+Tests for the shared model pool and swap-aware phase scheduling.
+"""
+import pytest
+
+from benchmarks.fake_ollama import FakeOllama, FakeOllamaConfig
+from utils import tracing
+from utils.dag import run_dag
+from utils.model_pool import ModelPool
+
+MODELS = {"research": "llama", "engineer": "coder", "critic": "coder", "marketing": "llama"}
+
+def _pipeline(order):
+    step = lambda name: (lambda inputs: order.append(name))
+    return {
+        "research": (step("research"), []),
+        "engineer": (step("engineer"), ["research"]),
+        "critic": (step("critic"), ["engineer"]),
+        "marketing": (step("marketing"), ["research"]),
+    }
+
+@pytest.fixture(autouse=True)
+def no_trace():
+    tracing.set_trace_path(None)
+
+def test_scheduler_groups_phases_by_model():
+    pool = ModelPool("http://unused", max_loaded=1)
+    order = []
+
+    def listener(name, event):
+        if event == "start":
+            pool.note_loaded(MODELS[name])
+
+    run_dag(_pipeline(order), max_workers=2, priority=pool.priority(MODELS, list(MODELS)),
+            listener=listener, admit=pool.admit(MODELS))
+    # marketing reuses the loaded research model before switching to the coder once
+    assert order == ["research", "marketing", "engineer", "critic"]
+
+def test_unbounded_pool_admits_phases_on_any_model():
+    pool = ModelPool("http://unused")
+    assert pool.admit(MODELS)("engineer", {"marketing"})
+    assert not ModelPool("http://unused", max_loaded=1).admit(MODELS)("engineer", {"marketing"})
+
+def test_clients_are_shared_per_model():
+    pool = ModelPool("http://unused", client_factory=lambda host: object())
+    assert pool.client("a") is pool.client("a")
+    assert pool.client("a") is not pool.client("b")
+
+def test_warm_loads_only_what_fits_and_records_load_time():
+    with FakeOllama(FakeOllamaConfig(load_seconds=0.05, max_loaded=1)) as server:
+        pool = ModelPool(server.url, keep_alive="5m", max_loaded=1)
+        loaded = pool.warm(["coder", "llama", "coder"])
+        assert list(loaded) == ["coder"] and loaded["coder"] >= 0.05
+        assert pool.warm(["coder"]) == {}  # already resident per /api/ps
+        assert server.loads == 1 and pool.resident() == ["coder"]
+        assert pool.loads == 1
+
+def test_agent_calls_go_through_the_pool(monkeypatch, tmp_path):
+    from agents import llm
+    from config import get_model_for_task
+    from utils import llm_cache, model_pool
+    from utils.llm_cache import ResponseCache
+
+    with FakeOllama(FakeOllamaConfig(default="OK", load_seconds=0.05)) as server:
+        pool = ModelPool(server.url)
+        monkeypatch.setattr(model_pool, "_shared", pool)
+        monkeypatch.setattr(llm_cache, "_shared", ResponseCache(str(tmp_path / "cache.db"), 1 << 20, "off"))
+        agent_llm = llm.build_agent_llm("research", 0.2)
+        assert agent_llm.call("Write the spec") == "OK"
+        assert agent_llm._chat.sync_client_kwargs["transport"] is pool.transport()
+        # The load the agent's call paid for is in the pool's bookkeeping
+        assert pool.resident() == [get_model_for_task("research")]
+        assert pool.loads == 1 and pool.load_seconds >= 0.05
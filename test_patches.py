@@ -0,0 +1,102 @@
+"""
+Tests for diff parsing, fuzzy patch application and the repair loop.
+"""
+import json
+
+import pytest
+
+from utils import tracing
+from utils.patches import apply_patches, parse_diff
+from utils.repair import repair_files
+from utils.review import review_files
+
+CARD = "import React from 'react'\n\nexport default function Card({ title }) {\n  return <div>{title}</div>\n}\n"
+PACKAGE = json.dumps({"name": "app", "dependencies": {"next": "14", "react": "18"}})
+
+@pytest.fixture(autouse=True)
+def no_trace():
+    tracing.set_trace_path(None)
+
+def test_parses_loose_diffs():
+    fenced = ("Card should show a fallback title:\n```diff\ndiff --git a/components/Card.tsx b/components/Card.tsx\n"
+              "--- a/components/Card.tsx\n+++ b/components/Card.tsx\n@@ -3,3 +3,3 @@\n"
+              " export default function Card({ title }) {\n-  return <div>{title}</div>\n"
+              "+  return <div>{title ?? 'Untitled'}</div>\n }\n```\n"
+              "--- /dev/null\n+++ b/lib/format.ts\n@@ -0,0 +1 @@\n+export const upper = (s) => s.toUpperCase()\n")
+    card, new = parse_diff(fenced)
+    assert card.path == "components/Card.tsx" and card.hunks[0].start == 3 and len(card.hunks[0].before) == 3
+    assert new.path == "lib/format.ts" and new.new_file
+    # No headers: the path comes from the prose, and the hunk header has no numbers
+    (bare,) = parse_diff("In components/Card.tsx:\n@@ @@\n-  return <div>{title}</div>\n+  return null\n",
+                         ["components/Card.tsx", "components/Card.module.css"])
+    assert bare.path == "components/Card.tsx" and bare.hunks[0].start == 0
+    assert parse_diff("Add error handling to the fetch call.") == []
+
+def test_applies_with_offset_whitespace_and_fuzz():
+    drifted = "// generated\n// header\n" + CARD.replace("  return", "    return")
+    diff = ("--- a/components/Card.tsx\n+++ b/components/Card.tsx\n@@ -3,3 +3,3 @@\n"
+            " export default function Card({ title }) {\n-  return <div>{title}</div>\n+  return <h2>{title}</h2>\n }\n")
+    changed, (result,) = apply_patches({"components/Card.tsx": drifted}, parse_diff(diff))
+    assert result.applied == 1 and "return <h2>{title}</h2>" in changed["components/Card.tsx"]
+
+    # Context the model misremembered is trimmed away; re-applying is a no-op that still counts
+    wrong = "--- a/x.ts\n+++ b/x.ts\n@@ -1,3 +1,3 @@\n not a\n-b\n+B\n not c\n"
+    changed, (result,) = apply_patches({"x.ts": "a\nb\nc\n"}, parse_diff(wrong))
+    assert changed == {"x.ts": "a\nB\nc\n"} and result.applied == 1
+    changed, (result,) = apply_patches({"x.ts": "a\nB\nc\n"}, parse_diff(wrong))
+    assert changed == {} and result.applied == 1 and not result.failed
+
+    missing = "--- a/x.ts\n+++ b/x.ts\n@@ -1 +1 @@\n-nowhere\n+z\n"
+    changed, (result,) = apply_patches({"x.ts": "a\nb\n"}, parse_diff(missing))
+    assert changed == {} and result.failed == 1
+
+def test_common_lines_elsewhere_do_not_count_as_applied():
+    # `}` and `return null;` are in the file, but the lines they should replace are not
+    for after in ("}", "  return null;"):
+        diff = f"--- a/components/Card.tsx\n+++ b/components/Card.tsx\n@@ -2 +2 @@\n-  if (!title) {{\n+{after}\n"
+        changed, (result,) = apply_patches({"components/Card.tsx": CARD + "const Empty = () => {\n  return null;\n}\n"},
+                                           parse_diff(diff))
+        assert changed == {} and (result.applied, result.failed) == (0, 1)
+    # A real result far from where the hunk points isn't taken as applied either
+    far = "--- a/x.ts\n+++ b/x.ts\n@@ -1 +1 @@\n-const a = 1\n+const a = 2\n"
+    changed, (result,) = apply_patches({"x.ts": "\n" * 10 + "const a = 2\n"}, parse_diff(far))
+    assert result.failed == 1
+
+def test_repair_loop_patches_rereviews_touched_files_and_reports_tokens():
+    files = {"package.json": PACKAGE, "components/Card.tsx": CARD,
+             "pages/index.tsx": "import Card from '../components/Card'\nexport default () => <Card title='x' />\n"}
+    fix = ("--- a/components/Card.tsx\n+++ b/components/Card.tsx\n@@ -4 +4 @@\n"
+           "-  return <div>{title}</div>\n+  return <div>{title ?? 'Untitled'}</div>\n")
+    prompts = []
+
+    def reviewer(prompt):
+        prompts.append(prompt)
+        tracing.record_llm_call("critic", 0.01, prompt_tokens=100, completion_tokens=20, eval_seconds=0, cache=None)
+        if "Untitled" in prompt or "components/Card.tsx" not in prompt:
+            return '{"status": "PASS", "diffs": []}'
+        return json.dumps({"status": "ISSUES", "diffs": [fix]})
+
+    review = review_files(files, reviewer, max_tokens=60)
+    assert review.result.status == "ISSUES" and len(prompts) > 1
+    prompts.clear()
+
+    run = repair_files(files, review, reviewer, rounds=2, max_tokens=60)
+    assert run.changed == ["components/Card.tsx"] and run.review.status == "PASS"
+    assert "{title ?? 'Untitled'}" in run.files["components/Card.tsx"] and "Untitled" not in files["components/Card.tsx"]
+    # Only the patched file went back to the critic
+    assert len(prompts) == 1 and "pages/index.tsx" not in prompts[0]
+    (round1,) = run.rounds
+    assert round1.applied == 1 and round1.touched == ["components/Card.tsx"]
+    assert (round1.prompt_tokens, round1.completion_tokens) == (100, 20)
+    assert "re-review PASS (100 prompt + 20 completion tokens)" in run.summary()
+    assert "of the ~" in run.summary()
+
+def test_reverts_patch_that_breaks_the_gate():
+    # Deleting Card would break the page's import
+    files = {"package.json": PACKAGE, "components/Card.tsx": CARD,
+             "pages/index.tsx": "import Card from '../components/Card'\n"}
+    delete = "--- a/components/Card.tsx\n+++ /dev/null\n@@ -1 +0,0 @@\n-import React from 'react'\n"
+    run = repair_files(files, review_files(files, lambda p: json.dumps({"status": "ISSUES", "diffs": [delete]})),
+                       lambda p: '{"status": "PASS", "diffs": []}')
+    assert run.changed == [] and run.rounds[0].reverted == ["components/Card.tsx"]
+    assert run.files == files and run.review.status == "ISSUES"
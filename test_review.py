@@ -0,0 +1,75 @@
+"""
+Tests for the map-reduce critic review.
+"""
+import json
+import threading
+
+import pytest
+
+from schemas import ReviewResult
+from utils import tracing
+from utils.review import _attribute, chunk_files, estimate_tokens, merge_reviews, parse_review, review_files
+
+@pytest.fixture(autouse=True)
+def no_trace():
+    tracing.set_trace_path(None)
+
+def _project(n=12, size=400):
+    files = {}
+    for i in range(n):
+        files[f"components/Card{i}.tsx"] = f"export const Card{i} = () => null\n" + "x" * size
+        files[f"components/Card{i}.module.css"] = ".card {}\n" + "y" * (size // 4)
+    return files
+
+def test_chunks_respect_budget_and_keep_related_files_together():
+    files = _project()
+    chunks = chunk_files(files, max_tokens=400)
+    assert len(chunks) > 1
+    for chunk in chunks:
+        assert sum(estimate_tokens(c) for _, c in chunk) <= 400
+    owner = {label: i for i, chunk in enumerate(chunks) for label, _ in chunk}
+    assert all(owner[f"components/Card{i}.tsx"] == owner[f"components/Card{i}.module.css"] for i in range(12))
+    assert sorted(owner) == sorted(files)
+
+def test_oversized_file_is_split_into_parts():
+    chunks = chunk_files({"big.ts": "line of code\n" * 2000}, max_tokens=500)
+    labels = [label for chunk in chunks for label, _ in chunk]
+    assert len(labels) > 1 and labels[0].startswith("big.ts (part 1/")
+    assert "".join(c for chunk in chunks for _, c in chunk) == "line of code\n" * 2000
+
+def test_parse_and_merge():
+    assert parse_review('```json\n{"status": "ISSUES", "diffs": ["a.ts: fix"]}\n```').diffs == ["a.ts: fix"]
+    assert parse_review("PASS - looks good").status == "PASS"
+    assert parse_review("ISSUES FOUND\n- bad import").status == "ISSUES"
+    merged = merge_reviews([ReviewResult(status="PASS"), ReviewResult(status="ISSUES", diffs=["d", "d"])])
+    assert (merged.status, merged.diffs) == ("ISSUES", ["d"])
+
+def test_findings_go_to_the_file_they_name():
+    header = "--- a/pages/index.ts\n+++ b/pages/index.ts\n@@ -1 +1 @@\n-a\n+b\n"
+    result = ReviewResult(status="ISSUES", diffs=["In pages/index.tsx: add a key prop", header, "Add tests"])
+    per_file = _attribute(result, ["pages/index.ts", "pages/index.tsx", "index.ts"])
+    assert per_file["pages/index.tsx"].diffs == ["In pages/index.tsx: add a key prop", "Add tests"]
+    assert per_file["pages/index.ts"].diffs == [header, "Add tests"]
+    assert per_file["index.ts"].diffs == ["Add tests"]
+
+def test_chunks_reviewed_concurrently_and_rerun_only_reviews_changed_files(tmp_path):
+    files = _project()
+    seen, lock = [], threading.Lock()
+
+    def reviewer(prompt):
+        with lock:
+            seen.append(prompt)
+        if "Card3.tsx" in prompt:
+            return json.dumps({"status": "ISSUES", "diffs": ["components/Card3.tsx: handle null props"]})
+        return json.dumps({"status": "PASS", "diffs": []})
+
+    state = tmp_path / "app.review.json"
+    first = review_files(files, reviewer, max_tokens=400, max_workers=4, state_path=state)
+    assert first.result.status == "ISSUES" and first.result.diffs == ["components/Card3.tsx: handle null props"]
+    assert first.chunks == len(seen) > 1 and first.reviewed == len(files)
+
+    seen.clear()
+    files["components/Card7.tsx"] += "\n// changed"
+    second = review_files(files, reviewer, max_tokens=400, max_workers=4, state_path=state)
+    assert second.reviewed == 1 and second.reused == len(files) - 1 and len(seen) == 1
+    assert second.result.diffs == first.result.diffs  # Card3's unchanged finding is kept
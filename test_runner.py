@@ -0,0 +1,78 @@
+"""
+Tests for the quality-gate helpers in tools.runner.
+"""
+import time
+
+from tools.runner import check_files, run_tests, shutdown_pool
+
+FILES = {
+    "app/ok.py": "def f(x):\n    return x + 1\n",
+    "app/bad.py": "def f(:\n    pass\n",
+    "package.json": {"name": "demo"},
+    "broken.json": "{\"name\": ",
+    "pages/index.tsx": "export default () => null",
+}
+
+def test_check_files_reports_per_file_results():
+    results = check_files(FILES, parallel=False)
+    assert set(results) == {"app/ok.py", "app/bad.py", "package.json", "broken.json"}
+    assert results["app/ok.py"] == (True, "")
+    assert results["package.json"] == (True, "")
+    ok, err = results["app/bad.py"]
+    assert not ok and err.startswith("app/bad.py:1:")
+    assert not results["broken.json"][0]
+
+def test_deeply_nested_files_fail_on_their_own():
+    files = {"deep.py": "x = " + "-" * 200_000 + "1\n", "deep.json": "[" * 100_000 + "]" * 100_000,
+             "app/ok.py": "x = 1\n"}
+    results = check_files(files, parallel=False)
+    assert results["app/ok.py"] == (True, "")
+    assert not results["deep.py"][0] and "too deeply nested" in results["deep.py"][1]
+    assert not results["deep.json"][0]
+
+def test_pooled_check_matches_in_process():
+    files = {f"m{i}.py": ("x = (" if i % 3 == 0 else f"x = {i}\n") for i in range(12)}
+    files["deep.json"] = "[" * 100_000 + "]" * 100_000
+    try:
+        assert check_files(files, parallel=True) == check_files(files, parallel=False)
+    finally:
+        shutdown_pool()
+
+def make_project(tmp_path, tests):
+    (tmp_path / "tests").mkdir(parents=True)
+    (tmp_path / "app.py").write_text("def add(a, b):\n    return a + b\n", encoding="utf-8")
+    for name, body in tests.items():
+        (tmp_path / "tests" / name).write_text(
+            "import sys, os\nsys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))\n"
+            "from app import add\n" + body, encoding="utf-8")
+    return tmp_path
+
+def test_sharded_run_merges_junit_results_and_caches(tmp_path):
+    project = make_project(tmp_path / "proj", {
+        "test_a.py": "def test_ok():\n    assert add(1, 2) == 3\n",
+        "test_b.py": "def test_bad():\n    assert add(1, 2) == 4\n\ndef test_ok2():\n    pass\n",
+    })
+    run = run_tests(str(project), shards=2, cache_dir=str(tmp_path / "cache"))
+    assert len(run.shards) == 2 and not run.cached
+    assert (run.count("passed"), run.count("failed")) == (2, 1)
+    assert not run.ok and "FAILED tests/test_b.py::test_bad" in run.summary()
+
+    again = run_tests(str(project), shards=2, cache_dir=str(tmp_path / "cache"))
+    assert again.cached and again.count("failed") == 1
+    (project / "app.py").write_text("def add(a, b):\n    return 4\n", encoding="utf-8")
+    changed = run_tests(str(project), shards=2, cache_dir=str(tmp_path / "cache"))
+    assert not changed.cached and changed.count("failed") == 1 and changed.count("passed") == 2
+
+def test_hanging_shard_is_killed(tmp_path):
+    project = make_project(tmp_path, {
+        "test_fast.py": "def test_ok():\n    assert add(2, 2) == 4\n",
+        "test_hang.py": "import subprocess, time\n\ndef test_hang():\n"
+                        "    subprocess.Popen([sys.executable, '-c', 'import time; time.sleep(60)'])\n"
+                        "    time.sleep(60)\n",
+    })
+    started = time.perf_counter()
+    run = run_tests(str(project), shards=2, shard_timeout=10)
+    assert time.perf_counter() - started < 30
+    assert run.timed_out == ["tests/test_hang.py"] and run.count("passed") == 1
+    assert not run.ok
+    assert run_tests(str(tmp_path / "missing")) is None
@@ -0,0 +1,91 @@
+"""
+Tests for the web search cache, run against a local fake DDGS (no network).
+"""
+import threading
+import time
+
+from tools.search_cache import CachedSearch, DDGSBackend, SearchCache, normalize_query, normalize_url, search_many
+
+class FakeDDGS:
+    """Stand-in for ddgs.DDGS that counts calls and can be slowed down."""
+    calls = 0
+    delay = 0.0
+    lock = threading.Lock()
+
+    def text(self, query, max_results=5):
+        with FakeDDGS.lock:
+            FakeDDGS.calls += 1
+        time.sleep(FakeDDGS.delay)
+        return [{"title": f"{query} #{i}", "href": f"https://example.com/{i}"} for i in range(max_results)]
+
+def _searcher(tmp_path, **kwargs):
+    FakeDDGS.calls, FakeDDGS.delay = 0, 0.0
+    return CachedSearch(DDGSBackend(FakeDDGS), SearchCache(str(tmp_path / "app.db"), **kwargs))
+
+def test_normalized_queries_share_cache_entry(tmp_path):
+    search = _searcher(tmp_path)
+    first = search.search("Pickup  Basketball apps", 3)
+    assert search.search("  pickup basketball APPS ", 3) == first
+    assert FakeDDGS.calls == 1
+    search.search("pickup basketball apps", 4)  # max_results is part of the key
+    assert FakeDDGS.calls == 2
+    assert normalize_query(" A\tB  c ") == "a b c"
+
+def test_cache_survives_new_instance_and_expires(tmp_path):
+    _searcher(tmp_path, ttl=60).search("q", 2)
+    fresh = CachedSearch(DDGSBackend(FakeDDGS), SearchCache(str(tmp_path / "app.db"), ttl=60))
+    fresh.search("q", 2)
+    assert FakeDDGS.calls == 1
+
+    expired = _searcher(tmp_path, ttl=-1)
+    expired.search("other", 2)
+    expired.search("other", 2)
+    assert FakeDDGS.calls == 2
+
+def test_max_entries_drops_oldest(tmp_path):
+    cache = SearchCache(str(tmp_path / "app.db"), max_entries=2)
+    for q in ("a", "b", "c"):
+        cache.put(q, 1, [{"title": q}])
+        time.sleep(0.01)
+    assert cache.get("a", 1) is None
+    assert cache.get("c", 1) == [{"title": "c"}]
+
+def test_concurrent_identical_queries_are_coalesced(tmp_path):
+    search = _searcher(tmp_path)
+    FakeDDGS.delay = 0.2
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(search.search("same", 3))) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert FakeDDGS.calls == 1
+    assert len(results) == 8 and all(r == results[0] for r in results)
+
+class TopicDDGS:
+    """Backend whose results overlap across queries; 'slow' queries hang past the timeout."""
+
+    def text(self, query, max_results=5):
+        if "slow" in query:
+            time.sleep(1.0)
+        shared = ["https://www.rival.com/?utm_source=ddg", "http://rival.com", "https://news.example/item#top"]
+        urls = shared + [f"https://example.com/{query.replace(' ', '-')}/{i}" for i in range(max_results)]
+        return [{"title": f"{query} {i}", "href": url} for i, url in enumerate(urls[:max_results])]
+
+def test_search_many_runs_concurrently_and_dedupes_urls(tmp_path):
+    search = CachedSearch(DDGSBackend(TopicDDGS), SearchCache(str(tmp_path / "app.db")))
+    start = time.monotonic()
+    batch = search_many(search, ["competitors", "pain points", "Pain  Points", "slow pricing"], 4,
+                        workers=3, timeout=0.3)
+    assert time.monotonic() - start < 0.9
+    assert batch.queries == ["competitors", "pain points", "slow pricing"]
+    assert batch.timed_out == ["slow pricing"] and batch.statuses == {"miss": 2}
+    urls = [r.url for r in batch.results]
+    # rival.com with and without www/tracking/scheme is one result, as is the fragment variant
+    assert urls[:2] == ["https://www.rival.com/?utm_source=ddg", "https://news.example/item#top"]
+    assert len(urls) == 4 and batch.duplicates == 4
+    assert batch.results[0].queries == [0, 1]
+    text = batch.format()
+    assert text.startswith("Queries: q1=competitors; q2=pain points; q3=slow pricing")
+    assert "[q1,q2]" in text and "(q3 timed out)" in text
+    assert normalize_url("HTTP://WWW.Rival.com:443/a/?b=1&utm_medium=x&a=2") == "https://rival.com/a?a=2&b=1"
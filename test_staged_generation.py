@@ -0,0 +1,71 @@
+"""
+Tests for two-stage (manifest, then parallel files) engineer generation.
+"""
+import json
+import re
+import time
+
+import pytest
+
+from utils import tracing
+from utils.staged_generation import generate_staged, group_specs, parse_files, parse_manifest
+
+MANIFEST = {"files": [
+    {"path": "package.json", "purpose": "deps", "exports": []},
+    {"path": "components/Card.tsx", "purpose": "card", "exports": ["Card", "interface CardProps"]},
+    {"path": "components/Card.module.css", "purpose": "card styles"},
+    {"path": "pages/index.tsx", "purpose": "home"},
+    {"path": "pages/about.tsx", "purpose": "about"},
+    {"path": "lib/api.ts", "purpose": "fetch helpers", "exports": ["getGames(): Promise<Game[]>"]},
+]}
+
+@pytest.fixture(autouse=True)
+def no_trace():
+    tracing.set_trace_path(None)
+
+def _generator(delay=0.0, flaky=()):
+    calls = []
+
+    def generate(prompt):
+        calls.append(prompt)
+        if "compact manifest" in prompt:
+            return json.dumps(MANIFEST)
+        time.sleep(delay)
+        keys = json.loads("[" + re.search(r"exactly these keys: (.*)\. Values", prompt).group(1) + "]")
+        # Flaky files are dropped the first time they are requested in a group
+        return json.dumps({k: f"// {k}" for k in keys if k not in flaky or len(keys) == 1})
+    return generate, calls
+
+def test_manifest_formats_and_grouping():
+    specs = parse_manifest("Plan:\n" + json.dumps(MANIFEST))
+    assert [s.path for s in specs][:2] == ["package.json", "components/Card.tsx"]
+    assert parse_manifest('{"a.ts": "helpers", "../evil": "x"}')[0].path == "a.ts"
+    groups = group_specs(specs, group_size=2)
+    assert [s.path for s in groups[1]] == ["components/Card.tsx", "components/Card.module.css"]
+    with pytest.raises(ValueError):
+        parse_manifest('{"files": []}')
+
+def test_single_file_may_come_back_as_plain_code():
+    spec = parse_manifest('{"a.tsx": "x"}')
+    assert parse_files("```tsx\nexport default 1\n```", spec) == {"a.tsx": "export default 1"}
+
+def test_files_generated_concurrently():
+    generate, calls = _generator(delay=0.1)
+    start = time.perf_counter()
+    run = generate_staged("Build an app", generate, max_workers=5)
+    wall = time.perf_counter() - start
+    assert sorted(run.files) == sorted(f["path"] for f in MANIFEST["files"])
+    assert run.requests == len(calls) == 1 + 5  # manifest + 5 groups
+    assert wall < 0.35  # 5 groups x 0.1 s run side by side
+
+def test_missing_file_is_retried_alone():
+    generate, calls = _generator(flaky={"components/Card.module.css"})
+    run = generate_staged("Build an app", generate, max_workers=2, retries=1)
+    assert not run.failed and run.retries == 1
+    assert run.files["components/Card.module.css"] == "// components/Card.module.css"
+    alone = [c for c in calls if 'exactly these keys: "components/Card.module.css".' in c]
+    assert len(alone) == 1 and run.requests == len(calls) == 1 + 5 + 1
+
+    generate, _ = _generator(flaky={"components/Card.module.css"})
+    run = generate_staged("Build an app", generate, group_size=2, retries=0)
+    assert run.failed == ["components/Card.module.css"] and len(run.files) == 5
@@ -0,0 +1,114 @@
+"""
+Tests for the static gate between the engineer and the critic.
+"""
+import json
+
+import pytest
+
+from benchmarks.fake_ollama import synthetic_project
+from utils import tracing
+from utils.static_gate import check_project, gate_and_fix
+
+PACKAGE = json.dumps({"name": "app", "dependencies": {"next": "14", "react": "18", "clsx": "2"}})
+TSCONFIG = '{\n  // comments are fine here\n  "compilerOptions": {"baseUrl": ".", "paths": {"@/*": ["./src/*"]},},\n}'
+
+@pytest.fixture(autouse=True)
+def no_trace():
+    tracing.set_trace_path(None)
+
+def kinds(report):
+    return sorted((issue.path, issue.kind) for issue in report.issues)
+
+def test_resolves_relative_alias_and_package_imports():
+    files = {
+        "package.json": PACKAGE,
+        "tsconfig.json": TSCONFIG,
+        "pages/index.tsx": ("import React from 'react'\nimport Link from 'next/link'\nimport fs from 'node:fs'\n"
+                            "import { Card } from '@/components/Card'\nexport { api } from '../lib/api.js'\n"
+                            "import '../styles/globals.css'\nconst Chart = dynamic(() => import('@/components'))\n"
+                            "Array.from('abc')\n"),
+        "src/components/Card.tsx": "import clsx from 'clsx'\nexport const Card = () => null\n",
+        "src/components/index.ts": "export * from './Card'\n",
+        "lib/api.ts": "export const api = 1\n",
+        "styles/globals.css": "@import './fonts.css';\n@import url('https://fonts.example/x.css');\n",
+        "styles/fonts.css": "body {}\n",
+    }
+    report = check_project(files)
+    assert report.ok, report.issues
+    assert report.graph["pages/index.tsx"] == ["src/components/Card.tsx", "lib/api.ts", "styles/globals.css",
+                                               "src/components/index.ts"]
+    assert report.graph["styles/globals.css"] == ["styles/fonts.css"]
+
+def test_imports_in_comments_strings_and_jsx_text_are_ignored():
+    files = {
+        "package.json": PACKAGE,
+        "pages/index.tsx": ("import React from 'react'\n// import y from \"commented\"\n"
+                            "/* import old from 'legacy-lib'\n   require('left-pad') */\n"
+                            "const hint = \"import q from 'quoted'\"\nconst tpl = `import('templated')`\n"
+                            "export default function Home() {\n"
+                            "  return <p>Data comes from 'z', an API we don't import</p>\n}\n"),
+    }
+    report = check_project(files)
+    assert report.ok, report.issues
+    assert report.imports == 1
+
+def test_reports_mechanical_failures():
+    files = {
+        "package.json": '{"name": "app", "dependencies": {"next": "14", "react": "18"},}',
+        "tsconfig.json": '{"compilerOptions": {}}',
+        "next.config.js": {"reactStrictMode": True},
+        "tailwind.config.ts": '{"content": ["./pages/**/*.tsx"]}',
+        "pages/index.tsx": ("import Header from '../components/Header'\nimport Foo from 'components/Foo'\n"
+                            "import { x } from '@/lib/x'\n"),
+        "components/Empty.tsx": "  \n",
+    }
+    assert kinds(check_project(files)) == [
+        ("components/Empty.tsx", "empty"),
+        ("next.config.js", "config_as_json"),
+        ("package.json", "invalid_json"),
+        ("pages/index.tsx", "missing_import"),
+        ("pages/index.tsx", "missing_import"),
+        ("pages/index.tsx", "missing_import"),
+        ("tailwind.config.ts", "config_as_json"),
+    ]
+    # With a valid package.json, unlisted packages are caught too
+    files["package.json"] = PACKAGE
+    files["components/Empty.tsx"] = "import axios from 'axios'\nimport { z } from '@hookform/resolvers/zod'\n"
+    report = check_project(files, only=["components/Empty.tsx"])
+    assert report.checked == 1 and [i.message for i in report.issues] == [
+        "imports package 'axios' which is not in package.json",
+        "imports package '@hookform/resolvers' which is not in package.json",
+    ]
+
+def test_failures_go_back_to_the_engineer():
+    files = {"package.json": PACKAGE, "pages/index.tsx": "import Header from '../components/Header'\n"}
+    prompts = []
+
+    def engineer(prompt):
+        prompts.append(prompt)
+        return json.dumps({"components/Header.tsx": "export default function Header() { return null }\n"})
+
+    run = gate_and_fix(files, engineer, "Build the app", rounds=2)
+    assert run.report.ok and run.rounds == 1 and run.replaced == ["components/Header.tsx"]
+    assert "pages/index.tsx: imports '../components/Header' but components/Header was not generated" in prompts[0]
+    assert "issues sent back to the engineer in 1 round(s)" in run.summary()
+
+    # A reply that fixes nothing stops after the round budget
+    stubborn = gate_and_fix({"a.json": "{"}, lambda prompt: '{"a.json": "{"}', "Build", rounds=2)
+    assert stubborn.rounds == 2 and not stubborn.report.ok
+
+def test_failed_fix_request_keeps_the_files():
+    files = {"package.json": PACKAGE, "pages/index.tsx": "import Header from '../components/Header'\n"}
+
+    def offline(prompt):
+        raise ConnectionError("connection refused")
+
+    run = gate_and_fix(files, offline, "Build the app", rounds=2)
+    assert run.files == files and run.rounds == 1 and not run.report.ok
+    assert run.error == "ConnectionError: connection refused"
+    assert "fix request failed: ConnectionError" in run.summary()
+
+def test_large_project_is_fast():
+    report = check_project(synthetic_project(2 * 1024 * 1024))
+    assert report.ok and report.files > 400
+    assert report.seconds < 0.5
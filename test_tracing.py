@@ -0,0 +1,64 @@
+"""
+Tests for span tracing and the trace summary.
+"""
+import json
+
+import pytest
+
+from utils import tracing
+from utils.dag import run_dag
+
+@pytest.fixture
+def trace_file(tmp_path):
+    path = tmp_path / "logs" / "trace.jsonl"
+    tracing.set_trace_path(str(path))
+    yield path
+    tracing.set_trace_path(None)
+
+def _records(path):
+    return [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
+
+def test_llm_usage_rolls_up_into_enclosing_spans(trace_file):
+    with tracing.trace_run("run1"):
+        with tracing.span("engineer"):
+            tracing.record_llm_call("coder", 2.0, 100, 50, 1.0, "miss", phase="engineer")
+            tracing.record_llm_call("coder", 0.01, 0, 0, 0.0, "hit", phase="engineer")
+        with tracing.span("write_files", written=3):
+            pass
+
+    records = {r["span"]: r for r in _records(trace_file) if r["span"] != "llm"}
+    engineer = records["engineer"]
+    assert (engineer["prompt_tokens"], engineer["completion_tokens"]) == (100, 50)
+    assert engineer["tokens_per_sec"] == 50.0
+    assert engineer["model"] == "coder" and engineer["cache"] == "mixed"
+    assert records["run"]["completion_tokens"] == 50
+    assert records["write_files"]["written"] == 3
+    assert {r["run_id"] for r in _records(trace_file)} == {"run1"}
+
+def test_spans_propagate_into_dag_workers(trace_file):
+    def phase(inputs):
+        with tracing.span("inner"):
+            tracing.record_llm_call("m", 0.1, 1, 1, 0.0, None)
+    with tracing.trace_run("run2"):
+        with tracing.span("outer"):
+            run_dag({"a": (phase, []), "b": (phase, [])})
+
+    inner = [r for r in _records(trace_file) if r["span"] == "inner"]
+    assert len(inner) == 2 and all(r["parent"] == "outer" and r["run_id"] == "run2" for r in inner)
+    assert next(r for r in _records(trace_file) if r["span"] == "outer")["prompt_tokens"] == 2
+
+def test_error_status_and_summary(trace_file):
+    with pytest.raises(RuntimeError):
+        with tracing.span("critic"):
+            raise RuntimeError("boom")
+    record = _records(trace_file)[0]
+    assert record["status"] == "error" and "boom" in record["error"]
+
+    tracing.record_llm_call("research-model", 1.0, 10, 20, 0.5, "miss", phase="research", ttft_ms=120.0,
+                            prefill_ms=80.0)
+    tracing.record_llm_call("research-model", 1.0, 30, 20, 0.5, "miss", phase="research", ttft_ms=40.0,
+                            prefill_ms=20.0)
+    summary = tracing.summarize(tracing.load_spans(str(trace_file)))
+    assert "critic" in summary and "research-model" in summary
+    prefill = summary.split("Prefill per phase (LLM calls):")[1].splitlines()[2].split()
+    assert prefill == ["research", "2", "40", "20", "100", "80.0", "116.0"]
@@ -0,0 +1,118 @@
+"""
+Tests for the Redis work queue against the in-memory stand-in.
+"""
+import asyncio
+import json
+import threading
+import time
+
+import pytest
+
+from schemas import JobRequest
+from service.fake_redis import FakeRedis
+from service.loadtest import _Client, stub_pipeline
+from service.server import DistributedJobService
+from service.work_queue import QueueWorker, RedisJobQueue
+from utils import tracing
+
+IDEA = "A web app that helps people find local pickup basketball games"
+MODELS = {"research": "writer", "marketing": "writer", "engineer": "coder", "critic": "coder"}
+
+@pytest.fixture(autouse=True)
+def no_trace():
+    tracing.set_trace_path(None)
+
+def make_queue(now, **kwargs):
+    clock = lambda: now[0]
+    return RedisJobQueue(FakeRedis(clock), model_for=MODELS.get, clock=clock, **kwargs)
+
+def test_jobs_wait_for_a_warm_worker_then_get_stolen():
+    now = [0.0]
+    queue = make_queue(now, lease_seconds=10, steal_after=5)
+    queue.heartbeat("coder-node", ["coder"])
+    queue.heartbeat("writer-node", ["writer"])
+    first = queue.submit(JobRequest(idea=IDEA))
+    second = queue.submit(JobRequest(idea=IDEA))
+    assert queue.depth() == {"writer": 2}
+
+    # Another live worker has the model warm, so the cold one leaves the job to it
+    assert queue.claim("coder-node", ["coder"]) is None
+    claim = queue.claim("writer-node", ["writer"])
+    assert claim.job_id == first and claim.warm and queue.get(first).status == "running"
+
+    now[0] = 6.0
+    queue.heartbeat("coder-node", ["coder"])
+    stolen = queue.claim("coder-node", ["coder"])
+    assert stolen.job_id == second and not stolen.warm and stolen.waited == 6.0
+
+    assert queue.complete("writer-node", first, ["launch.md"])
+    assert queue.get(first).status == "succeeded" and queue.get(first).artifact_links == ["launch.md"]
+    assert queue.complete("coder-node", second, error="RuntimeError: boom")
+    assert queue.get(second).errors == ["RuntimeError: boom"]
+
+def test_expired_lease_requeues_at_the_resumed_phase():
+    now = [0.0]
+    queue = make_queue(now, lease_seconds=10, max_attempts=2)
+    job_id = queue.submit(JobRequest(idea=IDEA))
+    queue.heartbeat("a", [])
+    assert queue.claim("a", []).job_id == job_id
+    queue.report(job_id, "engineer", 25.0)
+
+    # Heartbeats keep the claim; silence past the lease loses it
+    now[0] = 8.0
+    queue.heartbeat("a", [])
+    now[0] = 15.0
+    assert queue.requeue_expired() == []
+    now[0] = 30.0
+    assert queue.requeue_expired() == [job_id]
+    status = queue.get(job_id)
+    assert status.status == "queued" and "lease of worker a expired" in status.errors[0]
+    assert queue.depth()["coder"] == 1 and "a" not in queue.workers()
+
+    # The stale worker's late result is discarded
+    assert not queue.complete("a", job_id, ["late.md"])
+    assert queue.get(job_id).status == "queued"
+
+    # A second expiry exhausts max_attempts
+    queue.heartbeat("b", ["coder"])
+    assert queue.claim("b", ["coder"]).job_id == job_id
+    now[0] = 50.0
+    assert queue.requeue_expired() == []
+    assert queue.get(job_id).status == "failed" and queue.depth()["coder"] == 0
+
+def test_workers_drain_the_queue_through_the_http_front_end():
+    queue = RedisJobQueue(FakeRedis(), model_for=MODELS.get, lease_seconds=3)
+
+    async def submit(count):
+        service = DistributedJobService(queue)
+        host, port = await service.start("127.0.0.1", 0)
+        client = _Client(host, port)
+        try:
+            ids = []
+            for _ in range(count):
+                code, body = await client.request("POST", "/run", json.dumps({"idea": IDEA}).encode())
+                assert code == 202
+                ids.append(json.loads(body)["job_id"])
+            code, body = await client.request("GET", "/healthz")
+            assert code == 200 and json.loads(body)["queued"] == {"writer": count}
+            return ids
+        finally:
+            client.close()
+            await service.stop()
+
+    ids = asyncio.run(submit(12))
+    stop = threading.Event()
+    workers = [QueueWorker(queue, stub_pipeline(0.005), lambda: ["writer"], f"w{i}", poll_interval=0.01)
+               for i in range(3)]
+    threads = [threading.Thread(target=w.run, args=(stop,)) for w in workers]
+    for thread in threads:
+        thread.start()
+    deadline = time.monotonic() + 10
+    while time.monotonic() < deadline and any(queue.get(j).status != "succeeded" for j in ids):
+        time.sleep(0.02)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    assert all(queue.get(j).status == "succeeded" for j in ids)
+    assert sum(w.done for w in workers) == 12 and sum(w.warm_claims for w in workers) == 12
+    assert queue.workers() == {}
@@ -3,10 +3,27 @@ Code compilation and testing utilities for quality gates.
 """
 import os
 import sys
+import json
+import time
+import signal
+import hashlib
+import multiprocessing
 import tempfile
+import threading
 import subprocess
-from typing import Tuple
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
 from pathlib import Path
+from xml.etree import ElementTree
+from utils.engineer_output import atomic_write, normalize_file_content
+
+# Below this many checkable files the pool's IPC costs more than it saves
+PARALLEL_THRESHOLD = 64
+CHECKED_SUFFIXES = (".py", ".json")
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
 
 def py_compile_string(code: str) -> Tuple[bool, str]:
     """
@@ -45,35 +62,319 @@ def py_compile_string(code: str) -> Tuple[bool, str]:
             except:
                 pass
 
-def run_pytest_if_exists(work_dir: str) -> Tuple[bool, str]:
+def check_source(path: str, content: str) -> Tuple[bool, str]:
+    """
+    Syntax-check one file in-process based on its extension.
+
+    Args:
+        path: File path (determines the checker)
+        content: File content
+
+    Returns:
+        Tuple of (success: bool, error_message: str)
+    """
+    try:
+        if path.endswith(".py"):
+            compile(content, path, "exec", dont_inherit=True)
+        elif path.endswith(".json"):
+            json.loads(content)
+        return True, ""
+    except SyntaxError as e:
+        return False, f"{path}:{e.lineno}:{e.offset}: {e.msg}"
+    except json.JSONDecodeError as e:
+        return False, f"{path}:{e.lineno}:{e.colno}: {e.msg}"
+    except (ValueError, TypeError) as e:
+        return False, f"{path}: {e}"
+    except (RecursionError, MemoryError) as e:
+        # Pathologically nested code or JSON exhausts the parser; fail the file, not the whole check
+        return False, f"{path}: too deeply nested to parse ({type(e).__name__})"
+
+def _check_chunk(items: List[Tuple[str, str]]) -> List[Tuple[str, Tuple[bool, str]]]:
+    return [(path, check_source(path, content)) for path, content in items]
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # Forking a process that runs threads (the DAG scheduler, HTTP pools) can copy a held lock
+            _pool = ProcessPoolExecutor(max_workers=os.cpu_count() or 1,
+                                        mp_context=multiprocessing.get_context("spawn"))
+        return _pool
+
+def shutdown_pool() -> None:
+    """Shut down the persistent compile pool (it is recreated on next use)."""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown()
+            _pool = None
+
+def check_files(files: Dict[str, Any], parallel: Optional[bool] = None) -> Dict[str, Tuple[bool, str]]:
+    """
+    Syntax-check a whole generated project in one pass.
+
+    Python files are compiled in-process and JSON files parsed; other files
+    are not checked and do not appear in the result. Large projects are
+    fanned out over a persistent process pool.
+
+    Args:
+        files: Mapping of file path to content, as returned by extract_json_object
+        parallel: Force (True) or disable (False) the process pool; by default
+            it is used above PARALLEL_THRESHOLD checkable files
+
+    Returns:
+        Mapping of file path to (success: bool, error_message: str)
+    """
+    items = [
+        (path, normalize_file_content(path, content))
+        for path, content in files.items()
+        if path.endswith(CHECKED_SUFFIXES)
+    ]
+    if parallel is None:
+        parallel = len(items) >= PARALLEL_THRESHOLD
+    if not parallel or len(items) < 2:
+        return dict(_check_chunk(items))
+
+    pool = _get_pool()
+    # A few chunks per worker balances load without per-file IPC
+    size = max(1, len(items) // ((os.cpu_count() or 1) * 4))
+    chunks = [items[i:i + size] for i in range(0, len(items), size)]
+    results: Dict[str, Tuple[bool, str]] = {}
+    for chunk_result in pool.map(_check_chunk, chunks):
+        results.update(chunk_result)
+    return results
+
+@dataclass
+class CaseResult:
+    """One test's outcome, from pytest's JUnit XML."""
+    nodeid: str
+    outcome: str  # passed | failed | error | skipped
+    message: str = ""
+    seconds: float = 0.0
+
+@dataclass
+class ShardResult:
+    """One pytest process."""
+    files: List[str]
+    returncode: Optional[int]
+    seconds: float
+    timed_out: bool = False
+    output: str = ""
+
+@dataclass
+class SuiteResult:
+    """Merged outcome of a sharded pytest run."""
+    cases: List[CaseResult] = field(default_factory=list)
+    shards: List[ShardResult] = field(default_factory=list)
+    cached: bool = False
+
+    def count(self, outcome: str) -> int:
+        return sum(1 for case in self.cases if case.outcome == outcome)
+
+    @property
+    def timed_out(self) -> List[str]:
+        """Test files whose shard was killed for running too long."""
+        return [path for shard in self.shards if shard.timed_out for path in shard.files]
+
+    @property
+    def ok(self) -> bool:
+        # 5 = no tests collected
+        crashed = any(s.returncode not in (0, 1, 5) for s in self.shards if not s.timed_out)
+        return not (self.count("failed") or self.count("error") or self.timed_out or crashed)
+
+    def summary(self) -> str:
+        parts = [f"{self.count(o)} {o}" for o in ("passed", "failed", "error", "skipped") if self.count(o)]
+        if self.timed_out:
+            parts.append(f"timed out: {', '.join(self.timed_out)}")
+        lines = [f"{', '.join(parts) or 'no tests'} in {len(self.shards)} shards"
+                 + (" (cached)" if self.cached else "")]
+        for case in self.cases:
+            if case.outcome in ("failed", "error"):
+                lines.append(f"{case.outcome.upper()} {case.nodeid}: {case.message}")
+        for shard in self.shards:
+            if shard.returncode not in (0, 1, 5) and not shard.timed_out:
+                lines.append(f"pytest exited {shard.returncode} on {', '.join(shard.files)}:\n{shard.output}")
+        return "\n".join(lines)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "SuiteResult":
+        return cls([CaseResult(**c) for c in data["cases"]], [ShardResult(**s) for s in data["shards"]])
+
+# Not part of the project under test; skipped when finding tests and hashing the tree
+IGNORED_DIRS = {".git", "node_modules", "__pycache__", ".pytest_cache", ".next", ".venv", "venv"}
+
+# Last characters of a shard's output kept for reporting crashes
+OUTPUT_TAIL = 4000
+
+def find_test_files(work_dir: Path) -> List[Path]:
+    """test_*.py / *_test.py files under work_dir/tests, relative to work_dir."""
+    found = []
+    for root, dirs, files in os.walk(Path(work_dir) / "tests"):
+        dirs[:] = sorted(d for d in dirs if d not in IGNORED_DIRS)
+        for name in sorted(files):
+            if name.endswith(".py") and (name.startswith("test_") or name.endswith("_test.py")):
+                found.append((Path(root) / name).relative_to(work_dir))
+    return found
+
+def tree_hash(work_dir: Path) -> str:
+    """Hash of every file's path and content under work_dir (tests and sources)."""
+    h = hashlib.sha256(sys.version.encode("utf-8"))
+    for root, dirs, files in os.walk(work_dir):
+        dirs[:] = sorted(d for d in dirs if d not in IGNORED_DIRS)
+        for name in sorted(files):
+            path = Path(root) / name
+            rel = path.relative_to(work_dir).as_posix().encode("utf-8")
+            h.update(len(rel).to_bytes(8, "big"))
+            h.update(rel)
+            h.update(hashlib.sha256(path.read_bytes()).digest())
+    return h.hexdigest()
+
+def shard_files(paths: List[Path], work_dir: Path, shards: int) -> List[List[str]]:
+    """Split test files into at most `shards` groups of similar total size (largest first)."""
+    sizes = {path: (Path(work_dir) / path).stat().st_size for path in paths}
+    groups: List[List[str]] = [[] for _ in range(max(1, min(shards, len(paths))))]
+    totals = [0] * len(groups)
+    for path in sorted(paths, key=lambda p: sizes[p], reverse=True):
+        i = totals.index(min(totals))
+        groups[i].append(path.as_posix())
+        totals[i] += sizes[path]
+    return [sorted(files) for files in groups if files]
+
+def _parse_junit(path: Path) -> List[CaseResult]:
+    try:
+        root = ElementTree.parse(path).getroot()
+    except (OSError, ElementTree.ParseError):
+        return []
+    cases = []
+    for case in root.iter("testcase"):
+        # xunit1 records the file; the rest of classname is the test class, if any
+        path = case.get("file", "")
+        module = path[:-3].replace("/", ".") if path.endswith(".py") else ""
+        classname = case.get("classname", "")
+        cls = classname[len(module) + 1:] if module and classname.startswith(module + ".") else ""
+        nodeid = "::".join(filter(None, [path or classname, cls, case.get("name", "")]))
+        outcome, message = "passed", ""
+        for child in case:
+            if child.tag in ("failure", "error", "skipped"):
+                outcome = {"failure": "failed"}.get(child.tag, child.tag)
+                text = (child.get("message") or child.text or "").strip()
+                message = text.splitlines()[0][:300] if text else ""
+                break
+        cases.append(CaseResult(nodeid, outcome, message, float(case.get("time") or 0)))
+    return cases
+
+def _kill_group(proc: subprocess.Popen) -> None:
+    try:
+        os.killpg(proc.pid, signal.SIGKILL)
+    except (ProcessLookupError, PermissionError):
+        pass
+
+def _run_shard(work_dir: Path, files: List[str], junit: Path, timeout: float) -> Tuple[ShardResult, List[CaseResult]]:
+    started = time.perf_counter()
+    # Own session so a timeout kills pytest and everything the tests spawned
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "pytest", "-q", "-p", "no:cacheprovider", "-o", "junit_family=xunit1",
+         f"--junitxml={junit}", *files],
+        cwd=work_dir, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True, start_new_session=True,
+    )
+    timed_out = False
+    try:
+        output, _ = proc.communicate(timeout=max(0.0, timeout))
+    except subprocess.TimeoutExpired:
+        timed_out = True
+        _kill_group(proc)
+        output, _ = proc.communicate()
+    finally:
+        # Background processes left by passing tests go too
+        _kill_group(proc)
+    shard = ShardResult(files, None if timed_out else proc.returncode, time.perf_counter() - started,
+                        timed_out, (output or "")[-OUTPUT_TAIL:])
+    return shard, [] if timed_out else _parse_junit(junit)
+
+def run_tests(
+    work_dir: str,
+    shards: int = 4,
+    shard_timeout: float = 120.0,
+    total_timeout: float = 600.0,
+    cache_dir: Optional[str] = None,
+) -> Optional[SuiteResult]:
+    """
+    Run a generated project's tests as parallel pytest shards.
+
+    Test files are split across `shards` processes of similar size. A shard
+    that exceeds `shard_timeout`, or is still running when `total_timeout`
+    expires, is killed with its whole process group. Per-test outcomes are
+    read from each shard's JUnit XML and merged. With `cache_dir`, results are
+    stored under a hash of the project tree, so an unchanged project is not
+    run again (runs that timed out are not cached).
+
+    Args:
+        work_dir: Project directory containing tests/
+        shards: Maximum number of pytest processes
+        shard_timeout: Seconds one shard may run
+        total_timeout: Seconds the whole run may take
+        cache_dir: Directory for cached results, or None to always run
+
+    Returns:
+        Merged SuiteResult, or None if the project has no tests directory
+    """
+    work = Path(work_dir)
+    if not (work / "tests").is_dir():
+        return None
+    cache_file = Path(cache_dir) / f"{tree_hash(work)}.json" if cache_dir else None
+    if cache_file is not None and cache_file.exists():
+        try:
+            run = SuiteResult.from_dict(json.loads(cache_file.read_text(encoding="utf-8")))
+            run.cached = True
+            return run
+        except (OSError, ValueError, KeyError, TypeError):
+            pass
+
+    groups = shard_files(find_test_files(work), work, shards)
+    deadline = time.monotonic() + total_timeout
+    run = SuiteResult()
+    with tempfile.TemporaryDirectory() as tmp, ThreadPoolExecutor(max_workers=max(1, len(groups))) as pool:
+        futures = [pool.submit(_run_shard, work, files, Path(tmp) / f"shard{i}.xml",
+                               min(shard_timeout, deadline - time.monotonic()))
+                   for i, files in enumerate(groups)]
+        for future in futures:
+            shard, cases = future.result()
+            run.shards.append(shard)
+            run.cases.extend(cases)
+
+    if cache_file is not None and not run.timed_out:
+        cache_file.parent.mkdir(parents=True, exist_ok=True)
+        atomic_write(cache_file, json.dumps(run.to_dict()).encode("utf-8"))
+    return run
+
+def run_pytest_if_exists(work_dir: str, shards: Optional[int] = None, shard_timeout: Optional[float] = None,
+                         total_timeout: Optional[float] = None, cache: bool = True) -> Tuple[bool, str]:
     """
     Run pytest if tests directory exists in the working directory.
-    
+
+    Settings default to config TEST_SHARDS, TEST_SHARD_TIMEOUT, TEST_TIMEOUT
+    and TEST_CACHE_DIR; see run_tests for the structured result.
+
     Args:
         work_dir: Directory to check for tests and run pytest in
-        
+        shards: Parallel pytest processes
+        shard_timeout: Seconds per shard
+        total_timeout: Seconds for the whole run
+        cache: Reuse results for an unchanged project tree
+
     Returns:
-        Tuple of (success: bool, output: str)
+        Tuple of (success: bool, summary: str)
     """
-    tests_dir = Path(work_dir) / 'tests'
-    if not tests_dir.exists():
-        return True, "No tests directory found"
-        
+    from config import TEST_CACHE_DIR, TEST_SHARD_TIMEOUT, TEST_SHARDS, TEST_TIMEOUT
+
     try:
-        # Run pytest in quiet mode
-        result = subprocess.run(
-            [sys.executable, '-m', 'pytest', '-q'],
-            cwd=work_dir,
-            capture_output=True,
-            text=True
-        )
-        
-        if result.returncode == 0:
-            return True, result.stdout.strip()
-        else:
-            # Combine stdout and stderr for error details
-            output = result.stdout.strip() + "\n" + result.stderr.strip()
-            return False, output.strip()
-            
+        run = run_tests(work_dir, shards or TEST_SHARDS, shard_timeout or TEST_SHARD_TIMEOUT,
+                        total_timeout or TEST_TIMEOUT, TEST_CACHE_DIR if cache else None)
     except Exception as e:
         return False, f"Error running pytest: {str(e)}"
+    if run is None:
+        return True, "No tests directory found"
+    return run.ok, run.summary()
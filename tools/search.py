@@ -3,22 +3,17 @@
 This module prefers the modern `ddgs` package but falls back to the
 older `duckduckgo_search` package for compatibility. Install one of
 them in your environment (recommended: `ddgs`).
+
+Results are cached in the app database and identical in-flight queries
+are coalesced (see `tools.search_cache`). `web_search_many` runs a batch of
+queries concurrently and returns one deduplicated list, so a research step
+costs one tool round-trip instead of one per query.
 """
-from typing import List
-from pydantic import BaseModel, Field
+from typing import List, Optional
+from pydantic import BaseModel, Field, PrivateAttr
 from crewai.tools import BaseTool
-
-try:
-    # preferred package (new name)
-    from ddgs import DDGS  # type: ignore
-except Exception:
-    try:
-        # backward-compatible name used in some environments
-        from duckduckgo_search import DDGS  # type: ignore
-    except Exception as exc:  # pragma: no cover - environment issue
-        raise ImportError(
-            "Missing search backend: install the 'ddgs' package (recommended) or 'duckduckgo-search'."
-        ) from exc
+from tools.search_cache import CachedSearch, get_cached_search, search_many
+from utils.tracing import span
 
 
 class WebSearchToolSchema(BaseModel):
@@ -31,9 +26,16 @@ class WebSearchTool(BaseTool):
     name: str = "web_search"
     description: str = "Search the web for information. Returns a list of relevant results with titles and URLs."
     args_schema: type[BaseModel] = WebSearchToolSchema
+    _searcher: Optional[CachedSearch] = PrivateAttr(default=None)
 
-    def __init__(self):
+    def __init__(self, searcher: Optional[CachedSearch] = None):
+        """
+        Args:
+            searcher: Search front-end to use; defaults to the shared cached
+                DuckDuckGo searcher. Pass a CachedSearch over a fake backend in tests.
+        """
         super().__init__()
+        self._searcher = searcher
 
     def _run(self, query: str, max_results: int = 5) -> str:
         """Lightweight web search. Returns title + URL bullets as text.
@@ -44,15 +46,64 @@ class WebSearchTool(BaseTool):
 
         Output: newline-delimited bullet list (or 'No results.').
         """
+        searcher = self._searcher or get_cached_search()
+        with span("web_search", query=query, max_results=max_results) as s:
+            found, status = searcher.search_with_status(query, max_results)
+            s.set(cache=status, results=len(found))
         results: List[str] = []
-        with DDGS() as ddgs:
-            for r in ddgs.text(query, max_results=max_results):
-                # result shape varies slightly across versions; guard safely
-                title = (r.get("title") or "").strip()
-                href = (r.get("href") or r.get("url") or "").strip()
-                if title and href:
-                    results.append(f"- {title} — {href}")
+        for r in found:
+            # result shape varies slightly across versions; guard safely
+            title = (r.get("title") or "").strip()
+            href = (r.get("href") or r.get("url") or "").strip()
+            if title and href:
+                results.append(f"- {title} — {href}")
         return "\n".join(results) if results else "No results."
 
-# Create tool instance
-web_search = WebSearchTool()
\ No newline at end of file
+
+class MultiSearchToolSchema(BaseModel):
+    """Schema for the web_search_many tool."""
+    queries: List[str] = Field(description="Search queries to run together, e.g. competitors, pain points, pricing")
+    max_results: int = Field(5, description="Maximum number of results per query")
+
+
+class MultiSearchTool(BaseTool):
+    name: str = "web_search_many"
+    description: str = (
+        "Run several web searches at once. Takes a list of queries and returns one merged list of "
+        "unique results (title and URL), each tagged with the queries that found it. Prefer this "
+        "over repeated web_search calls."
+    )
+    args_schema: type[BaseModel] = MultiSearchToolSchema
+    _searcher: Optional[CachedSearch] = PrivateAttr(default=None)
+    _workers: Optional[int] = PrivateAttr(default=None)
+    _timeout: Optional[float] = PrivateAttr(default=None)
+
+    def __init__(self, searcher: Optional[CachedSearch] = None, workers: Optional[int] = None,
+                 timeout: Optional[float] = None):
+        """
+        Args:
+            searcher: Search front-end to use; defaults to the shared cached searcher
+            workers: Queries run at once (default config.SEARCH_WORKERS)
+            timeout: Seconds allowed per query (default config.SEARCH_TIMEOUT)
+        """
+        super().__init__()
+        self._searcher = searcher
+        self._workers = workers
+        self._timeout = timeout
+
+    def _run(self, queries: List[str], max_results: int = 5) -> str:
+        from config import SEARCH_TIMEOUT, SEARCH_WORKERS
+
+        if isinstance(queries, str):
+            queries = [queries]
+        searcher = self._searcher or get_cached_search()
+        with span("web_search_many", queries=len(queries), max_results=max_results) as s:
+            batch = search_many(searcher, queries, max_results, self._workers or SEARCH_WORKERS,
+                                self._timeout or SEARCH_TIMEOUT)
+            s.set(results=len(batch.results), duplicates=batch.duplicates, cache=batch.statuses,
+                  timed_out=len(batch.timed_out), failed=len(batch.failed))
+        return batch.format()
+
+# Create tool instances
+web_search = WebSearchTool()
+web_search_many = MultiSearchTool()
@@ -0,0 +1,347 @@
+"""
+TTL'd SQLite cache and request coalescing for web search.
+
+Results are keyed on the normalized query plus max_results and stored in the
+app database. Concurrent identical queries share a single backend call.
+`search_many` runs a batch of queries concurrently and merges their results.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+# A backend takes (query, max_results) and returns raw result dicts
+SearchBackend = Callable[[str, int], List[Dict[str, Any]]]
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS search_cache (
+    key TEXT PRIMARY KEY,
+    query TEXT NOT NULL,
+    max_results INTEGER NOT NULL,
+    results TEXT NOT NULL,
+    expires_at REAL NOT NULL,
+    created_at REAL NOT NULL
+)
+"""
+
+def normalize_query(query: str) -> str:
+    """Case-fold and collapse whitespace so trivially different queries share a key."""
+    return " ".join(query.lower().split())
+
+def cache_key(query: str, max_results: int) -> str:
+    return hashlib.sha256(f"{normalize_query(query)}\0{max_results}".encode("utf-8")).hexdigest()
+
+# Query parameters that only track where a click came from
+_TRACKING_PARAMS = {"fbclid", "gclid", "msclkid", "ref", "ref_src", "mc_cid", "mc_eid"}
+
+def normalize_url(url: str) -> str:
+    """
+    Canonical form of a result URL for deduplication.
+
+    Lowercases scheme and host, drops 'www.', default ports, the fragment,
+    tracking parameters (utm_*, fbclid, ...) and a trailing slash, and sorts
+    the remaining query parameters. http and https map to the same key.
+    """
+    parts = urlsplit(url.strip())
+    host = (parts.hostname or "").lower()
+    if host.startswith("www."):
+        host = host[4:]
+    port = parts.port if parts.port not in (None, 80, 443) else None
+    query = sorted((k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+                   if not k.lower().startswith("utm_") and k.lower() not in _TRACKING_PARAMS)
+    path = parts.path.rstrip("/")
+    return urlunsplit(("https" if parts.scheme in ("http", "https", "") else parts.scheme.lower(),
+                       f"{host}:{port}" if port else host, path, urlencode(query), ""))
+
+class DDGSBackend:
+    """
+    DuckDuckGo backend that reuses a DDGS session per thread instead of
+    opening a new one for every call.
+
+    Args:
+        factory: Callable returning a DDGS-like object with a `text()` method;
+            defaults to the installed `ddgs` / `duckduckgo_search` package
+    """
+
+    def __init__(self, factory: Optional[Callable[[], Any]] = None):
+        self._factory = factory
+        self._local = threading.local()
+
+    def _get_client(self):
+        client = getattr(self._local, "client", None)
+        if client is None:
+            factory = self._factory
+            if factory is None:
+                try:
+                    # preferred package (new name)
+                    from ddgs import DDGS  # type: ignore
+                except Exception:
+                    try:
+                        # backward-compatible name used in some environments
+                        from duckduckgo_search import DDGS  # type: ignore
+                    except Exception as exc:  # pragma: no cover - environment issue
+                        raise ImportError(
+                            "Missing search backend: install the 'ddgs' package (recommended) or 'duckduckgo-search'."
+                        ) from exc
+                factory = DDGS
+            client = self._local.client = factory()
+        return client
+
+    def __call__(self, query: str, max_results: int) -> List[Dict[str, Any]]:
+        return list(self._get_client().text(query, max_results=max_results) or [])
+
+class SearchCache:
+    """
+    Persistent search result cache with per-entry TTL and an entry cap.
+
+    Args:
+        db_path: SQLite database file (normally config.DB_PATH)
+        ttl: Seconds an entry stays fresh
+        max_entries: Oldest entries beyond this count are dropped on write
+    """
+
+    def __init__(self, db_path: str, ttl: float = 86400.0, max_entries: int = 5000):
+        self.db_path = db_path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            parent = os.path.dirname(self.db_path)
+            if parent:
+                os.makedirs(parent, exist_ok=True)
+            self._conn = sqlite3.connect(self.db_path, check_same_thread=False, timeout=30)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(_SCHEMA)
+            self._conn.execute("CREATE INDEX IF NOT EXISTS search_cache_age ON search_cache(created_at)")
+            self._conn.commit()
+        return self._conn
+
+    def get(self, query: str, max_results: int) -> Optional[List[Dict[str, Any]]]:
+        """Return fresh cached results, or None if missing or expired."""
+        with self._lock:
+            row = self._db().execute(
+                "SELECT results, expires_at FROM search_cache WHERE key = ?",
+                (cache_key(query, max_results),),
+            ).fetchone()
+        if row is None or row[1] < time.time():
+            return None
+        return json.loads(row[0])
+
+    def put(self, query: str, max_results: int, results: List[Dict[str, Any]], ttl: Optional[float] = None) -> None:
+        """Store results with their own expiry, trimming the table to max_entries."""
+        now = time.time()
+        expires = now + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            db = self._db()
+            db.execute(
+                "INSERT OR REPLACE INTO search_cache (key, query, max_results, results, expires_at, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (cache_key(query, max_results), normalize_query(query), max_results,
+                 json.dumps(results), expires, now),
+            )
+            db.execute("DELETE FROM search_cache WHERE expires_at < ?", (now,))
+            db.execute(
+                "DELETE FROM search_cache WHERE key IN ("
+                "SELECT key FROM search_cache ORDER BY created_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+            db.commit()
+
+class CachedSearch:
+    """
+    Search front-end combining the persistent cache with in-flight coalescing.
+
+    Args:
+        backend: Callable performing the actual search
+        cache: Optional SearchCache; without one only coalescing applies
+    """
+
+    def __init__(self, backend: SearchBackend, cache: Optional[SearchCache] = None):
+        self.backend = backend
+        self.cache = cache
+        self.backend_calls = 0
+        self._lock = threading.Lock()
+        self._inflight: Dict[str, "_Call"] = {}
+
+    def search(self, query: str, max_results: int = 5) -> List[Dict[str, Any]]:
+        """
+        Return results for a query, hitting the backend at most once per
+        key across concurrent callers and not at all while cached.
+        """
+        return self.search_with_status(query, max_results)[0]
+
+    def search_with_status(self, query: str, max_results: int = 5) -> Tuple[List[Dict[str, Any]], str]:
+        """Like `search`, also returning 'hit', 'coalesced' or 'miss'."""
+        if self.cache is not None:
+            cached = self.cache.get(query, max_results)
+            if cached is not None:
+                return cached, "hit"
+
+        key = cache_key(query, max_results)
+        with self._lock:
+            call = self._inflight.get(key)
+            leader = call is None
+            if leader:
+                call = self._inflight[key] = _Call()
+                self.backend_calls += 1
+
+        if not leader:
+            return call.wait(), "coalesced"
+
+        try:
+            results = self.backend(query, max_results)
+            if self.cache is not None:
+                self.cache.put(query, max_results, results)
+            call.resolve(results)
+            return results, "miss"
+        except BaseException as e:
+            call.fail(e)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+class _Call:
+    """Result slot shared by coalesced callers of the same query."""
+
+    def __init__(self):
+        self._done = threading.Event()
+        self._result: List[Dict[str, Any]] = []
+        self._error: Optional[BaseException] = None
+
+    def resolve(self, result: List[Dict[str, Any]]) -> None:
+        self._result = result
+        self._done.set()
+
+    def fail(self, error: BaseException) -> None:
+        self._error = error
+        self._done.set()
+
+    def wait(self) -> List[Dict[str, Any]]:
+        self._done.wait()
+        if self._error is not None:
+            raise self._error
+        return self._result
+
+@dataclass
+class MergedResult:
+    """One deduplicated result and the queries (by index) that returned it."""
+    title: str
+    url: str
+    queries: List[int]
+
+@dataclass
+class MultiSearch:
+    """Outcome of a batch of queries."""
+    queries: List[str]
+    results: List[MergedResult] = field(default_factory=list)
+    duplicates: int = 0
+    statuses: Dict[str, int] = field(default_factory=dict)  # hit / coalesced / miss counts
+    timed_out: List[str] = field(default_factory=list)
+    failed: Dict[str, str] = field(default_factory=dict)
+
+    def format(self) -> str:
+        """Compact text for the agent: one bullet per unique URL, tagged with the queries that found it."""
+        lines = []
+        for r in self.results:
+            tag = ",".join(f"q{i + 1}" for i in r.queries)
+            lines.append(f"- {r.title} — {r.url} [{tag}]")
+        if len(self.queries) > 1:
+            lines.insert(0, "Queries: " + "; ".join(f"q{i + 1}={q}" for i, q in enumerate(self.queries)))
+        lines += [f"(q{self.queries.index(q) + 1} timed out)" for q in self.timed_out]
+        lines += [f"(q{self.queries.index(q) + 1} failed: {e})" for q, e in self.failed.items()]
+        return "\n".join(lines) if self.results else "\n".join(lines + ["No results."])
+
+def search_many(searcher: CachedSearch, queries: Sequence[str], max_results: int = 5,
+                workers: int = 4, timeout: float = 10.0) -> MultiSearch:
+    """
+    Run several queries concurrently and merge their results.
+
+    Queries that normalize to the same string run once. At most `workers`
+    run at a time. A query that hasn't returned `timeout` seconds after it
+    started, or hasn't started within `timeout` of being submitted, is
+    reported as timed out; a late result still lands in the cache. Results
+    are deduplicated by normalize_url and interleaved by rank, so every
+    query's top hits come before anyone's tail.
+    """
+    unique: Dict[str, str] = {}
+    for q in queries:
+        if q.strip():
+            unique.setdefault(normalize_query(q), q.strip())
+    batch = MultiSearch(list(unique.values()))
+    if not batch.queries:
+        return batch
+
+    started: Dict[int, float] = {}
+
+    def run(i: int) -> Tuple[List[Dict[str, Any]], str]:
+        started[i] = time.monotonic()
+        return searcher.search_with_status(batch.queries[i], max_results)
+
+    pool = ThreadPoolExecutor(max_workers=max(1, min(workers, len(batch.queries))), thread_name_prefix="search")
+    submitted = time.monotonic()
+    futures: Dict[Future, int] = {pool.submit(run, i): i for i in range(len(batch.queries))}
+    found: Dict[int, List[Dict[str, Any]]] = {}
+    pending = set(futures)
+    try:
+        while pending:
+            deadline = min(started.get(futures[f], submitted) + timeout for f in pending)
+            done, pending = wait(pending, timeout=max(0.0, deadline - time.monotonic()), return_when=FIRST_COMPLETED)
+            for f in done:
+                query = batch.queries[futures[f]]
+                try:
+                    found[futures[f]], status = f.result()
+                    batch.statuses[status] = batch.statuses.get(status, 0) + 1
+                except Exception as e:
+                    batch.failed[query] = f"{type(e).__name__}: {e}"
+            now = time.monotonic()
+            for f in [f for f in pending if started.get(futures[f], submitted) + timeout <= now]:
+                f.cancel()
+                pending.discard(f)
+                batch.timed_out.append(batch.queries[futures[f]])
+    finally:
+        # Don't wait for stragglers; their results still fill the cache
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    merged: Dict[str, MergedResult] = {}
+    ranked = [found.get(i, []) for i in range(len(batch.queries))]
+    for rank in range(max((len(r) for r in ranked), default=0)):
+        for i, results in enumerate(ranked):
+            if rank >= len(results):
+                continue
+            r = results[rank]
+            # result shape varies slightly across ddgs versions
+            title = (r.get("title") or "").strip()
+            url = (r.get("href") or r.get("url") or "").strip()
+            if not (title and url):
+                continue
+            key = normalize_url(url)
+            if key in merged:
+                batch.duplicates += 1
+                if i not in merged[key].queries:
+                    merged[key].queries.append(i)
+                continue
+            merged[key] = MergedResult(title, url, [i])
+    batch.results = list(merged.values())
+    return batch
+
+_shared: Optional[CachedSearch] = None
+_shared_lock = threading.Lock()
+
+def get_cached_search() -> CachedSearch:
+    """Return the process-wide DuckDuckGo search front-end."""
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            from config import DB_PATH, SEARCH_CACHE_MAX_ENTRIES, SEARCH_CACHE_TTL
+            _shared = CachedSearch(DDGSBackend(), SearchCache(DB_PATH, SEARCH_CACHE_TTL, SEARCH_CACHE_MAX_ENTRIES))
+        return _shared
@@ -0,0 +1,321 @@
+"""
+Content-addressed store for run artifacts.
+
+Every file is stored once under blobs/<sha256[:2]>/<sha256[2:]>, and each run
+records only a manifest of path -> hash under runs/<run_id>.json, so the
+boilerplate that most generated apps share (package.json, tsconfig.json,
+tailwind.config.js, ...) costs one copy across thousands of runs. Runs can be
+checked out again or streamed into a .tar.gz/.zip without a temp directory,
+and `gc` deletes blobs no manifest references any more.
+
+Usage:
+    python -m utils.artifact_store runs
+    python -m utils.artifact_store export <run_id> -o app.tar.gz
+    python -m utils.artifact_store gc [--dry-run]
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import tarfile
+import threading
+import time
+import zipfile
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import IO, Dict, Iterable, List, Optional, Tuple
+
+from utils.engineer_output import atomic_write, content_hash
+
+FORMATS = ("tar.gz", "zip")
+
+# Unreferenced blobs younger than this are kept: a run stores its blobs before its manifest
+GC_GRACE_SECONDS = 3600
+
+@dataclass
+class RunManifest:
+    """The files one run produced, as path -> blob hash."""
+    run_id: str
+    created: float
+    files: Dict[str, str]
+    meta: Dict[str, str] = field(default_factory=dict)
+
+@dataclass
+class StoreReport:
+    """What storing a run cost."""
+    run_id: str
+    files: int = 0
+    new_blobs: int = 0
+    new_bytes: int = 0
+    total_bytes: int = 0
+
+    def __str__(self) -> str:
+        return (f"run {self.run_id}: {self.files} files, {self.new_blobs} new blobs "
+                f"({self.new_bytes / 1024:.1f} of {self.total_bytes / 1024:.1f} KiB stored)")
+
+@dataclass
+class GcReport:
+    """Outcome of a garbage collection."""
+    removed: int = 0
+    freed_bytes: int = 0
+    kept: int = 0
+
+    def __str__(self) -> str:
+        return f"{self.removed} blobs removed ({self.freed_bytes / 1024:.1f} KiB), {self.kept} kept"
+
+class ArtifactStore:
+    """
+    Blob store plus per-run manifests under `root`.
+
+    Args:
+        root: Store directory (config.ARTIFACT_STORE_DIR); created on first write
+    """
+
+    def __init__(self, root: Path):
+        self.root = Path(root)
+        self.blobs = self.root / "blobs"
+        self.runs_dir = self.root / "runs"
+
+    def blob_path(self, digest: str) -> Path:
+        return self.blobs / digest[:2] / digest[2:]
+
+    def put(self, data: bytes) -> Tuple[str, bool]:
+        """
+        Store bytes once.
+
+        Returns:
+            (hash, True if the blob was new)
+        """
+        digest = content_hash(data)
+        path = self.blob_path(digest)
+        try:
+            # Refresh the mtime so a concurrent gc's grace period covers reused blobs too
+            os.utime(path)
+            return digest, False
+        except FileNotFoundError:
+            pass
+        path.parent.mkdir(parents=True, exist_ok=True)
+        atomic_write(path, data)
+        return digest, True
+
+    def add_run(self, run_id: str, base_dir: Path, paths: Iterable[str],
+                meta: Optional[Dict[str, str]] = None) -> StoreReport:
+        """
+        Store a run's output files and save its manifest.
+
+        Args:
+            run_id: Unique id for the run (e.g. its trace run id)
+            base_dir: The run's output directory
+            paths: Files or directories under `base_dir` to include; missing ones are skipped
+            meta: Extra strings kept in the manifest (idea, output directory, ...)
+
+        Raises:
+            ValueError: If a run with this id already exists
+        """
+        manifest_file = self.runs_dir / f"{run_id}.json"
+        if manifest_file.exists():
+            raise ValueError(f"Run {run_id} is already stored")
+        base_dir = Path(base_dir)
+        report = StoreReport(run_id)
+        files: Dict[str, str] = {}
+        for rel in paths:
+            target = base_dir / rel
+            found = sorted(p for p in target.rglob("*") if p.is_file()) if target.is_dir() else \
+                [target] if target.is_file() else []
+            for path in found:
+                data = path.read_bytes()
+                digest, new = self.put(data)
+                files[path.relative_to(base_dir).as_posix()] = digest
+                report.total_bytes += len(data)
+                if new:
+                    report.new_blobs += 1
+                    report.new_bytes += len(data)
+        report.files = len(files)
+        self.runs_dir.mkdir(parents=True, exist_ok=True)
+        manifest = RunManifest(run_id, time.time(), files, dict(meta or {}))
+        atomic_write(manifest_file, json.dumps(asdict(manifest), indent=2, sort_keys=True).encode("utf-8"))
+        return report
+
+    def manifest(self, run_id: str) -> RunManifest:
+        """
+        Load one run's manifest.
+
+        Raises:
+            KeyError: If the run isn't stored
+        """
+        try:
+            data = json.loads((self.runs_dir / f"{run_id}.json").read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            raise KeyError(run_id) from None
+        return RunManifest(**data)
+
+    def runs(self) -> List[RunManifest]:
+        """Stored runs, oldest first."""
+        if not self.runs_dir.is_dir():
+            return []
+        runs = []
+        for path in self.runs_dir.glob("*.json"):
+            try:
+                runs.append(RunManifest(**json.loads(path.read_text(encoding="utf-8"))))
+            except (OSError, ValueError, TypeError):
+                continue
+        return sorted(runs, key=lambda run: run.created)
+
+    def delete_run(self, run_id: str) -> None:
+        """Forget a run; its blobs are freed by the next gc unless other runs share them."""
+        (self.runs_dir / f"{run_id}.json").unlink(missing_ok=True)
+
+    def checkout(self, run_id: str, dest: Path) -> int:
+        """Materialize a run's files under `dest`; returns the number of files."""
+        manifest = self.manifest(run_id)
+        dest = Path(dest)
+        for rel, digest in manifest.files.items():
+            target = dest / rel
+            target.parent.mkdir(parents=True, exist_ok=True)
+            atomic_write(target, self.blob_path(digest).read_bytes())
+        return len(manifest.files)
+
+    def export(self, run_id: str, out: IO[bytes], fmt: str = "tar.gz") -> int:
+        """
+        Stream a run as an archive into a binary file object.
+
+        Blobs are copied straight into the archive stream, so nothing is
+        staged on disk and `out` may be unseekable (stdout, a socket).
+        Entries are rooted at a directory named after the run.
+
+        Returns:
+            Number of files written
+
+        Raises:
+            KeyError: If the run isn't stored
+            ValueError: For an unknown format
+        """
+        if fmt not in FORMATS:
+            raise ValueError(f"Unknown archive format {fmt!r}; expected one of {FORMATS}")
+        manifest = self.manifest(run_id)
+        entries = sorted(manifest.files.items())
+        if fmt == "tar.gz":
+            with tarfile.open(fileobj=out, mode="w|gz") as tar:
+                for rel, digest in entries:
+                    blob = self.blob_path(digest)
+                    info = tarfile.TarInfo(f"{run_id}/{rel}")
+                    info.size = blob.stat().st_size
+                    info.mtime = int(manifest.created)
+                    info.mode = 0o644
+                    with open(blob, "rb") as src:
+                        tar.addfile(info, src)
+        else:
+            stamp = time.localtime(max(manifest.created, 315532800))[:6]  # zip dates start in 1980
+            with zipfile.ZipFile(out, "w", zipfile.ZIP_DEFLATED) as archive:
+                for rel, digest in entries:
+                    info = zipfile.ZipInfo(f"{run_id}/{rel}", stamp)
+                    info.compress_type = zipfile.ZIP_DEFLATED
+                    with open(self.blob_path(digest), "rb") as src, archive.open(info, "w") as dst:
+                        shutil.copyfileobj(src, dst)
+        return len(entries)
+
+    def gc(self, dry_run: bool = False, grace_seconds: float = GC_GRACE_SECONDS) -> GcReport:
+        """
+        Delete blobs that no stored run references.
+
+        Args:
+            dry_run: Only report what would be removed
+            grace_seconds: Keep unreferenced blobs modified this recently, since
+                a run being stored writes its blobs before its manifest
+        """
+        live = {digest for run in self.runs() for digest in run.files.values()}
+        report = GcReport()
+        if not self.blobs.is_dir():
+            return report
+        cutoff = time.time() - grace_seconds
+        for shard in self.blobs.iterdir():
+            for blob in shard.iterdir():
+                if blob.name.startswith("."):
+                    continue  # an in-progress atomic write
+                stat = blob.stat()
+                if shard.name + blob.name in live or stat.st_mtime > cutoff:
+                    report.kept += 1
+                    continue
+                if not dry_run:
+                    blob.unlink(missing_ok=True)
+                report.removed += 1
+                report.freed_bytes += stat.st_size
+            if not dry_run and not any(shard.iterdir()):
+                try:
+                    shard.rmdir()
+                except OSError:
+                    pass  # a blob is being written into it
+        return report
+
+    def stats(self) -> str:
+        runs = self.runs()
+        logical = sum(self.blob_path(d).stat().st_size for run in runs for d in run.files.values()
+                      if self.blob_path(d).exists())
+        stored = sum(p.stat().st_size for p in self.blobs.rglob("*") if p.is_file()) \
+            if self.blobs.is_dir() else 0
+        ratio = f", {logical / stored:.1f}x dedup" if stored else ""
+        return (f"Artifact store: {len(runs)} runs, {logical / 1024:.1f} KiB of files "
+                f"in {stored / 1024:.1f} KiB of blobs{ratio}")
+
+_shared: Optional[ArtifactStore] = None
+_shared_lock = threading.Lock()
+
+def get_artifact_store() -> ArtifactStore:
+    """Return the process-wide store at config.ARTIFACT_STORE_DIR."""
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            from config import ARTIFACT_STORE_DIR
+            _shared = ArtifactStore(Path(ARTIFACT_STORE_DIR))
+        return _shared
+
+def main(argv: Optional[List[str]] = None) -> None:
+    ap = argparse.ArgumentParser(description="Inspect, export and garbage-collect stored runs")
+    ap.add_argument("--root", help="Store directory (default: config.ARTIFACT_STORE_DIR)")
+    sub = ap.add_subparsers(dest="command", required=True)
+    sub.add_parser("runs", help="List stored runs")
+    sub.add_parser("stats", help="Show stored vs. logical size")
+    export = sub.add_parser("export", help="Stream a run as an archive")
+    export.add_argument("run_id")
+    export.add_argument("-o", "--output", default="-", help="Archive path, or '-' for stdout")
+    export.add_argument("--format", choices=FORMATS, help="Default: from the output name, else tar.gz")
+    checkout = sub.add_parser("checkout", help="Write a run's files to a directory")
+    checkout.add_argument("run_id")
+    checkout.add_argument("dest")
+    delete = sub.add_parser("delete", help="Forget a run (run gc afterwards to free its blobs)")
+    delete.add_argument("run_id")
+    gc = sub.add_parser("gc", help="Delete blobs no run references")
+    gc.add_argument("--dry-run", action="store_true")
+    gc.add_argument("--grace", type=float, default=GC_GRACE_SECONDS,
+                    help="Keep unreferenced blobs newer than this many seconds (default: %(default)s)")
+    args = ap.parse_args(argv)
+
+    store = ArtifactStore(Path(args.root)) if args.root else get_artifact_store()
+    try:
+        if args.command == "runs":
+            for run in store.runs():
+                when = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(run.created))
+                print(f"{run.run_id}  {when}  {len(run.files):4d} files  {run.meta.get('idea', '')[:60]}")
+        elif args.command == "stats":
+            print(store.stats())
+        elif args.command == "export":
+            fmt = args.format or ("zip" if args.output.endswith(".zip") else "tar.gz")
+            if args.output == "-":
+                count = store.export(args.run_id, sys.stdout.buffer, fmt)
+            else:
+                with open(args.output, "wb") as out:
+                    count = store.export(args.run_id, out, fmt)
+            print(f"Exported {count} files", file=sys.stderr)
+        elif args.command == "checkout":
+            print(f"Wrote {store.checkout(args.run_id, Path(args.dest))} files to {args.dest}")
+        elif args.command == "delete":
+            store.delete_run(args.run_id)
+        else:
+            report = store.gc(args.dry_run, args.grace)
+            print(("Would remove: " if args.dry_run else "") + str(report))
+    except KeyError as e:
+        ap.exit(1, f"Unknown run {e}\n")
+
+if __name__ == "__main__":
+    main()
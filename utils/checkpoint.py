@@ -0,0 +1,100 @@
+"""
+Per-phase checkpoints so an interrupted run can resume where it stopped.
+
+Each phase's output is saved under STATE_DIR/checkpoints/<idea hash>/ (or a
+hash of the idea and a scope such as a service job id) as soon as the phase
+completes, together with a fingerprint of everything that shaped
+it: prompts, model, generation mode and the fingerprints of the phases it
+consumed. On resume a checkpoint is reused only if its fingerprint still
+matches; otherwise the reason it went stale is reported and the phase reruns.
+"""
+import hashlib
+import json
+import time
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional
+
+from utils.engineer_output import atomic_write
+
+def idea_key(idea: str, scope: str = "") -> str:
+    text = idea.strip() + (f"\0{scope}" if scope else "")
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]
+
+def fingerprint(parts: Dict[str, Any]) -> str:
+    return hashlib.sha256(json.dumps(parts, sort_keys=True, default=str).encode("utf-8")).hexdigest()[:16]
+
+class PhaseCheckpoints:
+    """
+    Saved phase outputs for one idea.
+
+    Args:
+        root: Checkpoint root directory (config.CHECKPOINT_DIR)
+        idea: The idea being run
+        version: Global version; bumping it invalidates every checkpoint
+        resume: Reuse matching checkpoints (outputs are saved either way)
+        modes: Per-phase generation mode (e.g. staged engineer), part of the fingerprint
+        scope: Keeps these checkpoints apart from other runs of the same idea
+            (the service uses the job id, so only a retried job resumes)
+    """
+
+    def __init__(self, root: Path, idea: str, version: str = "1", resume: bool = False,
+                 modes: Optional[Dict[str, str]] = None, scope: str = ""):
+        self.dir = Path(root) / idea_key(idea, scope)
+        self.version = version
+        self.resume = resume
+        self.modes = dict(modes or {})
+        self.parts: Dict[str, Dict[str, Any]] = {}
+        self.fingerprints: Dict[str, str] = {}
+        self.reused: List[str] = []
+
+    def register(self, phase: str, parts: Dict[str, Any], deps: Any = ()) -> str:
+        """
+        Compute a phase's fingerprint from what shapes its output.
+
+        Args:
+            phase: Phase name
+            parts: Prompt text, model and settings, as a JSON-serializable dict
+            deps: Upstream phases (must be registered first); their
+                fingerprints are folded in so upstream changes cascade
+        """
+        parts = dict(parts, mode=self.modes.get(phase, ""), version=self.version,
+                     upstream={dep: self.fingerprints[dep] for dep in deps})
+        self.parts[phase] = parts
+        self.fingerprints[phase] = fingerprint(parts)
+        return self.fingerprints[phase]
+
+    def _path(self, phase: str) -> Path:
+        return self.dir / f"{phase}.json"
+
+    def load(self, phase: str) -> Optional[SimpleNamespace]:
+        """Saved output for `phase` if resuming and still valid, else None (reporting why)."""
+        if not self.resume:
+            return None
+        try:
+            saved = json.loads(self._path(phase).read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+        if saved.get("fingerprint") != self.fingerprints.get(phase):
+            old = saved.get("parts", {})
+            changed = sorted(k for k in set(old) | set(self.parts.get(phase, {}))
+                             if old.get(k) != self.parts.get(phase, {}).get(k))
+            print(f"Checkpoint for {phase} is stale ({', '.join(changed) or 'fingerprint'} changed); rerunning")
+            return None
+        self.reused.append(phase)
+        return SimpleNamespace(raw=saved["raw"], handoff=saved.get("handoff"), files=saved.get("files"))
+
+    def save(self, phase: str, output: Any) -> None:
+        """Persist a completed phase's output (raw text plus any structured hand-off or repaired files)."""
+        if phase not in self.fingerprints:
+            return
+        record = {
+            "fingerprint": self.fingerprints[phase],
+            "parts": self.parts[phase],
+            "saved_at": time.time(),
+            "raw": getattr(output, "raw", None) or str(output),
+            "handoff": getattr(output, "handoff", None),
+            "files": getattr(output, "files", None),
+        }
+        self.dir.mkdir(parents=True, exist_ok=True)
+        atomic_write(self._path(phase), json.dumps(record).encode("utf-8"))
@@ -2,15 +2,175 @@
 Utilities for processing engineer output from the AI Startup Simulator.
 Handles JSON extraction, content normalization, and file writing.
 """
+import hashlib
 import json
+import os
+import posixpath
 import re
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Any, Dict, Union
+from typing import Any, Dict, List, Optional, Union
+
+from utils.json_stream import JsonObjectStream
+
+# Decoder for whole objects; non-strict like JsonObjectStream (models emit raw newlines in strings)
+_DECODER = json.JSONDecoder(strict=False)
+
+# Opening fence of a Markdown code block plus its language tag
+_FENCE = re.compile(r"```[\w.+-]*\s*")
+
+# Next top-level `, "key":` after a malformed entry
+_NEXT_KEY = re.compile(r',\s*"(?:[^"\\\n]|\\.){1,1024}"\s*:')
+# Any `"key":` in the text skipped to get there (e.g. an entry after a missing comma)
+_SKIPPED_KEY = re.compile(r'"((?:[^"\\\n]|\\.){1,1024})"\s*:')
+
+# Prose before the object may contain braces; at most this many '{' are tried
+MAX_OBJECT_STARTS = 16
+
+_WHITESPACE = re.compile(r"\s*")
+
+@dataclass
+class JsonExtraction:
+    """A JSON value found in model output, and what had to be dropped to get it."""
+    value: Any
+    dropped: List[str] = field(default_factory=list)
+    truncated: bool = False
+    errors: int = 0
+
+    @property
+    def repaired(self) -> bool:
+        """True if the object wasn't valid JSON as a whole."""
+        return self.truncated or self.errors > 0
+
+    def summary(self) -> str:
+        how = ", ".join(filter(None, ["truncated" if self.truncated else "",
+                                      f"{self.errors} malformed entries" if self.errors else ""]))
+        dropped = f"; dropped: {', '.join(self.dropped)}" if self.dropped else ""
+        return f"repaired ({how}): recovered {len(self.value)} entries{dropped}"
+
+def _object_starts(raw: str):
+    """Candidate offsets of the object: a fenced block's JSON first, then each '{' in turn."""
+    seen = set()
+    fence = raw.find("```")
+    if fence >= 0:
+        body = _FENCE.match(raw, fence).end()
+        if body < len(raw) and raw[body] in "{[":
+            seen.add(body)
+            yield body
+    pos = raw.find("{")
+    while pos >= 0 and len(seen) < MAX_OBJECT_STARTS:
+        if pos not in seen:
+            seen.add(pos)
+            yield pos
+        pos = raw.find("{", pos + 1)
+
+def _repair(raw: str, start: int) -> Optional[JsonExtraction]:
+    """
+    Recover the complete entries of a truncated or malformed object at `start`.
+
+    Entries are decoded one at a time until the text ends or breaks; after a
+    break, decoding resumes at the next top-level key. Entries that were cut
+    off or malformed, and any skipped over to resume, are named in `dropped`.
+    Returns None if `start` doesn't begin an object at all (e.g. a brace in
+    prose).
+    """
+    result = JsonExtraction({})
+    end = len(raw.rstrip())
+    pos, key, last = start + 1, None, None
+
+    def skip(p: int) -> int:
+        return _WHITESPACE.match(raw, p).end()
+
+    while True:
+        error_pos = pos
+        try:
+            pos = skip(pos)
+            if raw[pos] == "}":
+                break
+            error_pos = pos
+            key, pos = _DECODER.raw_decode(raw, pos)
+            if not isinstance(key, str) or raw[skip(pos)] != ":":
+                raise ValueError("not a key")
+            value, pos = _DECODER.raw_decode(raw, skip(skip(pos) + 1))
+            result.value[key], last, key = value, key, None
+            pos = skip(pos)
+            error_pos = pos
+            if raw[pos] == "}":
+                break
+            if raw[pos] != ",":
+                raise ValueError("missing comma")
+            pos += 1
+            last = None
+        except (IndexError, ValueError) as e:
+            if isinstance(e, json.JSONDecodeError):
+                error_pos = e.pos
+            if key is None and last is None and not result.value and not result.errors:
+                return None
+            truncated = isinstance(e, IndexError) or error_pos >= end or (
+                isinstance(e, json.JSONDecodeError) and e.msg.startswith("Unterminated string"))
+            if last is not None and not truncated:
+                # A stray quote ended the last string early; its content is incomplete
+                result.value.pop(last)
+                key = last
+            if key is not None:
+                result.dropped.append(key)
+            if truncated:
+                result.truncated = True
+                break
+            result.errors += 1
+            resync = _NEXT_KEY.search(raw, max(error_pos, start + 1))
+            skipped = raw[max(error_pos, start + 1):resync.start() if resync else end]
+            for match in _SKIPPED_KEY.finditer(skipped):
+                name = json.loads(f'"{match.group(1)}"')
+                if name not in result.dropped:
+                    result.dropped.append(name)
+            if resync is None:
+                break
+            pos, key, last = resync.start() + 1, None, None
+    return result
+
+def scan_json_object(raw: str) -> JsonExtraction:
+    """
+    Find the outermost JSON object in model output in linear time.
+
+    A fenced ```json block is preferred, otherwise the first '{' that starts
+    an object is used; text around it is ignored. A complete object is decoded
+    in one pass. If it is truncated (the model hit its token limit) or has a
+    malformed entry, every complete "key": value entry is still recovered and
+    the lost keys are reported in `dropped`.
+
+    Args:
+        raw: Raw model output
+
+    Returns:
+        JsonExtraction with the decoded value
+
+    Raises:
+        ValueError: If no JSON object is found
+    """
+    error: Optional[json.JSONDecodeError] = None
+    for start in _object_starts(raw):
+        try:
+            return JsonExtraction(_DECODER.raw_decode(raw, start)[0])
+        except json.JSONDecodeError as e:
+            error = error or e
+        if raw[start] == "{":
+            repaired = _repair(raw, start)
+            if repaired is not None:
+                return repaired
+    if error is None:
+        raise ValueError("No JSON object found in the engineer output")
+    raise ValueError(f"Found JSON-like content but couldn't parse: {error}")
 
 def extract_json_object(raw: str) -> dict:
     """
     Find the first JSON object in a raw string.
-    
+
+    Truncated or partly malformed objects are repaired as far as possible;
+    use scan_json_object to also learn which entries were dropped.
+
     Args:
         raw: Raw string that might contain a JSON object
         
@@ -20,27 +180,7 @@ def extract_json_object(raw: str) -> dict:
     Raises:
         ValueError: If no valid JSON object is found
     """
-    # Try to find JSON between code fences
-    code_block_pattern = r'```(?:json)?\s*([\s\S]*?)\s*```'
-    match = re.search(code_block_pattern, raw)
-    if match:
-        json_str = match.group(1)
-        try:
-            return json.loads(json_str)
-        except json.JSONDecodeError as e:
-            raise ValueError(f"Found code block but couldn't parse as JSON: {e}")
-    
-    # Try to find raw JSON object with curly braces
-    object_pattern = r'(\{[\s\S]*\})'
-    match = re.search(object_pattern, raw)
-    if match:
-        json_str = match.group(1)
-        try:
-            return json.loads(json_str)
-        except json.JSONDecodeError as e:
-            raise ValueError(f"Found JSON-like content but couldn't parse: {e}")
-    
-    raise ValueError("No JSON object found in the engineer output")
+    return scan_json_object(raw).value
 
 def normalize_file_content(path: str, val: Any) -> str:
     """
@@ -71,28 +211,241 @@ def normalize_file_content(path: str, val: Any) -> str:
     # Fall back to string representation for any other type
     return str(val)
 
-def write_files(base_dir: Path, files: Dict[str, Any]) -> int:
+@dataclass
+class WriteReport:
+    """Outcome of writing a generated project to disk."""
+    written: int = 0
+    skipped: int = 0
+    removed: int = 0
+    rejected: List[str] = field(default_factory=list)  # paths outside the output directory
+
+    @property
+    def total(self) -> int:
+        """Number of files present in the project after the write."""
+        return self.written + self.skipped
+
+    def __str__(self) -> str:
+        text = f"{self.written} written, {self.skipped} unchanged, {self.removed} removed"
+        return text + (f", {len(self.rejected)} rejected" if self.rejected else "")
+
+def safe_relpath(path: Any) -> Optional[str]:
     """
-    Write files to the filesystem with normalized content.
-    
+    Normalize a generated file path, or return None if it could leave the project.
+
+    Paths come from model output, so absolute paths, drive letters and any
+    `..` component are rejected rather than repaired.
+    """
+    raw = str(path).strip().replace("\\", "/")
+    if not raw or raw.startswith("/") or re.match(r"[A-Za-z]:", raw) or ".." in raw.split("/"):
+        return None
+    rel = posixpath.normpath(raw)
+    return None if rel == "." else rel
+
+def _inside(base_dir: Path, rel: str) -> Optional[Path]:
+    """`base_dir / rel` if it resolves (symlinks included) to a path under base_dir, else None."""
+    if safe_relpath(rel) != rel:
+        return None
+    full_path = base_dir / rel
+    root = base_dir.resolve()
+    return full_path if root in full_path.resolve().parents else None
+
+def manifest_path(base_dir: Path) -> Path:
+    """Manifest (path -> content hash) stored next to the output directory."""
+    base_dir = Path(base_dir)
+    return base_dir.parent / f"{base_dir.name}.manifest.json"
+
+def load_manifest(base_dir: Path) -> Dict[str, str]:
+    try:
+        return json.loads(manifest_path(base_dir).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+
+def save_manifest(base_dir: Path, manifest: Dict[str, str]) -> None:
+    path = manifest_path(base_dir)
+    atomic_write(path, json.dumps(manifest, indent=2, sort_keys=True).encode("utf-8"))
+
+def content_hash(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+def atomic_write(path: Path, data: bytes) -> None:
+    """Write bytes via a temp file in the same directory and rename it into place."""
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as fh:
+            fh.write(data)
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+
+def _is_unchanged(full_path: Path, data: bytes, digest: str, old: Dict[str, str], rel: str) -> bool:
+    if old.get(rel) != digest:
+        return False
+    try:
+        return full_path.stat().st_size == len(data)
+    except OSError:
+        return False
+
+def _remove_stale(base_dir: Path, stale: List[str]) -> int:
+    removed = 0
+    for rel in stale:
+        full_path = _inside(base_dir, rel)
+        if full_path is None:
+            continue  # never delete outside the output directory, whatever the manifest says
+        try:
+            full_path.unlink()
+            removed += 1
+        except FileNotFoundError:
+            continue
+        # Drop directories the removal left empty, up to base_dir
+        parent = full_path.parent
+        while parent != base_dir and base_dir in parent.parents:
+            try:
+                parent.rmdir()
+            except OSError:
+                break
+            parent = parent.parent
+    return removed
+
+def write_files(base_dir: Path, files: Dict[str, Any], max_workers: int = 8) -> WriteReport:
+    """
+    Incrementally write files to the filesystem with normalized content.
+
+    A manifest of content hashes next to `base_dir` lets unchanged files be
+    skipped (keeping their mtimes), files missing from `files` that an earlier
+    run wrote be removed, and changed files be written in parallel with
+    temp-file + rename so a crash never leaves a half-written file.
+
     Args:
         base_dir: Base directory to write files to
         files: Dictionary of file paths to content
-        
+        max_workers: Threads used to write changed files
+
     Returns:
-        Number of files written
+        WriteReport with written/skipped/removed counts
     """
-    count = 0
-    
-    for file_path, content in files.items():
-        full_path = base_dir / file_path
-        
-        # Create parent directories if they don't exist
-        full_path.parent.mkdir(parents=True, exist_ok=True)
-        
-        # Normalize the content and write to file
-        normalized_content = normalize_file_content(file_path, content)
-        full_path.write_text(normalized_content, encoding="utf-8")
-        count += 1
-    
-    return count
\ No newline at end of file
+    base_dir = Path(base_dir)
+    old = load_manifest(base_dir)
+    manifest: Dict[str, str] = {}
+    report = WriteReport()
+    pending = []
+
+    for raw_path, content in files.items():
+        file_path = safe_relpath(raw_path)
+        full_path = _inside(base_dir, file_path) if file_path is not None else None
+        if full_path is None:
+            report.rejected.append(str(raw_path))
+            continue
+        data = normalize_file_content(file_path, content).encode("utf-8")
+        digest = content_hash(data)
+        manifest[file_path] = digest
+        if _is_unchanged(full_path, data, digest, old, file_path):
+            report.skipped += 1
+        else:
+            pending.append((full_path, data))
+
+    # Create each directory once instead of once per file
+    for directory in sorted({full_path.parent for full_path, _ in pending}):
+        directory.mkdir(parents=True, exist_ok=True)
+
+    if len(pending) > 1 and max_workers > 1:
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            list(pool.map(lambda item: atomic_write(*item), pending))
+    else:
+        for item in pending:
+            atomic_write(*item)
+    report.written = len(pending)
+
+    report.removed = _remove_stale(base_dir, [rel for rel in old if rel not in manifest])
+    base_dir.mkdir(parents=True, exist_ok=True)
+    save_manifest(base_dir, manifest)
+    return report
+
+class StreamingFileWriter:
+    """
+    Write engineer files to disk while the model output is still streaming.
+
+    Feed raw token text with `feed`; every "path": "content" pair is normalized
+    and written as soon as its value closes, so only one file is held in memory.
+    Like write_files, unchanged files are skipped using the manifest and
+    changed ones are replaced atomically; call `finish` once the stream is
+    complete to remove stale files and save the new manifest.
+    """
+
+    def __init__(self, base_dir: Path):
+        self.base_dir = Path(base_dir)
+        self.paths: List[str] = []
+        self.error: Optional[str] = None
+        self.report = WriteReport()
+        self._stream = JsonObjectStream()
+        self._old = load_manifest(self.base_dir)
+        self._manifest: Dict[str, str] = {}
+
+    @property
+    def count(self) -> int:
+        """Number of files received so far (written or unchanged)."""
+        return len(self.paths)
+
+    @property
+    def complete(self) -> bool:
+        """True once the closing brace of the JSON object has been seen."""
+        return self._stream.done
+
+    def reset(self) -> None:
+        """Start parsing a fresh response (e.g. when the agent retries)."""
+        self._stream.reset()
+        self.error = None
+        self.paths = []
+        self.report = WriteReport()
+        self._manifest = {}
+
+    def feed(self, chunk: str) -> int:
+        """
+        Parse the next chunk of model output and write any completed files.
+
+        Args:
+            chunk: Next slice of streamed text
+
+        Returns:
+            Number of files written (not skipped) from this chunk; malformed output stops
+            streaming and is recorded in `error` until the next reset
+        """
+        if self.error is not None:
+            return 0
+        entries: List[Any] = []
+        try:
+            self._stream.feed(chunk, entries)
+        except ValueError as e:
+            self.error = str(e)
+
+        written = 0
+        for raw_path, content in entries:
+            file_path = safe_relpath(raw_path)
+            full_path = _inside(self.base_dir, file_path) if file_path is not None else None
+            if full_path is None:
+                self.report.rejected.append(str(raw_path))
+                continue
+            data = normalize_file_content(file_path, content).encode("utf-8")
+            digest = content_hash(data)
+            if _is_unchanged(full_path, data, digest, self._old, file_path):
+                self.report.skipped += 1
+            else:
+                full_path.parent.mkdir(parents=True, exist_ok=True)
+                atomic_write(full_path, data)
+                self.report.written += 1
+                written += 1
+            self._manifest[file_path] = digest
+            self.paths.append(file_path)
+        return written
+
+    def finish(self) -> WriteReport:
+        """Remove files dropped since the last run and persist the manifest."""
+        if self.complete:
+            stale = [rel for rel in self._old if rel not in self._manifest]
+            self.report.removed = _remove_stale(self.base_dir, stale)
+            self.base_dir.mkdir(parents=True, exist_ok=True)
+            save_manifest(self.base_dir, self._manifest)
+        return self.report
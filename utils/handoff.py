@@ -0,0 +1,202 @@
+"""
+Structured hand-off between pipeline phases.
+
+A phase's free-form output is parsed into its Pydantic schema (repairing
+common deviations, or re-asking the model once), trimmed to a token budget,
+and only that compact JSON is passed to downstream prompts.
+"""
+import re
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Tuple, Type
+
+from pydantic import BaseModel, ValidationError
+
+from schemas import ResearchSpec, ReviewResult
+from utils.engineer_output import extract_json_object
+from utils.review import estimate_tokens, parse_review
+from utils.tracing import span
+
+# Shortest an item is trimmed to when fitting a budget
+MIN_ITEM_CHARS = 60
+
+RESEARCH_REASK = (
+    "Rewrite the research below as one JSON object with exactly these keys:\n"
+    '- "pain_points": 3-5 short strings\n'
+    '- "competitors": exactly 3 strings formatted "Name - URL"\n'
+    '- "requirements": 3-5 short, actionable strings\n'
+    "Output ONLY the JSON object.\n\nResearch:\n"
+)
+
+# Markdown heading keywords -> ResearchSpec field
+_SECTIONS = (("pain", "pain_points"), ("problem", "pain_points"), ("compet", "competitors"),
+             ("alternative", "competitors"), ("require", "requirements"), ("spec", "requirements"),
+             ("feature", "requirements"))
+_HEADING = re.compile(r"^\s*(?:#{1,6}\s*|\*\*)(.+?)(?:\*\*)?:?\s*$")
+_ITEM = re.compile(r"^\s*(?:[-*+•]|\d+[.)])\s+(.*\S)")
+# ReAct scaffolding left in front of an agent's answer ("Thought: ...\nFinal Answer: ## Pain points")
+_REACT_PREFIX = re.compile(r"\A\s*(?:Thought:.*?)?Final Answer:[ \t]*", re.S)
+
+def _limits(model: Type[BaseModel], name: str) -> Tuple[int, Optional[int]]:
+    """(min, max) item counts declared on a list field."""
+    low, high = 0, None
+    for meta in model.model_fields[name].metadata:
+        low = getattr(meta, "min_length", None) or low
+        high = getattr(meta, "max_length", None) or high
+    return low, high
+
+def _markdown_lists(text: str) -> Dict[str, List[str]]:
+    """Bulleted items grouped under ResearchSpec fields by their section heading."""
+    lists: Dict[str, List[str]] = {}
+    current: Optional[str] = None
+    for line in text.splitlines():
+        heading = _HEADING.match(line)
+        item = _ITEM.match(line)
+        if heading and not item:
+            title = heading.group(1).lower()
+            current = next((field for key, field in _SECTIONS if key in title), None)
+        elif item and current:
+            lists.setdefault(current, []).append(item.group(1).strip("* "))
+    return lists
+
+def parse_research(text: str) -> Tuple[ResearchSpec, bool]:
+    """
+    Read a ResearchSpec from the research phase's output.
+
+    Tries the JSON object the agent is asked for first; failing that, lists are
+    recovered from JSON with the wrong item counts or from markdown sections,
+    and clamped to the schema's limits. A leading ReAct "Thought: ... Final
+    Answer:" is ignored.
+
+    Returns:
+        (spec, repaired) where repaired is True if the output needed fixing
+
+    Raises:
+        ValueError: If no valid spec can be recovered
+    """
+    text = _REACT_PREFIX.sub("", text, count=1)
+    try:
+        data = extract_json_object(text)
+    except ValueError:
+        data = None
+    if isinstance(data, dict):
+        try:
+            return ResearchSpec.model_validate(data), False
+        except ValidationError:
+            pass
+    error: Optional[ValidationError] = None
+    for candidate in ([data] if isinstance(data, dict) else []) + [_markdown_lists(text)]:
+        fields = {}
+        for name in ResearchSpec.model_fields:
+            items = candidate.get(name) or []
+            items = [str(i).strip() for i in (items if isinstance(items, list) else [items]) if str(i).strip()]
+            _, high = _limits(ResearchSpec, name)
+            fields[name] = items[:high] if high else items
+        try:
+            return ResearchSpec.model_validate(fields), True
+        except ValidationError as e:
+            error = e
+    raise ValueError(f"Research output doesn't match ResearchSpec: {error.error_count()} errors")
+
+def _trim(item: str, length: int) -> str:
+    cut = item[:length].rsplit(" ", 1)[0] if " " in item[:length] else item[:length]
+    return cut.rstrip(" ,;:") + "…"
+
+def fit_budget(value: BaseModel, max_tokens: int) -> BaseModel:
+    """
+    Shrink a model's list fields until its JSON fits `max_tokens`.
+
+    The longest items are shortened first (down to MIN_ITEM_CHARS), then
+    surplus items beyond each field's minimum count are dropped.
+    """
+    data = value.model_dump()
+    lists = [name for name, v in data.items() if isinstance(v, list)]
+
+    def size() -> int:
+        return estimate_tokens(type(value).model_validate(data).model_dump_json())
+
+    while size() > max_tokens:
+        longest = max(((name, i) for name in lists for i, item in enumerate(data[name])
+                       if isinstance(item, str) and len(item) > MIN_ITEM_CHARS + 1),
+                      key=lambda ni: len(data[ni[0]][ni[1]]), default=None)
+        if longest is None:
+            break
+        name, i = longest
+        item = data[name][i]
+        # The ellipsis adds a character, so always cut at least two
+        data[name][i] = _trim(item, min(len(item) - 2, max(MIN_ITEM_CHARS, len(item) * 3 // 4)))
+    for name in lists:
+        low, _ = _limits(type(value), name)
+        while size() > max_tokens and len(data[name]) > low:
+            data[name].pop()
+    return type(value).model_validate(data)
+
+@dataclass
+class Handoff:
+    """A phase output reduced to its schema for downstream prompts."""
+    phase: str
+    value: BaseModel
+    text: str
+    tokens_before: int
+    tokens_after: int
+    repaired: bool = False
+    reasked: bool = False
+
+    def summary(self) -> str:
+        how = " (re-asked)" if self.reasked else " (repaired)" if self.repaired else ""
+        return f"Hand-off {self.phase}: {self.tokens_before} -> {self.tokens_after} prompt tokens{how}"
+
+def hand_off(
+    phase: str,
+    text: str,
+    parse: Callable[[str], Tuple[BaseModel, bool]],
+    max_tokens: int,
+    reask: Optional[Callable[[str], str]] = None,
+    reask_prompt: str = "",
+) -> Handoff:
+    """
+    Validate one phase's output and compact it for the next phases.
+
+    Args:
+        phase: Phase name, for reporting
+        text: Raw phase output
+        parse: Returns (model, repaired) or raises ValueError
+        max_tokens: Budget for the compact JSON passed downstream
+        reask: Optional model call used once if parsing fails
+        reask_prompt: Instruction prepended to `text` when re-asking
+
+    Returns:
+        Handoff with the validated value and its compact JSON
+
+    Raises:
+        ValueError: If the output can't be parsed even after re-asking
+    """
+    with span("handoff", phase=phase) as s:
+        reasked = False
+        try:
+            value, repaired = parse(text)
+        except ValueError:
+            if reask is None:
+                raise
+            reasked = True
+            value, repaired = parse(reask(reask_prompt + text))
+        value = fit_budget(value, max_tokens)
+        compact = value.model_dump_json()
+        result = Handoff(phase, value, compact, estimate_tokens(text), estimate_tokens(compact),
+                         repaired, reasked)
+        s.set(tokens_before=result.tokens_before, tokens_after=result.tokens_after,
+              repaired=repaired, reasked=reasked)
+    return result
+
+def research_handoff(text: str, max_tokens: int, reask: Optional[Callable[[str], str]] = None) -> Handoff:
+    """Hand-off for the research phase: markdown or JSON -> compact ResearchSpec."""
+    return hand_off("research", text, parse_research, max_tokens, reask, RESEARCH_REASK)
+
+def review_handoff(text: str, max_tokens: int) -> Handoff:
+    """Hand-off for the critic phase: any review text -> compact ReviewResult."""
+    def parse(raw: str) -> Tuple[ReviewResult, bool]:
+        try:
+            return ReviewResult.model_validate(extract_json_object(raw)), False
+        except ValueError:
+            # Plain-text verdicts and malformed JSON
+            return parse_review(raw), True
+    return hand_off("critic", text, parse, max_tokens)
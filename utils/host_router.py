@@ -0,0 +1,399 @@
+"""
+Latency-aware routing of model calls across several Ollama hosts.
+
+Each host advertises the models it serves. For every call the router picks,
+among the healthy hosts serving the model, the one with the lowest expected
+completion time: its queue (requests in flight) times an EWMA of recent
+service time for that model, which is time to first token plus the model's
+typical output length at the host's recent tokens/sec. Failures put a host
+into exponential backoff (passive health checking); once the backoff expires
+a single probe request is let through before the host takes full traffic
+again. A host answering 404 for a model is left out for that model until
+`recheck` seconds have passed (it may have been pulled since). Calls sharing
+a system prompt prefer the host that last served it: that host likely still
+holds the prompt's prefill in its KV cache, so its expected time is reduced
+by the host's recent prefill time. Every decision is traced as a 'route'
+span and kept in `decisions`.
+
+Routing happens in an httpx transport, so any ollama.Client (and ChatOllama,
+through its client kwargs) can use it; the model is read from each request.
+"""
+import hashlib
+import json
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Callable, Deque, Dict, Iterator, List, Optional, Set
+
+import httpx
+from ollama import ResponseError
+
+from utils.tracing import span
+
+# HTTP statuses that say nothing about the host's health
+_CLIENT_ERRORS = range(400, 500)
+# System prompts remembered per host (roughly the server's KV cache slots)
+PREFIX_SLOTS = 4
+
+@dataclass
+class HostSpec:
+    """One Ollama host and the models it serves (None: any model)."""
+    url: str
+    models: Optional[Set[str]] = None
+
+def parse_hosts(spec: str) -> List[HostSpec]:
+    """
+    Parse OLLAMA_HOSTS: `url[=model,model...]` entries separated by ';' or whitespace.
+
+    Example:
+        "http://gpu1:11434=qwen2.5-coder:7b-instruct-q5_1;http://gpu2:11434"
+    """
+    hosts = []
+    for entry in spec.replace(";", " ").split():
+        url, _, models = entry.partition("=")
+        names = {m.strip() for m in models.split(",") if m.strip()}
+        hosts.append(HostSpec(url.rstrip("/"), names or None))
+    return hosts
+
+def _ewma(old: Optional[float], value: float, alpha: float) -> float:
+    return value if old is None else alpha * value + (1 - alpha) * old
+
+def _field(response: Any, name: str) -> Any:
+    value = getattr(response, name, None)
+    if value is None and isinstance(response, dict):
+        value = response.get(name)
+    return value
+
+@dataclass
+class ModelStats:
+    """Recent performance of one model on one host."""
+    ttft: Optional[float] = None     # seconds until generation starts (queueing, load, prefill)
+    prefill: Optional[float] = None  # server-reported prompt evaluation seconds
+    tps: Optional[float] = None      # generated tokens per second
+    seconds: Optional[float] = None  # whole-call wall time
+    samples: int = 0
+
+@dataclass
+class HostState:
+    """Router-side view of one host."""
+    url: str
+    models: Optional[Set[str]]
+    in_flight: int = 0
+    failures: int = 0
+    down_until: float = 0.0
+    requests: int = 0
+    errors: int = 0
+    unsupported: Dict[str, float] = field(default_factory=dict)  # model -> time to ask again
+    stats: Dict[str, ModelStats] = field(default_factory=dict)
+    prefixes: Deque[str] = field(default_factory=lambda: deque(maxlen=PREFIX_SLOTS))
+
+    def serves(self, model: str, now: float) -> bool:
+        if self.unsupported.get(model, now) > now:
+            return False
+        return self.models is None or model in self.models
+
+@dataclass
+class RouteDecision:
+    """Why a call went where it did."""
+    model: str
+    host: str
+    expected: float
+    candidates: Dict[str, float]
+    at: float
+
+class HostRouter:
+    """
+    Pick a host per call and learn from the outcome.
+
+    Args:
+        hosts: Hosts and the models they serve
+        alpha: EWMA weight of the newest sample
+        backoff: Seconds a host is avoided after its first failure; doubles per
+            consecutive failure
+        max_backoff: Upper bound for the backoff
+        recheck: Seconds before a host that answered 404 for a model is tried
+            with it again
+        transport_factory: Builds the HTTP transport for one host; defaults
+            to httpx.HTTPTransport (a connection pool per host)
+        clock: Monotonic time source (injectable for tests)
+    """
+
+    def __init__(self, hosts: List[HostSpec], alpha: float = 0.3, backoff: float = 1.0,
+                 max_backoff: float = 60.0, recheck: float = 300.0,
+                 transport_factory: Optional[Callable[[], httpx.BaseTransport]] = None,
+                 clock: Callable[[], float] = time.monotonic):
+        if not hosts:
+            raise ValueError("HostRouter needs at least one host")
+        self.hosts = [HostState(h.url, set(h.models) if h.models else None) for h in hosts]
+        self.alpha = alpha
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.recheck = recheck
+        self.clock = clock
+        self.decisions: Deque[RouteDecision] = deque(maxlen=1000)
+        self._tokens: Dict[str, float] = {}  # EWMA of completion tokens per model
+        self._lock = threading.Lock()
+        self._transport = RoutedTransport(self, transport_factory)
+
+    def transport(self) -> "RoutedTransport":
+        """The shared routing transport, for any httpx-based Ollama client."""
+        return self._transport
+
+    def client(self, model: str = "") -> Any:
+        """An ollama.Client whose chat/generate calls are routed per call (the model comes from each call)."""
+        from ollama import Client
+        return Client(host=self.hosts[0].url, transport=self._transport)
+
+    def expected_seconds(self, host: HostState, model: str) -> float:
+        """Expected completion time of one more `model` call on `host` (lock held)."""
+        stats = host.stats.get(model)
+        if stats is None or stats.samples == 0:
+            # Untried hosts look free so each one gets measured
+            return 0.0
+        return (host.in_flight + 1) * self._service(stats, model)
+
+    def _service(self, stats: ModelStats, model: str) -> float:
+        tokens = self._tokens.get(model)
+        if stats.tps and stats.ttft is not None and tokens is not None:
+            return stats.ttft + tokens / stats.tps
+        return stats.seconds or 0.0
+
+    def acquire(self, model: str, exclude: Set[str] = frozenset(), prefix: Optional[str] = None) -> HostState:
+        """
+        Choose a host for one `model` call and count it as in flight.
+
+        Healthy hosts are preferred; a host whose backoff has expired takes a
+        single probe request at a time. If every host serving the model is
+        backing off, the one that recovers soonest is used. A host that
+        recently served `prefix` (a key of the call's system prompt) is
+        credited with the prefill time its cache saves.
+
+        Raises:
+            LookupError: If no host serves `model`
+        """
+        with span("route", model=model) as s, self._lock:
+            now = self.clock()
+            serving = [h for h in self.hosts if h.serves(model, now) and h.url not in exclude]
+            if not serving:
+                raise LookupError(f"No Ollama host serves {model}")
+            healthy = [h for h in serving if h.down_until <= now and not (h.failures and h.in_flight)]
+            candidates = {h.url: self.expected_seconds(h, model) for h in healthy}
+            warm = [h for h in healthy if prefix is not None and prefix in h.prefixes]
+            for h in warm:
+                saved = h.stats[model].prefill if model in h.stats else None
+                candidates[h.url] = max(0.0, candidates[h.url] - (saved or 0.0))
+            if healthy:
+                host = min(healthy, key=lambda h: (candidates[h.url], h.in_flight))
+            else:
+                host = min(serving, key=lambda h: h.down_until)
+            host.in_flight += 1
+            host.requests += 1
+            if prefix is not None:
+                if prefix in host.prefixes:
+                    host.prefixes.remove(prefix)
+                host.prefixes.append(prefix)
+            expected = candidates.get(host.url, self.expected_seconds(host, model))
+            self.decisions.append(RouteDecision(model, host.url, expected, candidates, now))
+            s.set(host=host.url, expected_ms=round(expected * 1000, 1), healthy=len(healthy),
+                  candidates={url: round(sec * 1000, 1) for url, sec in candidates.items()},
+                  prefix_warm=any(h is host for h in warm))
+            return host
+
+    def release(self, host: HostState, model: str, seconds: float, response: Any = None,
+                error: Optional[BaseException] = None, completed: bool = True) -> None:
+        """
+        Record the outcome of a call started with `acquire`.
+
+        Args:
+            host: The host returned by acquire
+            model: Model the call ran on
+            seconds: Wall time of the call
+            response: Final response (carries eval_count/eval_duration)
+            error: The exception if the call failed
+            completed: False if the caller abandoned a stream; only the in-flight count changes
+        """
+        with self._lock:
+            host.in_flight -= 1
+            if not completed:
+                return
+            if error is not None:
+                host.errors += 1
+                status = getattr(error, "status_code", None)
+                if status == 404:
+                    # The host doesn't have the model; stop sending it there for a while
+                    host.unsupported[model] = self.clock() + self.recheck
+                elif status not in _CLIENT_ERRORS:
+                    host.failures += 1
+                    delay = min(self.max_backoff, self.backoff * 2 ** (host.failures - 1))
+                    host.down_until = self.clock() + delay
+                return
+            host.failures = 0
+            host.down_until = 0.0
+            stats = host.stats.setdefault(model, ModelStats())
+            stats.samples += 1
+            stats.seconds = _ewma(stats.seconds, seconds, self.alpha)
+            tokens = _field(response, "eval_count") or 0
+            eval_seconds = (_field(response, "eval_duration") or 0) / 1e9
+            prefill = _field(response, "prompt_eval_duration")
+            if prefill is not None:
+                stats.prefill = _ewma(stats.prefill, prefill / 1e9, self.alpha)
+            if tokens and eval_seconds:
+                stats.tps = _ewma(stats.tps, tokens / eval_seconds, self.alpha)
+                stats.ttft = _ewma(stats.ttft, max(0.0, seconds - eval_seconds), self.alpha)
+                self._tokens[model] = _ewma(self._tokens.get(model), tokens, self.alpha)
+
+    @staticmethod
+    def retryable(error: BaseException) -> bool:
+        """Whether another host might succeed where this one failed (a bad request won't)."""
+        status = getattr(error, "status_code", None)
+        return status == 404 or status not in _CLIENT_ERRORS
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        """Per-host state for reporting."""
+        with self._lock:
+            now = self.clock()
+            return [{
+                "url": h.url, "in_flight": h.in_flight, "requests": h.requests, "errors": h.errors,
+                "backoff_s": round(max(0.0, h.down_until - now), 2),
+                "models": {m: {"seconds": s.seconds, "ttft": s.ttft, "prefill": s.prefill, "tps": s.tps,
+                               "samples": s.samples}
+                           for m, s in h.stats.items()},
+            } for h in self.hosts]
+
+    def stats(self) -> str:
+        lines = []
+        for h in self.snapshot():
+            state = f"backing off {h['backoff_s']}s" if h["backoff_s"] else "up"
+            speed = ", ".join(f"{m} {s['seconds'] * 1000:.0f}ms" + (f" {s['tps']:.0f} tok/s" if s["tps"] else "")
+                              for m, s in h["models"].items() if s["seconds"] is not None)
+            lines.append(f"  {h['url']}: {h['requests']} requests, {h['errors']} errors, {state}"
+                         + (f"; {speed}" if speed else ""))
+        return "Hosts:\n" + "\n".join(lines)
+
+class RoutedTransport(httpx.BaseTransport):
+    """
+    httpx transport that sends each Ollama generation request to the host the router picks.
+
+    The model is read from the request body, so routing, statistics and 404s
+    are about the model the call actually asked for. A request that fails
+    before any output (connection error, 5xx, or 404 from a host without the
+    model) is retried on the next best host. A response stays counted as in
+    flight until its body has been read or closed. Other endpoints (ps,
+    show, tags, ...) go to the first host.
+    """
+
+    def __init__(self, router: HostRouter, transport_factory: Optional[Callable[[], httpx.BaseTransport]] = None):
+        self.router = router
+        factory = transport_factory or httpx.HTTPTransport
+        self._transports = {h.url: factory() for h in router.hosts}
+
+    @staticmethod
+    def _prefix(body: Dict[str, Any]) -> Optional[str]:
+        """Key of the call's system prompt, the part of the prompt shared across calls."""
+        system = body.get("system")
+        messages = body.get("messages") or []
+        if system is None and messages and isinstance(messages[0], dict) and messages[0].get("role") == "system":
+            system = messages[0].get("content")
+        return hashlib.sha1(system.encode("utf-8")).hexdigest()[:16] if isinstance(system, str) and system else None
+
+    def _send(self, host_url: str, request: httpx.Request, content: bytes) -> httpx.Response:
+        base = httpx.URL(host_url)
+        url = request.url.copy_with(scheme=base.scheme, host=base.host, port=base.port)
+        headers = [(k, v) for k, v in request.headers.raw if k.lower() != b"host"]
+        forwarded = httpx.Request(request.method, url, headers=headers, content=content,
+                                  extensions=request.extensions)
+        return self._transports[host_url].handle_request(forwarded)
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        content = request.read()
+        if request.url.path not in ("/api/chat", "/api/generate"):
+            return self._send(self.router.hosts[0].url, request, content)
+        try:
+            body = json.loads(content or b"{}")
+        except ValueError:
+            body = {}
+        model = str(body.get("model") or "")
+        prefix = self._prefix(body)
+        tried: Set[str] = set()
+        while True:
+            host = self.router.acquire(model, tried, prefix)
+            start = time.perf_counter()
+            try:
+                response = self._send(host.url, request, content)
+            except httpx.TransportError as e:
+                self.router.release(host, model, time.perf_counter() - start, error=e)
+                tried.add(host.url)
+                if self._give_up(model, e, tried):
+                    raise
+                continue
+            if response.status_code >= 400:
+                text = response.read()
+                response.close()
+                error = ResponseError(text.decode("utf-8", "replace"), response.status_code)
+                self.router.release(host, model, time.perf_counter() - start, error=error)
+                tried.add(host.url)
+                if self._give_up(model, error, tried):
+                    return httpx.Response(response.status_code, headers=response.headers, content=text,
+                                          extensions=response.extensions)
+                continue
+            stream = _ReleasingStream(response.stream, self.router, host, model, start)
+            return httpx.Response(response.status_code, headers=response.headers, stream=stream,
+                                  extensions=response.extensions)
+
+    def _give_up(self, model: str, error: BaseException, tried: Set[str]) -> bool:
+        now = self.router.clock()
+        left = [h for h in self.router.hosts if h.serves(model, now) and h.url not in tried]
+        return not left or not self.router.retryable(error)
+
+    def close(self) -> None:
+        for transport in self._transports.values():
+            transport.close()
+
+class _ReleasingStream(httpx.SyncByteStream):
+    """Response body that reports the call to the router once it is consumed or closed."""
+
+    def __init__(self, stream: Any, router: HostRouter, host: HostState, model: str, start: float):
+        self.stream = stream
+        self.router = router
+        self.host = host
+        self.model = model
+        self.start = start
+        self._tail = b""
+        self._last: Optional[bytes] = None
+        self._done = False
+        self._released = False
+
+    def __iter__(self) -> Iterator[bytes]:
+        try:
+            for chunk in self.stream:
+                # Keep the last complete NDJSON line: the final chunk carries the usage counts
+                lines = (self._tail + chunk).split(b"\n")
+                self._tail = lines.pop()
+                complete = [line for line in lines if line.strip()]
+                if complete:
+                    self._last = complete[-1]
+                yield chunk
+        except httpx.TransportError as e:
+            self._release(error=e)
+            raise
+        self._done = True
+
+    def _release(self, error: Optional[BaseException] = None) -> None:
+        if self._released:
+            return
+        self._released = True
+        last = self._tail if self._tail.strip() else self._last
+        try:
+            response = json.loads(last) if last else None
+        except ValueError:
+            response = None
+        # An abandoned stream only frees its slot
+        self.router.release(self.host, self.model, time.perf_counter() - self.start, response, error,
+                            completed=self._done or error is not None)
+
+    def close(self) -> None:
+        try:
+            self.stream.close()
+        finally:
+            self._release()
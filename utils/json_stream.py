@@ -0,0 +1,231 @@
+"""
+Incremental JSON tokenizer for streamed engineer output.
+Emits each top-level "path": value pair of a JSON object as soon as its value
+closes, so files can be written while the model is still generating.
+"""
+import json
+import re
+from typing import Any, List, Optional, Tuple
+
+# Characters that end a bulk copy inside a string / nested value / scalar
+_STRING_STOP = re.compile(r'["\\]')
+_NESTED_STOP = re.compile(r'["\\{}\[\]]')
+_SCALAR_STOP = re.compile(r'[\s,}]')
+
+_DECODER = json.JSONDecoder(strict=False)
+
+# Parser states
+_SEEK = "seek"
+_KEY_OR_END = "key_or_end"
+_KEY = "key"
+_COLON = "colon"
+_VALUE = "value"
+_STRING = "string"
+_NESTED = "nested"
+_SCALAR = "scalar"
+_COMMA_OR_END = "comma_or_end"
+_DONE = "done"
+
+class JsonObjectStream:
+    """
+    Push parser for a single JSON object whose entries are emitted one at a time.
+
+    Text before the first '{' (prose, code fences, agent chatter) is skipped and
+    everything after the matching '}' is ignored. Only the value currently being
+    read is buffered, so memory stays bounded by the largest single entry.
+    Strings are decoded non-strictly because models routinely emit raw newlines
+    inside JSON strings.
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self) -> None:
+        """Discard all state and wait for a new object."""
+        self._state = _SEEK
+        self._buf: List[str] = []
+        self._escape = False
+        self._depth = 0
+        self._in_string = False
+        self._key: Optional[str] = None
+        self.consumed = 0
+
+    @property
+    def done(self) -> bool:
+        """True once the closing brace of the object has been read."""
+        return self._state == _DONE
+
+    @property
+    def started(self) -> bool:
+        """True once the opening brace of the object has been read."""
+        return self._state != _SEEK
+
+    @property
+    def pending_key(self) -> Optional[str]:
+        """Key whose value is currently being read, if any."""
+        return self._key
+
+    def feed(self, chunk: str, out: Optional[List[Tuple[str, Any]]] = None) -> List[Tuple[str, Any]]:
+        """
+        Consume the next piece of text.
+
+        Args:
+            chunk: Arbitrary slice of the model output
+            out: Optional list to append completed pairs to; entries completed
+                before a parse error are kept there
+
+        Returns:
+            List of (key, value) pairs completed within this chunk
+
+        Raises:
+            ValueError: If the text after the opening brace is not valid JSON
+        """
+        if out is None:
+            out = []
+        pos, end = 0, len(chunk)
+        while pos < end and self._state != _DONE:
+            state = self._state
+
+            if state == _SEEK:
+                idx = chunk.find("{", pos)
+                if idx < 0:
+                    pos = end
+                    break
+                pos = idx + 1
+                self._state = _KEY_OR_END
+
+            elif state in (_KEY, _STRING):
+                if self._escape:
+                    self._buf.append(chunk[pos])
+                    self._escape = False
+                    pos += 1
+                    continue
+                m = _STRING_STOP.search(chunk, pos)
+                if m is None:
+                    self._buf.append(chunk[pos:])
+                    pos = end
+                    break
+                idx = m.start()
+                self._buf.append(chunk[pos:idx])
+                if chunk[idx] == "\\":
+                    self._buf.append("\\")
+                    self._escape = True
+                    pos = idx + 1
+                    continue
+                pos = idx + 1
+                text = self._decode_string()
+                if state == _KEY:
+                    self._key = text
+                    self._state = _COLON
+                else:
+                    out.append((self._key, text))
+                    self._key = None
+                    self._state = _COMMA_OR_END
+
+            elif state == _NESTED:
+                pos = self._scan_nested(chunk, pos, out)
+
+            elif state == _SCALAR:
+                m = _SCALAR_STOP.search(chunk, pos)
+                if m is None:
+                    self._buf.append(chunk[pos:])
+                    pos = end
+                    break
+                self._buf.append(chunk[pos:m.start()])
+                pos = m.start()
+                out.append((self._key, self._decode_raw()))
+                self._key = None
+                self._state = _COMMA_OR_END
+
+            else:
+                ch = chunk[pos]
+                pos += 1
+                if ch.isspace():
+                    continue
+                self._structural(ch, out, self.consumed + pos - 1)
+
+        self.consumed += pos
+        return out
+
+    def _structural(self, ch: str, out: List[Tuple[str, Any]], offset: int) -> None:
+        """Handle a non-whitespace character between tokens."""
+        state = self._state
+        if state == _KEY_OR_END:
+            if ch == '"':
+                self._state = _KEY
+                return
+            if ch == "}":
+                self._state = _DONE
+                return
+        elif state == _COLON:
+            if ch == ":":
+                self._state = _VALUE
+                return
+        elif state == _VALUE:
+            if ch == '"':
+                self._state = _STRING
+            elif ch in "{[":
+                self._buf.append(ch)
+                self._depth = 1
+                self._in_string = False
+                self._state = _NESTED
+            else:
+                self._buf.append(ch)
+                self._state = _SCALAR
+            return
+        elif state == _COMMA_OR_END:
+            if ch == ",":
+                self._state = _KEY_OR_END
+                return
+            if ch == "}":
+                self._state = _DONE
+                return
+        raise ValueError(f"Unexpected {ch!r} at offset {offset} while expecting {state}")
+
+    def _scan_nested(self, chunk: str, pos: int, out: List[Tuple[str, Any]]) -> int:
+        """Copy a nested object/array verbatim until its brackets balance."""
+        end = len(chunk)
+        while pos < end:
+            if self._escape:
+                self._buf.append(chunk[pos])
+                self._escape = False
+                pos += 1
+                continue
+            m = (_STRING_STOP if self._in_string else _NESTED_STOP).search(chunk, pos)
+            if m is None:
+                self._buf.append(chunk[pos:])
+                return end
+            idx = m.start()
+            ch = chunk[idx]
+            self._buf.append(chunk[pos:idx + 1])
+            pos = idx + 1
+            if ch == "\\":
+                self._escape = True
+            elif ch == '"':
+                self._in_string = not self._in_string
+            elif ch in "{[":
+                self._depth += 1
+            else:
+                self._depth -= 1
+                if self._depth == 0:
+                    out.append((self._key, self._decode_raw()))
+                    self._key = None
+                    self._state = _COMMA_OR_END
+                    return pos
+        return pos
+
+    def _decode_string(self) -> str:
+        raw = "".join(self._buf)
+        self._buf = []
+        try:
+            return _DECODER.decode(f'"{raw}"')
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Invalid JSON string for key {self._key!r}: {e}") from e
+
+    def _decode_raw(self) -> Any:
+        raw = "".join(self._buf).strip()
+        self._buf = []
+        try:
+            return _DECODER.decode(raw)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Invalid JSON value for key {self._key!r}: {e}") from e
@@ -0,0 +1,152 @@
+"""
+Persistent, content-addressed cache for LLM responses.
+Entries are keyed on a hash of model, prompt and sampling parameters and kept
+in a small SQLite file under STATE_DIR with size-bounded LRU eviction.
+"""
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from typing import Optional
+
+MODES = ("on", "off", "refresh")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS llm_cache (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    last_used REAL NOT NULL
+)
+"""
+
+def make_key(model: str, prompt: str, params: str = "") -> str:
+    """
+    Build the content address for one LLM call.
+
+    Args:
+        model: Model identifier (as returned by config.get_model_for_task)
+        prompt: Full serialized prompt
+        params: Serialized sampling parameters
+
+    Returns:
+        Hex SHA-256 digest identifying the call
+    """
+    h = hashlib.sha256()
+    for part in (model, prompt, params):
+        data = part.encode("utf-8")
+        # Length-prefix each part so ("ab", "c") and ("a", "bc") differ
+        h.update(len(data).to_bytes(8, "big"))
+        h.update(data)
+    return h.hexdigest()
+
+class ResponseCache:
+    """
+    SQLite-backed LRU store of serialized LLM responses.
+
+    Modes:
+        on: read and write the cache
+        off: bypass it completely
+        refresh: ignore existing entries but store new responses
+    """
+
+    def __init__(self, path: str, max_bytes: int = 512 * 1024 * 1024, mode: str = "on"):
+        if mode not in MODES:
+            raise ValueError(f"Unknown cache mode {mode!r}; expected one of {MODES}")
+        self.path = path
+        self.max_bytes = max_bytes
+        self.mode = mode
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._total = 0
+
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            parent = os.path.dirname(self.path)
+            if parent:
+                os.makedirs(parent, exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(_SCHEMA)
+            self._conn.execute("CREATE INDEX IF NOT EXISTS llm_cache_lru ON llm_cache(last_used)")
+            row = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM llm_cache").fetchone()
+            self._total = row[0]
+        return self._conn
+
+    @property
+    def enabled(self) -> bool:
+        return self.mode != "off"
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the cached value for `key`, or None on a miss."""
+        if self.mode != "on":
+            if self.mode == "refresh":
+                self.misses += 1
+            return None
+        with self._lock:
+            db = self._db()
+            row = db.execute("SELECT value FROM llm_cache WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            db.execute("UPDATE llm_cache SET last_used = ? WHERE key = ?", (time.time(), key))
+            db.commit()
+            self.hits += 1
+            return row[0]
+
+    def put(self, key: str, value: str) -> None:
+        """Store `value` under `key`, evicting least recently used entries if needed."""
+        if not self.enabled:
+            return
+        size = len(value.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            db = self._db()
+            old = db.execute("SELECT size FROM llm_cache WHERE key = ?", (key,)).fetchone()
+            db.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, value, size, last_used) VALUES (?, ?, ?, ?)",
+                (key, value, size, time.time()),
+            )
+            self._total += size - (old[0] if old else 0)
+            if self._total > self.max_bytes:
+                self._evict(db)
+            db.commit()
+
+    def _evict(self, db: sqlite3.Connection) -> None:
+        victims = []
+        for key, size in db.execute("SELECT key, size FROM llm_cache ORDER BY last_used"):
+            if self._total <= self.max_bytes:
+                break
+            victims.append((key,))
+            self._total -= size
+        db.executemany("DELETE FROM llm_cache WHERE key = ?", victims)
+
+    def clear(self) -> None:
+        """Remove every cached entry."""
+        with self._lock:
+            db = self._db()
+            db.execute("DELETE FROM llm_cache")
+            db.commit()
+            self._total = 0
+
+    def stats(self) -> str:
+        """One-line hit/miss summary for end-of-run reporting."""
+        total = self.hits + self.misses
+        rate = (100.0 * self.hits / total) if total else 0.0
+        return f"LLM cache ({self.mode}): {self.hits} hits, {self.misses} misses ({rate:.0f}% hit rate)"
+
+_shared: Optional[ResponseCache] = None
+_shared_lock = threading.Lock()
+
+def get_response_cache() -> ResponseCache:
+    """Return the process-wide cache shared by all agents."""
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            from config import LLM_CACHE_MAX_MB, LLM_CACHE_MODE, LLM_CACHE_PATH
+            _shared = ResponseCache(LLM_CACHE_PATH, LLM_CACHE_MAX_MB * 1024 * 1024, LLM_CACHE_MODE)
+        return _shared
@@ -0,0 +1,193 @@
+"""
+Process-wide registry of Ollama clients with model-residency tracking.
+
+On a single-GPU Ollama host only a few models fit in memory at once, and every
+swap costs a full model load. The pool shares one pooled HTTP client per model
+across all agents, can preload the models upcoming phases need, and tells the
+phase scheduler which work can run on the models already loaded.
+"""
+import threading
+import time
+from typing import AbstractSet, Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from utils.tracing import span
+
+class ModelPool:
+    """
+    Shared Ollama clients plus a local view of which models are loaded.
+
+    Args:
+        host: Ollama base URL
+        keep_alive: How long Ollama keeps a model loaded after a request
+        max_loaded: Models the host can keep loaded at once
+            (OLLAMA_MAX_LOADED_MODELS on the server; 1 on a single GPU);
+            0 = no limit
+        client_factory: Builds a client for a host; defaults to an ollama.Client
+            on the shared transport
+        router: With several hosts, a HostRouter that picks the host per call;
+            clients then route each request instead of using `host`
+    """
+
+    def __init__(self, host: str, keep_alive: Any = None, max_loaded: int = 0,
+                 client_factory: Optional[Callable[[str], Any]] = None, router: Any = None):
+        self.host = host
+        self.router = router
+        self.keep_alive = keep_alive
+        self.max_loaded = max(0, max_loaded)
+        self._factory = client_factory
+        self._transport: Any = None
+        self._clients: Dict[str, Any] = {}
+        self._resident: List[str] = []  # least recently used first
+        self._lock = threading.Lock()
+        self.loads = 0
+        self.load_seconds = 0.0
+
+    def transport(self) -> Any:
+        """
+        The httpx transport every Ollama client in the process shares.
+
+        Pass it as `sync_client_kwargs={"transport": ...}` to ChatOllama (or as
+        `transport=` to ollama.Client) so its calls reuse the pool's open
+        connections and, with several hosts, are routed per call.
+        """
+        with self._lock:
+            if self._transport is None:
+                if self.router is not None:
+                    self._transport = self.router.transport()
+                else:
+                    import httpx
+                    self._transport = httpx.HTTPTransport()
+            return self._transport
+
+    def client(self, model: str = "") -> Any:
+        """Shared client for `model` (keep-alive connections are reused across agents)."""
+        if self._factory is None:
+            from ollama import Client
+            transport = self.transport()
+            self._factory = lambda host: Client(host=host, transport=transport)
+        with self._lock:
+            client = self._clients.get(model)
+            if client is None:
+                client = self._clients[model] = self._factory(self.host)
+            return client
+
+    def resident(self) -> List[str]:
+        """Models believed to be loaded, least recently used first."""
+        with self._lock:
+            return list(self._resident)
+
+    def refresh(self) -> List[str]:
+        """Ask the server which models are loaded; keeps the local view if it can't be reached."""
+        try:
+            models = [m.model or m.name for m in self.client().ps().models]
+        except Exception:
+            return self.resident()
+        with self._lock:
+            self._resident = [m for m in models if m][-self.max_loaded:] if self.max_loaded else models
+            return list(self._resident)
+
+    def note_loaded(self, model: str, load_seconds: float = 0.0) -> None:
+        """Record that `model` just served a request (and took `load_seconds` to load)."""
+        with self._lock:
+            if model in self._resident:
+                self._resident.remove(model)
+            self._resident.append(model)
+            if self.max_loaded:
+                del self._resident[:-self.max_loaded]
+            if load_seconds > 0:
+                self.loads += 1
+                self.load_seconds += load_seconds
+
+    def warm(self, models: Sequence[str]) -> Dict[str, float]:
+        """
+        Preload the first models in `models` that aren't loaded yet.
+
+        Only as many distinct models as the host can hold are loaded, so a
+        warm-up never evicts a model it just loaded; without a limit only the
+        first one is (the host may still hold just one).
+
+        Args:
+            models: Models in the order the upcoming phases need them
+
+        Returns:
+            Mapping of model to load seconds for each model loaded
+        """
+        wanted: List[str] = []
+        for model in models:
+            if model not in wanted:
+                wanted.append(model)
+        resident = set(self.refresh())
+        loaded: Dict[str, float] = {}
+        for model in wanted[:self.max_loaded or 1]:
+            if model in resident:
+                continue
+            with span("model_load", model=model, warmup=True) as s:
+                start = time.perf_counter()
+                # An empty prompt only loads the model
+                response = self.client(model).generate(model=model, prompt="", keep_alive=self.keep_alive)
+                seconds = (response.get("load_duration") or 0) / 1e9 or time.perf_counter() - start
+                s.set(load_ms=round(seconds * 1000, 2))
+            self.note_loaded(model, seconds)
+            loaded[model] = seconds
+        return loaded
+
+    def priority(self, models: Dict[str, str], order: Sequence[str]) -> Callable[[str], Tuple[int, int]]:
+        """
+        Sort key for ready phases: those whose model is loaded first, then declaration order.
+
+        Args:
+            models: Phase name -> model it runs on
+            order: Phase names in declaration order
+        """
+        rank = {name: i for i, name in enumerate(order)}
+
+        def key(name: str) -> Tuple[int, int]:
+            resident = self.resident()
+            model = models.get(name)
+            # Most recently used model first, then other loaded ones, then cold ones
+            if resident and model == resident[-1]:
+                hot = 0
+            else:
+                hot = 1 if model in resident else 2
+            return hot, rank.get(name, len(rank))
+        return key
+
+    def admit(self, models: Dict[str, str]) -> Callable[[str, AbstractSet[str]], bool]:
+        """
+        Admission check for run_dag: start a phase next to running ones only if
+        that doesn't push more distinct models onto the host than it can hold.
+        Without a limit every ready phase is admitted.
+        """
+        def check(name: str, running: AbstractSet[str]) -> bool:
+            if not self.max_loaded:
+                return True
+            in_use = {models.get(r) for r in running}
+            return models.get(name) in in_use or len(in_use) < self.max_loaded
+        return check
+
+    def stats(self) -> str:
+        text = (f"Model pool: {self.loads} loads ({self.load_seconds:.1f}s), "
+                f"resident: {', '.join(self.resident()) or 'none'}")
+        return text + "\n" + self.router.stats() if self.router is not None else text
+
+_shared: Optional[ModelPool] = None
+_shared_lock = threading.Lock()
+
+def get_model_pool() -> ModelPool:
+    """Return the process-wide pool shared by all agents."""
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            from config import (OLLAMA_HOST, OLLAMA_HOSTS, OLLAMA_KEEP_ALIVE, OLLAMA_MAX_LOADED_MODELS,
+                                ROUTER_BACKOFF, ROUTER_MAX_BACKOFF)
+            from utils.host_router import HostRouter, parse_hosts
+            hosts = parse_hosts(OLLAMA_HOSTS)
+            if len(hosts) > 1:
+                # Each host holds its own set of models, so more phases can run side by side
+                router = HostRouter(hosts, backoff=ROUTER_BACKOFF, max_backoff=ROUTER_MAX_BACKOFF)
+                _shared = ModelPool(hosts[0].url, OLLAMA_KEEP_ALIVE, OLLAMA_MAX_LOADED_MODELS * len(hosts),
+                                    router=router)
+            else:
+                _shared = ModelPool(hosts[0].url if hosts else OLLAMA_HOST, OLLAMA_KEEP_ALIVE,
+                                    OLLAMA_MAX_LOADED_MODELS)
+        return _shared
@@ -0,0 +1,289 @@
+"""
+Unified-diff parsing and fuzzy application for critic suggestions.
+
+Models write diffs loosely: hunk headers without line numbers or with wrong
+counts, blank context lines missing their leading space, fences around the
+diff, or only the file path in prose instead of ---/+++ headers. The parser
+accepts all of these and yields one FilePatch per file. Hunks are applied
+like GNU patch does: at the stated line if the context matches, else at the
+nearest place it matches, then ignoring whitespace, then with up to
+MAX_FUZZ context lines trimmed from each end. A hunk whose result is already
+present at its stated line (within MAX_FUZZ lines, or anywhere but only once
+for a hunk without line numbers) counts as applied, so re-applying a review
+is harmless; results made only of braces or bare statements like
+`return null;` match too many places to count.
+"""
+import re
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from utils.engineer_output import safe_relpath
+
+# Context lines that may be dropped from each end of a hunk that doesn't match as written
+MAX_FUZZ = 2
+
+_HUNK = re.compile(r"^@@\s*(?:-(\d+)(?:,\d+)?)?\s*(?:\+\d+(?:,\d+)?)?\s*@@")
+_FENCE = re.compile(r"^\s*```")
+# Lines too common to show that a hunk's result is present: punctuation and bare keywords
+_TRIVIAL = re.compile(r"[\W_]*(?:(?:return|break|continue|else|null|undefined|true|false|pass|end)\b[\W_]*)*")
+
+@dataclass
+class Hunk:
+    """One change: `before` (context and removed lines) becomes `after` (context and added lines)."""
+    start: int  # 1-based line of `before` in the original, 0 if unknown
+    before: List[str] = field(default_factory=list)
+    after: List[str] = field(default_factory=list)
+
+    def _context(self) -> Tuple[int, int]:
+        """Leading and trailing lines shared by before and after."""
+        lead = 0
+        while lead < min(len(self.before), len(self.after)) and self.before[lead] == self.after[lead]:
+            lead += 1
+        trail = 0
+        while (trail < min(len(self.before), len(self.after)) - lead
+               and self.before[-1 - trail] == self.after[-1 - trail]):
+            trail += 1
+        return lead, trail
+
+    def trimmed(self, fuzz: int) -> "Hunk":
+        """The hunk with up to `fuzz` context lines dropped from each end."""
+        lead, trail = self._context()
+        top, bottom = min(fuzz, lead), min(fuzz, trail)
+        return Hunk(self.start + top if self.start else 0,
+                    self.before[top:len(self.before) - bottom], self.after[top:len(self.after) - bottom])
+
+@dataclass
+class FilePatch:
+    """All hunks for one file."""
+    path: str
+    hunks: List[Hunk] = field(default_factory=list)
+    new_file: bool = False
+    deleted: bool = False
+
+@dataclass
+class PatchResult:
+    """What happened when one FilePatch was applied."""
+    path: str
+    applied: int = 0
+    failed: int = 0
+    created: bool = False
+    deleted: bool = False
+
+    @property
+    def changed(self) -> bool:
+        return self.applied > 0 or self.created or self.deleted
+
+def _clean_path(raw: str) -> Optional[str]:
+    path = raw.strip().split("\t", 1)[0].strip().strip('"')
+    if path == "/dev/null" or not path:
+        return None
+    if path[:2] in ("a/", "b/"):
+        path = path[2:]
+    return safe_relpath(path)
+
+def mentioned_paths(text: str, known: Iterable[str]) -> List[str]:
+    """
+    Known paths named in `text` as whole tokens, longest first.
+
+    `index.ts` is not found inside `index.tsx`, and text claimed by a longer
+    path (pages/index.ts) is not matched again by a shorter one (index.ts).
+    """
+    found = []
+    for path in sorted(known, key=len, reverse=True):
+        token = re.compile(r"(?<![\w.-])" + re.escape(path) + r"(?![\w-]|\.\w)")
+        if token.search(text):
+            found.append(path)
+            text = token.sub(" ", text)
+    return found
+
+def _mentioned(text: str, known: Sequence[str]) -> Optional[str]:
+    """The longest known path named in `text` (so Card.module.css beats Card)."""
+    found = mentioned_paths(text, known)
+    return found[0] if found else None
+
+def parse_diff(text: str, known_paths: Iterable[str] = ()) -> List[FilePatch]:
+    """
+    Parse one critic diff (possibly covering several files) into FilePatches.
+
+    Args:
+        text: Unified diff, optionally fenced and surrounded by prose
+        known_paths: Project paths, used when the diff names its file only in prose
+
+    Returns:
+        Patches with at least one hunk, in order of appearance
+    """
+    known = sorted(known_paths, key=len, reverse=True)
+    patches: List[FilePatch] = []
+    current: Optional[FilePatch] = None
+    hunk: Optional[Hunk] = None
+    old_path: Optional[str] = None
+    prose: List[str] = []
+
+    def close_hunk() -> None:
+        nonlocal hunk
+        if hunk is not None:
+            # Blank lines after the last real hunk line are separators, not context
+            while hunk.before and hunk.after and hunk.before[-1] == "" and hunk.after[-1] == "":
+                hunk.before.pop()
+                hunk.after.pop()
+            if hunk.before or hunk.after:
+                current.hunks.append(hunk)
+        hunk = None
+
+    lines = [line for line in text.splitlines() if not _FENCE.match(line)]
+    for i, line in enumerate(lines):
+        if line.startswith("diff --git "):
+            close_hunk()
+            current, old_path = None, None
+            continue
+        # Inside a hunk "--- x" may be a removed "-- x" line; it's a header only if +++ follows
+        if line.startswith("--- ") and (hunk is None or lines[i + 1:i + 2] and lines[i + 1].startswith("+++ ")):
+            close_hunk()
+            old_path = line[4:]
+            current = None
+            continue
+        if line.startswith("+++ ") and old_path is not None:
+            close_hunk()
+            new, old = _clean_path(line[4:]), _clean_path(old_path)
+            path = new or old
+            current = FilePatch(path, new_file=old is None, deleted=new is None) if path else None
+            if current is not None:
+                patches.append(current)
+            old_path = None
+            continue
+        match = _HUNK.match(line)
+        if match:
+            close_hunk()
+            if current is None:
+                path = _mentioned("\n".join(prose[-5:]), known)
+                if path is None:
+                    continue
+                current = FilePatch(path)
+                patches.append(current)
+            hunk = Hunk(int(match.group(1) or 0))
+            continue
+        if hunk is not None:
+            if line.startswith("+"):
+                hunk.after.append(line[1:])
+            elif line.startswith("-"):
+                hunk.before.append(line[1:])
+            elif line.startswith(" ") or line == "":
+                hunk.before.append(line[1:])
+                hunk.after.append(line[1:])
+            elif line.startswith("\\"):
+                pass  # "\ No newline at end of file"
+            else:
+                close_hunk()
+                prose.append(line)
+                current = None
+            continue
+        prose.append(line)
+    if hunk is not None:
+        close_hunk()
+    return [p for p in patches if p.hunks or p.deleted]
+
+def _norm(line: str) -> str:
+    return " ".join(line.split())
+
+def _find(lines: List[str], block: List[str], expected: int, loose: bool) -> Optional[int]:
+    """Start index of `block` in `lines` closest to `expected`, or None."""
+    if not block:
+        return min(max(expected, 0), len(lines))
+    if loose:
+        lines = [_norm(l) for l in lines]
+        block = [_norm(l) for l in block]
+    first, n = block[0], len(block)
+    best: Optional[int] = None
+    for i, line in enumerate(lines[:len(lines) - n + 1]):
+        if line == first and lines[i:i + n] == block:
+            if best is None or abs(i - expected) < abs(best - expected):
+                best = i
+            elif i > expected:
+                break
+    return best
+
+def _applied_at(lines: List[str], hunk: Hunk, expected: int, loose: bool) -> Optional[int]:
+    """Start index of `hunk`'s result if it is already in `lines` where the hunk points, else None."""
+    if hunk.before == hunk.after or all(_TRIVIAL.fullmatch(line) for line in hunk.after):
+        return None
+    pos = _find(lines, hunk.after, expected, loose)
+    if pos is None:
+        return None
+    if hunk.start:
+        return pos if abs(pos - expected) <= MAX_FUZZ else None
+    # No line number to go by: only an unambiguous match counts
+    rest = lines[pos + 1:]
+    return pos if _find(rest, hunk.after, 0, loose) is None else None
+
+def apply_hunks(text: str, hunks: List[Hunk]) -> Tuple[str, int, int]:
+    """
+    Apply hunks to one file's text.
+
+    Returns:
+        (new text, hunks applied or already present, hunks that found no match)
+    """
+    lines = text.split("\n")
+    applied = failed = 0
+    offset = 0
+    for hunk in hunks:
+        placed = False
+        for fuzz in range(MAX_FUZZ + 1):
+            h = hunk.trimmed(fuzz) if fuzz else hunk
+            if fuzz and (len(h.before), len(h.after)) == (len(hunk.before), len(hunk.after)):
+                break  # nothing left to trim
+            expected = h.start - 1 + offset if h.start else 0
+            for loose in (False, True):
+                pos = _find(lines, h.before, expected, loose) if h.before or not h.after else None
+                if pos is None and h.before == [] and h.after:
+                    pos = min(max(expected, 0), len(lines)) if h.start else None
+                if pos is not None:
+                    lines[pos:pos + len(h.before)] = h.after
+                    if h.start:
+                        offset = pos - (h.start - 1) + len(h.after) - len(h.before)
+                    placed = True
+                    break
+                pos = _applied_at(lines, h, expected, loose) if h.after else None
+                if pos is not None:
+                    if h.start:
+                        offset = pos - (h.start - 1) + len(h.after) - len(h.before)
+                    placed = True  # already applied
+                    break
+            if placed:
+                break
+        applied += placed
+        failed += not placed
+    return "\n".join(lines), applied, failed
+
+def apply_patches(files: Dict[str, str], patches: List[FilePatch]) -> Tuple[Dict[str, Optional[str]], List[PatchResult]]:
+    """
+    Apply patches to an in-memory {path: text} map without modifying it.
+
+    Returns:
+        ({path: new text, or None if deleted} for changed files, one PatchResult per patch)
+    """
+    changed: Dict[str, Optional[str]] = {}
+    results = []
+    for patch in patches:
+        result = PatchResult(patch.path)
+        current = changed[patch.path] if patch.path in changed else files.get(patch.path)
+        if patch.deleted:
+            if current is not None:
+                changed[patch.path] = None
+                result.deleted = True
+            results.append(result)
+            continue
+        if current is None:
+            # New file (or a diff against a file that doesn't exist): its added lines are the content
+            content = [line for hunk in patch.hunks for line in hunk.after]
+            if content:
+                changed[patch.path] = "\n".join(content) + "\n"
+                result.created = True
+            else:
+                result.failed = len(patch.hunks)
+            results.append(result)
+            continue
+        text, result.applied, result.failed = apply_hunks(current, patch.hunks)
+        if text != current:
+            changed[patch.path] = text
+        results.append(result)
+    return changed, results
@@ -0,0 +1,178 @@
+"""
+Patch-based repair loop after the critic.
+
+Instead of another full engineer pass, the critic's unified diffs are parsed
+into per-file patches (utils.patches) and applied to the in-memory file map.
+Each round only the files a patch touched are re-gated (with the files that
+import them) and re-reviewed; a patch that makes the static gate worse is
+reverted. Rounds repeat on the fresh findings until the critic passes, no
+patch applies, or the round budget is spent. Token usage is reported per
+round next to what regenerating the whole app would cost.
+"""
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Set
+
+from schemas import ReviewResult
+from utils.engineer_output import normalize_file_content
+from utils.patches import apply_patches, parse_diff
+from utils.review import Reviewer, ReviewRun, estimate_tokens, merge_reviews, review_files
+from utils.static_gate import check_project, importers
+from utils.tracing import span
+
+@dataclass
+class RepairRound:
+    """One apply / re-gate / re-review cycle."""
+    round: int
+    diffs: int = 0
+    patches: int = 0
+    applied: int = 0  # hunks applied (or already present)
+    failed: int = 0  # hunks whose context matched nowhere
+    unparsed: int = 0  # diffs that weren't unified diffs of a project file
+    touched: List[str] = field(default_factory=list)
+    reverted: List[str] = field(default_factory=list)
+    status: str = ""
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    est_tokens: int = 0  # chars/4 estimate of the re-review traffic, for models that report no usage
+
+    @property
+    def tokens(self) -> int:
+        return self.prompt_tokens + self.completion_tokens or self.est_tokens
+
+    def summary(self) -> str:
+        line = (f"round {self.round}: {self.applied}/{self.applied + self.failed} hunks applied to "
+                f"{len(self.touched)} files")
+        if self.reverted:
+            line += f", {len(self.reverted)} reverted by the gate"
+        if self.unparsed:
+            line += f", {self.unparsed} diffs not applicable"
+        if self.status:
+            line += f"; re-review {self.status}"
+        return line + f" ({self.prompt_tokens} prompt + {self.completion_tokens} completion tokens" + (
+            f", ~{self.est_tokens} estimated)" if not self.prompt_tokens + self.completion_tokens else ")")
+
+@dataclass
+class RepairRun:
+    """Repaired files, the final verdict and the per-round report."""
+    files: Dict[str, str]
+    review: ReviewResult
+    rounds: List[RepairRound] = field(default_factory=list)
+    changed: List[str] = field(default_factory=list)
+    baseline_tokens: int = 0  # estimated output tokens of regenerating every file
+
+    @property
+    def tokens(self) -> int:
+        return sum(r.tokens for r in self.rounds)
+
+    def summary(self) -> str:
+        if not self.rounds:
+            return "Repair: nothing to apply"
+        lines = [f"Repair: {len(self.changed)} files patched in {len(self.rounds)} round(s), "
+                 f"final review {self.review.status}"]
+        lines += [f"  {r.summary()}" for r in self.rounds]
+        if self.baseline_tokens:
+            lines.append(f"  {self.tokens} tokens in total, {self.tokens / self.baseline_tokens:.0%} of the "
+                         f"~{self.baseline_tokens} a full engineer pass would generate")
+        return "\n".join(lines)
+
+def _blame(before, after, changed: Set[str], graph: Dict[str, List[str]]) -> Set[str]:
+    """Changed files to revert: those with new gate issues, or imported by a file that got new issues."""
+    count = lambda report: {path: sum(i.path == path for i in report.issues) for path in report.paths}
+    old, new = count(before), count(after)
+    worse = {path for path, n in new.items() if n > old.get(path, 0)}
+    blamed = worse & changed
+    for path in worse - changed:
+        blamed.update(target for target in graph.get(path, []) if target in changed)
+    return blamed
+
+def repair_files(
+    files: Dict[str, object],
+    review: ReviewRun,
+    reviewer: Reviewer,
+    rounds: int = 2,
+    max_tokens: int = 6000,
+    max_workers: int = 4,
+    gate: bool = True,
+) -> RepairRun:
+    """
+    Apply the critic's diffs to the files and re-review what changed.
+
+    Args:
+        files: Mapping of path to content (non-strings are normalized)
+        review: The critic's review of `files` (review_files output)
+        reviewer: Function sending one chunk prompt to the critic model
+        rounds: Maximum apply / re-review cycles
+        max_tokens: Token budget for the code in one re-review chunk
+        max_workers: Chunks re-reviewed concurrently
+        gate: Re-run the static gate on touched files and revert patches that break it
+
+    Returns:
+        RepairRun with the patched file map (the input is not modified)
+    """
+    original = {path: normalize_file_content(path, value) for path, value in files.items()}
+    texts = dict(original)
+    per_file = dict(review.per_file) or {path: review.result for path in texts}
+    run = RepairRun(texts, review.result, baseline_tokens=sum(estimate_tokens(t) for t in original.values()))
+    graph = check_project(texts).graph if gate else {}
+    pending = list(review.result.diffs) if review.result.status == "ISSUES" else []
+
+    for number in range(1, rounds + 1):
+        if not pending:
+            break
+        report = RepairRound(number, diffs=len(pending))
+        run.rounds.append(report)
+        with span("repair_round", round=number, diffs=len(pending)) as s:
+            patches = []
+            for diff in pending:
+                parsed = parse_diff(diff, texts)
+                report.unparsed += not parsed
+                patches.extend(parsed)
+            changed, results = apply_patches(texts, patches)
+            report.patches = len(patches)
+            report.applied = sum(r.applied + r.created for r in results)
+            report.failed = sum(r.failed for r in results)
+
+            if changed and gate:
+                updated = {p: t for p, t in dict(texts, **changed).items() if t is not None}
+                scope = (set(changed) | importers(graph, changed))
+                before = check_project(texts, only=scope)
+                after = check_project(updated, only=scope)
+                for path in sorted(_blame(before, after, set(changed), graph)):
+                    report.reverted.append(path)
+                    del changed[path]
+            for path, text in changed.items():
+                if text is None:
+                    texts.pop(path, None)
+                    per_file.pop(path, None)
+                else:
+                    texts[path] = text
+            if gate and changed:
+                graph.update(check_project(texts, only=[p for p in changed if p in texts]).graph)
+            report.touched = sorted(changed)
+
+            pending = []
+            live = {path: texts[path] for path in report.touched if path in texts}
+            if live:
+                sent: List[int] = []
+
+                def counted(prompt: str) -> str:
+                    reply = reviewer(prompt)
+                    sent.append(estimate_tokens(prompt) + estimate_tokens(reply))
+                    return reply
+
+                rerun = review_files(live, counted, max_tokens, max_workers)
+                per_file.update(rerun.per_file)
+                report.status = rerun.result.status
+                report.est_tokens = sum(sent)
+                if rerun.result.status == "ISSUES":
+                    pending = list(rerun.result.diffs)
+            report.prompt_tokens, report.completion_tokens = s.prompt_tokens, s.completion_tokens
+            s.set(patches=report.patches, applied=report.applied, failed=report.failed,
+                  touched=len(report.touched), reverted=len(report.reverted), status=report.status)
+        if not report.touched:
+            break
+
+    run.files = texts
+    run.changed = sorted(p for p in set(original) | set(texts) if original.get(p) != texts.get(p))
+    run.review = merge_reviews([per_file[path] for path in sorted(per_file)]) if run.changed else review.result
+    return run
@@ -0,0 +1,244 @@
+"""
+Map-reduce code review over the engineer's {path: content} output.
+
+Files are split into context-sized chunks (related files kept together),
+each chunk is reviewed independently and concurrently, and the per-chunk
+ReviewResults are merged into one verdict. Findings are remembered per file
+content hash so a re-run only re-reviews files that changed.
+"""
+import json
+import os
+import posixpath
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+from pydantic import ValidationError
+
+from schemas import ReviewResult
+from utils.dag import run_dag
+from utils.engineer_output import atomic_write, content_hash, extract_json_object, normalize_file_content
+from utils.patches import mentioned_paths, parse_diff
+from utils.tracing import span
+
+# Rough characters per token for sizing chunks
+CHARS_PER_TOKEN = 4
+
+# Reviewer: chunk prompt text -> raw model response
+Reviewer = Callable[[str], str]
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN + 1
+
+def _group_key(path: str) -> Tuple[str, str]:
+    """Directory and base name without extensions, so Card.tsx, Card.module.css and Card.test.tsx group."""
+    directory, name = posixpath.split(path)
+    return directory, name.split(".", 1)[0].lower()
+
+def _split_large(path: str, content: str, max_tokens: int) -> List[Tuple[str, str]]:
+    """Split one oversized file on line boundaries into labelled parts."""
+    limit = max_tokens * CHARS_PER_TOKEN
+    parts: List[str] = []
+    current = ""
+    for line in content.splitlines(keepends=True):
+        while len(line) > limit:
+            if current:
+                parts.append(current)
+                current = ""
+            parts.append(line[:limit])
+            line = line[limit:]
+        if len(current) + len(line) > limit:
+            parts.append(current)
+            current = ""
+        current += line
+    if current or not parts:
+        parts.append(current)
+    return [(f"{path} (part {i + 1}/{len(parts)})", part) for i, part in enumerate(parts)]
+
+def chunk_files(files: Dict[str, str], max_tokens: int) -> List[List[Tuple[str, str]]]:
+    """
+    Split files into chunks of at most `max_tokens` estimated tokens.
+
+    Files sharing a directory and base name form one group that is never
+    split across chunks (unless the group alone exceeds the limit); groups are
+    packed in path order so neighbouring files tend to share a chunk.
+
+    Args:
+        files: Mapping of path to content
+        max_tokens: Token budget for the code in one chunk
+
+    Returns:
+        List of chunks, each a list of (label, content) pairs
+    """
+    groups: Dict[Tuple[str, str], List[Tuple[str, str]]] = {}
+    for path in sorted(files):
+        groups.setdefault(_group_key(path), []).append((path, files[path]))
+
+    chunks: List[List[Tuple[str, str]]] = []
+    current: List[Tuple[str, str]] = []
+    used = 0
+    for key in sorted(groups):
+        group = groups[key]
+        size = sum(estimate_tokens(c) for _, c in group)
+        if size > max_tokens:
+            # Too big to keep together: each file on its own, oversized ones in parts
+            pieces = []
+            for path, content in group:
+                if estimate_tokens(content) > max_tokens:
+                    pieces.extend([part] for part in _split_large(path, content, max_tokens))
+                else:
+                    pieces.append([(path, content)])
+        else:
+            pieces = [group]
+        for piece in pieces:
+            piece_size = sum(estimate_tokens(c) for _, c in piece)
+            if current and used + piece_size > max_tokens:
+                chunks.append(current)
+                current, used = [], 0
+            current.extend(piece)
+            used += piece_size
+    if current:
+        chunks.append(current)
+    return chunks
+
+def format_chunk(chunk: List[Tuple[str, str]], index: int, total: int) -> str:
+    """
+    Prompt body for one chunk: each file wrapped in a <FILE path="..."> tag.
+
+    The instructions come first and are identical for every chunk, so the
+    server can reuse their cached prefill; the chunk number goes with the code.
+    """
+    body = "\n".join(f'<FILE path="{label}">\n{content}\n</FILE>' for label, content in chunk)
+    return ("Review the code below. It is one chunk of a larger project; other files are reviewed separately, "
+            "so don't report imports of files not shown as missing.\n"
+            "Reply with a JSON ReviewResult: {\"status\": \"PASS\" | \"ISSUES\", \"diffs\": [...]}. "
+            "Write each diff as a unified diff of one file (--- a/path, +++ b/path, then @@ hunks with "
+            "3 lines of unchanged context) so it can be applied automatically.\n\n"
+            f"<CODE chunk=\"{index + 1} of {total}\">\n{body}\n</CODE>")
+
+def parse_review(text: str) -> ReviewResult:
+    """
+    Read a ReviewResult from a model response.
+
+    Accepts the JSON object the critic is asked for and falls back to the
+    older plain-text 'PASS' / 'ISSUES FOUND ...' format.
+    """
+    try:
+        return ReviewResult.model_validate(extract_json_object(text))
+    except (ValueError, ValidationError):
+        pass
+    stripped = text.strip()
+    if stripped.upper().startswith("PASS"):
+        return ReviewResult(status="PASS")
+    return ReviewResult(status="ISSUES", diffs=[stripped] if stripped else [])
+
+def merge_reviews(results: List[ReviewResult]) -> ReviewResult:
+    """Combine chunk reviews: ISSUES if any chunk found issues, diffs de-duplicated in order."""
+    diffs: List[str] = []
+    for result in results:
+        for diff in result.diffs:
+            if diff not in diffs:
+                diffs.append(diff)
+    status = "ISSUES" if any(r.status == "ISSUES" for r in results) else "PASS"
+    return ReviewResult(status=status, diffs=diffs)
+
+def _attribute(result: ReviewResult, paths: List[str]) -> Dict[str, ReviewResult]:
+    """Assign a chunk's findings to its files: diffs naming a file go to that file, the rest to all."""
+    per_file = {path: ReviewResult(status="PASS") for path in paths}
+    for diff in result.diffs:
+        # ---/+++ headers decide; otherwise whole path tokens, so index.tsx isn't index.ts
+        owners = ([p.path for p in parse_diff(diff) if p.path in per_file]
+                  or mentioned_paths(diff, paths) or paths)
+        owners = list(dict.fromkeys(owners))
+        for path in owners:
+            per_file[path].diffs.append(diff)
+    if result.status == "ISSUES":
+        for path in paths:
+            if per_file[path].diffs or not result.diffs:
+                per_file[path].status = "ISSUES"
+    return per_file
+
+def review_state_path(base_dir: Path) -> Path:
+    """Per-file review results stored next to the output directory."""
+    base_dir = Path(base_dir)
+    return base_dir.parent / f"{base_dir.name}.review.json"
+
+@dataclass
+class ReviewRun:
+    """Merged verdict plus what was (re-)reviewed."""
+    result: ReviewResult
+    chunks: int = 0
+    reviewed: int = 0
+    reused: int = 0
+    per_file: Dict[str, ReviewResult] = field(default_factory=dict)
+
+    def summary(self) -> str:
+        return (f"{self.result.status}: {len(self.result.diffs)} diffs, {self.chunks} chunks, "
+                f"{self.reviewed} files reviewed, {self.reused} unchanged files reused")
+
+def review_files(
+    files: Dict[str, object],
+    reviewer: Reviewer,
+    max_tokens: int = 6000,
+    max_workers: int = 4,
+    state_path: Optional[Path] = None,
+) -> ReviewRun:
+    """
+    Review a generated project chunk by chunk and merge the verdicts.
+
+    Args:
+        files: Mapping of path to content (non-strings are normalized)
+        reviewer: Function sending one chunk prompt to the model
+        max_tokens: Token budget for the code in one chunk
+        max_workers: Chunks reviewed concurrently
+        state_path: Where per-file results are kept between runs; files whose
+            content hash matches a stored result are not reviewed again
+
+    Returns:
+        ReviewRun with the merged ReviewResult
+    """
+    texts = {path: normalize_file_content(path, value) for path, value in files.items()}
+    hashes = {path: content_hash(text.encode("utf-8")) for path, text in texts.items()}
+    state: Dict[str, dict] = {}
+    if state_path is not None:
+        try:
+            state = json.loads(Path(state_path).read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            state = {}
+
+    per_file: Dict[str, ReviewResult] = {}
+    for path, digest in hashes.items():
+        entry = state.get(path)
+        if entry and entry.get("hash") == digest:
+            per_file[path] = ReviewResult.model_validate(entry["result"])
+    pending = {path: text for path, text in texts.items() if path not in per_file}
+
+    chunks = chunk_files(pending, max_tokens) if pending else []
+
+    def review(index: int) -> Dict[str, ReviewResult]:
+        chunk = chunks[index]
+        paths = list(dict.fromkeys(label.split(" (part ")[0] for label, _ in chunk))
+        prompt = format_chunk(chunk, index, len(chunks))
+        with span("critic_chunk", chunk=index, files=len(paths), est_tokens=estimate_tokens(prompt)) as s:
+            result = parse_review(reviewer(prompt))
+            s.set(status=result.status, diffs=len(result.diffs))
+        return _attribute(result, paths)
+
+    if chunks:
+        nodes = {f"chunk{i}": (lambda inputs, i=i: review(i), []) for i in range(len(chunks))}
+        run = run_dag(nodes, max_workers=max_workers)
+        fresh: Dict[str, ReviewResult] = {}
+        for name in nodes:
+            for path, result in run.results[name].items():
+                # A file split into parts collects the findings of every part
+                fresh[path] = merge_reviews([fresh[path], result]) if path in fresh else result
+        per_file.update(fresh)
+
+    if state_path is not None:
+        state = {path: {"hash": hashes[path], "result": per_file[path].model_dump()} for path in texts}
+        os.makedirs(Path(state_path).parent, exist_ok=True)
+        atomic_write(Path(state_path), json.dumps(state, indent=2, sort_keys=True).encode("utf-8"))
+
+    merged = merge_reviews([per_file[path] for path in sorted(per_file)])
+    return ReviewRun(merged, chunks=len(chunks), reviewed=len(pending), reused=len(texts) - len(pending),
+                     per_file=per_file)
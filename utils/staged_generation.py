@@ -0,0 +1,207 @@
+"""
+Two-stage engineer generation: a compact manifest first, then files in parallel.
+
+Stage one asks the model for the list of files with their purpose and the
+types/interfaces each exports. Stage two generates every file (or small group
+of related files) in its own request that shares the manifest as context, so
+requests run concurrently and a failed file is retried on its own instead of
+regenerating the whole app.
+"""
+import json
+import posixpath
+import re
+import threading
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Tuple
+
+from utils.dag import run_dag
+from utils.engineer_output import extract_json_object, normalize_file_content, safe_relpath
+from utils.tracing import span
+
+# Generator: prompt text -> raw model response
+Generator = Callable[[str], str]
+
+MAX_FILES = 200
+MAX_PURPOSE_CHARS = 300
+
+_FENCE = re.compile(r"^\s*```[\w.+-]*\n([\s\S]*?)\n?```\s*$")
+
+@dataclass
+class FileSpec:
+    """One manifest entry."""
+    path: str
+    purpose: str = ""
+    exports: List[str] = field(default_factory=list)
+
+    def describe(self) -> str:
+        exports = f" exports: {', '.join(self.exports)}" if self.exports else ""
+        return f"- {self.path}: {self.purpose}{exports}"
+
+def manifest_prompt(brief: str, context: str = "") -> str:
+    """Stage one prompt: plan the files without writing them."""
+    research = f"\n\nResearch:\n{context}" if context else ""
+    return (
+        f"{brief}{research}\n\n"
+        "Do NOT write any code yet. First output a compact manifest of every file the app needs as JSON:\n"
+        '{"files": [{"path": "components/Card.tsx", "purpose": "one line", '
+        '"exports": ["Card", "interface CardProps { title: string }"]}]}\n'
+        "List the exported components, functions, types and interfaces with their signatures so other "
+        "files can import them. Output ONLY the JSON object."
+    )
+
+def parse_manifest(text: str) -> List[FileSpec]:
+    """
+    Read the manifest from a model response.
+
+    Accepts {"files": [{"path", "purpose", "exports"}, ...]} as well as a
+    {path: purpose-or-entry} mapping.
+
+    Raises:
+        ValueError: If no usable file entries are found
+    """
+    data = extract_json_object(text)
+    entries = data.get("files", data) if isinstance(data, dict) else data
+    if isinstance(entries, dict):
+        entries = [dict(v, path=k) if isinstance(v, dict) else {"path": k, "purpose": str(v)}
+                   for k, v in entries.items()]
+    specs: Dict[str, FileSpec] = {}
+    for entry in entries if isinstance(entries, list) else []:
+        if not isinstance(entry, dict):
+            continue
+        path = safe_relpath(entry.get("path", ""))
+        if path is None or path in specs:
+            continue
+        exports = entry.get("exports") or []
+        if isinstance(exports, str):
+            exports = [exports]
+        # Keep the manifest compact even if the model put file contents in it
+        purpose = str(entry.get("purpose", ""))[:MAX_PURPOSE_CHARS]
+        specs[path] = FileSpec(path, purpose, [str(e)[:MAX_PURPOSE_CHARS] for e in exports])
+    if not specs:
+        raise ValueError("Manifest lists no files")
+    return list(specs.values())[:MAX_FILES]
+
+def group_specs(specs: List[FileSpec], group_size: int = 2) -> List[List[FileSpec]]:
+    """Group related files (same directory and base name) into requests of at most `group_size` files."""
+    by_key: Dict[Tuple[str, str], List[FileSpec]] = {}
+    for spec in specs:
+        directory, name = posixpath.split(spec.path)
+        by_key.setdefault((directory, name.split(".", 1)[0].lower()), []).append(spec)
+    groups: List[List[FileSpec]] = []
+    for related in by_key.values():
+        for i in range(0, len(related), max(1, group_size)):
+            groups.append(related[i:i + group_size])
+    return groups
+
+def file_prompt(brief: str, manifest: List[FileSpec], group: List[FileSpec]) -> str:
+    """Stage two prompt: write just the files in `group`, consistent with the manifest."""
+    listing = "\n".join(spec.describe() for spec in manifest)
+    wanted = "\n".join(spec.describe() for spec in group)
+    keys = ", ".join(json.dumps(spec.path) for spec in group)
+    return (
+        f"{brief}\n\nThe app consists of these files (manifest):\n{listing}\n\n"
+        f"Write ONLY these files, complete and consistent with the manifest's exports:\n{wanted}\n\n"
+        f"Output a single JSON object with exactly these keys: {keys}. "
+        "Values are the entire file contents as strings. No Markdown fences or prose."
+    )
+
+def parse_files(text: str, group: List[FileSpec]) -> Dict[str, str]:
+    """Files from a stage-two response; a lone unfenced file may come back as plain code."""
+    wanted = {spec.path for spec in group}
+    try:
+        data = extract_json_object(text)
+    except ValueError:
+        data = None
+    if isinstance(data, dict) and wanted & set(data):
+        return {path: normalize_file_content(path, data[path]) for path in wanted if path in data}
+    if len(group) != 1 or not text.strip():
+        return {}
+    path = group[0].path
+    if isinstance(data, dict) and data:
+        # A JSON file returned as itself rather than wrapped in {path: content}
+        return {path: json.dumps(data, indent=2)} if path.endswith(".json") else {}
+    fenced = _FENCE.match(text)
+    return {path: fenced.group(1) if fenced else text}
+
+@dataclass
+class GenerationRun:
+    """Files produced by a staged generation and what it took."""
+    files: Dict[str, str]
+    manifest: List[FileSpec]
+    failed: List[str] = field(default_factory=list)
+    requests: int = 0
+    retries: int = 0
+
+    def summary(self) -> str:
+        failed = f", failed: {', '.join(self.failed)}" if self.failed else ""
+        return (f"{len(self.files)}/{len(self.manifest)} files in {self.requests} requests "
+                f"({self.retries} retries){failed}")
+
+def generate_staged(
+    brief: str,
+    generator: Generator,
+    context: str = "",
+    max_workers: int = 4,
+    group_size: int = 2,
+    retries: int = 1,
+) -> GenerationRun:
+    """
+    Generate an app as a manifest plus concurrently generated files.
+
+    Args:
+        brief: Task description (idea plus output rules)
+        generator: Function sending one prompt to the engineer model
+        context: Output of earlier phases (research)
+        max_workers: File requests in flight at once
+        group_size: Related files generated per request
+        retries: Extra attempts per file whose output is missing or unparsable;
+            retries request the missing files one at a time
+
+    Returns:
+        GenerationRun with the {path: content} map
+
+    Raises:
+        ValueError: If the manifest can't be parsed
+    """
+    with span("engineer_manifest") as s:
+        manifest = parse_manifest(generator(manifest_prompt(brief, context)))
+        s.set(files=len(manifest))
+    groups = group_specs(manifest, group_size)
+    counters = {"requests": 1, "retries": 0}
+    lock = threading.Lock()
+
+    def count(key: str, n: int = 1) -> None:
+        with lock:
+            counters[key] += n
+
+    def generate(group: List[FileSpec]) -> Dict[str, str]:
+        files: Dict[str, str] = {}
+        todo = [group]
+        for attempt in range(retries + 1):
+            missing: List[FileSpec] = []
+            for batch in todo:
+                with span("engineer_files", files=len(batch), attempt=attempt) as s:
+                    count("requests")
+                    try:
+                        got = parse_files(generator(file_prompt(brief, manifest, batch)), batch)
+                    except Exception as e:
+                        # One failed request only costs its own files
+                        s.set(error=f"{type(e).__name__}: {e}")
+                        got = {}
+                    s.set(generated=len(got))
+                files.update(got)
+                missing.extend(spec for spec in batch if spec.path not in got)
+            if not missing:
+                break
+            if attempt < retries:
+                count("retries", len(missing))
+            todo = [[spec] for spec in missing]
+        return files
+
+    nodes = {f"group{i}": (lambda inputs, group=group: generate(group), []) for i, group in enumerate(groups)}
+    run = run_dag(nodes, max_workers=max_workers)
+    files: Dict[str, str] = {}
+    for name in nodes:
+        files.update(run.results[name])
+    failed = [spec.path for spec in manifest if spec.path not in files]
+    return GenerationRun(files, manifest, failed, counters["requests"], counters["retries"])
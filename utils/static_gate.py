@@ -0,0 +1,401 @@
+"""
+Static checks on the engineer's {path: content} output before the critic sees it.
+
+The gate catches the mechanical failures a parser finds instantly, so no critic
+inference is spent on them:
+    - JSON files that don't parse (tsconfig-style files may have comments)
+    - .js/.ts modules emitted as JSON objects (normalize_file_content turns
+      those into `export default {...}`, which isn't the config Next.js expects)
+    - empty source files
+    - imports of project files that were never emitted, resolving relative
+      paths and tsconfig/jsconfig `baseUrl`/`paths` aliases
+    - packages imported but missing from package.json
+
+Imports are matched outside comments and string/template literals, and
+`from` only counts after an import/export clause, so prose in comments or
+JSX text isn't mistaken for an import. Everything is regex and set lookups
+over the file map, so a project with thousands of files is checked in
+milliseconds. Failures go back to the
+engineer with `gate_and_fix`, which asks only for the files to add or replace.
+"""
+import json
+import posixpath
+import re
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from utils.engineer_output import extract_json_object, normalize_file_content
+from utils.tracing import span
+
+# Generator: prompt text -> raw model response
+Generator = Callable[[str], str]
+
+CODE_SUFFIXES = (".ts", ".tsx", ".js", ".jsx", ".mjs", ".cjs")
+STYLE_SUFFIXES = (".css", ".scss", ".sass")
+# Tried in this order when an import omits the extension
+RESOLVE_SUFFIXES = (".ts", ".tsx", ".d.ts", ".js", ".jsx", ".mjs", ".cjs", ".json")
+# Parsed with comments and trailing commas allowed, as tsc and eslint do
+JSONC_NAMES = {"tsconfig.json", "jsconfig.json", ".eslintrc.json", "tsconfig.base.json"}
+NODE_BUILTINS = {
+    "assert", "buffer", "child_process", "crypto", "dns", "events", "fs", "fs/promises", "http", "http2",
+    "https", "net", "os", "path", "perf_hooks", "process", "querystring", "readline", "stream", "string_decoder",
+    "timers", "tls", "url", "util", "worker_threads", "zlib",
+}
+
+# Where one of these keywords is followed by a quoted specifier there may be an import;
+# str.find on the keywords is ~15x faster than scanning every position with a regex
+_IMPORT_KEYWORDS = ("from", "import", "require")
+_CANDIDATE = re.compile(r"""(?<![\w$.])(?:from\s*|import\s+|(?:require|import)\s*\(\s*)(['"])([^'"\n]+)\1""")
+# Comments and string/template literals, found left to right so "//" in a string isn't a comment;
+# block comments and templates may be cut off at the end of the scanned text
+_CODE_TOKEN = re.compile(r"""//[^\n]*|/\*[\s\S]*?(?:\*/|\Z)|'(?:\\.|[^'\\\n])*'|"(?:\\.|[^"\\\n])*"|`(?:\\.|[^`\\])*(?:`|\Z)""")
+# Over masked source (strings replaced by their index): import/export <names> from 'n' and
+# import 'n' at the start of a statement, or require('n') / import('n') anywhere
+_IMPORT = re.compile(
+    r"""(?:^|(?<=[;}]))\s*(?:import|export)\b(?:[\w$*{},\s]*?\bfrom)?\s*'(\d+)'"""
+    r"""|(?<![\w$.])(?:require|import)\s*\(\s*'(\d+)'""",
+    re.M,
+)
+_JSON_START = re.compile(r"\s*[\[{]")
+_CSS_IMPORT = re.compile(r"""@import\s+(?:url\(\s*)?(['"])([^'"\n]+)\1""")
+# Line and block comments, skipping over strings
+_JSONC_TOKEN = re.compile(r'"(?:\\.|[^"\\])*"|//[^\n]*|/\*[\s\S]*?\*/|,(?=\s*[}\]])')
+
+@dataclass
+class GateIssue:
+    """One mechanical problem in one file."""
+    path: str
+    kind: str  # invalid_json | config_as_json | empty | missing_import | missing_dependency
+    message: str
+
+    def __str__(self) -> str:
+        return f"{self.path}: {self.message}"
+
+@dataclass
+class GateReport:
+    """Outcome of one pass over a project."""
+    files: int
+    checked: int
+    issues: List[GateIssue] = field(default_factory=list)
+    imports: int = 0
+    graph: Dict[str, List[str]] = field(default_factory=dict)  # importer -> project files it imports
+    seconds: float = 0.0
+
+    @property
+    def ok(self) -> bool:
+        return not self.issues
+
+    @property
+    def paths(self) -> List[str]:
+        """Files with issues, in order of first issue."""
+        return list(dict.fromkeys(issue.path for issue in self.issues))
+
+    def summary(self) -> str:
+        counts: Dict[str, int] = {}
+        for issue in self.issues:
+            counts[issue.kind] = counts.get(issue.kind, 0) + 1
+        found = ", ".join(f"{n} {kind}" for kind, n in sorted(counts.items())) or "no issues"
+        return (f"Static gate: {found} in {self.checked} of {self.files} files, "
+                f"{self.imports} imports ({self.seconds * 1000:.1f} ms)")
+
+def strip_jsonc(text: str) -> str:
+    """Drop // and /* */ comments and trailing commas outside strings."""
+    return _JSONC_TOKEN.sub(lambda m: m.group(0) if m.group(0).startswith('"') else "", text)
+
+def _load_json(path: str, text: str) -> Any:
+    if posixpath.basename(path) in JSONC_NAMES or path.endswith(".jsonc"):
+        text = strip_jsonc(text)
+    return json.loads(text)
+
+def _alias_rules(files: Dict[str, str]) -> Tuple[Optional[str], List[Tuple[str, str, List[str]]]]:
+    """baseUrl and (prefix, suffix, targets) path rules from tsconfig.json or jsconfig.json."""
+    for name in ("tsconfig.json", "jsconfig.json"):
+        if name not in files:
+            continue
+        try:
+            options = _load_json(name, files[name]).get("compilerOptions") or {}
+        except (ValueError, AttributeError):
+            continue
+        base = options.get("baseUrl")
+        base_dir = posixpath.normpath(base) if isinstance(base, str) else None
+        rules = []
+        for pattern, targets in (options.get("paths") or {}).items():
+            if not isinstance(targets, list):
+                continue
+            prefix, star, suffix = pattern.partition("*")
+            root = base_dir or "."
+            rules.append((prefix, suffix if star else "",
+                          [posixpath.normpath(posixpath.join(root, t)) for t in targets if isinstance(t, str)]))
+        # Longest prefix wins, as in tsc
+        rules.sort(key=lambda rule: -len(rule[0]))
+        return base_dir, rules
+    return None, []
+
+class _Resolver:
+    """Resolves import specifiers against the emitted paths."""
+
+    def __init__(self, files: Dict[str, str]):
+        self.paths: Set[str] = set(files)
+        self.top_dirs = {p.split("/", 1)[0] for p in files if "/" in p}
+        self.base_url, self.rules = _alias_rules(files)
+        self.dependencies: Optional[Set[str]] = None
+        try:
+            package = json.loads(files.get("package.json", ""))
+            self.dependencies = {name for key in ("dependencies", "devDependencies", "peerDependencies")
+                                 for name in (package.get(key) or {})}
+        except (ValueError, AttributeError, TypeError):
+            pass
+
+    def find(self, target: str) -> Optional[str]:
+        """The emitted file an extensionless/index/.js-for-.ts import lands on."""
+        target = posixpath.normpath(target)
+        if target.startswith("./"):
+            target = target[2:]
+        if target in self.paths:
+            return target
+        for suffix in RESOLVE_SUFFIXES:
+            if target + suffix in self.paths:
+                return target + suffix
+        for suffix in RESOLVE_SUFFIXES:
+            if f"{target}/index{suffix}" in self.paths:
+                return f"{target}/index{suffix}"
+        stem, ext = posixpath.splitext(target)
+        if ext in (".js", ".jsx", ".mjs", ".cjs"):
+            # TypeScript ESM style: import './util.js' compiles from util.ts
+            for suffix in (".ts", ".tsx", ".mts", ".cts"):
+                if stem + suffix in self.paths:
+                    return stem + suffix
+        return None
+
+    def resolve(self, importer: str, spec: str) -> Tuple[Optional[str], Optional[GateIssue]]:
+        """(resolved project file, issue) for one import; both None for a satisfied package import."""
+        spec = spec.split("?", 1)[0]
+        if spec.startswith("."):
+            target = posixpath.join(posixpath.dirname(importer), spec)
+            found = self.find(target)
+            if found is None:
+                return None, GateIssue(importer, "missing_import",
+                                       f"imports '{spec}' but {posixpath.normpath(target)} was not generated")
+            return found, None
+        if spec.startswith("/") or "://" in spec or spec.startswith("data:"):
+            return None, None  # public/ asset or URL
+        for prefix, suffix, targets in self.rules:
+            if spec.startswith(prefix) and spec.endswith(suffix) and len(spec) >= len(prefix) + len(suffix):
+                middle = spec[len(prefix):len(spec) - len(suffix)] if suffix else spec[len(prefix):]
+                for target in targets:
+                    found = self.find(target.replace("*", middle, 1))
+                    if found is not None:
+                        return found, None
+                return None, GateIssue(importer, "missing_import",
+                                       f"imports '{spec}' but no file matches alias '{prefix}*' "
+                                       f"({', '.join(targets)})")
+        if self.base_url is not None:
+            found = self.find(posixpath.join(self.base_url, spec))
+            if found is not None:
+                return found, None
+        head = spec.split("/", 1)[0]
+        if head in ("@", "~") or (head.startswith("@") and head[1:] in self.top_dirs):
+            return None, GateIssue(importer, "missing_import",
+                                   f"imports '{spec}' but no tsconfig/jsconfig 'paths' alias defines '{head}/'")
+        if head in self.top_dirs:
+            where = "was not generated" if self.base_url is not None else \
+                "is a project path; use a relative import or set baseUrl in tsconfig.json"
+            return None, GateIssue(importer, "missing_import", f"imports '{spec}' which {where}")
+        package = "/".join(spec.split("/")[:2]) if spec.startswith("@") else head
+        builtin = spec[5:] if spec.startswith("node:") else spec
+        if self.dependencies is not None and package not in self.dependencies and builtin not in NODE_BUILTINS \
+                and package.split("/")[0] not in NODE_BUILTINS and not package.startswith("@types/"):
+            return None, GateIssue(importer, "missing_dependency",
+                                   f"imports package '{package}' which is not in package.json")
+        return None, None
+
+def check_project(files: Dict[str, Any], only: Optional[Iterable[str]] = None) -> GateReport:
+    """
+    Run the static checks over a generated project.
+
+    Args:
+        files: Mapping of path to content; non-string values are checked as
+            emitted, then normalized like write_files does
+        only: Check just these files (imports still resolve against all of them)
+
+    Returns:
+        GateReport with the issues found and the resolved import graph
+    """
+    start = time.perf_counter()
+    texts = {path: normalize_file_content(path, value) for path, value in files.items()}
+    targets = list(texts) if only is None else [p for p in dict.fromkeys(only) if p in texts]
+    report = GateReport(files=len(texts), checked=len(targets))
+    resolver = _Resolver(texts)
+    with span("static_gate", files=len(texts), checked=len(targets)) as s:
+        for path in targets:
+            text = texts[path]
+            if not text.strip():
+                if path.endswith(CODE_SUFFIXES + STYLE_SUFFIXES + (".json",)):
+                    report.issues.append(GateIssue(path, "empty", "is empty"))
+                continue
+            if path.endswith((".json", ".jsonc")):
+                try:
+                    _load_json(path, text)
+                except ValueError as e:
+                    report.issues.append(GateIssue(path, "invalid_json", f"is not valid JSON: {e}"))
+                continue
+            if path.endswith(CODE_SUFFIXES):
+                if isinstance(files[path], (dict, list)) or (_JSON_START.match(text) and _is_json(text)):
+                    report.issues.append(GateIssue(
+                        path, "config_as_json",
+                        "was emitted as a JSON object instead of a module "
+                        "(use `module.exports = {...}` or `export default {...}`)"))
+                    continue
+                specs = _code_imports(text)
+            elif path.endswith(STYLE_SUFFIXES):
+                # Packages and URLs are the bundler's business
+                specs = [m.group(2) for m in _CSS_IMPORT.finditer(text) if m.group(2).startswith(".")]
+            else:
+                continue
+            edges = []
+            for spec in specs:
+                report.imports += 1
+                found, issue = resolver.resolve(path, spec)
+                if found is not None and found not in edges:
+                    edges.append(found)
+                if issue is not None:
+                    report.issues.append(issue)
+            if edges:
+                report.graph[path] = edges
+        report.seconds = time.perf_counter() - start
+        s.set(issues=len(report.issues), imports=report.imports, gate_ms=round(report.seconds * 1000, 2))
+    return report
+
+def _mask_code(text: str) -> Tuple[str, List[str]]:
+    """
+    Source with comments blanked and each string literal replaced by its index.
+
+    Import-looking text inside comments, strings or template literals then
+    can't match, and the specifier of a real import is looked up by index.
+    """
+    strings: List[str] = []
+
+    def replace(match: "re.Match[str]") -> str:
+        token = match.group()
+        if token[0] in "'\"":
+            strings.append(token[1:-1])
+            return f"'{len(strings) - 1}'"
+        if token[0] == "`":
+            return "``"
+        return "\n" * token.count("\n")  # keep line starts for statement detection
+
+    return _CODE_TOKEN.sub(replace, text), strings
+
+def _code_imports(text: str) -> List[str]:
+    """Import specifiers of a JS/TS module, in source order."""
+    end = -1
+    for keyword in _IMPORT_KEYWORDS:
+        i = text.find(keyword)
+        while i != -1:
+            match = _CANDIDATE.match(text, i)
+            if match:
+                end = max(end, match.end())
+            i = text.find(keyword, i + len(keyword))
+    if end == -1:
+        return []
+    # Imports sit near the top, so only the text up to the last candidate's line is tokenized
+    line_end = text.find("\n", end)
+    masked, strings = _mask_code(text if line_end == -1 else text[:line_end])
+    return [strings[int(m.group(1) or m.group(2))] for m in _IMPORT.finditer(masked)]
+
+def _is_json(text: str) -> bool:
+    try:
+        json.loads(text)
+        return True
+    except ValueError:
+        return False
+
+def importers(graph: Dict[str, List[str]], paths: Iterable[str]) -> Set[str]:
+    """Files that import any of `paths` directly."""
+    wanted = set(paths)
+    return {src for src, targets in graph.items() if wanted.intersection(targets)}
+
+# Characters of each offending file shown to the engineer in a fix request
+FIX_CONTEXT_CHARS = 4000
+# Paths listed so the model knows what exists
+FIX_MAX_LISTED = 300
+
+def fix_prompt(brief: str, report: GateReport, files: Dict[str, Any]) -> str:
+    """Ask the engineer for just the files that fix the gate's issues."""
+    issues = "\n".join(f"- {issue}" for issue in report.issues)
+    listed = sorted(files)
+    listing = "\n".join(listed[:FIX_MAX_LISTED]) + (f"\n... and {len(listed) - FIX_MAX_LISTED} more"
+                                                     if len(listed) > FIX_MAX_LISTED else "")
+    shown = []
+    for path in report.paths:
+        text = normalize_file_content(path, files[path]) if path in files else ""
+        cut = "\n... (truncated)" if len(text) > FIX_CONTEXT_CHARS else ""
+        shown.append(f"--- {path}\n{text[:FIX_CONTEXT_CHARS]}{cut}")
+    return (
+        f"{brief}\n\nThe generated app has these files:\n{listing}\n\n"
+        f"A static check found these problems:\n{issues}\n\n"
+        "Current content of the files with problems:\n" + "\n".join(shown) + "\n\n"
+        "Fix every problem: create the missing files, add missing packages to package.json, and rewrite "
+        "broken files. Output a single JSON object containing ONLY the files to create or replace; keys are "
+        "file paths and values are the entire new file contents as strings. No Markdown fences or prose."
+    )
+
+@dataclass
+class GateRun:
+    """Files after the gate and any fix rounds."""
+    files: Dict[str, Any]
+    report: GateReport
+    initial_issues: int = 0
+    rounds: int = 0
+    replaced: List[str] = field(default_factory=list)
+    error: str = ""  # why the last fix request failed, if it did
+
+    def summary(self) -> str:
+        if not self.rounds:
+            return self.report.summary()
+        state = "all fixed" if self.report.ok else f"{len(self.report.issues)} left"
+        line = (f"{self.report.summary()}; {self.initial_issues} issues sent back to the engineer in "
+                f"{self.rounds} round(s), {len(self.replaced)} files added or replaced, {state}")
+        return line + (f" (fix request failed: {self.error})" if self.error else "")
+
+def gate_and_fix(files: Dict[str, Any], generator: Optional[Generator], brief: str, rounds: int = 2) -> GateRun:
+    """
+    Check a project and send mechanical failures back to the engineer.
+
+    Each round asks `generator` for the files that fix the current issues,
+    merges them into the file map and checks the project again. Stops when
+    clean, after `rounds` rounds, if a reply contains no usable files, or if
+    the request fails (the error is kept on the GateRun and the files so far
+    are returned).
+    """
+    files = dict(files)
+    report = check_project(files)
+    run = GateRun(files, report, initial_issues=len(report.issues))
+    while not report.ok and generator is not None and run.rounds < rounds:
+        run.rounds += 1
+        with span("gate_fix", round=run.rounds, issues=len(report.issues)) as s:
+            try:
+                answer = generator(fix_prompt(brief, report, files))
+            except Exception as e:  # connection errors, timeouts, HTTP errors from the model
+                run.error = f"{type(e).__name__}: {e}"
+                s.set(error=run.error)
+                break
+            try:
+                reply = extract_json_object(answer)
+            except ValueError:
+                reply = None
+            changed = [path for path, value in reply.items() if isinstance(path, str) and path.strip()] \
+                if isinstance(reply, dict) else []
+            s.set(files=len(changed))
+        if not changed:
+            break
+        for path in changed:
+            files[path] = reply[path]
+            if path not in run.replaced:
+                run.replaced.append(path)
+        # A full pass costs milliseconds, and a new file can fix issues anywhere
+        report = check_project(files)
+        run.report = report
+    run.files = files
+    return run
@@ -0,0 +1,25 @@
+"""
+Small statistics helpers for timing summaries.
+"""
+import math
+from typing import Sequence
+
+def percentile(values: Sequence[float], pct: float) -> float:
+    """
+    Linear-interpolated percentile of a sequence.
+
+    Args:
+        values: Sample values (need not be sorted)
+        pct: Percentile between 0 and 100
+
+    Returns:
+        The percentile, or 0.0 for an empty sequence
+    """
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * pct / 100.0
+    lo, hi = math.floor(rank), math.ceil(rank)
+    if lo == hi:
+        return ordered[lo]
+    return ordered[lo] + (ordered[hi] - ordered[lo]) * (rank - lo)
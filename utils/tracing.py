@@ -0,0 +1,247 @@
+"""
+Lightweight span tracing for pipeline stages, appended as JSONL to logs/.
+
+Each span records wall time plus, where LLM calls happened inside it, prompt
+and completion token counts, tokens/sec, model load time, model name and cache
+status.
+
+Summarize a trace file with:
+    python -m utils.tracing [--path logs/trace.jsonl] [--run RUN_ID]
+"""
+import argparse
+import contextvars
+import json
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+from utils.stats import percentile
+
+_current: contextvars.ContextVar[Optional["Span"]] = contextvars.ContextVar("current_span", default=None)
+_run_id: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("trace_run_id", default=None)
+_write_lock = threading.Lock()
+_trace_path: Optional[str] = None
+
+def trace_path() -> Optional[str]:
+    """JSONL file spans are appended to, or None when tracing is disabled."""
+    global _trace_path
+    if _trace_path is None:
+        from config import TRACE_PATH, TRACING
+        _trace_path = TRACE_PATH if TRACING else ""
+    return _trace_path or None
+
+def set_trace_path(path: Optional[str]) -> None:
+    """Redirect (or with None, disable) span output, e.g. for tests and benchmarks."""
+    global _trace_path
+    _trace_path = path or ""
+
+class Span:
+    """One timed unit of work; usage from nested LLM calls is aggregated into it."""
+
+    def __init__(self, name: str, attrs: Dict[str, Any], parent: Optional["Span"]):
+        self.name = name
+        self.attrs = dict(attrs)
+        self.parent = parent
+        self.start = time.time()
+        self._t0 = time.perf_counter()
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.eval_seconds = 0.0
+        self.load_seconds = 0.0
+        self.models: List[str] = []
+        self.cache: List[str] = []
+        self._lock = threading.Lock()
+
+    def set(self, **attrs: Any) -> None:
+        """Attach extra attributes to the span record."""
+        self.attrs.update(attrs)
+
+    def add_llm_usage(self, model: str, prompt_tokens: int, completion_tokens: int,
+                      eval_seconds: float, cache: Optional[str], load_seconds: float = 0.0) -> None:
+        """Fold one LLM call's usage into this span and its ancestors."""
+        span: Optional[Span] = self
+        while span is not None:
+            with span._lock:
+                span.prompt_tokens += prompt_tokens
+                span.completion_tokens += completion_tokens
+                span.eval_seconds += eval_seconds
+                span.load_seconds += load_seconds
+                if model and model not in span.models:
+                    span.models.append(model)
+                if cache:
+                    span.cache.append(cache)
+            span = span.parent
+
+    def record(self, status: str, wall: float) -> Dict[str, Any]:
+        cache = None
+        if self.cache:
+            cache = self.cache[0] if len(set(self.cache)) == 1 else "mixed"
+        # Prefer server-reported generation time so queueing/prefill don't skew tok/s
+        seconds = self.eval_seconds or wall
+        rate = round(self.completion_tokens / seconds, 2) if self.completion_tokens and seconds else None
+        return {
+            "ts": round(self.start, 3),
+            "run_id": _run_id.get(),
+            "span": self.name,
+            "parent": self.parent.name if self.parent else None,
+            "status": status,
+            "wall_ms": round(wall * 1000, 2),
+            "model": ",".join(self.models) or None,
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "tokens_per_sec": rate,
+            "load_ms": round(self.load_seconds * 1000, 2),
+            "cache": cache,
+            **self.attrs,
+        }
+
+def _emit(record: Dict[str, Any]) -> None:
+    path = trace_path()
+    if not path:
+        return
+    line = json.dumps(record, default=str) + "\n"
+    with _write_lock:
+        parent = os.path.dirname(path)
+        if parent:
+            os.makedirs(parent, exist_ok=True)
+        with open(path, "a", encoding="utf-8") as fh:
+            fh.write(line)
+
+@contextmanager
+def span(name: str, **attrs: Any) -> Iterator[Span]:
+    """
+    Time a block of work and append it to the trace on exit.
+
+    Args:
+        name: Span name (e.g. 'research', 'web_search', 'write_files')
+        **attrs: Extra attributes stored with the record
+    """
+    current = Span(name, attrs, _current.get())
+    token = _current.set(current)
+    status = "ok"
+    try:
+        yield current
+    except BaseException as e:
+        status = "error"
+        current.set(error=f"{type(e).__name__}: {e}")
+        raise
+    finally:
+        _current.reset(token)
+        _emit(current.record(status, time.perf_counter() - current._t0))
+
+def current_span() -> Optional[Span]:
+    return _current.get()
+
+@contextmanager
+def trace_run(run_id: Optional[str] = None, **attrs: Any) -> Iterator[Span]:
+    """Open the root span for one pipeline run, tagging every nested span with its id."""
+    token = _run_id.set(run_id or uuid.uuid4().hex[:12])
+    try:
+        with span("run", **attrs) as root:
+            yield root
+    finally:
+        _run_id.reset(token)
+
+def record_llm_call(model: str, wall: float, prompt_tokens: int, completion_tokens: int,
+                    eval_seconds: float, cache: Optional[str], parent: Optional[Span] = None,
+                    status: str = "ok", load_seconds: float = 0.0, **attrs: Any) -> None:
+    """
+    Append an 'llm' span for a finished model call and roll its usage into `parent`.
+
+    Args:
+        model: Model name
+        wall: Wall-clock seconds of the call
+        prompt_tokens: Prompt (prefill) token count
+        completion_tokens: Generated token count
+        eval_seconds: Generation time reported by the server (0 if unknown)
+        cache: 'hit', 'miss', or None when caching is off
+        parent: Enclosing span; defaults to the current one
+        load_seconds: Time the server spent loading the model for this call
+    """
+    parent = parent if parent is not None else _current.get()
+    call = Span("llm", attrs, parent)
+    call.start = time.time() - wall
+    # Also folds the usage into every enclosing span
+    call.add_llm_usage(model, prompt_tokens, completion_tokens, eval_seconds, cache, load_seconds)
+    _emit(call.record(status, wall))
+
+# -- summary CLI --------------------------------------------------------------
+
+def load_spans(path: str, run_id: Optional[str] = None) -> List[Dict[str, Any]]:
+    spans = []
+    with open(path, encoding="utf-8") as fh:
+        for line in fh:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if run_id is None or record.get("run_id") == run_id:
+                spans.append(record)
+    return spans
+
+def summarize(spans: List[Dict[str, Any]]) -> str:
+    """Roll spans up into per-phase and per-model percentile tables."""
+    def table(title: str, groups: Dict[str, List[Dict[str, Any]]]) -> List[str]:
+        lines = [title, f"  {'name':<28} {'n':>5} {'p50 ms':>10} {'p95 ms':>10} {'prompt tok':>11} "
+                        f"{'compl tok':>10} {'p50 tok/s':>10} {'load ms':>9} {'cache hit':>10}"]
+        for name, records in sorted(groups.items()):
+            walls = [r["wall_ms"] for r in records]
+            rates = [r["tokens_per_sec"] for r in records if r.get("tokens_per_sec")]
+            cached = [r["cache"] for r in records if r.get("cache")]
+            hit = f"{100.0 * cached.count('hit') / len(cached):.0f}%" if cached else "-"
+            lines.append(
+                f"  {name:<28} {len(records):>5} {percentile(walls, 50):>10.1f} {percentile(walls, 95):>10.1f} "
+                f"{sum(r.get('prompt_tokens') or 0 for r in records):>11} "
+                f"{sum(r.get('completion_tokens') or 0 for r in records):>10} "
+                f"{percentile(rates, 50):>10.1f} {sum(r.get('load_ms') or 0 for r in records):>9.0f} {hit:>10}"
+            )
+        return lines
+
+    def prefill(groups: Dict[str, List[Dict[str, Any]]]) -> List[str]:
+        lines = ["Prefill per phase (LLM calls):",
+                 f"  {'phase':<28} {'n':>5} {'prompt tok':>11} {'tok/call':>9} {'prefill ms':>11} "
+                 f"{'p50 ttft ms':>12} {'p95 ttft ms':>12}"]
+        for name, records in sorted(groups.items()):
+            tokens = sum(r.get("prompt_tokens") or 0 for r in records)
+            ttfts = [r["ttft_ms"] for r in records if r.get("ttft_ms") is not None]
+            lines.append(
+                f"  {name:<28} {len(records):>5} {tokens:>11} {tokens / len(records):>9.0f} "
+                f"{sum(r.get('prefill_ms') or 0 for r in records):>11.0f} "
+                f"{percentile(ttfts, 50):>12.1f} {percentile(ttfts, 95):>12.1f}"
+            )
+        return lines
+
+    phases: Dict[str, List[Dict[str, Any]]] = {}
+    models: Dict[str, List[Dict[str, Any]]] = {}
+    calls: Dict[str, List[Dict[str, Any]]] = {}
+    for record in spans:
+        if record["span"] == "llm":
+            models.setdefault(record.get("model") or "?", []).append(record)
+            if record.get("cache") != "hit":
+                calls.setdefault(record.get("phase") or "?", []).append(record)
+        else:
+            phases.setdefault(record["span"], []).append(record)
+    runs = {r.get("run_id") for r in spans}
+    return "\n".join([f"{len(spans)} spans from {len(runs)} run(s)"]
+                     + table("Per phase:", phases) + table("Per model (LLM calls):", models) + prefill(calls))
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Summarize pipeline trace spans")
+    ap.add_argument("--path", help="Trace JSONL file (default: config.TRACE_PATH)")
+    ap.add_argument("--run", help="Only include spans from this run id")
+    args = ap.parse_args()
+    if args.path:
+        path = args.path
+    else:
+        from config import TRACE_PATH
+        path = TRACE_PATH
+    print(summarize(load_spans(path, args.run)))
+
+if __name__ == "__main__":
+    main()